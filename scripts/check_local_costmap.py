@@ -0,0 +1,77 @@
+"""
+Verificação headless da separação entre estrutura conhecida e obstáculos novos no
+mapa de custo local.
+
+Uma mesa é cadastrada como área proibida. Os retornos do LIDAR na face da mesa já
+são evitados pelo planejador e não devem entrar na camada dinâmica; já uma pessoa
+parada a 0,2 m da borda da mesa, ou mesmo dentro da inflação usada pelo A*, precisa
+entrar, senão o robô nunca replaneja ao redor dela.
+
+Uso:
+    python scripts/check_local_costmap.py
+
+Sai com código 1 se alguma verificação falhar.
+"""
+
+import sys
+import os
+import io
+import contextlib
+import numpy as np
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.robot_navigator import RobotNavigator
+from src.core.config import FORBIDDEN_AREA_INFLATION_RADIUS
+
+TABLE = [(2.5, 6.0), (4.0, 6.0), (4.0, 7.0), (2.5, 7.0)]
+ROBOT_POSITION = (1.2, 6.5)
+# Distâncias (m) entre a borda da mesa e a pessoa; a menor fica dentro da inflação da mesa
+PERSON_GAPS = (0.2, FORBIDDEN_AREA_INFLATION_RADIUS - 0.01)
+RANGE_NOISE = 0.01  # metros
+
+
+def face_hits(x: float, y0: float, y1: float, rng) -> np.ndarray:
+    """Retornos em uma face vertical (x fixo), com o ruído de distância do LIDAR."""
+    ys = np.linspace(y0, y1, 20)
+    return np.stack([x + rng.normal(0.0, RANGE_NOISE, len(ys)), ys], axis=1)
+
+
+def update(nav: RobotNavigator, hits: np.ndarray):
+    """Integra os retornos como _process_lidar_scan faz."""
+    nav.local_costmap.reset()
+    nav.local_costmap.update(nav.current_position, hits, 0.0, known=nav.path_finder.structure_points(hits))
+
+
+def main() -> int:
+    rng = np.random.default_rng(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        nav = RobotNavigator()
+        nav.set_forbidden_areas([TABLE])
+    nav.current_position = ROBOT_POSITION
+    nav.local_costmap.recenter(ROBOT_POSITION)
+
+    table = face_hits(TABLE[0][0], 6.1, 6.9, rng)
+    ok = True
+
+    update(nav, table)
+    marked = bool(nav.local_costmap.points_blocked(table).any())
+    print(f"Face da mesa: {'marcada (ERRO)' if marked else 'ignorada'} na camada dinâmica")
+    ok &= not marked
+
+    for gap in PERSON_GAPS:
+        person = face_hits(TABLE[0][0] - gap, 6.4, 6.6, rng)
+        update(nav, np.concatenate([table, person]))
+        marked = bool(nav.local_costmap.points_blocked(person).all())
+        # O trecho rente à mesa passa pela pessoa: precisa aparecer como bloqueado
+        aisle = [ROBOT_POSITION, (TABLE[0][0] - gap, 6.5), (TABLE[0][0] - gap, 7.5)]
+        blocked = nav._leg_blocked(aisle)
+        print(f"Pessoa a {gap:.2f}m da mesa: {'marcada' if marked else 'ignorada (ERRO)'} na camada dinâmica, "
+              f"trecho ao lado da mesa {'bloqueado' if blocked else 'livre (ERRO)'}")
+        ok &= marked and blocked
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Verificação headless do filtro de partículas: localização global e robô sequestrado.
+
+O robô percorre um circuito em um salão simulado (6 m x 12 m com mesas e balcão).
+Cada volta do LIDAR sai do ScanSimulator e passa pelo ScanRingBuffer, a mesma
+conversão para SCAN_DTYPE usada pelo SlamtecManager no modo simulado; a odometria
+recebe ruído e deriva. Duas fases:
+
+1. Localização global: partículas uniformes no espaço livre até convergir na pose real.
+2. Sequestro: o robô é levado para outro ponto sem que a odometria perceba; o filtro
+   deve detectar a queda da verossimilhança, injetar partículas e reconvergir.
+
+Uso:
+    python scripts/check_particle_filter.py [semente]
+
+Sai com código 1 se alguma fase não convergir dentro do limite de atualizações.
+"""
+
+import sys
+import os
+import math
+import io
+import contextlib
+import numpy as np
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.particle_filter import ParticleFilter
+from src.core.scan_simulator import ScanSimulator
+from src.core.lidar_buffer import ScanRingBuffer, SCAN_DTYPE
+from src.core.config import MAP_GRID_SIZE, ENVIRONMENT_WIDTH, ENVIRONMENT_HEIGHT
+
+# Critério de sucesso: erro de posição e de orientação com o filtro convergido
+MAX_POSITION_ERROR = 0.3  # metros
+MAX_ANGLE_ERROR = 10.0  # graus
+GLOBAL_MAX_UPDATES = 120
+KIDNAP_MAX_UPDATES = 150
+
+STEP_DISTANCE = 0.1  # metros entre voltas (igual a PF_UPDATE_MIN_DISTANCE)
+TURN_STEP = 15.0  # graus por volta ao girar no lugar
+ODOMETRY_NOISE = (0.05, 0.5)  # desvio relativo da translação, desvio (graus) por volta
+
+# Circuito (x, y) no sentido anti-horário, longe das mesas
+CIRCUIT = [(1.0, 1.0), (5.0, 1.0), (5.0, 6.0), (1.0, 6.0), (1.0, 11.0), (5.0, 11.0), (5.0, 6.0), (1.0, 6.0)]
+KIDNAP_CIRCUIT_INDEX = 4  # O sequestro leva o robô da metade de baixo para (1, 11)
+
+
+def build_room() -> np.ndarray:
+    """Grade [y, x] do salão: paredes e móveis sem correspondente no salão girado de 180°."""
+    width = int(round(ENVIRONMENT_WIDTH / MAP_GRID_SIZE))
+    height = int(round(ENVIRONMENT_HEIGHT / MAP_GRID_SIZE))
+    occupied = np.zeros((height, width), dtype=bool)
+    occupied[0, :] = occupied[-1, :] = occupied[:, 0] = occupied[:, -1] = True
+
+    def block(x0, y0, x1, y1):
+        occupied[int(y0 / MAP_GRID_SIZE):int(y1 / MAP_GRID_SIZE), int(x0 / MAP_GRID_SIZE):int(x1 / MAP_GRID_SIZE)] = True
+
+    block(2.0, 2.5, 3.0, 3.5)    # Mesa quadrada
+    block(1.8, 7.5, 2.2, 9.5)    # Mesa comprida
+    block(0.1, 3.4, 0.5, 5.0)    # Balcão na parede esquerda
+    block(4.4, 0.1, 5.9, 0.4)    # Aparador na parede de baixo
+    block(4.6, 11.2, 5.9, 11.9)  # Bar no canto de cima
+    block(5.5, 9.6, 5.9, 11.2)
+    block(3.2, 6.4, 3.6, 6.8)    # Vaso no corredor central
+    return occupied
+
+
+def circuit_poses(start_index: int = 0):
+    """Gera as poses reais do circuito, uma por volta do LIDAR (gira no lugar nos cantos)."""
+    x, y = CIRCUIT[start_index]
+    heading = 0.0
+    index = start_index
+    while True:
+        target = CIRCUIT[(index + 1) % len(CIRCUIT)]
+        desired = math.degrees(math.atan2(target[1] - y, target[0] - x))
+        while abs((desired - heading + 180.0) % 360.0 - 180.0) > 1e-6:
+            delta = (desired - heading + 180.0) % 360.0 - 180.0
+            heading = (heading + max(-TURN_STEP, min(TURN_STEP, delta))) % 360.0
+            yield x, y, heading
+        while math.hypot(target[0] - x, target[1] - y) > 1e-6:
+            step = min(STEP_DISTANCE, math.hypot(target[0] - x, target[1] - y))
+            x += step * math.cos(math.radians(heading))
+            y += step * math.sin(math.radians(heading))
+            yield x, y, heading
+        index = (index + 1) % len(CIRCUIT)
+
+
+class Check:
+    """Estado da verificação: pose real, odometria com ruído e filtro."""
+
+    def __init__(self, seed: int):
+        occupied = build_room()
+        self.rng = np.random.default_rng(seed)
+        self.simulator = ScanSimulator(seed=seed)
+        self.simulator.set_map(occupied, MAP_GRID_SIZE)
+        self.buffer = ScanRingBuffer()
+        self.filter = ParticleFilter(seed=seed)
+        self.filter.set_map(occupied, resolution=MAP_GRID_SIZE)
+        self.truth = None
+        self.odometry = None
+        self.scan_time = 0.0
+
+    def scan(self) -> np.ndarray:
+        """Simula uma volta na pose real e a lê do anel, como o navegador faz."""
+        self.scan_time += 0.1
+        sequence = self.buffer.publish(*self.simulator.simulate(self.truth), timestamps=self.scan_time)
+        latest_sequence, scan = self.buffer.latest()
+        assert latest_sequence == sequence and scan.dtype == SCAN_DTYPE
+        return scan
+
+    def move_to(self, pose):
+        """Move a pose real e acumula o mesmo deslocamento, com ruído, na odometria."""
+        if self.truth is None:
+            self.truth = pose
+            self.odometry = pose
+            return
+        dx, dy = pose[0] - self.truth[0], pose[1] - self.truth[1]
+        distance = math.hypot(dx, dy)
+        turn = (pose[2] - self.truth[2] + 180.0) % 360.0 - 180.0
+        # Deslocamento no referencial do robô, reaplicado à odometria (que já derivou)
+        direction = math.atan2(dy, dx) - math.radians(self.truth[2]) if distance > 0 else 0.0
+        distance *= 1.0 + self.rng.normal(0.0, ODOMETRY_NOISE[0])
+        heading = math.radians(self.odometry[2]) + direction
+        odometry_turn = turn + self.rng.normal(0.0, ODOMETRY_NOISE[1])
+        previous = self.odometry
+        self.odometry = (previous[0] + distance * math.cos(heading), previous[1] + distance * math.sin(heading),
+                         (previous[2] + odometry_turn) % 360.0)
+        self.truth = pose
+        self.filter.predict(previous, self.odometry)
+
+    def error(self):
+        """Erros de posição (m) e orientação (graus) da estimativa em relação à pose real."""
+        estimate, _ = self.filter.estimate()
+        position_error = math.hypot(estimate[0] - self.truth[0], estimate[1] - self.truth[1])
+        angle_error = abs((estimate[2] - self.truth[2] + 180.0) % 360.0 - 180.0)
+        return position_error, angle_error
+
+    def localized(self) -> bool:
+        position_error, angle_error = self.error()
+        return self.filter.converged and position_error < MAX_POSITION_ERROR and angle_error < MAX_ANGLE_ERROR
+
+    def run(self, poses, max_updates: int):
+        """Segue as poses até localizar; retorna o número de atualizações usadas ou None."""
+        for updates in range(1, max_updates + 1):
+            self.move_to(next(poses))
+            scan = self.scan()
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.filter.update(scan, force=True)
+            if self.localized():
+                return updates
+        return None
+
+
+def report(phase: str, updates, check: Check) -> bool:
+    position_error, angle_error = check.error()
+    stats = check.filter.stats()
+    status = f"convergiu em {updates} atualizações" if updates is not None else "NÃO convergiu"
+    print(f"{phase}: {status} - erro {position_error:.3f}m / {angle_error:.1f}°, "
+          f"{stats['particles']} partículas, {stats['last_update_ms']:.1f}ms por atualização")
+    return updates is not None
+
+
+def main(seed: int = 0) -> int:
+    check = Check(seed)
+    poses = circuit_poses()
+    check.move_to(next(poses))
+    with contextlib.redirect_stdout(io.StringIO()):
+        check.filter.initialize_global()
+    print(f"Localização global com {check.filter.particle_count} partículas (semente {seed})")
+    ok = report("Localização global", check.run(poses, GLOBAL_MAX_UPDATES), check)
+
+    # Sequestro: a pose real salta para outro trecho do circuito, a odometria continua de onde estava
+    kidnap_poses = circuit_poses(start_index=KIDNAP_CIRCUIT_INDEX)
+    check.truth = next(kidnap_poses)
+    ok = report("Robô sequestrado", check.run(kidnap_poses, KIDNAP_MAX_UPDATES), check) and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 0))
@@ -0,0 +1,211 @@
+"""
+Verificação headless dos decodificadores e do driver do RPLIDAR.
+
+Primeiro os decodificadores de rplidar_protocol recebem fluxos com bits trocados e
+bytes inseridos, entregues em blocos de tamanho aleatório como a porta serial faz:
+
+- o decodificador vetorizado do SCAN padrão deve produzir exatamente os mesmos nós
+  e pacotes perdidos que a referência em Python puro;
+- os decodificadores de cápsulas EXPRESS e DENSE devem devolver as distâncias e os
+  ângulos codificados e o mesmo resultado com qualquer divisão em blocos.
+
+Depois o driver roda sobre o dispositivo falso (pty): o FakeRPLidarDevice transmite
+voltas de uma sala com distância conhecida para cada ângulo e corrompe um pacote a
+cada poucas voltas. O RPLidarDriver abre o pty como se fosse a porta serial, nos
+modos STANDARD (nós de 5 bytes) e EXPRESS (cápsulas DENSE), e deve:
+
+- publicar as voltas no ScanRingBuffer com todos os pontos e distâncias corretas;
+- medir a taxa de varredura configurada no dispositivo;
+- contar como perdidos exatamente os pacotes corrompidos.
+
+Uso:
+    python scripts/check_rplidar_driver.py [semente]
+
+Sai com código 1 se alguma verificação falhar.
+"""
+
+import sys
+import os
+import io
+import time
+import contextlib
+import numpy as np
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.rplidar_driver import RPLidarDriver, SERIAL_AVAILABLE
+from src.core.rplidar_fake_device import FakeRPLidarDevice
+from src.core.lidar_buffer import ScanRingBuffer
+from src.core.rplidar_protocol import (NODE_SIZE, CAPSULE_SIZE, DENSE_SAMPLES, EXPRESS_SAMPLES, CapsuleDecoder,
+                                       decode_standard_nodes, decode_standard_nodes_python,
+                                       encode_standard_nodes, encode_capsules)
+
+POINTS_PER_SCAN = 360
+SCAN_RATE = 10.0  # voltas por segundo
+CORRUPT_EVERY = 4  # um pacote corrompido a cada N voltas
+DURATION = 2.0  # segundos de aquisição por modo
+MIN_REVOLUTIONS = int(0.7 * SCAN_RATE * DURATION)
+MAX_RATE_ERROR = 0.25  # erro relativo aceito na taxa de varredura
+MAX_RANGE_ERROR = 0.005  # metros (quantização do protocolo)
+
+DECODER_TRIALS = 50  # fluxos aleatórios por decodificador
+STREAM_REVOLUTIONS = 10
+MAX_CORRUPTIONS = 30  # bits trocados por fluxo
+MAX_CHUNK = 3000  # bytes - maior bloco entregue ao decodificador
+
+
+def room(angles_deg: np.ndarray) -> np.ndarray:
+    """Distância (mm) até as paredes de uma sala alongada, para cada ângulo."""
+    return 2000.0 + 800.0 * np.cos(np.radians(angles_deg) * 2.0)
+
+
+def corrupt(data: bytes, packet_size: int, rng) -> bytes:
+    """Troca bits aleatórios e insere lixo entre pacotes (perda de bytes na serial)."""
+    damaged = bytearray(data)
+    for position in rng.integers(0, len(damaged), int(rng.integers(1, MAX_CORRUPTIONS + 1))).tolist():
+        damaged[position] ^= 1 << int(rng.integers(8))
+    position = int(rng.integers(len(damaged) // packet_size)) * packet_size
+    damaged[position:position] = rng.integers(0, 256, int(rng.integers(1, packet_size)), dtype=np.uint8).tobytes()
+    return bytes(damaged)
+
+
+def decode_chunked(decoder, data: bytes, rng=None):
+    """Entrega o fluxo em blocos aleatórios (ou de uma vez), como o driver, e junta os resultados."""
+    pieces, dropped, pending, position = [], 0, b"", 0
+    while position < len(data):
+        size = int(rng.integers(1, MAX_CHUNK)) if rng is not None else len(data)
+        pending += data[position:position + size]
+        position += size
+        result = decoder(pending)
+        pieces.append(result[:4])
+        dropped += result[5]
+        pending = pending[result[4]:]
+    return [np.concatenate([piece[i] for piece in pieces]) for i in range(4)], dropped
+
+
+def same_output(a, b) -> bool:
+    """Compara (início de volta, qualidade, ângulo, distância) de duas decodificações."""
+    return (all(len(x) == len(y) for x, y in zip(a, b)) and np.array_equal(a[0], b[0])
+            and np.array_equal(a[1], b[1]) and np.allclose(a[2], b[2], rtol=0.0, atol=1e-12)
+            and np.allclose(a[3], b[3], rtol=0.0, atol=1e-12))
+
+
+def check_standard_decoders(rng) -> bool:
+    """Decodificador vetorizado x referência em Python sobre fluxos SCAN padrão corrompidos."""
+    angles = np.linspace(0.0, 360.0, POINTS_PER_SCAN, endpoint=False)
+    stream = b"".join(encode_standard_nodes(angles, room(angles), rng.integers(0, 64, POINTS_PER_SCAN))
+                      for _ in range(STREAM_REVOLUTIONS))
+    mismatches = 0
+    nodes = dropped = 0
+    for _ in range(DECODER_TRIALS):
+        data = corrupt(stream, NODE_SIZE, rng)
+        seed = int(rng.integers(2 ** 32))
+        vectorized, vectorized_dropped = decode_chunked(decode_standard_nodes, data, np.random.default_rng(seed))
+        reference, reference_dropped = decode_chunked(decode_standard_nodes_python, data, np.random.default_rng(seed))
+        if vectorized_dropped != reference_dropped or not same_output(vectorized, reference):
+            mismatches += 1
+        nodes += len(vectorized[0])
+        dropped += vectorized_dropped
+    print(f"SCAN padrão: {DECODER_TRIALS} fluxos, {nodes} nós, {dropped} pacotes perdidos - "
+          f"{'idêntico à referência' if not mismatches else f'{mismatches} fluxos DIFERENTES da referência'}")
+    return not mismatches
+
+
+def check_capsule_decoders(rng, dense: bool) -> bool:
+    """Cápsulas EXPRESS/DENSE: valores codificados e independência da divisão em blocos."""
+    name = "DENSE" if dense else "EXPRESS"
+    samples = DENSE_SAMPLES if dense else EXPRESS_SAMPLES
+    capsules = STREAM_REVOLUTIONS * POINTS_PER_SCAN // samples
+    starts = np.arange(capsules) * (360.0 * samples / POINTS_PER_SCAN) % 360.0
+    span = 360.0 * samples / POINTS_PER_SCAN
+    failures = 0
+    for _ in range(DECODER_TRIALS):
+        distances = rng.integers(100, 4000, (capsules, samples)).astype(np.float64)
+        stream = encode_capsules(starts, distances, dense=dense)
+        # Fluxo íntegro: a última cápsula fica pendente à espera da sucessora
+        (_, _, angles, ranges), dropped = decode_chunked(CapsuleDecoder(dense).feed, stream, rng)
+        expected_angles = (starts[:-1, None] + span * np.arange(samples)[None, :] / samples).ravel() % 360.0
+        if (dropped or not np.allclose(ranges * 1000.0, distances[:-1].ravel())
+                or not np.allclose(np.degrees(angles), expected_angles, atol=1e-6)):
+            failures += 1
+            continue
+        data = corrupt(stream, CAPSULE_SIZE, rng)
+        chunked, chunked_dropped = decode_chunked(CapsuleDecoder(dense).feed, data, rng)
+        whole, whole_dropped = decode_chunked(CapsuleDecoder(dense).feed, data)
+        if chunked_dropped != whole_dropped or not same_output(chunked, whole):
+            failures += 1
+    print(f"{name}: {DECODER_TRIALS} fluxos de {capsules} cápsulas - "
+          f"{'OK' if not failures else f'{failures} fluxos com resultado ERRADO'}")
+    return not failures
+
+
+def check_mode(scan_mode: str) -> bool:
+    """Roda o driver sobre o dispositivo falso em um modo e verifica o anel e as estatísticas."""
+    device = FakeRPLidarDevice(points_per_scan=POINTS_PER_SCAN, scan_rate=SCAN_RATE,
+                               range_function=room, corrupt_every=CORRUPT_EVERY)
+    device.start()
+    buffer = ScanRingBuffer()
+    driver = RPLidarDriver(port=device.port, buffer=buffer, scan_mode=scan_mode)
+    counts, range_errors = [], []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = driver.start()
+        if not started:
+            print(f"{scan_mode}: driver não iniciou ({driver.last_error})")
+            return False
+        # Lê as voltas pelo anel, como o laço de controle faz, durante a aquisição
+        deadline = time.time() + DURATION
+        for _, scan in buffer.scans(start=1, timeout=1.0):
+            expected = room(np.degrees(scan['angle'].astype(np.float64))) / 1000.0
+            counts.append(len(scan))
+            range_errors.append(float(np.max(np.abs(scan['range'] - expected))) if len(scan) else 0.0)
+            if time.time() >= deadline:
+                break
+        stats = driver.stats()
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            driver.stop()
+        device.close()
+
+    failures = []
+    if stats['revolutions'] < MIN_REVOLUTIONS or len(counts) < MIN_REVOLUTIONS:
+        failures.append(f"{stats['revolutions']} voltas publicadas, {len(counts)} lidas do anel "
+                        f"(mínimo {MIN_REVOLUTIONS})")
+    # Só as voltas com pacote corrompido podem chegar incompletas
+    complete = sum(abs(count - POINTS_PER_SCAN) <= 1 for count in counts)
+    if complete < len(counts) - device.corrupted_nodes or max(counts, default=0) > POINTS_PER_SCAN:
+        failures.append(f"{complete} de {len(counts)} voltas com {POINTS_PER_SCAN} pontos")
+    if max(range_errors, default=0.0) > MAX_RANGE_ERROR:
+        failures.append(f"erro de distância de {max(range_errors) * 1000:.1f}mm")
+    if abs(stats['scan_rate'] - SCAN_RATE) > MAX_RATE_ERROR * SCAN_RATE:
+        failures.append(f"taxa de varredura {stats['scan_rate']:.2f}Hz (esperado {SCAN_RATE:.1f}Hz)")
+    # O último pacote corrompido pode ainda estar em trânsito quando a aquisição para
+    if not (0 < stats['dropped_packets'] <= device.corrupted_nodes
+            and stats['dropped_packets'] >= device.corrupted_nodes - 1):
+        failures.append(f"{stats['dropped_packets']} pacotes perdidos para {device.corrupted_nodes} corrompidos")
+
+    print(f"{scan_mode}: {stats['revolutions']} voltas ({complete} completas), {stats['scan_rate']:.2f}Hz, "
+          f"{stats['dropped_packets']}/{device.corrupted_nodes} pacotes corrompidos descartados, "
+          f"tipo de resposta 0x{stats['response_type'] or 0:02x} - {'OK' if not failures else 'FALHOU'}")
+    for failure in failures:
+        print(f"  {failure}")
+    return not failures
+
+
+def main(seed: int = 0) -> int:
+    rng = np.random.default_rng(seed)
+    print(f"Decodificadores (semente {seed})")
+    ok = check_standard_decoders(rng)
+    for dense in (False, True):
+        ok = check_capsule_decoders(rng, dense) and ok
+    if not SERIAL_AVAILABLE:
+        print("pyserial não disponível - verificação do driver não executada")
+        return 1
+    for scan_mode in ("STANDARD", "EXPRESS"):
+        ok = check_mode(scan_mode) and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 0))
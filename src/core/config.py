@@ -36,6 +36,11 @@ EMERGENCY_STOP_DISTANCE = 0.2  # 20cm
 # Raio (30cm para um robô de 60cm de diâmetro) + Folga (5cm) = 35cm
 FORBIDDEN_AREA_INFLATION_RADIUS = 0.35 # 35cm de margem de segurança
 
+# Índice espacial das áreas proibidas (consultas de proximidade em O(1))
+SPATIAL_INDEX_BUCKET_SIZE = 0.5  # metros - lado de cada bucket de arestas
+CLEARANCE_FIELD_RESOLUTION = 0.05  # metros - resolução do campo de distância
+CLEARANCE_FIELD_MAX_DISTANCE = 1.0  # metros - distâncias maiores são saturadas no campo
+
 # Configurações do robô
 ROBOT_WIDTH = 0.6  # Largura/Diâmetro do robô em metros
 ROBOT_SPEED = 0.2  # Velocidade base do robô (m/s)
@@ -61,8 +66,41 @@ NAVIGATION_FINE_APPROACH_DISTANCE = 0.15  # 15cm
 NAVIGATION_PRECISION_APPROACH_DISTANCE = 0.08  # 8cm
 NAVIGATION_ULTRA_PRECISION_ANGLE_TOLERANCE = 0.5  # graus (tolerância de ângulo ultra-precisa)
 
+# Modo de seguimento do caminho
+# "WAYPOINT": gira no lugar e avança ponto a ponto (máquina de estados original)
+# "PURE_PURSUIT": segue o caminho continuamente mirando um ponto de antecipação
+NAVIGATION_FOLLOWER_MODE = "WAYPOINT"
+NAVIGATION_FOLLOWER_MODES = ("WAYPOINT", "PURE_PURSUIT")
+NAVIGATION_MAX_TURN_VALUE = 0.5  # Comando de giro máximo usado na navegação
+
+# Configurações do seguidor pure pursuit
+# Modelo cinemático da simulação (ver RobotNavigator._update_position):
+#   velocidade linear [m/s]    = forward_value * ROBOT_SPEED
+#   velocidade angular [graus/s] = turn_value * ROBOT_TURN_SPEED
+PURE_PURSUIT_LOOKAHEAD_TIME = 1.5  # segundos de antecipação na velocidade atual
+PURE_PURSUIT_MIN_LOOKAHEAD = 0.25  # metros
+PURE_PURSUIT_MAX_LOOKAHEAD = 0.6  # metros
+PURE_PURSUIT_MIN_TURN_RADIUS = 0.4  # metros - curvas mais fechadas reduzem a velocidade
+PURE_PURSUIT_ROTATE_IN_PLACE_ANGLE = 60.0  # graus - acima disso gira no lugar
+PURE_PURSUIT_APPROACH_DISTANCE = 0.4  # metros - desacelera perto do fim do caminho
+PURE_PURSUIT_MIN_APPROACH_RATIO = 0.25  # fração mínima da velocidade na desaceleração
+PURE_PURSUIT_SEARCH_WINDOW = 20  # segmentos à frente considerados na projeção
+
+# Perfil de velocidade ao longo do caminho planejado (unidades físicas da simulação)
+TRAJECTORY_PROFILE_ENABLED = True
+TRAJECTORY_MAX_ACCELERATION = 0.05  # m/s² - aceleração/frenagem longitudinal
+TRAJECTORY_MAX_LATERAL_ACCELERATION = 0.1  # m/s² - limita a velocidade nas curvas
+TRAJECTORY_RESOLUTION = 0.01  # metros entre amostras da tabela de velocidade
+TRAJECTORY_MIN_SPEED = 0.005  # m/s - velocidade mínima para não travar nas paradas
+
+# Suavização do caminho (B-spline validada contra a grade de obstáculos)
+PATH_SMOOTHING_SAMPLE_SPACING = 0.02  # metros entre amostras de validação
+PATH_SMOOTHING_CONTROL_SPACING = 0.3  # metros - espaçamento máximo dos pontos de controle
+PATH_SMOOTHING_WAYPOINT_SPACING = 0.25  # metros entre waypoints do caminho suavizado
+
 # Configurações de interface
 INTERFACE_UPDATE_RATE = 10  # Hz
+INTERFACE_MAX_FPS = 10  # quadros/s - limite do redesenho do robô no mapa, independente da taxa de controle
 INTERFACE_GRID_SIZE = 1  # metros
 INTERFACE_POINT_SIZE = 15  # pixels (mesmo tamanho do robô para facilitar navegação)
 INTERFACE_ROBOT_SIZE = 15  # pixels
@@ -71,6 +109,21 @@ INTERFACE_DIRECTION_LENGTH = 30  # pixels
 # Configurações de banco de dados
 DATABASE_PATH = "data/robot.db"
 DATABASE_VERSION = "1.0"
+DATABASE_SCHEMA_VERSION = 1  # PRAGMA user_version; 1: coordenadas das áreas em BLOB float64
+DATABASE_POOL_SIZE = 4  # conexões de leitura compartilhadas entre threads
+DATABASE_BUSY_TIMEOUT = 5.0  # segundos - espera pelo bloqueio de escrita (evita "database is locked")
+DATABASE_STATEMENT_CACHE_SIZE = 256  # comandos preparados em cache por conexão
+MAP_WRITE_BEHIND_DELAY = 0.2  # segundos - agrupa edições do mapa antes de gravá-las em segundo plano
+MAP_WRITE_BEHIND_MAX_DELAY = 2.0  # segundos - espera máxima de um mapa editado sem parar até ser gravado
+MAP_BUNDLE_DIRECTORY = "data/mapas"  # pacotes de mapa (.rgmb) exportados/importados
+MAP_BUNDLE_EXTENSION = ".rgmb"
+MAP_BUNDLE_COMPRESSION_LEVEL = 6  # zlib (1-9) - pacotes comprimidos para distribuição
+MAP_CACHE_BUDGET_MB = 64  # memória dos mapas preparados mantidos para troca rápida de mapa
+TELEMETRY_ENABLED = True  # histórico das entregas e telemetria da navegação
+TELEMETRY_DATABASE_PATH = "data/telemetria.db"  # banco próprio: gravação contínua sem disputar o banco dos mapas
+TELEMETRY_FLUSH_INTERVAL = 2.0  # segundos - espera máxima das linhas em memória antes da gravação em lote
+TELEMETRY_BATCH_SIZE = 500  # linhas acumuladas que antecipam a gravação
+TELEMETRY_POSE_INTERVAL = 0.5  # segundos - intervalo mínimo entre amostras de pose
 
 # Configurações de logging
 LOG_LEVEL = "INFO"
@@ -100,6 +153,90 @@ if __name__ == '__main__':
 RPLIDAR_PORT = "/dev/ttyUSB0"  # Porta padrão do RPLIDAR
 RPLIDAR_BAUDRATE = 115200
 RPLIDAR_TIMEOUT = 1.0  # segundos
+RPLIDAR_SCAN_MODE = "STANDARD"  # "STANDARD" (nós de 5 bytes) ou "EXPRESS" (cápsulas, maior taxa)
+RPLIDAR_MAX_READ = 65536  # bytes - limite de cada leitura em lote da porta serial
+RPLIDAR_SCAN_RATE_SMOOTHING = 0.2  # peso da última volta na média da taxa de varredura
+
+# Buffer circular de scans (arrays NumPy pré-alocados)
+LIDAR_SCAN_RING_CAPACITY = 8  # voltas mantidas em memória
+LIDAR_MAX_POINTS_PER_SCAN = 4096  # pontos máximos por volta
+
+# Gravação das voltas, obstáculos, comandos dos motores e poses (log binário)
+SCAN_LOG_DIRECTORY = "logs/scans"
+SCAN_LOG_CHUNK_SIZE = 256 * 1024  # bytes acumulados antes de escrever um bloco
+SCAN_LOG_FLUSH_INTERVAL = 1.0  # segundos - tempo máximo de um registro em memória
+
+# Montagem do LIDAR no robô
+LIDAR_MOUNT_ANGLE_OFFSET = 0.0  # graus - direção do zero do LIDAR em relação à frente do robô
+LIDAR_ANGLE_DIRECTION = 1  # 1: ângulo cresce no mesmo sentido do ângulo do robô; -1: sentido oposto
+
+# LIDAR simulado (voltas geradas por marcha sobre a grade de ocupação)
+LIDAR_SIMULATION_ENABLED = False  # True: sem sensor, o simulador gera voltas do ambiente (áreas proibidas, bordas e mapa)
+LIDAR_SIM_BEAMS = 360  # feixes por volta
+LIDAR_SIM_MAX_RANGE = 12.0  # metros - alcance do sensor simulado
+LIDAR_SIM_MIN_RANGE = 0.05  # metros - distância mínima medida
+LIDAR_SIM_RANGE_NOISE = 0.01  # metros - desvio do ruído das distâncias
+LIDAR_SIM_QUALITY = 47  # qualidade atribuída aos retornos simulados
+
+# Extração de obstáculos (breakpoint adaptativo)
+OBSTACLE_MIN_RANGE = 0.15  # metros - leituras menores são descartadas
+OBSTACLE_MAX_RANGE = 8.0  # metros - leituras maiores são descartadas
+OBSTACLE_BREAKPOINT_LAMBDA = 10.0  # graus - ângulo mínimo entre feixe e superfície
+OBSTACLE_BREAKPOINT_SIGMA = 0.01  # metros - ruído de distância do sensor
+OBSTACLE_MIN_POINTS = 3  # pontos mínimos por obstáculo
+OBSTACLE_CONFIDENT_POINTS = 10  # pontos para confiança máxima
+
+# Mapa de custo local (camada dinâmica alimentada pelos scans)
+LOCAL_COSTMAP_SIZE = 4.0  # metros - lado da janela centrada no robô
+LOCAL_COSTMAP_DECAY_HALF_LIFE = 2.0  # segundos - meia-vida de obstáculos não observados
+LOCAL_COSTMAP_FREE_FACTOR = 0.3  # fator aplicado às células atravessadas por um feixe
+LOCAL_COSTMAP_OCCUPIED_THRESHOLD = 0.5  # ocupação a partir da qual a célula é obstáculo
+LOCAL_COSTMAP_INFLATION_RADIUS = ROBOT_WIDTH / 2.0 + EMERGENCY_STOP_DISTANCE + 0.05  # metros - fora da zona de parada de emergência
+LOCAL_COSTMAP_RECENTER_DISTANCE = 0.5  # metros - deslocamento que recentraliza a janela
+LOCAL_COSTMAP_LOOKAHEAD = 2.0  # metros do caminho verificados contra a camada dinâmica
+LOCAL_COSTMAP_REPLAN_INTERVAL = 1.0  # segundos entre tentativas de replanejamento
+
+# Mapeamento por grade de ocupação (log-odds)
+OCCUPANCY_LOG_ODDS_HIT = 0.85  # evidência de ocupado por retorno (p = 0.7)
+OCCUPANCY_LOG_ODDS_MISS = -0.4  # evidência de livre por feixe que atravessa a célula (p = 0.4)
+OCCUPANCY_LOG_ODDS_MIN = -4.0  # limites da grade: mantêm o mapa adaptável
+OCCUPANCY_LOG_ODDS_MAX = 4.0
+OCCUPANCY_OCCUPIED_PROBABILITY = 0.65  # acima disso a célula é obstáculo para o planejador
+OCCUPANCY_FREE_PROBABILITY = 0.35  # abaixo disso a célula é considerada livre
+OCCUPANCY_DISPLAY_INTERVAL = 1.0  # segundos entre atualizações do mapa na interface durante o mapeamento
+
+# Localização por casamento de scans com o mapa de ocupação
+SCAN_MATCH_ENABLED = True
+SCAN_MATCH_SIGMA = 0.1  # metros - desvio do campo de verossimilhança
+SCAN_MATCH_LINEAR_WINDOW = 0.2  # metros - meia largura da busca em x e y em torno da odometria
+SCAN_MATCH_LINEAR_STEP = 0.05  # metros - passo da busca exaustiva em translação
+SCAN_MATCH_ANGULAR_WINDOW = 6.0  # graus - meia largura da busca em rotação
+SCAN_MATCH_ANGULAR_STEP = 1.5  # graus - passo da busca exaustiva em rotação
+SCAN_MATCH_MIN_SCORE = 0.35  # pontuação média mínima (0 a 1) para aceitar a correção
+SCAN_MATCH_MAX_POINTS = 180  # pontos do scan usados no casamento
+SCAN_MATCH_MIN_POINTS = 30  # pontos válidos mínimos para tentar o casamento
+
+# Localização por filtro de partículas (AMCL)
+LOCALIZATION_MODE = "SCAN_MATCH"  # "SCAN_MATCH" (rastreamento) ou "PARTICLE_FILTER" (global, recupera sequestro)
+PF_MIN_PARTICLES = 150  # limite inferior do número adaptativo de partículas
+PF_MAX_PARTICLES = 4000  # limite superior (usado na localização global)
+PF_KLD_EPSILON = 0.05  # erro máximo entre a distribuição amostrada e a verdadeira
+PF_KLD_Z = 2.33  # quantil normal para 99% de confiança
+PF_KLD_BIN_SIZE = 0.25  # metros - lado das células do histograma do KLD
+PF_KLD_BIN_ANGLE = 10.0  # graus - largura angular das células do histograma do KLD
+PF_ODOMETRY_ALPHAS = (0.1, 0.1, 0.1, 0.05)  # ruído do modelo de odometria
+PF_SENSOR_SIGMA = 0.15  # metros - desvio do campo de verossimilhança
+PF_Z_HIT = 0.95  # peso do termo de acerto do modelo de sensor
+PF_Z_RAND = 0.05  # peso das leituras aleatórias
+PF_MAX_BEAMS = 60  # feixes usados por atualização
+PF_LIKELIHOOD_SCALE = 0.02  # expoente do produto das verossimilhanças dos feixes (evita o colapso dos pesos)
+PF_RECOVERY_ALPHA_SLOW = 0.001  # taxa da média lenta da verossimilhança
+PF_RECOVERY_ALPHA_FAST = 0.1  # taxa da média rápida da verossimilhança
+PF_UPDATE_MIN_DISTANCE = 0.1  # metros de deslocamento entre atualizações do sensor
+PF_UPDATE_MIN_ANGLE = 10.0  # graus de rotação entre atualizações do sensor
+PF_RESAMPLE_THRESHOLD = 0.5  # reamostra quando o número efetivo cai abaixo desta fração das partículas
+PF_CONVERGED_LINEAR_STD = 0.15  # metros - desvio máximo para considerar a pose localizada
+PF_CONVERGED_ANGULAR_STD = 8.0  # graus
 
 # Configurações de simulação
 SIMULATION_FREQUENCY = 10.0  # Hz
@@ -0,0 +1,118 @@
+"""
+Conexões SQLite do robô.
+
+Todas as conexões são abertas com o mesmo perfil:
+
+- journal_mode=WAL: leitores não bloqueiam o escritor nem são bloqueados por ele;
+- synchronous=NORMAL: em WAL, o disco só é sincronizado nos checkpoints (uma queda
+  de energia pode perder as últimas transações, mas nunca corrompe o banco);
+- busy_timeout: quem encontra o banco ocupado espera, em vez de falhar com
+  "database is locked";
+- cache de comandos preparados (cached_statements), para as consultas repetidas.
+
+O ConnectionPool mantém algumas conexões prontas para que threads de segundo plano
+(autosave, pré-cálculo de rotas) leiam enquanto a interface escreve.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from .config import DATABASE_POOL_SIZE, DATABASE_BUSY_TIMEOUT, DATABASE_STATEMENT_CACHE_SIZE
+
+
+def connect(path: str, busy_timeout: float = DATABASE_BUSY_TIMEOUT,
+            cached_statements: int = DATABASE_STATEMENT_CACHE_SIZE) -> sqlite3.Connection:
+    """
+    Abre uma conexão com o perfil de desempenho do robô.
+
+    A conexão pode ser passada entre threads, mas não deve ser usada por duas ao mesmo tempo.
+
+    Args:
+        path: Arquivo do banco
+        busy_timeout: Espera máxima (s) pelo bloqueio de escrita
+        cached_statements: Comandos preparados mantidos em cache pela conexão
+    """
+    conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False,
+                           cached_statements=cached_statements)
+    mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    if str(mode).lower() != 'wal':
+        print(f"DEBUG: Banco {path} sem WAL (modo de journal: {mode})")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class ConnectionPool:
+    """Conjunto pequeno de conexões reaproveitadas, seguro para várias threads."""
+
+    def __init__(self, path: str, size: int = DATABASE_POOL_SIZE, busy_timeout: float = DATABASE_BUSY_TIMEOUT,
+                 cached_statements: int = DATABASE_STATEMENT_CACHE_SIZE):
+        """
+        Args:
+            path: Arquivo do banco
+            size: Número máximo de conexões (abertas sob demanda)
+            busy_timeout: Espera máxima (s) pelo bloqueio de escrita e por uma conexão livre
+            cached_statements: Comandos preparados mantidos em cache por conexão
+        """
+        self.path = path
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Conexão livre, aberta sob demanda até `size`; espera uma ser devolvida se todas estão em uso."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Pool de conexões fechado")
+            if len(self._connections) < self.size:
+                conn = connect(self.path, self.busy_timeout, self.cached_statements)
+                self._connections.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Nenhuma conexão livre em {self.busy_timeout:.1f}s")
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Empresta uma conexão. Ao sair do bloco, uma transação aberta é confirmada
+        (ou desfeita, se houve exceção) e a conexão volta ao pool.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self):
+        """Fecha as conexões livres; as emprestadas são fechadas ao serem devolvidas."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._connections.clear()
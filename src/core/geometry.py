@@ -0,0 +1,101 @@
+"""
+Kernels geométricos vetorizados (NumPy) para consultas de proximidade em lote.
+
+Segmentos são representados como um array (M, 2, 2): segments[k] = [[x1, y1], [x2, y2]].
+"""
+
+from typing import List, Tuple
+import numpy as np
+
+# Limite de elementos (pontos x segmentos) processados por bloco, para limitar a memória
+_MAX_PAIRS_PER_CHUNK = 262144
+
+
+def polygons_to_segments(polygons: List[List[Tuple[float, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converte polígonos em arestas fechadas.
+
+    Returns:
+        Tupla (segments (M, 2, 2), owners (M,)) - owners[k] é o índice do polígono da aresta k
+    """
+    segments = []
+    owners = []
+    for index, polygon in enumerate(polygons):
+        if len(polygon) < 2:
+            continue
+        points = np.asarray(polygon, dtype=float).reshape(-1, 2)
+        segments.append(np.stack([points, np.roll(points, -1, axis=0)], axis=1))
+        owners.append(np.full(len(points), index))
+    if not segments:
+        return np.zeros((0, 2, 2)), np.zeros(0, dtype=int)
+    return np.concatenate(segments), np.concatenate(owners)
+
+
+def points_to_segments_distance(points: np.ndarray, segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distância mínima de cada ponto até o conjunto de segmentos.
+
+    Args:
+        points: Array (N, 2) de pontos consultados
+        segments: Array (M, 2, 2) de segmentos
+
+    Returns:
+        Tupla (distâncias (N,), índice do segmento mais próximo (N,)).
+        Sem segmentos, as distâncias são infinitas e os índices -1.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+    count = len(points)
+    distances = np.full(count, np.inf)
+    nearest = np.full(count, -1, dtype=int)
+    if not count or not len(segments):
+        return distances, nearest
+
+    a = segments[:, 0]
+    ab = segments[:, 1] - a
+    len_sq = np.einsum('md,md->m', ab, ab)
+    # Segmentos degenerados (pontos) usam t = 0
+    inverse_len_sq = np.where(len_sq > 0, 1.0 / np.where(len_sq > 0, len_sq, 1.0), 0.0)
+
+    chunk = max(1, _MAX_PAIRS_PER_CHUNK // len(segments))
+    for start in range(0, count, chunk):
+        ap = points[start:start + chunk, None, :] - a[None, :, :]  # (n, M, 2)
+        t = np.clip(np.einsum('nmd,md->nm', ap, ab) * inverse_len_sq, 0.0, 1.0)
+        diff = ap - t[..., None] * ab[None, :, :]
+        squared = np.einsum('nmd,nmd->nm', diff, diff)
+        best = np.argmin(squared, axis=1)
+        nearest[start:start + chunk] = best
+        distances[start:start + chunk] = np.sqrt(squared[np.arange(len(best)), best])
+    return distances, nearest
+
+
+def beam_free_samples(origin: np.ndarray, endpoints: np.ndarray, step: float,
+                      max_length: float = np.inf) -> np.ndarray:
+    """
+    Amostra os feixes origem -> retorno a cada `step` metros, sem incluir o retorno.
+
+    Todos os feixes são amostrados de uma vez sobre um vetor comum de distâncias
+    (limitado a max_length); as amostras além do retorno de cada feixe são descartadas.
+
+    Args:
+        origin: Posição (2,) do sensor
+        endpoints: Array (N, 2) dos pontos de retorno
+        step: Espaçamento (m) entre amostras - meia célula garante todas as células atravessadas
+        max_length: Comprimento máximo (m) amostrado por feixe
+
+    Returns:
+        Array (K, 2) com as amostras do espaço livre
+    """
+    origin = np.asarray(origin, dtype=float).reshape(2)
+    endpoints = np.asarray(endpoints, dtype=float).reshape(-1, 2)
+    if not len(endpoints):
+        return np.zeros((0, 2))
+    deltas = endpoints - origin
+    lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+    samples = int(np.ceil(min(float(lengths.max()), max_length) / step)) + 1
+    t = np.arange(samples) * step  # distância ao longo do feixe
+    with np.errstate(divide='ignore', invalid='ignore'):
+        directions = np.where(lengths[:, None] > 0, deltas / lengths[:, None], 0.0)
+    along = origin + t[None, :, None] * directions[:, None, :]  # (N, amostras, 2)
+    before_hit = t[None, :] < (lengths[:, None] - step * 0.5)  # não libera a célula do retorno
+    return along[before_hit]
@@ -0,0 +1,153 @@
+"""
+Buffer circular de scans do LIDAR sobre arrays NumPy pré-alocados.
+
+Cada volta do sensor é copiada uma única vez para um slot de um array estruturado
+(ângulo, distância, qualidade, timestamp). Os consumidores recebem views sem cópia
+do slot, pelo acesso ao último scan ou por um gerador que entrega os scans novos.
+"""
+
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+from .config import LIDAR_SCAN_RING_CAPACITY, LIDAR_MAX_POINTS_PER_SCAN
+
+# Um ponto do scan: ângulo (rad), distância (m), qualidade (0-255) e instante da medição (s)
+SCAN_DTYPE = np.dtype([
+    ('angle', np.float32),
+    ('range', np.float32),
+    ('quality', np.uint8),
+    ('timestamp', np.float64),
+])
+
+
+class ScanRingBuffer:
+    """
+    Anel de scans com capacidade fixa, escrito por um produtor e lido por vários consumidores.
+
+    As views entregues apontam diretamente para o slot do anel: continuam válidas até o
+    slot ser reutilizado, ou seja, por `capacity - 1` voltas. Consumidores que precisam
+    guardar um scan por mais tempo devem copiá-lo.
+    """
+
+    def __init__(self, capacity: int = LIDAR_SCAN_RING_CAPACITY,
+                 max_points: int = LIDAR_MAX_POINTS_PER_SCAN):
+        """
+        Args:
+            capacity: Número de voltas mantidas no anel
+            max_points: Número máximo de pontos por volta
+        """
+        self.capacity = capacity
+        self.max_points = max_points
+        self._scans = np.zeros((capacity, max_points), dtype=SCAN_DTYPE)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+        self._scan_times = np.zeros(capacity, dtype=np.float64)
+        self._sequence = 0  # Número de voltas já publicadas
+        self.truncated_scans = 0
+        self._condition = threading.Condition()
+        self.recorder = None  # ScanLogWriter que recebe cada volta publicada (opcional)
+
+    @property
+    def sequence(self) -> int:
+        """Número de voltas publicadas desde a criação do buffer."""
+        return self._sequence
+
+    def publish(self, angles: np.ndarray, ranges: np.ndarray, qualities: np.ndarray,
+                timestamps=None) -> int:
+        """
+        Copia uma volta completa para o próximo slot do anel.
+
+        Args:
+            angles: Ângulos (rad)
+            ranges: Distâncias (m)
+            qualities: Qualidades (0-255)
+            timestamps: Instante de cada ponto ou um único instante para a volta (padrão: agora)
+
+        Returns:
+            Número de sequência da volta publicada
+        """
+        count = len(angles)
+        if count > self.max_points:
+            self.truncated_scans += 1
+            count = self.max_points
+        if timestamps is None:
+            timestamps = time.time()
+        scan_time = float(np.max(timestamps)) if np.ndim(timestamps) else float(timestamps)
+
+        with self._condition:
+            slot = self._sequence % self.capacity
+            target = self._scans[slot]
+            target['angle'][:count] = angles[:count]
+            target['range'][:count] = ranges[:count]
+            target['quality'][:count] = qualities[:count]
+            target['timestamp'][:count] = timestamps[:count] if np.ndim(timestamps) else timestamps
+            self._counts[slot] = count
+            self._scan_times[slot] = scan_time
+            self._sequence += 1
+            sequence = self._sequence
+            self._condition.notify_all()
+        if self.recorder is not None:
+            # Fora do lock: a view do slot só é reutilizada após `capacity` voltas do mesmo produtor
+            self.recorder.write_scan(self._view(sequence), scan_time)
+        return sequence
+
+    def publish_structured(self, scan: np.ndarray) -> int:
+        """Publica uma volta já no formato SCAN_DTYPE."""
+        return self.publish(scan['angle'], scan['range'], scan['quality'], scan['timestamp'])
+
+    def _view(self, sequence: int) -> np.ndarray:
+        """View somente leitura da volta de número `sequence` (sem cópia)."""
+        slot = (sequence - 1) % self.capacity
+        view = self._scans[slot, :self._counts[slot]]
+        view.flags.writeable = False
+        return view
+
+    def latest(self) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Retorna a última volta publicada.
+
+        Returns:
+            Tupla (número de sequência, view do scan) - (0, None) se nada foi publicado
+        """
+        with self._condition:
+            if self._sequence == 0:
+                return 0, None
+            return self._sequence, self._view(self._sequence)
+
+    def latest_time(self) -> float:
+        """Instante da última volta publicada (0 se nada foi publicado)."""
+        if self._sequence == 0:
+            return 0.0
+        return float(self._scan_times[(self._sequence - 1) % self.capacity])
+
+    def wait_for(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """Aguarda até que a volta de número `sequence` seja publicada."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._sequence >= sequence, timeout)
+
+    def scans(self, start: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Gerador das voltas novas, em ordem.
+
+        Voltas sobrescritas antes de serem lidas (consumidor lento) são puladas.
+        O gerador termina quando nenhuma volta nova chega dentro de `timeout`.
+
+        Args:
+            start: Primeira sequência desejada (padrão: a próxima volta publicada)
+            timeout: Tempo máximo (s) de espera por uma volta nova (None espera indefinidamente)
+
+        Yields:
+            Tuplas (número de sequência, view do scan)
+        """
+        next_sequence = self._sequence + 1 if start is None else max(1, start)
+        while True:
+            if not self.wait_for(next_sequence, timeout):
+                return
+            with self._condition:
+                oldest = self._sequence - self.capacity + 1
+                if next_sequence < oldest:
+                    next_sequence = oldest
+                view = self._view(next_sequence)
+            yield next_sequence, view
+            next_sequence += 1
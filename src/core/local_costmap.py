@@ -0,0 +1,207 @@
+"""
+Camada dinâmica de custo local alimentada pelos scans do LIDAR.
+
+Uma janela deslizante, centrada no robô e alinhada à grade global do PathFinder,
+acumula a ocupação observada:
+- cada feixe é traçado (amostras vetorizadas a cada meia célula) e libera as
+  células atravessadas;
+- a célula do retorno é marcada como ocupada;
+- a ocupação decai com o tempo, esquecendo obstáculos que saíram de vista;
+- as células ocupadas são infladas pelo raio do robô (exceto sob o próprio robô).
+
+O PathFinder consulta a máscara inflada diretamente (sem copiar o mapa estático).
+"""
+
+import math
+import time
+from typing import Optional, Tuple
+import numpy as np
+from scipy import ndimage
+
+from .geometry import beam_free_samples
+from .config import (MAP_GRID_SIZE, ROBOT_WIDTH, LOCAL_COSTMAP_SIZE, LOCAL_COSTMAP_DECAY_HALF_LIFE,
+                     LOCAL_COSTMAP_FREE_FACTOR, LOCAL_COSTMAP_OCCUPIED_THRESHOLD,
+                     LOCAL_COSTMAP_INFLATION_RADIUS, LOCAL_COSTMAP_RECENTER_DISTANCE)
+
+
+class LocalCostmap:
+    """Janela de ocupação em torno do robô, com traçado de raios, decaimento e inflação."""
+
+    def __init__(self, size: float = LOCAL_COSTMAP_SIZE, resolution: float = MAP_GRID_SIZE,
+                 decay_half_life: float = LOCAL_COSTMAP_DECAY_HALF_LIFE,
+                 free_factor: float = LOCAL_COSTMAP_FREE_FACTOR,
+                 occupied_threshold: float = LOCAL_COSTMAP_OCCUPIED_THRESHOLD,
+                 inflation_radius: float = LOCAL_COSTMAP_INFLATION_RADIUS,
+                 recenter_distance: float = LOCAL_COSTMAP_RECENTER_DISTANCE,
+                 footprint_radius: float = ROBOT_WIDTH / 2.0):
+        """
+        Args:
+            size: Lado da janela (m)
+            resolution: Lado da célula (m) - igual ao da grade do PathFinder
+            decay_half_life: Meia-vida (s) da ocupação sem novas observações
+            free_factor: Fator aplicado à ocupação das células atravessadas por um feixe
+            occupied_threshold: Ocupação a partir da qual a célula é obstáculo
+            inflation_radius: Raio (m) de inflação dos obstáculos
+            recenter_distance: Deslocamento (m) do robô que faz a janela ser recentralizada
+            footprint_radius: Raio (m) do robô; a inflação dentro dele não bloqueia
+        """
+        self.resolution = resolution
+        self.cells = int(math.ceil(size / resolution))
+        self.decay_half_life = decay_half_life
+        self.free_factor = free_factor
+        self.occupied_threshold = occupied_threshold
+        self.recenter_distance = recenter_distance
+        self.footprint_radius = footprint_radius
+
+        radius_cells = int(math.ceil(inflation_radius / resolution))
+        yy, xx = np.mgrid[-radius_cells:radius_cells + 1, -radius_cells:radius_cells + 1]
+        self._inflation_kernel = (xx * xx + yy * yy) <= radius_cells * radius_cells
+
+        self.occupancy = np.zeros((self.cells, self.cells), dtype=np.float32)  # [y, x]
+        self.blocked = np.zeros((self.cells, self.cells), dtype=bool)  # ocupação inflada
+        self.origin = (0, 0)  # Célula global (x, y) do canto da janela
+        self.active = False  # Há alguma célula bloqueada
+        self.last_update: Optional[float] = None
+        self.last_update_duration = 0.0
+        self._center: Optional[Tuple[float, float]] = None
+
+    def reset(self):
+        """Esquece todas as observações."""
+        self.occupancy.fill(0.0)
+        self.blocked.fill(False)
+        self.active = False
+        self.last_update = None
+
+    # ------------------------------------------------------------------
+    # Janela deslizante
+    # ------------------------------------------------------------------
+
+    def recenter(self, position: Tuple[float, float]):
+        """Recentraliza a janela no robô, preservando a sobreposição com a janela anterior."""
+        if self._center is not None and math.hypot(position[0] - self._center[0],
+                                                   position[1] - self._center[1]) < self.recenter_distance:
+            return
+        half = self.cells // 2
+        new_origin = (int(math.floor(position[0] / self.resolution)) - half,
+                      int(math.floor(position[1] / self.resolution)) - half)
+        if self._center is not None:
+            shift_x = new_origin[0] - self.origin[0]
+            shift_y = new_origin[1] - self.origin[1]
+            shifted = np.zeros_like(self.occupancy)
+            if abs(shift_x) < self.cells and abs(shift_y) < self.cells:
+                src_x = slice(max(0, shift_x), self.cells + min(0, shift_x))
+                dst_x = slice(max(0, -shift_x), self.cells + min(0, -shift_x))
+                src_y = slice(max(0, shift_y), self.cells + min(0, shift_y))
+                dst_y = slice(max(0, -shift_y), self.cells + min(0, -shift_y))
+                shifted[dst_y, dst_x] = self.occupancy[src_y, src_x]
+            self.occupancy = shifted
+        self.origin = new_origin
+        self._center = (float(position[0]), float(position[1]))
+
+    # ------------------------------------------------------------------
+    # Atualização por scan
+    # ------------------------------------------------------------------
+
+    def update(self, sensor_position: Tuple[float, float], hit_points: np.ndarray,
+               now: Optional[float] = None, known: Optional[np.ndarray] = None):
+        """
+        Integra uma volta do LIDAR.
+
+        Args:
+            sensor_position: Posição (x, y) do sensor no mundo
+            hit_points: Array (N, 2) dos retornos válidos no mundo
+            now: Instante da volta (padrão: agora)
+            known: Máscara (N,) dos retornos em obstáculos já cobertos pela grade estática;
+                   seus feixes liberam as células atravessadas, mas não marcam ocupação
+                   (a camada dinâmica não reinfla, com outro raio, o que o planejador já evita)
+        """
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        self.recenter(sensor_position)
+
+        # Decaimento temporal
+        if self.last_update is not None and self.decay_half_life > 0:
+            self.occupancy *= np.float32(0.5 ** (max(0.0, now - self.last_update) / self.decay_half_life))
+        self.last_update = now
+
+        hit_points = np.asarray(hit_points, dtype=float).reshape(-1, 2)
+        if len(hit_points):
+            free_cells, hit_cells = self._raytrace(np.asarray(sensor_position, dtype=float), hit_points,
+                                                   None if known is None else ~np.asarray(known, dtype=bool))
+            flat = self.occupancy.reshape(-1)
+            free_mask = np.zeros(flat.size, dtype=bool)
+            free_mask[free_cells] = True
+            hit_mask = np.zeros(flat.size, dtype=bool)
+            hit_mask[hit_cells] = True
+            flat[free_mask & ~hit_mask] *= np.float32(self.free_factor)
+            flat[hit_mask] = 1.0
+
+        lethal = self.occupancy >= self.occupied_threshold
+        self.active = bool(lethal.any())
+        if self.active:
+            self.blocked = ndimage.binary_dilation(lethal, structure=self._inflation_kernel)
+            # O robô está fisicamente na sua área: só a inflação é liberada ali, para o
+            # planejador conseguir sair quando o robô já estiver dentro dela
+            self.blocked &= ~self._footprint_mask(sensor_position) | lethal
+        else:
+            self.blocked = np.zeros_like(lethal)
+        self.last_update_duration = time.perf_counter() - started
+
+    def _footprint_mask(self, position: Tuple[float, float]) -> np.ndarray:
+        """Máscara das células da janela a até footprint_radius da posição."""
+        centers = (np.arange(self.cells) + 0.5) * self.resolution
+        dx = centers + self.origin[0] * self.resolution - position[0]
+        dy = centers + self.origin[1] * self.resolution - position[1]
+        return (dy[:, None] ** 2 + dx[None, :] ** 2) <= self.footprint_radius ** 2
+
+    def _raytrace(self, sensor: np.ndarray, hits: np.ndarray,
+                  occupying: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Traça todos os feixes de uma vez.
+
+        Args:
+            occupying: Máscara dos retornos que marcam ocupação (padrão: todos)
+
+        Returns:
+            Tupla (índices planos das células livres, índices planos das células de retorno),
+            apenas dentro da janela
+        """
+        # O sensor está dentro da janela: feixes só são traçados até a diagonal dela
+        max_length = math.hypot(self.cells * self.resolution, self.cells * self.resolution)
+        free = self._flat_indices(beam_free_samples(sensor, hits, self.resolution * 0.5, max_length))
+        hit_indices = self._flat_indices(hits if occupying is None else hits[occupying])
+        return free, hit_indices
+
+    def _flat_indices(self, points: np.ndarray) -> np.ndarray:
+        """Índices planos (na janela) das células que contêm os pontos; pontos fora são ignorados."""
+        cells_x = np.floor(points[:, 0] / self.resolution).astype(np.int64) - self.origin[0]
+        cells_y = np.floor(points[:, 1] / self.resolution).astype(np.int64) - self.origin[1]
+        inside = (cells_x >= 0) & (cells_x < self.cells) & (cells_y >= 0) & (cells_y < self.cells)
+        return cells_y[inside] * self.cells + cells_x[inside]
+
+    # ------------------------------------------------------------------
+    # Consultas (usadas pelo PathFinder como camada dinâmica)
+    # ------------------------------------------------------------------
+
+    def is_cell_blocked(self, x: int, y: int) -> bool:
+        """Verifica uma célula da grade global."""
+        local_x = x - self.origin[0]
+        local_y = y - self.origin[1]
+        if 0 <= local_x < self.cells and 0 <= local_y < self.cells:
+            return bool(self.blocked[local_y, local_x])
+        return False
+
+    def cells_blocked(self, cells_x: np.ndarray, cells_y: np.ndarray) -> np.ndarray:
+        """Versão vetorizada de is_cell_blocked para índices da grade global."""
+        local_x = np.asarray(cells_x) - self.origin[0]
+        local_y = np.asarray(cells_y) - self.origin[1]
+        inside = (local_x >= 0) & (local_x < self.cells) & (local_y >= 0) & (local_y < self.cells)
+        blocked = np.zeros(len(local_x), dtype=bool)
+        blocked[inside] = self.blocked[local_y[inside], local_x[inside]]
+        return blocked
+
+    def points_blocked(self, points: np.ndarray) -> np.ndarray:
+        """Verifica pontos do mundo (N, 2) contra a camada inflada."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return self.cells_blocked(np.floor(points[:, 0] / self.resolution).astype(np.int64),
+                                  np.floor(points[:, 1] / self.resolution).astype(np.int64))
@@ -0,0 +1,348 @@
+"""
+Pacotes de mapa (.rgmb) para distribuir um mapa entre robôs.
+
+Um pacote reúne em um único arquivo tudo o que o robô usa de um mapa: pontos de
+interesse, áreas proibidas, a grade de ocupação mapeada pelo LIDAR e as grades
+derivadas das áreas (máscara inflada do planejador, máscara do simulador e campo de
+distância), que assim não precisam ser recalculadas a partir dos polígonos.
+
+    cabeçalho (32 bytes): 'RGMB', versão, número de seções, CRC32 da tabela, instante, tamanho
+    tabela de seções (96 bytes cada): nome, dtype, forma, codificação, deslocamento,
+                                      tamanhos e CRC32 dos bytes gravados
+    seções: arrays NumPy alinhados a 8 bytes, crus ou comprimidos com zlib
+
+Seções cruas são lidas sem cópia do arquivo mapeado em memória; a compressão reduz
+o arquivo para distribuição (export com compress=False gera um pacote todo mapeável).
+Os CRC32 da tabela e de cada seção são conferidos ao abrir o pacote.
+
+As grades derivadas só valem para as mesmas áreas e parâmetros de configuração
+(dimensões, resolução, inflação): a chave de derived_grids_key() as acompanha e é
+conferida antes de usá-las.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from .path_finder import PathFinder
+from .spatial_index import ForbiddenAreaIndex
+from .config import (MAP_WIDTH, MAP_HEIGHT, MAP_GRID_SIZE, FORBIDDEN_AREA_INFLATION_RADIUS,
+                     CLEARANCE_FIELD_RESOLUTION, CLEARANCE_FIELD_MAX_DISTANCE, MAP_BUNDLE_COMPRESSION_LEVEL)
+
+BUNDLE_MAGIC = b'RGMB'
+BUNDLE_VERSION = 1
+
+# Codificação das seções
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+HEADER_DTYPE = np.dtype([('magic', 'S4'), ('version', '<u2'), ('sections', '<u2'), ('table_crc', '<u4'),
+                         ('reserved', '<u4'), ('created', '<f8'), ('size', '<u8')])
+SECTION_DTYPE = np.dtype([('name', 'S24'), ('dtype', 'S8'), ('ndim', '<u2'), ('codec', '<u2'),
+                          ('reserved', '<u4'), ('shape', '<u8', (3,)), ('offset', '<u8'),
+                          ('stored_size', '<u8'), ('raw_size', '<u8'), ('crc', '<u4'), ('reserved2', '<u4')])
+
+# Seções
+SECTION_META = 'meta'  # JSON: nome, dimensões, pontos de interesse, nomes das áreas
+SECTION_VERTICES = 'areas.vertices'  # (V, 2) float64: vértices de todas as áreas, em sequência
+SECTION_OFFSETS = 'areas.offsets'  # (A + 1,) int64: início dos vértices de cada área
+SECTION_OCCUPANCY = 'occupancy'  # (H, W) float32: log-odds do OccupancyMapper
+GRID_SECTION_PREFIX = 'grid.'
+
+# Grades derivadas das áreas proibidas
+GRID_INFLATED = 'inflated'  # Áreas infladas na grade do PathFinder (bool [y, x])
+GRID_AREAS = 'areas'  # Áreas sem inflação na grade do PathFinder, para o simulador (bool [y, x])
+GRID_CLEARANCE = 'clearance'  # Campo de distância do ForbiddenAreaIndex (float32)
+
+
+def _padded(size: int) -> int:
+    """Tamanho arredondado para múltiplo de 8 bytes."""
+    return (size + 7) & ~7
+
+
+def derived_grids_key(areas) -> str:
+    """
+    Chave das grades derivadas: muda com os vértices das áreas ou com os parâmetros
+    de configuração usados para calculá-las.
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([BUNDLE_VERSION, MAP_WIDTH, MAP_HEIGHT, MAP_GRID_SIZE, FORBIDDEN_AREA_INFLATION_RADIUS,
+                              CLEARANCE_FIELD_RESOLUTION, CLEARANCE_FIELD_MAX_DISTANCE]).encode())
+    for area in areas:
+        vertices = np.asarray(area, dtype='<f8').reshape(-1, 2)
+        digest.update(len(vertices).to_bytes(4, 'little'))
+        digest.update(vertices.tobytes())
+    return digest.hexdigest()
+
+
+class DerivedGrids:
+    """Grades calculadas a partir das áreas proibidas, com a chave das áreas que as geraram."""
+
+    def __init__(self, key: str, grids: Dict[str, np.ndarray]):
+        self.key = key
+        self.grids = grids
+
+    @classmethod
+    def compute(cls, areas: List[List[Tuple[float, float]]]) -> 'DerivedGrids':
+        """Calcula todas as grades derivadas das áreas (lento: rasteriza os polígonos)."""
+        path_finder = PathFinder(width=int(MAP_WIDTH / MAP_GRID_SIZE), height=int(MAP_HEIGHT / MAP_GRID_SIZE),
+                                 grid_size=MAP_GRID_SIZE)
+        return cls(derived_grids_key(areas), {
+            GRID_INFLATED: path_finder.inflated_areas_mask(areas),
+            GRID_AREAS: path_finder.areas_to_mask(areas),
+            GRID_CLEARANCE: ForbiddenAreaIndex(areas).clearance,
+        })
+
+    def matches(self, areas) -> bool:
+        """Indica se as grades valem para estas áreas e a configuração atual."""
+        return self.key == derived_grids_key(areas)
+
+    def get(self, name: str) -> Optional[np.ndarray]:
+        return self.grids.get(name)
+
+    def __repr__(self) -> str:
+        return f"DerivedGrids({self.key[:8]}, {sorted(self.grids)})"
+
+
+def write_map_bundle(path: str, name: str, points_of_interest: Dict[str, tuple], forbidden_areas: List[Dict],
+                     occupancy: Optional[Tuple[np.ndarray, float]] = None,
+                     derived: Optional[DerivedGrids] = None, compress: bool = True,
+                     width: float = MAP_WIDTH, height: float = MAP_HEIGHT) -> int:
+    """
+    Grava um pacote de mapa. O arquivo é escrito ao lado e renomeado no fim, de modo que
+    um pacote existente nunca fica pela metade.
+
+    Args:
+        path: Arquivo do pacote
+        name: Nome do mapa
+        points_of_interest: {nome: (x, y, tipo)}
+        forbidden_areas: Áreas como no MapModel ({'nome', 'coordenadas'})
+        occupancy: (log-odds [y, x], resolução em metros) da grade mapeada, se houver
+        derived: Grades derivadas das áreas, se houver
+        compress: Comprime com zlib as seções em que isso reduz o tamanho; sem compressão,
+                  todas as seções são lidas sem cópia do arquivo mapeado
+        width: Largura do mapa (m)
+        height: Comprimento do mapa (m)
+
+    Returns:
+        Tamanho do pacote em bytes
+    """
+    vertices = [np.asarray(area['coordenadas'], dtype='<f8').reshape(-1, 2) for area in forbidden_areas]
+    offsets = np.zeros(len(vertices) + 1, dtype='<i8')
+    offsets[1:] = np.cumsum([len(area) for area in vertices])
+    meta = {
+        'nome': name,
+        'largura': width,
+        'comprimento': height,
+        'pontos': [[point_name, float(x), float(y), point_type]
+                   for point_name, (x, y, point_type) in sorted(points_of_interest.items())],
+        'areas': [area.get('nome') for area in forbidden_areas],
+        'ocupacao': {'resolucao': float(occupancy[1])} if occupancy is not None else None,
+        'grades': derived.key if derived is not None else None,
+    }
+    sections = [
+        (SECTION_META, np.frombuffer(json.dumps(meta, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)),
+        (SECTION_VERTICES, np.concatenate(vertices) if vertices else np.zeros((0, 2), dtype='<f8')),
+        (SECTION_OFFSETS, offsets),
+    ]
+    if occupancy is not None:
+        sections.append((SECTION_OCCUPANCY, np.asarray(occupancy[0], dtype='<f4')))
+    if derived is not None:
+        sections.extend((GRID_SECTION_PREFIX + grid_name, grid) for grid_name, grid in sorted(derived.grids.items()))
+
+    table = np.zeros(len(sections), dtype=SECTION_DTYPE)
+    payloads = []
+    offset = HEADER_DTYPE.itemsize + table.nbytes
+    for entry, (section_name, array) in zip(table, sections):
+        array = np.ascontiguousarray(array)
+        if array.ndim > 3:
+            raise ValueError(f"seção {section_name} com {array.ndim} dimensões")
+        raw = array.tobytes()
+        stored, codec = raw, CODEC_RAW
+        if compress and raw:
+            compressed = zlib.compress(raw, MAP_BUNDLE_COMPRESSION_LEVEL)
+            if len(compressed) < len(raw):
+                stored, codec = compressed, CODEC_ZLIB
+        entry['name'] = section_name.encode()
+        entry['dtype'] = array.dtype.str.encode()
+        entry['ndim'] = array.ndim
+        entry['codec'] = codec
+        entry['shape'][:array.ndim] = array.shape
+        entry['offset'] = offset
+        entry['stored_size'] = len(stored)
+        entry['raw_size'] = len(raw)
+        entry['crc'] = zlib.crc32(stored)
+        payloads.append(stored + bytes(_padded(len(stored)) - len(stored)))
+        offset += len(payloads[-1])
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = BUNDLE_MAGIC
+    header['version'] = BUNDLE_VERSION
+    header['sections'] = len(sections)
+    header['table_crc'] = zlib.crc32(table.tobytes())
+    header['created'] = time.time()
+    header['size'] = offset
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(table.tobytes())
+        for payload in payloads:
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return offset
+
+
+class MapBundle:
+    """
+    Pacote de mapa aberto para leitura, mapeado em memória.
+
+    Arrays de seções cruas são visões do arquivo (somente leitura) e mantêm o mapeamento
+    vivo enquanto existirem; copie-os para usá-los depois de fechar o pacote.
+    """
+
+    def __init__(self, path: str, verify: bool = True):
+        """
+        Args:
+            path: Arquivo do pacote
+            verify: Confere o CRC32 de todas as seções ao abrir
+
+        Raises:
+            OSError: se o arquivo não pode ser lido
+            ValueError: se o arquivo não é um pacote válido (formato, versão ou CRC)
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < HEADER_DTYPE.itemsize:
+                raise ValueError(f"pacote de mapa inválido: {path} é pequeno demais")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._sections = self._read_table(verify)
+            self.meta = json.loads(self.array(SECTION_META).tobytes().decode('utf-8'))
+        except (ValueError, KeyError, UnicodeDecodeError) as e:
+            self.close()
+            raise ValueError(f"pacote de mapa inválido: {path}: {e}") from None
+
+    def _read_table(self, verify: bool) -> Dict[str, np.void]:
+        """Lê e confere o cabeçalho e a tabela de seções."""
+        header = np.frombuffer(self._map, dtype=HEADER_DTYPE, count=1).copy()[0]
+        if bytes(header['magic']) != BUNDLE_MAGIC:
+            raise ValueError("assinatura desconhecida")
+        if header['version'] > BUNDLE_VERSION:
+            raise ValueError(f"versão {header['version']} não suportada")
+        if header['size'] != len(self._map):
+            raise ValueError(f"tamanho {len(self._map)} diferente do gravado ({header['size']}) - arquivo truncado?")
+        table_end = HEADER_DTYPE.itemsize + int(header['sections']) * SECTION_DTYPE.itemsize
+        if table_end > len(self._map):
+            raise ValueError("tabela de seções truncada")
+        table = np.frombuffer(self._map, dtype=SECTION_DTYPE, count=int(header['sections']),
+                              offset=HEADER_DTYPE.itemsize).copy()
+        if zlib.crc32(table.tobytes()) != header['table_crc']:
+            raise ValueError("CRC da tabela de seções não confere")
+        sections = {}
+        for entry in table:
+            name = entry['name'].decode()
+            end = int(entry['offset']) + int(entry['stored_size'])
+            if end > len(self._map):
+                raise ValueError(f"seção {name} fora do arquivo")
+            if verify and zlib.crc32(self._map[int(entry['offset']):end]) != entry['crc']:
+                raise ValueError(f"CRC da seção {name} não confere")
+            sections[name] = entry
+        return sections
+
+    def __enter__(self) -> 'MapBundle':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Fecha o mapeamento (adiado até o fim das visões ainda em uso)."""
+        try:
+            self._map.close()
+        except BufferError:
+            # Ainda há arrays apontando para o arquivo: o mapeamento é liberado com eles
+            pass
+
+    def has_section(self, name: str) -> bool:
+        return name in self._sections
+
+    def array(self, name: str) -> np.ndarray:
+        """Array de uma seção: visão do arquivo se crua, descomprimida se zlib."""
+        entry = self._sections[name]
+        dtype = np.dtype(entry['dtype'].decode())
+        shape = tuple(int(size) for size in entry['shape'][:int(entry['ndim'])])
+        offset, stored_size = int(entry['offset']), int(entry['stored_size'])
+        if entry['codec'] == CODEC_RAW:
+            count = int(entry['raw_size']) // dtype.itemsize
+            return np.frombuffer(self._map, dtype=dtype, count=count, offset=offset).reshape(shape)
+        if entry['codec'] != CODEC_ZLIB:
+            raise ValueError(f"codificação {entry['codec']} desconhecida na seção {name}")
+        try:
+            raw = zlib.decompress(self._map[offset:offset + stored_size])
+        except zlib.error as e:
+            raise ValueError(f"seção {name} corrompida: {e}") from None
+        if len(raw) != entry['raw_size']:
+            raise ValueError(f"seção {name} com {len(raw)} bytes, esperados {entry['raw_size']}")
+        return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+    @property
+    def name(self) -> str:
+        return self.meta['nome']
+
+    @property
+    def width(self) -> float:
+        return float(self.meta['largura'])
+
+    @property
+    def height(self) -> float:
+        return float(self.meta['comprimento'])
+
+    @property
+    def points_of_interest(self) -> Dict[str, Tuple[float, float, str]]:
+        """Pontos de interesse {nome: (x, y, tipo)}."""
+        try:
+            return {name: (float(x), float(y), point_type) for name, x, y, point_type in self.meta['pontos']}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"pacote de mapa inválido: {self.path}: pontos de interesse inconsistentes") from None
+
+    @property
+    def forbidden_areas(self) -> List[Dict]:
+        """Áreas proibidas [{'nome', 'coordenadas'}], com os vértices (N, 2) como visões do pacote."""
+        vertices = self.array(SECTION_VERTICES)
+        offsets = self.array(SECTION_OFFSETS)
+        names = self.meta['areas']
+        if len(offsets) != len(names) + 1 or (len(offsets) and offsets[-1] != len(vertices)):
+            raise ValueError(f"pacote de mapa inválido: {self.path}: áreas inconsistentes")
+        return [{'nome': name, 'coordenadas': vertices[offsets[i]:offsets[i + 1]]}
+                for i, name in enumerate(names)]
+
+    @property
+    def occupancy(self) -> Optional[Tuple[np.ndarray, float]]:
+        """(log-odds [y, x], resolução em metros) da grade mapeada, ou None."""
+        if self.meta.get('ocupacao') is None or not self.has_section(SECTION_OCCUPANCY):
+            return None
+        return self.array(SECTION_OCCUPANCY), float(self.meta['ocupacao']['resolucao'])
+
+    @property
+    def derived_grids(self) -> Optional[DerivedGrids]:
+        """Grades derivadas gravadas no pacote (podem não valer para a configuração atual)."""
+        if not self.meta.get('grades'):
+            return None
+        grids = {name[len(GRID_SECTION_PREFIX):]: self.array(name)
+                 for name in self._sections if name.startswith(GRID_SECTION_PREFIX)}
+        return DerivedGrids(self.meta['grades'], grids) if grids else None
+
+    def __repr__(self) -> str:
+        return (f"MapBundle({self.path!r}, nome={self.meta.get('nome')!r}, "
+                f"seções={sorted(self._sections)})")
@@ -0,0 +1,140 @@
+"""
+Cache em memória dos mapas preparados, para trocar de mapa sem recarregá-lo.
+
+Um mapa preparado reúne o que a troca de mapa consome: o MapModel, as grades
+derivadas das áreas (rasterização do planejador e campo de distância) e a grade de
+ocupação. Os mapas usados recentemente ficam em memória até o orçamento
+(MAP_CACHE_BUDGET_MB); quando ele estoura, sai o usado há mais tempo (LRU).
+
+O modelo guardado é o mesmo objeto editado pela interface, de modo que o cache
+acompanha as edições. Grades derivadas de áreas antigas não são usadas (a chave
+não confere) e são trocadas pelas novas quando o mapa volta a ser preparado.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from .map_model import MapModel
+from .map_bundle import DerivedGrids
+from .config import MAP_CACHE_BUDGET_MB
+
+# Estimativa do tamanho dos objetos Python do modelo (listas de vértices e tuplas dos pontos)
+_VERTEX_BYTES = 120
+_POINT_BYTES = 250
+
+
+class PreparedMap:
+    """Mapa pronto para ser exibido e usado pelo navegador."""
+
+    def __init__(self, model: MapModel, derived: Optional[DerivedGrids] = None,
+                 occupancy: Optional[Tuple[np.ndarray, float]] = None):
+        """
+        Args:
+            model: Modelo do mapa (gravado: com map_id)
+            derived: Grades derivadas das áreas, se conhecidas
+            occupancy: (log-odds [y, x], resolução em metros) da grade mapeada, se houver
+        """
+        self.model = model
+        self.derived = derived
+        self.occupancy = occupancy
+
+    @property
+    def map_id(self) -> Optional[int]:
+        return self.model.map_id
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.model.name
+
+    @property
+    def nbytes(self) -> int:
+        """Memória aproximada ocupada pelo mapa."""
+        size = sum(len(area['coordenadas']) for area in self.model.forbidden_areas) * _VERTEX_BYTES
+        size += len(self.model.points_of_interest) * _POINT_BYTES
+        if self.derived is not None:
+            size += sum(grid.nbytes for grid in self.derived.grids.values())
+        if self.occupancy is not None:
+            size += self.occupancy[0].nbytes
+        return size
+
+    def __repr__(self) -> str:
+        return (f"PreparedMap(id={self.map_id}, nome={self.name!r}, grades={self.derived is not None}, "
+                f"ocupação={self.occupancy is not None}, {self.nbytes / 1024:.0f} KB)")
+
+
+class MapCache:
+    """Mapas preparados por ID, com descarte do usado há mais tempo acima do orçamento."""
+
+    def __init__(self, budget_bytes: int = int(MAP_CACHE_BUDGET_MB * 1024 * 1024)):
+        """
+        Args:
+            budget_bytes: Memória máxima (aproximada) dos mapas guardados; o mapa mais
+                          recente é sempre mantido, mesmo que sozinho passe do orçamento
+        """
+        self.budget_bytes = budget_bytes
+        self._maps: "OrderedDict[int, PreparedMap]" = OrderedDict()
+        self._sizes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    def __contains__(self, map_id: int) -> bool:
+        return map_id in self._maps
+
+    @property
+    def nbytes(self) -> int:
+        """Memória aproximada dos mapas guardados."""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def get(self, map_id: Optional[int]) -> Optional[PreparedMap]:
+        """Mapa guardado com este ID (passa a ser o mais recente), ou None."""
+        with self._lock:
+            prepared = self._maps.get(map_id)
+            if prepared is None:
+                self.misses += 1
+                return None
+            self._maps.move_to_end(map_id)
+            self.hits += 1
+            return prepared
+
+    def find(self, name: str) -> Optional[PreparedMap]:
+        """Mapa guardado com este nome (passa a ser o mais recente), ou None."""
+        with self._lock:
+            map_id = next((map_id for map_id, prepared in self._maps.items() if prepared.name == name), None)
+        return self.get(map_id)
+
+    def put(self, prepared: PreparedMap):
+        """Guarda (ou atualiza) um mapa como o mais recente e descarta os antigos acima do orçamento."""
+        if prepared.map_id is None:
+            return
+        with self._lock:
+            self._maps[prepared.map_id] = prepared
+            self._maps.move_to_end(prepared.map_id)
+            self._sizes[prepared.map_id] = prepared.nbytes
+            while len(self._maps) > 1 and sum(self._sizes.values()) > self.budget_bytes:
+                map_id, evicted = self._maps.popitem(last=False)
+                del self._sizes[map_id]
+                self.evictions += 1
+                print(f"DEBUG: Mapa '{evicted.name}' descartado do cache")
+
+    def discard(self, map_id: Optional[int]):
+        """Remove um mapa (ex.: alterado no banco por fora do modelo)."""
+        with self._lock:
+            self._maps.pop(map_id, None)
+            self._sizes.pop(map_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._maps.clear()
+            self._sizes.clear()
+
+    def __repr__(self) -> str:
+        return (f"MapCache({len(self._maps)} mapas, {self.nbytes / 1024:.0f} KB de "
+                f"{self.budget_bytes / 1024:.0f} KB, acertos={self.hits}, faltas={self.misses})")
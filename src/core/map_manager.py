@@ -1,17 +1,67 @@
 import sqlite3
 import json
-from src.core.config import DATABASE_PATH, MAP_WIDTH, MAP_HEIGHT
+import ast
+import time
+import zlib
+import numpy as np
+from src.core.config import DATABASE_PATH, DATABASE_SCHEMA_VERSION, MAP_WIDTH, MAP_HEIGHT
+from src.core.occupancy_mapper import OccupancyMapper
+from src.core.map_model import MapModel
+from src.core.map_bundle import DerivedGrids, MapBundle, write_map_bundle
+from src.core.map_cache import MapCache, PreparedMap
+from src.core.database import ConnectionPool, connect
 import os
 from typing import List, Tuple, Optional, Dict
 
+# Formato das coordenadas em areas_proibidas.coordenadas_versao
+COORDINATES_TEXT = 0  # Texto JSON (ou o formato antigo, lido por eval) - apenas bancos anteriores à migração
+COORDINATES_FLOAT64 = 1  # BLOB com os vértices (x, y) em float64 little-endian, contíguos
+
+
+def encode_coordinates(coordinates) -> bytes:
+    """Empacota os vértices [(x, y), ...] de uma área em um BLOB float64."""
+    return np.asarray(coordinates, dtype='<f8').reshape(-1, 2).tobytes()
+
+
+def decode_coordinates(blob: bytes) -> np.ndarray:
+    """Vértices (N, 2) de um BLOB float64, sem cópia (somente leitura)."""
+    return np.frombuffer(blob, dtype='<f8').reshape(-1, 2)
+
+
+def parse_text_coordinates(text: str) -> Optional[np.ndarray]:
+    """
+    Interpreta as coordenadas de texto dos bancos antigos (JSON ou repr de lista de tuplas).
+
+    Returns:
+        Vértices (N, 2), ou None se o texto não descreve uma lista de pares numéricos
+    """
+    try:
+        coordinates = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        try:
+            coordinates = ast.literal_eval(text)
+        except (ValueError, SyntaxError, TypeError):
+            return None
+    try:
+        vertices = np.asarray(coordinates, dtype=np.float64)
+    except (ValueError, TypeError):
+        return None
+    if vertices.ndim != 2 or vertices.shape[1] != 2 or not len(vertices):
+        return None
+    return vertices
+
+
 class MapManager:
     def __init__(self):
         self.db_path = DATABASE_PATH
-        self.conn = None
+        self.conn = None  # Conexão de escrita (thread da interface)
         self.cursor = None
+        self.pool: Optional[ConnectionPool] = None  # Conexões de leitura, seguras para várias threads
+        self.map_cache = MapCache()  # Mapas preparados usados recentemente (troca de mapa sem recarga)
         self._ensure_data_directory_exists()
         self._connect_db()
         self._create_tables()
+        self._migrate_schema()
 
     def _ensure_data_directory_exists(self):
         """Cria o diretório 'data' se ele não existir."""
@@ -23,8 +73,9 @@ class MapManager:
     def _connect_db(self):
         """Conecta ao banco de dados SQLite."""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = connect(self.db_path)
             self.cursor = self.conn.cursor()
+            self.pool = ConnectionPool(self.db_path)
             print(f"Conectado ao banco de dados: {self.db_path}")
         except sqlite3.Error as e:
             print(f"Erro ao conectar ao banco de dados: {e}")
@@ -64,83 +115,211 @@ class MapManager:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     mapa_id INTEGER NOT NULL,
                     nome TEXT,
-                    coordenadas TEXT NOT NULL,
+                    coordenadas BLOB NOT NULL,
                     ativo INTEGER NOT NULL DEFAULT 1,
                     motivo TEXT,
+                    coordenadas_versao INTEGER NOT NULL DEFAULT 1,
+                    FOREIGN KEY (mapa_id) REFERENCES mapas(id) ON DELETE CASCADE
+                )
+            """)
+            # Tabela mapas_ocupacao: grade de ocupação (log-odds) mapeada pelo LIDAR
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS mapas_ocupacao (
+                    mapa_id INTEGER PRIMARY KEY,
+                    largura_celulas INTEGER NOT NULL,
+                    altura_celulas INTEGER NOT NULL,
+                    resolucao REAL NOT NULL,
+                    dados BLOB NOT NULL,
+                    atualizado_em REAL NOT NULL,
+                    FOREIGN KEY (mapa_id) REFERENCES mapas(id) ON DELETE CASCADE
+                )
+            """)
+            # Tabela grades_derivadas: grades calculadas das áreas (ver map_bundle), válidas
+            # enquanto a chave corresponder às áreas e à configuração
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS grades_derivadas (
+                    mapa_id INTEGER NOT NULL,
+                    nome TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    dtype TEXT NOT NULL,
+                    forma TEXT NOT NULL,
+                    dados BLOB NOT NULL,
+                    PRIMARY KEY (mapa_id, nome),
                     FOREIGN KEY (mapa_id) REFERENCES mapas(id) ON DELETE CASCADE
                 )
             """)
+            # Índices das consultas por mapa e do mapa ativo
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_mapas_ativo ON mapas (ativo)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_pontos_interesse_mapa ON pontos_interesse (mapa_id)")
+            self.cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_areas_proibidas_mapa ON areas_proibidas (mapa_id, ativo)")
             self.conn.commit()
             print("Tabelas verificadas/criadas com sucesso.")
         except sqlite3.Error as e:
             print(f"Erro ao criar tabelas: {e}")
 
-    def save_map(self, map_name: str, points_of_interest: dict, forbidden_areas: list):
+    def _migrate_schema(self):
+        """
+        Atualiza bancos criados por versões anteriores até DATABASE_SCHEMA_VERSION
+        (registrada em PRAGMA user_version).
+
+        Versão 1: as coordenadas das áreas proibidas passam de texto JSON (ou o formato
+        antigo lido por eval) para BLOB float64, com o formato em coordenadas_versao.
+        Áreas com texto ilegível permanecem na versão 0 e são ignoradas no carregamento.
+        """
+        if not self.conn:
+            return
+        try:
+            version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version >= DATABASE_SCHEMA_VERSION:
+                return
+            if version < 1:
+                columns = {row[1] for row in self.cursor.execute("PRAGMA table_info(areas_proibidas)")}
+                if 'coordenadas_versao' not in columns:
+                    self.cursor.execute(f"""
+                        ALTER TABLE areas_proibidas
+                        ADD COLUMN coordenadas_versao INTEGER NOT NULL DEFAULT {COORDINATES_TEXT}
+                    """)
+                rows = self.cursor.execute("""
+                    SELECT id, coordenadas FROM areas_proibidas WHERE coordenadas_versao = ?
+                """, (COORDINATES_TEXT,)).fetchall()
+                converted = []
+                for area_id, text in rows:
+                    vertices = parse_text_coordinates(text) if isinstance(text, str) else None
+                    if vertices is None:
+                        print(f"DEBUG: Coordenadas ilegíveis na área {area_id} - mantida no formato antigo")
+                        continue
+                    converted.append((sqlite3.Binary(encode_coordinates(vertices)), COORDINATES_FLOAT64, area_id))
+                self.cursor.executemany(
+                    "UPDATE areas_proibidas SET coordenadas = ?, coordenadas_versao = ? WHERE id = ?", converted)
+                print(f"Migração do banco: {len(converted)} de {len(rows)} áreas convertidas para BLOB")
+            self.cursor.execute(f"PRAGMA user_version = {int(DATABASE_SCHEMA_VERSION)}")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Erro ao migrar banco de dados: {e}")
+            self.conn.rollback()
+
+    def save_map(self, map_name: str, points_of_interest: dict, forbidden_areas: list) -> bool:
         """
         Salva o mapa atual no banco de dados.
-        Atualiza um mapa existente ou cria um novo.
+        Atualiza um mapa existente ou cria um novo, e o define como ativo.
+
+        O conteúdo é comparado com o gravado e apenas as diferenças são escritas:
+        pontos e áreas inalterados mantêm suas linhas (e IDs).
         """
         if not self.conn or not self.cursor:
             print("Erro: Conexão com o banco de dados não estabelecida.")
-            return
-            
+            return False
+        # Lido pela conexão de escrita: o delta parte do que ela mesma gravou por último
+        model = self._load_map_model(self.conn, map_name) or MapModel(name=map_name)
+        model.replace_contents(points_of_interest, forbidden_areas)
+        saved = self.save_map_changes(model, activate=True)
+        if saved:
+            # Gravado por outro modelo: o modelo em cache (se houver) ficou desatualizado
+            self.map_cache.discard(model.map_id)
+        return saved
+
+    def save_map_changes(self, model: MapModel, activate: bool = False,
+                         conn: Optional[sqlite3.Connection] = None) -> bool:
+        """
+        Grava as alterações pendentes do modelo em uma única transação: remoções,
+        atualizações e inserções, cada grupo com um único executemany.
+
+        Args:
+            model: Modelo do mapa (um mapa sem ID é criado pelo nome)
+            activate: Se True, define o mapa como ativo (mapas novos sempre são ativados)
+            conn: Conexão a usar (padrão: a de escrita, da thread da interface); threads de
+                  gravação em segundo plano passam a sua própria
+
+        Returns:
+            bool: True se salvou com sucesso, False caso contrário
+        """
+        conn = conn if conn is not None else self.conn
+        if not conn:
+            print("Erro: Conexão com o banco de dados não estabelecida.")
+            return False
+
+        changes = model.take_changes()
+        cursor = conn.cursor()
         try:
-            self.cursor.execute("SELECT id FROM mapas WHERE nome = ?", (map_name,))
-            map_id = self.cursor.fetchone()
-
-            if map_id:
-                map_id = map_id[0]
-                # Atualiza o mapa existente, desativa outros e define este como ativo
-                self.cursor.execute("UPDATE mapas SET ativo = 0")
-                self.cursor.execute("UPDATE mapas SET largura = ?, comprimento = ?, ativo = 1 WHERE id = ?",
-                                    (MAP_WIDTH, MAP_HEIGHT, map_id))
-                # Limpa pontos de interesse e áreas proibidas antigas
-                self.cursor.execute("DELETE FROM pontos_interesse WHERE mapa_id = ?", (map_id,))
-                self.cursor.execute("DELETE FROM areas_proibidas WHERE mapa_id = ?", (map_id,))
-                print(f"Mapa '{map_name}' atualizado.")
-            else:
-                # Insere novo mapa e o define como ativo, desativando outros
-                self.cursor.execute("UPDATE mapas SET ativo = 0")
-                self.cursor.execute("INSERT INTO mapas (nome, largura, comprimento, ativo) VALUES (?, ?, ?, 1)",
-                                    (map_name, MAP_WIDTH, MAP_HEIGHT))
-                map_id = self.cursor.lastrowid
-                print(f"Novo mapa '{map_name}' criado.")
-
-            # Insere pontos de interesse
-            for name, data in points_of_interest.items():
-                if isinstance(data, tuple):
-                    if len(data) == 2:
-                        # Formato antigo: (x, y)
-                        x, y = data
-                        point_type = "Mesa"  # Tipo padrão
-                    else:
-                        # Novo formato: (x, y, tipo)
-                        x, y, point_type = data
-                    self.cursor.execute("INSERT INTO pontos_interesse (mapa_id, nome, x, y, tipo) VALUES (?, ?, ?, ?, ?)",
-                                        (map_id, name, x, y, point_type))
-
-            # Insere áreas proibidas
-            for area in forbidden_areas:
-                if isinstance(area, dict):
-                    # Novo formato: dicionário com id, nome, coordenadas
-                    coordinates = area.get('coordenadas', [])
-                    area_name = area.get('nome')
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            map_id = model.map_id
+            if map_id is None:
+                cursor.execute("SELECT id FROM mapas WHERE nome = ?", (model.name,))
+                row = cursor.fetchone()
+                if row:
+                    map_id = row[0]
                 else:
-                    # Formato antigo: lista de coordenadas
-                    coordinates = area
-                    area_name = None
-                
-                # Converte lista de coordenadas para string JSON
-                coords_json = json.dumps(coordinates)
-                self.cursor.execute("INSERT INTO areas_proibidas (mapa_id, nome, coordenadas) VALUES (?, ?, ?)",
-                                    (map_id, area_name, coords_json))
+                    cursor.execute("INSERT INTO mapas (nome, largura, comprimento, ativo) VALUES (?, ?, ?, 0)",
+                                   (model.name, MAP_WIDTH, MAP_HEIGHT))
+                    map_id = cursor.lastrowid
+                    print(f"Novo mapa '{model.name}' criado.")
+                activate = True
+            if activate:
+                cursor.execute("UPDATE mapas SET ativo = 0 WHERE ativo = 1 AND id != ?", (map_id,))
+                cursor.execute("UPDATE mapas SET largura = ?, comprimento = ?, ativo = 1 WHERE id = ?",
+                               (MAP_WIDTH, MAP_HEIGHT, map_id))
 
-            self.conn.commit()
-            print("Dados do mapa salvos com sucesso.")
+            # Pontos de interesse
+            cursor.executemany("DELETE FROM pontos_interesse WHERE id = ?",
+                               [(point_id,) for point_id in changes['points_delete']])
+            cursor.executemany("UPDATE pontos_interesse SET nome = ?, x = ?, y = ?, tipo = ? WHERE id = ?",
+                               changes['points_update'])
+            first_id = self._next_row_id(cursor, 'pontos_interesse')
+            point_ids = {name: first_id + i for i, (name, _, _, _) in enumerate(changes['points_insert'])}
+            cursor.executemany(
+                "INSERT INTO pontos_interesse (id, mapa_id, nome, x, y, tipo) VALUES (?, ?, ?, ?, ?, ?)",
+                [(point_ids[name], map_id, name, x, y, point_type)
+                 for name, x, y, point_type in changes['points_insert']])
+
+            # Áreas proibidas
+            cursor.executemany("DELETE FROM areas_proibidas WHERE id = ?",
+                               [(area_id,) for area_id in changes['areas_delete']])
+            cursor.executemany(
+                "UPDATE areas_proibidas SET nome = ?, coordenadas = ?, coordenadas_versao = ? WHERE id = ?",
+                [(name, sqlite3.Binary(encode_coordinates(coordinates)), COORDINATES_FLOAT64, area_id)
+                 for area_id, name, coordinates in changes['areas_update']])
+            first_id = self._next_row_id(cursor, 'areas_proibidas')
+            area_ids = {temporary_id: first_id + i
+                        for i, (temporary_id, _, _) in enumerate(changes['areas_insert'])}
+            cursor.executemany(
+                "INSERT INTO areas_proibidas (id, mapa_id, nome, coordenadas, coordenadas_versao) VALUES (?, ?, ?, ?, ?)",
+                [(area_ids[temporary_id], map_id, name, sqlite3.Binary(encode_coordinates(coordinates)),
+                  COORDINATES_FLOAT64) for temporary_id, name, coordinates in changes['areas_insert']])
+
+            if changes['areas_insert'] or changes['areas_update'] or changes['areas_delete']:
+                # As grades derivadas das áreas antigas deixam de valer
+                cursor.execute("DELETE FROM grades_derivadas WHERE mapa_id = ?", (map_id,))
+
+            conn.commit()
         except sqlite3.Error as e:
             print(f"Erro ao salvar mapa: {e}")
-            if self.conn:
-                self.conn.rollback()
+            conn.rollback()
+            model.restore_changes(changes)
+            return False
+        except Exception:
+            # Erro fora do SQLite (ex.: coordenadas inválidas): o delta volta às pendências
+            conn.rollback()
+            model.restore_changes(changes)
+            raise
+
+        model.confirm_saved(changes, map_id, point_ids, area_ids)
+        counts = {key: len(rows) for key, rows in changes.items() if key != 'version' and rows}
+        print(f"Mapa '{model.name}' salvo: {counts if counts else 'sem alterações'}")
+        return True
+
+    @staticmethod
+    def _next_row_id(cursor: sqlite3.Cursor, table: str) -> int:
+        """
+        Próximo ID de uma tabela AUTOINCREMENT, para inserir linhas com IDs conhecidos
+        (deve ser chamado dentro da transação que as insere).
+        """
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        max_id = cursor.fetchone()[0]
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        return max(max_id, row[0] if row else 0) + 1
 
     def load_active_map(self) -> tuple[dict, list, str]:
         """
@@ -150,35 +329,71 @@ class MapManager:
         if not self.conn:
             print("Erro: Conexão com o banco de dados não estabelecida.")
             return {}, [], ""
+        model = self.load_map_model()
+        if model is None:
+            print("Nenhum mapa ativo encontrado. Iniciando com mapa vazio.")
+            return {}, [], ""
+        return model.points_of_interest, model.forbidden_areas, model.name
 
-        points_of_interest = {}
-        forbidden_areas = []
-        map_name = ""
-        try:
-            self.cursor.execute("SELECT id, nome FROM mapas WHERE ativo = 1")
-            active_map = self.cursor.fetchone()
-
-            if active_map:
-                map_id, map_name = active_map
-                print(f"Carregando mapa ativo: '{map_name}'")
-
-                # Carrega pontos de interesse
-                self.cursor.execute("SELECT nome, x, y, tipo FROM pontos_interesse WHERE mapa_id = ?", (map_id,))
-                for row in self.cursor.fetchall():
-                    name, x, y, point_type = row
-                    points_of_interest[name] = (x, y, point_type)
+    def load_map_model(self, map_name: Optional[str] = None) -> Optional[MapModel]:
+        """
+        Carrega um mapa como modelo editável (com os IDs das linhas, para salvar só o delta).
 
-                # Carrega áreas proibidas com IDs
-                areas_with_ids = self.get_forbidden_areas_with_ids(map_id)
-                forbidden_areas = areas_with_ids
+        Args:
+            map_name: Nome do mapa (se None, usa o mapa ativo)
 
-            else:
-                print("Nenhum mapa ativo encontrado. Iniciando com mapa vazio.")
+        Returns:
+            O modelo do mapa, ou None se ele não existe
+        """
+        if not self.conn:
+            print("Erro: Conexão com o banco de dados não estabelecida.")
+            return None
+        try:
+            with self.pool.connection() as conn:
+                return self._load_map_model(conn, map_name)
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar mapa: {e}")
+            return None
 
+    def _load_map_model(self, conn: sqlite3.Connection, map_name: Optional[str]) -> Optional[MapModel]:
+        """Executa a carga de load_map_model pela conexão dada."""
+        condition, parameters = ("ativo = 1", ()) if map_name is None else ("nome = ?", (map_name,))
+        try:
+            started = time.perf_counter()
+            # Uma única consulta: o mapa com seus pontos e áreas (o mapa vem mesmo sem conteúdo);
+            # cada ramo filtra pelo mapa, usando os índices por mapa_id
+            rows = conn.execute(f"""
+                WITH alvo AS (SELECT id, nome FROM mapas WHERE {condition} LIMIT 1)
+                SELECT alvo.id, alvo.nome, c.tipo_registro, c.id, c.nome, c.x, c.y, c.tipo, c.coordenadas
+                FROM alvo
+                LEFT JOIN (
+                    SELECT 0 AS tipo_registro, id, nome, x, y, tipo, NULL AS coordenadas
+                    FROM pontos_interesse
+                    WHERE mapa_id = (SELECT id FROM alvo)
+                    UNION ALL
+                    SELECT 1, id, nome, NULL, NULL, NULL, coordenadas
+                    FROM areas_proibidas
+                    WHERE mapa_id = (SELECT id FROM alvo) AND ativo = 1 AND coordenadas_versao = ?
+                ) c
+                ORDER BY c.tipo_registro, c.id
+            """, parameters + (COORDINATES_FLOAT64,)).fetchall()
         except sqlite3.Error as e:
             print(f"Erro ao carregar mapa: {e}")
+            return None
+        if not rows:
+            return None
 
-        return points_of_interest, forbidden_areas, map_name
+        map_id, name = rows[0][0], rows[0][1]
+        point_rows = [(record_id, record_name, x, y, point_type)
+                      for _, _, record_type, record_id, record_name, x, y, point_type, _ in rows
+                      if record_type == 0]
+        area_rows = [(record_id, record_name, decode_coordinates(blob).tolist())
+                     for _, _, record_type, record_id, record_name, _, _, _, blob in rows
+                     if record_type == 1]
+        model = MapModel.from_rows(map_id, name, point_rows, area_rows)
+        print(f"Mapa '{name}' carregado: {len(point_rows)} pontos, {len(area_rows)} áreas "
+              f"em {(time.perf_counter() - started) * 1000:.1f}ms")
+        return model
 
     def get_all_map_names(self) -> list[str]:
         """
@@ -188,8 +403,8 @@ class MapManager:
             print("Erro: Conexão com o banco de dados não estabelecida.")
             return []
         try:
-            self.cursor.execute("SELECT nome FROM mapas ORDER BY nome")
-            return [row[0] for row in self.cursor.fetchall()]
+            with self.pool.connection() as conn:
+                return [row[0] for row in conn.execute("SELECT nome FROM mapas ORDER BY nome")]
         except sqlite3.Error as e:
             print(f"Erro ao listar mapas: {e}")
             return []
@@ -203,25 +418,61 @@ class MapManager:
             print("Erro: Conexão com o banco de dados não estabelecida.")
             return {}, [], ""
 
-        points_of_interest = {}
-        forbidden_areas = []
-        loaded_map_name = ""
-        try:
-            # Desativa todos os mapas e ativa o selecionado
-            self.cursor.execute("UPDATE mapas SET ativo = 0")
-            self.cursor.execute("UPDATE mapas SET ativo = 1 WHERE nome = ?", (map_name,))
-            self.conn.commit()
+        prepared = self.switch_map(map_name)
+        if prepared is None:
+            return {}, [], ""
+        return prepared.model.points_of_interest, prepared.model.forbidden_areas, prepared.name
 
-            # Agora carrega o mapa recém-ativado
-            return self.load_active_map()
+    def switch_map(self, map_name: str) -> Optional[PreparedMap]:
+        """
+        Define o mapa como ativo e o devolve preparado - do cache, se foi usado recentemente.
 
+        Returns:
+            Mapa preparado, ou None se o mapa não existe ou houve erro
+        """
+        if not self.conn:
+            print("Erro: Conexão com o banco de dados não estabelecida.")
+            return None
+        try:
+            # Um único UPDATE: desativa o mapa ativo e ativa o selecionado (se ele existe)
+            self.cursor.execute("""
+                UPDATE mapas SET ativo = (nome = ?)
+                WHERE (ativo = 1 OR nome = ?) AND EXISTS (SELECT 1 FROM mapas WHERE nome = ?)
+            """, (map_name, map_name, map_name))
+            self.conn.commit()
         except sqlite3.Error as e:
-            print(f"Erro ao carregar mapa por nome: {e}")
+            print(f"Erro ao ativar o mapa '{map_name}': {e}")
             self.conn.rollback()
-        return {}, [], ""
+            return None
+        return self.load_prepared_map(map_name)
+
+    def load_prepared_map(self, map_name: Optional[str] = None) -> Optional[PreparedMap]:
+        """
+        Mapa preparado (modelo, grades derivadas e grade de ocupação), do cache ou do banco.
+
+        Args:
+            map_name: Nome do mapa (se None, o mapa ativo)
+        """
+        if map_name is not None:
+            prepared = self.map_cache.find(map_name)
+        else:
+            with self.pool.connection() as conn:
+                prepared = self.map_cache.get(self._resolve_map_id(None, conn.cursor()))
+        if prepared is not None:
+            print(f"DEBUG: Mapa '{prepared.name}' obtido do cache")
+            return prepared
+
+        model = self.load_map_model(map_name)
+        if model is None:
+            return None
+        prepared = PreparedMap(model, self.load_derived_grids(model.map_id), self.load_occupancy_grid(model.map_id))
+        self.map_cache.put(prepared)
+        return prepared
 
     def close(self):
         """Fecha a conexão com o banco de dados."""
+        if self.pool:
+            self.pool.close()
         if self.conn:
             self.conn.close()
             print("Conexão com o banco de dados fechada.")
@@ -229,19 +480,14 @@ class MapManager:
     def get_forbidden_areas(self, map_id: int) -> List[List[Tuple[float, float]]]:
         """Obtém todas as áreas proibidas de um mapa"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT coordenadas FROM areas_proibidas 
-                    WHERE mapa_id = ? AND ativo = 1
-                """, (map_id,))
-                areas = []
-                for row in cursor.fetchall():
-                    # Converte a string de coordenadas em lista de tuplas
-                    coords_str = row[0]
-                    coords_list = eval(coords_str)  # Converte string para lista
-                    areas.append([(float(x), float(y)) for x, y in coords_list])
-                return areas
+                    WHERE mapa_id = ? AND ativo = 1 AND coordenadas_versao = ?
+                    ORDER BY id
+                """, (map_id, COORDINATES_FLOAT64))
+                return [list(map(tuple, decode_coordinates(row[0]).tolist())) for row in cursor.fetchall()]
         except Exception as e:
             print(f"Erro ao obter áreas proibidas: {e}")
             return []
@@ -249,7 +495,7 @@ class MapManager:
     def get_active_map(self) -> Optional[Dict]:
         """Obtém o mapa ativo do banco de dados"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, nome, largura, comprimento 
@@ -295,16 +541,14 @@ class MapManager:
                 
             map_id = active_map[0]
             
-            # Converte lista de tuplas para string JSON
-            coords_json = json.dumps(area_coordinates)
-            
-            # Insere a área proibida
+            # Insere a área proibida com os vértices empacotados em float64
             self.cursor.execute(
-                "INSERT INTO areas_proibidas (mapa_id, nome, coordenadas) VALUES (?, ?, ?)",
-                (map_id, area_name, coords_json)
+                "INSERT INTO areas_proibidas (mapa_id, nome, coordenadas, coordenadas_versao) VALUES (?, ?, ?, ?)",
+                (map_id, area_name, sqlite3.Binary(encode_coordinates(area_coordinates)), COORDINATES_FLOAT64)
             )
             
             self.conn.commit()
+            self.map_cache.discard(map_id)
             print(f"Área proibida salva com sucesso. ID: {self.cursor.lastrowid}")
             return True
             
@@ -333,7 +577,7 @@ class MapManager:
         try:
             # Primeiro verifica se a área existe
             if self.cursor:
-                self.cursor.execute("SELECT id, nome FROM areas_proibidas WHERE id = ?", (area_id,))
+                self.cursor.execute("SELECT id, nome, mapa_id FROM areas_proibidas WHERE id = ?", (area_id,))
                 area = self.cursor.fetchone()
                 if area:
                     print(f"DEBUG: Área encontrada - ID: {area[0]}, Nome: {area[1]}")
@@ -344,6 +588,7 @@ class MapManager:
                 # Executa a exclusão
                 self.cursor.execute("DELETE FROM areas_proibidas WHERE id = ?", (area_id,))
                 self.conn.commit()
+                self.map_cache.discard(area[2])
                 
                 print(f"DEBUG: rowcount após exclusão: {self.cursor.rowcount}")
                 
@@ -378,68 +623,290 @@ class MapManager:
             return []
             
         try:
-            if map_id is None:
-                # Obtém o mapa ativo
-                self.cursor.execute("SELECT id FROM mapas WHERE ativo = 1")
-                active_map = self.cursor.fetchone()
-                if not active_map:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                map_id = self._resolve_map_id(map_id, cursor)
+                if map_id is None:
                     return []
-                map_id = active_map[0]
-            
-            self.cursor.execute("""
-                SELECT id, nome, coordenadas, ativo 
-                FROM areas_proibidas 
-                WHERE mapa_id = ? AND ativo = 1
-                ORDER BY id
-            """, (map_id,))
-            
-            areas = []
-            for row in self.cursor.fetchall():
-                area_id, name, coords_json, active = row
-                try:
-                    # Tenta carregar como JSON primeiro
-                    coords_list = json.loads(coords_json)
-                except (json.JSONDecodeError, TypeError):
-                    try:
-                        # Se falhar, tenta usar eval (formato antigo)
-                        coords_list = eval(coords_json)
-                    except Exception as e:
-                        print(f"DEBUG: Erro ao carregar coordenadas da área {area_id}: {e}")
-                        print(f"DEBUG: Dados: {coords_json[:100]}...")
-                        continue
-                
-                # Verifica se as coordenadas são válidas
-                if not isinstance(coords_list, list):
-                    print(f"DEBUG: Coordenadas inválidas para área {area_id}: {coords_list}")
-                    continue
-                    
-                # Verifica se cada coordenada é válida
-                valid_coords = []
-                for coord in coords_list:
-                    if isinstance(coord, list) and len(coord) == 2:
-                        try:
-                            x, y = float(coord[0]), float(coord[1])
-                            valid_coords.append([x, y])
-                        except (ValueError, TypeError):
-                            print(f"DEBUG: Coordenada inválida na área {area_id}: {coord}")
-                            continue
-                    else:
-                        print(f"DEBUG: Formato de coordenada inválido na área {area_id}: {coord}")
-                        continue
                 
-                if valid_coords:
-                    areas.append({
-                        'id': area_id,
-                        'nome': name,
-                        'coordenadas': valid_coords,
-                        'ativo': bool(active)
-                    })
-                    print(f"DEBUG: Área {area_id} carregada com {len(valid_coords)} coordenadas válidas")
-                else:
-                    print(f"DEBUG: Área {area_id} sem coordenadas válidas")
+                cursor.execute("""
+                    SELECT id, nome, coordenadas, ativo 
+                    FROM areas_proibidas 
+                    WHERE mapa_id = ? AND ativo = 1 AND coordenadas_versao = ?
+                    ORDER BY id
+                """, (map_id, COORDINATES_FLOAT64))
+                rows = cursor.fetchall()
             
+            areas = [{
+                'id': area_id,
+                'nome': name,
+                'coordenadas': decode_coordinates(blob).tolist(),
+                'ativo': bool(active)
+            } for area_id, name, blob, active in rows]
             return areas
             
         except sqlite3.Error as e:
             print(f"Erro ao obter áreas proibidas: {e}")
-            return [] 
\ No newline at end of file
+            return [] 
+
+    def _resolve_map_id(self, map_id: Optional[int], cursor: Optional[sqlite3.Cursor] = None) -> Optional[int]:
+        """Retorna map_id ou, se None, o ID do mapa ativo (pelo cursor dado ou o de escrita)."""
+        if map_id is not None:
+            return map_id
+        cursor = cursor if cursor is not None else self.cursor
+        cursor.execute("SELECT id FROM mapas WHERE ativo = 1")
+        active_map = cursor.fetchone()
+        return active_map[0] if active_map else None
+
+    def save_occupancy_grid(self, mapper: OccupancyMapper, map_id: Optional[int] = None) -> bool:
+        """
+        Salva a grade de ocupação mapeada pelo LIDAR junto ao mapa.
+
+        Args:
+            mapper: Mapeador com a grade em log-odds
+            map_id: ID do mapa (se None, usa o mapa ativo)
+
+        Returns:
+            bool: True se salvou com sucesso, False caso contrário
+        """
+        if not self.conn or not self.cursor:
+            print("Erro: Conexão com o banco de dados não estabelecida.")
+            return False
+
+        try:
+            map_id = self._resolve_map_id(map_id)
+            if map_id is None:
+                print("Erro: Nenhum mapa ativo encontrado.")
+                return False
+            self.cursor.execute("""
+                INSERT OR REPLACE INTO mapas_ocupacao
+                    (mapa_id, largura_celulas, altura_celulas, resolucao, dados, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (map_id, mapper.width, mapper.height, mapper.resolution,
+                  sqlite3.Binary(mapper.to_blob()), time.time()))
+            self.conn.commit()
+            self.map_cache.discard(map_id)
+            print(f"Grade de ocupação salva para o mapa {map_id} ({mapper.width}x{mapper.height})")
+            return True
+        except sqlite3.Error as e:
+            print(f"Erro ao salvar grade de ocupação: {e}")
+            if self.conn:
+                self.conn.rollback()
+            return False
+
+    def load_occupancy_grid(self, map_id: Optional[int] = None) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Carrega a grade de ocupação de um mapa.
+
+        Args:
+            map_id: ID do mapa (se None, usa o mapa ativo)
+
+        Returns:
+            Tupla (log-odds [y, x], resolução em metros) ou None se o mapa não foi mapeado
+        """
+        if not self.conn:
+            print("Erro: Conexão com o banco de dados não estabelecida.")
+            return None
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                map_id = self._resolve_map_id(map_id, cursor)
+                if map_id is None:
+                    return None
+                cursor.execute("""
+                    SELECT largura_celulas, altura_celulas, resolucao, dados
+                    FROM mapas_ocupacao WHERE mapa_id = ?
+                """, (map_id,))
+                row = cursor.fetchone()
+            if not row:
+                return None
+            width, height, resolution, blob = row
+            return OccupancyMapper.grid_from_blob(blob, width, height), resolution
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Erro ao carregar grade de ocupação: {e}")
+            return None
+
+    def load_derived_grids(self, map_id: Optional[int] = None) -> Optional[DerivedGrids]:
+        """
+        Carrega as grades derivadas das áreas de um mapa (importadas de um pacote).
+
+        A validade para as áreas atuais é conferida por quem as usa (DerivedGrids.matches).
+
+        Args:
+            map_id: ID do mapa (se None, usa o mapa ativo)
+        """
+        if not self.conn:
+            print("Erro: Conexão com o banco de dados não estabelecida.")
+            return None
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                map_id = self._resolve_map_id(map_id, cursor)
+                if map_id is None:
+                    return None
+                cursor.execute("SELECT nome, chave, dtype, forma, dados FROM grades_derivadas WHERE mapa_id = ?",
+                               (map_id,))
+                rows = cursor.fetchall()
+            if not rows or len({row[1] for row in rows}) != 1:
+                return None
+            grids = {name: np.frombuffer(zlib.decompress(blob), dtype=dtype).reshape(json.loads(shape))
+                     for name, _, dtype, shape, blob in rows}
+            return DerivedGrids(rows[0][1], grids)
+        except (sqlite3.Error, ValueError, zlib.error) as e:
+            print(f"Erro ao carregar grades derivadas: {e}")
+            return None
+
+    def export_map_bundle(self, path: str, map_name: Optional[str] = None, compress: bool = True,
+                          derived: Optional[DerivedGrids] = None) -> bool:
+        """
+        Exporta um mapa para um pacote (.rgmb): pontos, áreas, grade de ocupação e grades
+        derivadas (calculadas aqui se as gravadas não valem para as áreas atuais).
+
+        Args:
+            path: Arquivo do pacote
+            map_name: Nome do mapa (se None, usa o mapa ativo)
+            compress: Comprime as seções (False gera um pacote lido sem cópia, maior)
+            derived: Grades já calculadas (ex.: as do navegador), usadas se valem para as áreas
+
+        Returns:
+            bool: True se exportou com sucesso, False caso contrário
+        """
+        model = self.load_map_model(map_name)
+        if model is None:
+            print(f"Erro: Mapa '{map_name}' não encontrado para exportação.")
+            return False
+        areas = model.area_coordinates()
+        if derived is None or not derived.matches(areas):
+            derived = self.load_derived_grids(model.map_id)
+        if derived is None or not derived.matches(areas):
+            derived = DerivedGrids.compute(areas)
+        try:
+            start = time.time()
+            size = write_map_bundle(path, model.name, model.points_of_interest, model.forbidden_areas,
+                                    self.load_occupancy_grid(model.map_id), derived, compress)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao exportar o mapa '{model.name}': {e}")
+            return False
+        print(f"Mapa '{model.name}' exportado para {path} ({size} bytes em {(time.time() - start) * 1000:.1f}ms)")
+        return True
+
+    def import_map_bundle(self, path: str, activate: bool = False) -> Optional[str]:
+        """
+        Importa um pacote de mapa. Um mapa com o mesmo nome é substituído (mantendo o ID).
+
+        Returns:
+            Nome do mapa importado, ou None em caso de erro
+        """
+        imported = self.import_map_bundles([path], activate)
+        return imported[0] if imported else None
+
+    def import_map_bundles(self, paths: List[str], activate: bool = False) -> List[str]:
+        """
+        Importa vários pacotes de mapa em uma única transação. Pacotes ilegíveis ou
+        corrompidos são ignorados; um erro do banco desfaz a importação inteira.
+
+        Args:
+            paths: Arquivos dos pacotes
+            activate: Se True, o último mapa importado passa a ser o ativo
+
+        Returns:
+            Nomes dos mapas importados
+        """
+        if not self.conn:
+            print("Erro: Conexão com o banco de dados não estabelecida.")
+            return []
+
+        bundles = []
+        for path in paths:
+            try:
+                bundles.append(MapBundle(path))
+            except (OSError, ValueError) as e:
+                print(f"Erro: pacote {path} ignorado: {e}")
+        if not bundles:
+            return []
+
+        start = time.time()
+        imported = []
+        cursor = self.conn.cursor()
+        try:
+            if not self.conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            map_id = None
+            for bundle in bundles:
+                try:
+                    map_id = self._import_bundle(cursor, bundle)
+                except ValueError as e:
+                    print(f"Erro: pacote {bundle.path} ignorado: {e}")
+                    continue
+                imported.append(bundle.name)
+                self.map_cache.discard(map_id)
+            if activate and imported:
+                cursor.execute("UPDATE mapas SET ativo = 0 WHERE ativo = 1 AND id != ?", (map_id,))
+                cursor.execute("UPDATE mapas SET ativo = 1 WHERE id = ?", (map_id,))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Erro ao importar pacotes de mapa: {e}")
+            self.conn.rollback()
+            return []
+        finally:
+            for bundle in bundles:
+                bundle.close()
+        print(f"{len(imported)} mapa(s) importado(s) em {(time.time() - start) * 1000:.1f}ms: {imported}")
+        return imported
+
+    def _import_bundle(self, cursor: sqlite3.Cursor, bundle: MapBundle) -> int:
+        """
+        Grava um pacote dentro da transação de importação; retorna o ID do mapa.
+
+        Todo o conteúdo do pacote é lido e convertido antes de apagar o mapa de mesmo
+        nome, para que um pacote inválido (ValueError) não o deixe vazio.
+        """
+        name = bundle.name
+        width, height = bundle.width, bundle.height
+        point_rows = [(point_name, x, y, point_type)
+                      for point_name, (x, y, point_type) in bundle.points_of_interest.items()]
+        area_rows = [(area['nome'], sqlite3.Binary(encode_coordinates(area['coordenadas'])), COORDINATES_FLOAT64)
+                     for area in bundle.forbidden_areas]
+        occupancy = bundle.occupancy
+        occupancy_row = None
+        if occupancy is not None:
+            grid, resolution = occupancy
+            occupancy_row = (grid.shape[1], grid.shape[0], resolution,
+                             sqlite3.Binary(OccupancyMapper.grid_to_blob(grid)), time.time())
+        derived = bundle.derived_grids
+        derived_rows = []
+        if derived is not None:
+            derived_rows = [(grid_name, derived.key, grid.dtype.str, json.dumps(list(grid.shape)),
+                             sqlite3.Binary(zlib.compress(np.ascontiguousarray(grid).tobytes())))
+                            for grid_name, grid in derived.grids.items()]
+
+        cursor.execute("SELECT id FROM mapas WHERE nome = ?", (name,))
+        row = cursor.fetchone()
+        if row:
+            map_id = row[0]
+            for table in ('pontos_interesse', 'areas_proibidas', 'mapas_ocupacao', 'grades_derivadas'):
+                cursor.execute(f"DELETE FROM {table} WHERE mapa_id = ?", (map_id,))
+            cursor.execute("UPDATE mapas SET largura = ?, comprimento = ? WHERE id = ?",
+                           (width, height, map_id))
+        else:
+            cursor.execute("INSERT INTO mapas (nome, largura, comprimento, ativo) VALUES (?, ?, ?, 0)",
+                           (name, width, height))
+            map_id = cursor.lastrowid
+
+        cursor.executemany("INSERT INTO pontos_interesse (mapa_id, nome, x, y, tipo) VALUES (?, ?, ?, ?, ?)",
+                           [(map_id,) + point for point in point_rows])
+        cursor.executemany(
+            "INSERT INTO areas_proibidas (mapa_id, nome, coordenadas, coordenadas_versao) VALUES (?, ?, ?, ?)",
+            [(map_id,) + area for area in area_rows])
+        if occupancy_row is not None:
+            cursor.execute("""
+                INSERT INTO mapas_ocupacao
+                    (mapa_id, largura_celulas, altura_celulas, resolucao, dados, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (map_id,) + occupancy_row)
+        cursor.executemany(
+            "INSERT INTO grades_derivadas (mapa_id, nome, chave, dtype, forma, dados) VALUES (?, ?, ?, ?, ?, ?)",
+            [(map_id,) + grid_row for grid_row in derived_rows])
+        return map_id
@@ -0,0 +1,318 @@
+"""
+Modelo em memória de um mapa (pontos de interesse e áreas proibidas) com registro
+das alterações feitas desde o último salvamento.
+
+O modelo é a fonte autoritativa do mapa em edição: interface e navegação leem dele,
+sem consultar o banco. Cada alteração incrementa `version` e notifica os ouvintes.
+
+O MapManager grava apenas o delta registrado - inserções, atualizações e remoções -
+e as linhas já gravadas mantêm seus IDs. Áreas novas recebem IDs temporários
+negativos, trocados pelos IDs do banco quando o salvamento é confirmado. O
+salvamento pode rodar em outra thread: take_changes() retira o delta (que passa
+a estar "em voo") e confirm_saved() / restore_changes() o encerram; alterações
+feitas nesse intervalo continuam registradas para o salvamento seguinte.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+class MapModel:
+    """Pontos e áreas de um mapa, com as alterações pendentes de gravação."""
+
+    def __init__(self, map_id: Optional[int] = None, name: str = ""):
+        """
+        Args:
+            map_id: ID do mapa no banco (None para um mapa ainda não gravado)
+            name: Nome do mapa
+        """
+        self.map_id = map_id
+        self.name = name
+        self.points_of_interest: Dict[str, Tuple[float, float, str]] = {}  # {nome: (x, y, tipo)}
+        self.forbidden_areas: List[Dict] = []  # Dicionários com id, nome, coordenadas e ativo
+
+        self._point_ids: Dict[str, int] = {}  # Nome -> ID dos pontos já gravados
+        self._changed_points: Set[str] = set()  # Pontos novos ou alterados (por nome)
+        self._deleted_point_ids: Set[int] = set()
+        self._changed_area_ids: Set[int] = set()  # Áreas alteradas
+        self._deleted_area_ids: Set[int] = set()  # IDs do banco das áreas removidas
+        self._next_temporary_id = -1
+
+        self.version = 0  # Incrementada a cada alteração (inclusive a troca de IDs ao salvar)
+        self._listeners: List[Callable[['MapModel'], None]] = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_rows(cls, map_id: int, name: str, point_rows, area_rows) -> 'MapModel':
+        """
+        Cria o modelo de um mapa gravado, sem alterações pendentes.
+
+        Args:
+            point_rows: Linhas (id, nome, x, y, tipo) dos pontos de interesse
+            area_rows: Linhas (id, nome, coordenadas) das áreas proibidas ativas
+        """
+        model = cls(map_id, name)
+        for point_id, point_name, x, y, point_type in point_rows:
+            model.points_of_interest[point_name] = (x, y, point_type)
+            model._point_ids[point_name] = point_id
+        for area_id, area_name, coordinates in area_rows:
+            model.forbidden_areas.append({'id': area_id, 'nome': area_name,
+                                          'coordenadas': coordinates, 'ativo': True})
+        return model
+
+    @property
+    def has_changes(self) -> bool:
+        """Indica se há alterações ainda não gravadas."""
+        with self._lock:
+            return bool(self._changed_points or self._deleted_point_ids or self._changed_area_ids or
+                        self._deleted_area_ids or any(area['id'] < 0 for area in self.forbidden_areas))
+
+    def subscribe(self, callback: Callable[['MapModel'], None]):
+        """
+        Registra um ouvinte, chamado após cada alteração na thread que a fez (a confirmação
+        de um salvamento em segundo plano notifica da thread de gravação).
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[['MapModel'], None]):
+        """Remove um ouvinte registrado por subscribe()."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _changed(self):
+        """Incrementa a versão e notifica os ouvintes."""
+        self.version += 1
+        for callback in list(self._listeners):
+            callback(self)
+
+    def area_coordinates(self) -> List[List[Tuple[float, float]]]:
+        """Vértices de todas as áreas proibidas, no formato de RobotNavigator.set_forbidden_areas."""
+        with self._lock:
+            return [[(x, y) for x, y in area['coordenadas']] for area in self.forbidden_areas]
+
+    # ------------------------------------------------------------------
+    # Edição
+    # ------------------------------------------------------------------
+
+    def set_point(self, name: str, x: float, y: float, point_type: str = "Mesa"):
+        """Cria ou altera o ponto de interesse `name`."""
+        point = (float(x), float(y), point_type)
+        with self._lock:
+            if self.points_of_interest.get(name) == point:
+                return
+            self.points_of_interest[name] = point
+            self._changed_points.add(name)
+            self._changed()
+
+    def remove_point(self, name: str) -> bool:
+        """Remove o ponto de interesse `name`; retorna False se ele não existe."""
+        with self._lock:
+            if name not in self.points_of_interest:
+                return False
+            del self.points_of_interest[name]
+            self._changed_points.discard(name)
+            point_id = self._point_ids.pop(name, None)
+            if point_id is not None:
+                self._deleted_point_ids.add(point_id)
+            self._changed()
+        return True
+
+    def area(self, area_id: int) -> Optional[Dict]:
+        """Área proibida com o ID dado (do banco ou temporário)."""
+        for area in self.forbidden_areas:
+            if area['id'] == area_id:
+                return area
+        return None
+
+    def add_area(self, coordinates, name: Optional[str] = None) -> int:
+        """
+        Acrescenta uma área proibida.
+
+        Returns:
+            ID temporário (negativo) da área, válido até o próximo salvamento
+        """
+        with self._lock:
+            area_id = self._next_temporary_id
+            self._next_temporary_id -= 1
+            self.forbidden_areas.append({'id': area_id, 'nome': name,
+                                         'coordenadas': [[float(x), float(y)] for x, y in coordinates],
+                                         'ativo': True})
+            self._changed()
+        return area_id
+
+    def update_area(self, area_id: int, coordinates=None, name: Optional[str] = None) -> bool:
+        """Altera os vértices e/ou o nome de uma área; retorna False se ela não existe."""
+        with self._lock:
+            area = self.area(area_id)
+            if area is None:
+                return False
+            if coordinates is not None:
+                area['coordenadas'] = [[float(x), float(y)] for x, y in coordinates]
+            if name is not None:
+                area['nome'] = name
+            # IDs temporários também: a área pode estar sendo inserida por um salvamento em voo
+            self._changed_area_ids.add(area_id)
+            self._changed()
+        return True
+
+    def remove_area(self, area_id: int) -> bool:
+        """Remove uma área proibida; retorna False se ela não existe."""
+        with self._lock:
+            area = self.area(area_id)
+            if area is None:
+                return False
+            self.forbidden_areas.remove(area)
+            self._changed_area_ids.discard(area_id)
+            if area_id > 0:
+                self._deleted_area_ids.add(area_id)
+            self._changed()
+        return True
+
+    def replace_contents(self, points_of_interest: Dict, forbidden_areas: List):
+        """
+        Substitui o conteúdo pelo informado, registrando apenas as diferenças.
+
+        Args:
+            points_of_interest: {nome: (x, y) ou (x, y, tipo)}
+            forbidden_areas: Dicionários com id, nome e coordenadas (IDs desconhecidos
+                             viram áreas novas) ou listas de coordenadas (formato antigo)
+        """
+        with self._lock:
+            for name in [name for name in self.points_of_interest if name not in points_of_interest]:
+                self.remove_point(name)
+            for name, data in points_of_interest.items():
+                if len(data) == 2:
+                    self.set_point(name, data[0], data[1])
+                else:
+                    self.set_point(name, data[0], data[1], data[2])
+
+            kept = set()
+            for area in forbidden_areas:
+                if isinstance(area, dict):
+                    coordinates = [[float(x), float(y)] for x, y in area.get('coordenadas', [])]
+                    name = area.get('nome')
+                    existing = self.area(area.get('id')) if area.get('id') is not None else None
+                else:
+                    # Formato antigo: só as coordenadas; casa com uma área idêntica, se houver
+                    coordinates = [[float(x), float(y)] for x, y in area]
+                    name = None
+                    existing = next((a for a in self.forbidden_areas
+                                     if a['id'] not in kept and a['coordenadas'] == coordinates), None)
+                    if existing is not None:
+                        name = existing['nome']
+                if existing is None or existing['id'] in kept:
+                    kept.add(self.add_area(coordinates, name))
+                    continue
+                kept.add(existing['id'])
+                if existing['coordenadas'] != coordinates or existing['nome'] != name:
+                    self.update_area(existing['id'], coordinates, name)
+            for area in [area for area in self.forbidden_areas if area['id'] not in kept]:
+                self.remove_area(area['id'])
+
+    # ------------------------------------------------------------------
+    # Salvamento
+    # ------------------------------------------------------------------
+
+    def pending_changes(self) -> Dict[str, list]:
+        """
+        Alterações pendentes, agrupadas por operação (sem retirá-las; veja take_changes).
+
+        Returns:
+            Dicionário com:
+            - 'points_insert': [(nome, x, y, tipo)]
+            - 'points_update': [(nome, x, y, tipo, id)]
+            - 'points_delete': [id]
+            - 'areas_insert': [(id temporário, nome, coordenadas)]
+            - 'areas_update': [(id, nome, coordenadas)]
+            - 'areas_delete': [id]
+        """
+        with self._lock:
+            return self._collect_changes()
+
+    def _collect_changes(self) -> Dict[str, list]:
+        points_insert, points_update = [], []
+        for name in sorted(self._changed_points):
+            x, y, point_type = self.points_of_interest[name]
+            if name in self._point_ids:
+                points_update.append((name, x, y, point_type, self._point_ids[name]))
+            else:
+                points_insert.append((name, x, y, point_type))
+        areas_insert = [(area['id'], area['nome'], area['coordenadas'])
+                        for area in self.forbidden_areas if area['id'] < 0]
+        areas_update = [(area['id'], area['nome'], area['coordenadas'])
+                        for area in self.forbidden_areas
+                        if area['id'] > 0 and area['id'] in self._changed_area_ids]
+        return {
+            'points_insert': points_insert,
+            'points_update': points_update,
+            'points_delete': sorted(self._deleted_point_ids),
+            'areas_insert': areas_insert,
+            'areas_update': areas_update,
+            'areas_delete': sorted(self._deleted_area_ids),
+        }
+
+    def take_changes(self) -> Dict:
+        """
+        Retira as alterações pendentes para gravação: o delta de pending_changes(),
+        com a versão do modelo em 'version'. Deve ser encerrado por confirm_saved()
+        ou restore_changes(), e só um delta pode estar em voo por vez.
+        """
+        with self._lock:
+            changes = self._collect_changes()
+            changes['version'] = self.version
+            self._changed_points.clear()
+            self._deleted_point_ids.clear()
+            self._changed_area_ids.clear()
+            self._deleted_area_ids.clear()
+            return changes
+
+    def confirm_saved(self, changes: Dict, map_id: int, point_ids: Dict[str, int], area_ids: Dict[int, int]):
+        """
+        Confirma a gravação de um delta retirado por take_changes().
+
+        Args:
+            changes: O delta gravado
+            map_id: ID do mapa no banco
+            point_ids: {nome: id} dos pontos inseridos
+            area_ids: {id temporário: id do banco} das áreas inseridas
+        """
+        with self._lock:
+            changed = self.map_id != map_id or bool(area_ids)
+            self.map_id = map_id
+            for name, point_id in point_ids.items():
+                if name in self.points_of_interest:
+                    self._point_ids[name] = point_id
+                else:
+                    # Removido enquanto era inserido: a linha gravada também deve sair
+                    self._deleted_point_ids.add(point_id)
+            for temporary_id, area_id in area_ids.items():
+                area = self.area(temporary_id)
+                if area is None:
+                    self._deleted_area_ids.add(area_id)
+                    continue
+                area['id'] = area_id
+                if temporary_id in self._changed_area_ids:
+                    # Alterada enquanto era inserida: atualiza no próximo salvamento
+                    self._changed_area_ids.discard(temporary_id)
+                    self._changed_area_ids.add(area_id)
+            self._changed_area_ids = {area_id for area_id in self._changed_area_ids if area_id > 0}
+            if changed:
+                # IDs trocados: quem exibe IDs precisa se atualizar
+                self._changed()
+
+    def restore_changes(self, changes: Dict):
+        """Devolve às pendências um delta de take_changes() que não pôde ser gravado."""
+        with self._lock:
+            for row in changes['points_insert'] + changes['points_update']:
+                if row[0] in self.points_of_interest:
+                    self._changed_points.add(row[0])
+            self._deleted_point_ids.update(changes['points_delete'])
+            for area_id, _, _ in changes['areas_update']:
+                if self.area(area_id) is not None:
+                    self._changed_area_ids.add(area_id)
+            self._deleted_area_ids.update(changes['areas_delete'])
+
+    def __repr__(self) -> str:
+        return (f"MapModel(id={self.map_id}, nome={self.name!r}, pontos={len(self.points_of_interest)}, "
+                f"áreas={len(self.forbidden_areas)}, alterado={self.has_changes})")
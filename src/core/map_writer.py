@@ -0,0 +1,178 @@
+"""
+Gravação dos mapas em segundo plano (write-behind).
+
+A interface altera o MapModel em memória e apenas pede a gravação; uma thread
+dedicada, com a sua própria conexão SQLite (WAL), retira o delta de cada modelo
+e o grava em uma transação. Cada novo pedido adia a gravação do modelo por `delay`
+(debounce), até no máximo `max_delay` após o primeiro pedido pendente, de modo que
+uma rajada de edições vira um único salvamento e quem edita nunca espera um commit.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .database import connect
+from .map_model import MapModel
+from .config import MAP_WRITE_BEHIND_DELAY, MAP_WRITE_BEHIND_MAX_DELAY
+
+
+class MapWriteBehind:
+    """Thread que grava as alterações pendentes dos modelos de mapa."""
+
+    def __init__(self, manager, delay: float = MAP_WRITE_BEHIND_DELAY,
+                 max_delay: float = MAP_WRITE_BEHIND_MAX_DELAY,
+                 on_saved: Optional[Callable[[MapModel, int, bool, str], None]] = None):
+        """
+        Args:
+            manager: MapManager que sabe gravar o delta (save_map_changes)
+            delay: Espera (s) sem novos pedidos antes de gravar um modelo
+            max_delay: Espera máxima (s) desde o primeiro pedido pendente, mesmo sob edições contínuas
+            on_saved: Chamado na thread de gravação com (modelo, último pedido atendido,
+                      sucesso, mensagem de erro) após cada salvamento
+        """
+        self.manager = manager
+        self.delay = delay
+        self.max_delay = max(max_delay, delay)
+        self.on_saved = on_saved
+        self.saves = 0
+        self.failures = 0
+        self._tickets = 0  # Número do último pedido (request_save)
+        # id(modelo) -> (modelo, ativar ao gravar, instante do primeiro pedido, instante do último,
+        #                número do último pedido)
+        self._requests: "OrderedDict[int, tuple]" = OrderedDict()
+        self._saving = False
+        self._stopping = False
+        self._flushing = 0  # flush() em espera: os pedidos são gravados sem debounce
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        """Indica se a thread de gravação está ativa."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def busy(self) -> bool:
+        """Indica se há gravações pedidas ou em andamento."""
+        with self._condition:
+            return bool(self._requests) or self._saving
+
+    def start(self):
+        """Inicia a thread de gravação."""
+        if self.is_running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="map-write-behind", daemon=True)
+        self._thread.start()
+
+    def request_save(self, model: MapModel, activate: bool = False) -> int:
+        """
+        Pede a gravação das alterações do modelo (retorna imediatamente).
+
+        Args:
+            model: Modelo a gravar; um modelo sem ID só é gravado se tiver nome (o mapa é criado)
+            activate: Se True, define o mapa como ativo ao gravar
+
+        Returns:
+            Número do pedido; o on_saved que o atende recebe um número igual ou maior
+        """
+        now = time.monotonic()
+        with self._condition:
+            self._tickets += 1
+            previous = self._requests.get(id(model))
+            if previous is None:
+                self._requests[id(model)] = (model, activate, now, now, self._tickets)
+            else:
+                self._requests[id(model)] = (model, activate or previous[1], previous[2], now, self._tickets)
+            self._condition.notify_all()
+            return self._tickets
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera as gravações pedidas terminarem.
+
+        Returns:
+            True se não restam gravações pendentes
+        """
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(lambda: not self._requests and not self._saving, timeout)
+            finally:
+                self._flushing -= 1
+
+    def stop(self, flush: bool = True, timeout: float = 5.0):
+        """Encerra a thread, gravando antes os pedidos pendentes (se flush)."""
+        if flush and self.is_running:
+            self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _due_time(self, request: tuple) -> float:
+        """Instante em que o pedido deve ser gravado (debounce limitado por max_delay)."""
+        _, _, first_requested, last_requested, _ = request
+        return min(last_requested + self.delay, first_requested + self.max_delay)
+
+    def _run(self):
+        """Laço da thread: espera o pedido mais antigo vencer e grava o modelo dele."""
+        conn = connect(self.manager.db_path)
+        try:
+            while True:
+                with self._condition:
+                    while True:
+                        if not self._requests:
+                            if self._stopping:
+                                return
+                            self._condition.wait()
+                            continue
+                        key = min(self._requests, key=lambda k: self._due_time(self._requests[k]))
+                        remaining = self._due_time(self._requests[key]) - time.monotonic()
+                        if remaining <= 0 or self._stopping or self._flushing:
+                            break
+                        # Novos pedidos, flush() ou stop() acordam a thread antes do prazo
+                        self._condition.wait(remaining)
+                    model, activate, _, _, ticket = self._requests.pop(key)
+                    self._saving = True
+                try:
+                    self._save(conn, model, activate, ticket)
+                finally:
+                    with self._condition:
+                        self._saving = False
+                        self._condition.notify_all()
+        finally:
+            conn.close()
+
+    def _save(self, conn, model: MapModel, activate: bool, ticket: int):
+        """Grava um modelo pela conexão da thread e notifica o resultado."""
+        if model.map_id is None and not model.name:
+            print("DEBUG: Mapa sem nome e sem ID - gravação ignorada")
+            return
+        error = ""
+        if not model.has_changes and not activate and model.map_id is not None:
+            success = True
+        else:
+            try:
+                success = self.manager.save_map_changes(model, activate, conn=conn)
+            except Exception as e:
+                # A thread de gravação não pode morrer: o erro segue para quem ouve
+                print(f"DEBUG: Erro na gravação em segundo plano: {e}")
+                success = False
+                error = str(e)
+            if not success and not error:
+                error = f"Não foi possível gravar o mapa '{model.name}'"
+        if success:
+            self.saves += 1
+        else:
+            self.failures += 1
+        if self.on_saved is not None:
+            try:
+                self.on_saved(model, ticket, success, error)
+            except Exception as e:
+                print(f"DEBUG: Erro ao notificar a gravação do mapa: {e}")
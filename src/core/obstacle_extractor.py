@@ -0,0 +1,187 @@
+"""
+Extração de obstáculos a partir dos scans do LIDAR.
+
+Cada volta é convertida de polar para cartesiano (referencial do robô e do mundo)
+com trigonometria vetorizada e segmentada em agrupamentos pelo critério de
+breakpoint adaptativo (Borges & Aldon): dois pontos consecutivos pertencem a
+objetos diferentes quando a distância entre eles excede
+
+    D_max = r * sin(Δφ) / sin(λ - Δφ) + 3σ
+
+em que r é a distância do ponto anterior, Δφ a separação angular, λ o ângulo
+mínimo aceitável entre o feixe e a superfície e σ o ruído de distância do sensor.
+"""
+
+import math
+import time
+from typing import Optional, Tuple
+import numpy as np
+
+from .config import (OBSTACLE_MIN_RANGE, OBSTACLE_MAX_RANGE, OBSTACLE_BREAKPOINT_LAMBDA,
+                     OBSTACLE_BREAKPOINT_SIGMA, OBSTACLE_MIN_POINTS, OBSTACLE_CONFIDENT_POINTS,
+                     LIDAR_MOUNT_ANGLE_OFFSET, LIDAR_ANGLE_DIRECTION)
+
+# Um obstáculo: centróide no mundo e no robô, distância/direção, extensão e confiança
+OBSTACLE_DTYPE = np.dtype([
+    ('x', np.float64),          # centróide no mundo (m)
+    ('y', np.float64),
+    ('robot_x', np.float64),    # centróide no referencial do robô (m, x para frente)
+    ('robot_y', np.float64),
+    ('range', np.float64),      # distância do ponto mais próximo ao sensor (m)
+    ('bearing', np.float64),    # direção do centróide no referencial do robô (rad)
+    ('radius', np.float64),     # maior distância de um ponto ao centróide (m)
+    ('width', np.float64),      # distância entre o primeiro e o último ponto (m)
+    ('points', np.int32),
+    ('confidence', np.float64),
+])
+
+
+class ObstacleExtractor:
+    """Converte scans em obstáculos (agrupamentos de pontos) de forma vetorizada."""
+
+    def __init__(self, min_range: float = OBSTACLE_MIN_RANGE, max_range: float = OBSTACLE_MAX_RANGE,
+                 breakpoint_lambda: float = OBSTACLE_BREAKPOINT_LAMBDA,
+                 breakpoint_sigma: float = OBSTACLE_BREAKPOINT_SIGMA,
+                 min_points: int = OBSTACLE_MIN_POINTS,
+                 confident_points: int = OBSTACLE_CONFIDENT_POINTS,
+                 mount_angle_offset: float = LIDAR_MOUNT_ANGLE_OFFSET,
+                 angle_direction: int = LIDAR_ANGLE_DIRECTION):
+        """
+        Args:
+            min_range: Distâncias menores (m) são descartadas (corpo do robô, leituras inválidas)
+            max_range: Distâncias maiores (m) são descartadas
+            breakpoint_lambda: Ângulo λ (graus) do critério de breakpoint adaptativo
+            breakpoint_sigma: Ruído σ (m) da distância medida
+            min_points: Pontos mínimos para um agrupamento virar obstáculo
+            confident_points: Pontos a partir dos quais a confiança é máxima
+            mount_angle_offset: Ângulo (graus) do zero do LIDAR em relação à frente do robô
+            angle_direction: 1 se o ângulo do LIDAR cresce no mesmo sentido do ângulo do robô, -1 caso contrário
+        """
+        self.min_range = min_range
+        self.max_range = max_range
+        self.breakpoint_lambda = math.radians(breakpoint_lambda)
+        self.breakpoint_sigma = breakpoint_sigma
+        self.min_points = min_points
+        self.confident_points = confident_points
+        self.mount_angle_offset = math.radians(mount_angle_offset)
+        self.angle_direction = angle_direction
+        self.last_extraction_time = 0.0  # segundos gastos na última extração
+        # Pontos (N, 2), no referencial do robô, dos agrupamentos da última extração
+        self.last_obstacle_points = np.zeros((0, 2))
+
+    def robot_frame_angles(self, angles: np.ndarray) -> np.ndarray:
+        """Converte ângulos do LIDAR para o referencial do robô (rad)."""
+        return self.angle_direction * np.asarray(angles, dtype=np.float64) + self.mount_angle_offset
+
+    def polar_to_robot(self, angles: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+        """Converte pontos polares do LIDAR para (N, 2) no referencial do robô."""
+        theta = self.robot_frame_angles(angles)
+        ranges = np.asarray(ranges, dtype=np.float64)
+        return np.stack([ranges * np.cos(theta), ranges * np.sin(theta)], axis=1)
+
+    def scan_to_world(self, scan: np.ndarray, pose: Tuple[float, float, float]) -> np.ndarray:
+        """Converte os pontos válidos de uma volta para (N, 2) no mundo."""
+        ranges = np.asarray(scan['range'], dtype=np.float64)
+        valid = (ranges >= self.min_range) & (ranges <= self.max_range) & (np.asarray(scan['quality']) > 0)
+        return self.robot_to_world(self.polar_to_robot(scan['angle'][valid], ranges[valid]), pose)
+
+    @staticmethod
+    def robot_to_world(points: np.ndarray, pose: Tuple[float, float, float]) -> np.ndarray:
+        """
+        Converte pontos (N, 2) do referencial do robô para o mundo.
+
+        Args:
+            pose: (x, y, ângulo em graus), com a mesma convenção de RobotNavigator
+        """
+        x, y, heading = pose
+        cos_h = math.cos(math.radians(heading))
+        sin_h = math.sin(math.radians(heading))
+        rotation = np.array([[cos_h, sin_h], [-sin_h, cos_h]])
+        return points @ rotation + (x, y)
+
+    def circular_breaks(self, angles: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+        """
+        Aplica o critério de breakpoint adaptativo a pontos ordenados por ângulo em [0, 2π).
+
+        Returns:
+            Máscara (N,): breaks[i] indica quebra entre o ponto i e o ponto (i + 1) % N
+        """
+        points = np.stack([ranges * np.cos(angles), ranges * np.sin(angles)], axis=1)
+        following = np.roll(np.arange(len(ranges)), -1)
+        gaps = np.hypot(*(points[following] - points).T)
+        delta_phi = np.diff(angles, append=angles[0] + 2 * np.pi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            threshold = ranges * np.sin(delta_phi) / np.sin(self.breakpoint_lambda - delta_phi)
+        # Separações angulares maiores ou iguais a λ sempre quebram o agrupamento
+        threshold = np.where(delta_phi < self.breakpoint_lambda, threshold, -np.inf) + 3.0 * self.breakpoint_sigma
+        return gaps > threshold
+
+    def extract(self, scan: np.ndarray, pose: Optional[Tuple[float, float, float]] = None) -> np.ndarray:
+        """
+        Extrai os obstáculos de uma volta.
+
+        Args:
+            scan: Array estruturado com os campos 'angle' (rad), 'range' (m) e 'quality'
+            pose: Pose do robô (x, y, ângulo em graus); sem pose, x/y ficam no referencial do robô
+
+        Returns:
+            Array estruturado OBSTACLE_DTYPE
+        """
+        started = time.perf_counter()
+        ranges = np.asarray(scan['range'], dtype=np.float64)
+        valid = (ranges >= self.min_range) & (ranges <= self.max_range) & (np.asarray(scan['quality']) > 0)
+        theta = self.robot_frame_angles(scan['angle'])[valid]
+        ranges = ranges[valid]
+        self.last_obstacle_points = np.zeros((0, 2))
+        if len(ranges) < self.min_points:
+            self.last_extraction_time = time.perf_counter() - started
+            return np.zeros(0, dtype=OBSTACLE_DTYPE)
+
+        # Ordena por ângulo no intervalo [0, 2π)
+        theta = np.mod(theta, 2 * np.pi)
+        order = np.argsort(theta, kind='stable')
+        theta = theta[order]
+        ranges = ranges[order]
+        breaks = self.circular_breaks(theta, ranges)
+        if breaks.any():
+            # Gira a sequência para começar logo após uma quebra: todo agrupamento,
+            # inclusive o que cruza o ângulo zero, fica contíguo
+            shift = int(np.argmax(breaks)) + 1
+            theta = np.roll(theta, -shift)
+            ranges = np.roll(ranges, -shift)
+            breaks = np.roll(breaks, -shift)
+        labels = np.concatenate(([0], np.cumsum(breaks[:-1])))
+
+        robot_points = np.stack([ranges * np.cos(theta), ranges * np.sin(theta)], axis=1)
+
+        starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+        counts = np.diff(np.concatenate((starts, [len(labels)])))
+        keep = counts >= self.min_points
+        if not keep.any():
+            self.last_extraction_time = time.perf_counter() - started
+            return np.zeros(0, dtype=OBSTACLE_DTYPE)
+
+        sums = np.add.reduceat(robot_points, starts, axis=0)
+        centroids = sums / counts[:, None]
+        offsets = robot_points - np.repeat(centroids, counts, axis=0)
+        radius = np.sqrt(np.maximum.reduceat(np.einsum('ij,ij->i', offsets, offsets), starts))
+        nearest = np.minimum.reduceat(ranges, starts)
+        ends = starts + counts - 1
+        width = np.hypot(*(robot_points[ends] - robot_points[starts]).T)
+
+        obstacles = np.zeros(int(keep.sum()), dtype=OBSTACLE_DTYPE)
+        centroids = centroids[keep]
+        obstacles['robot_x'] = centroids[:, 0]
+        obstacles['robot_y'] = centroids[:, 1]
+        world = self.robot_to_world(centroids, pose) if pose is not None else centroids
+        obstacles['x'] = world[:, 0]
+        obstacles['y'] = world[:, 1]
+        obstacles['range'] = nearest[keep]
+        obstacles['bearing'] = np.arctan2(centroids[:, 1], centroids[:, 0])
+        obstacles['radius'] = radius[keep]
+        obstacles['width'] = width[keep]
+        obstacles['points'] = counts[keep]
+        obstacles['confidence'] = np.minimum(1.0, counts[keep] / self.confident_points)
+        self.last_obstacle_points = robot_points[np.repeat(keep, counts)]
+        self.last_extraction_time = time.perf_counter() - started
+        return obstacles
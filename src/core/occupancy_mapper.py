@@ -0,0 +1,149 @@
+"""
+Mapeamento do ambiente por grade de ocupação em log-odds.
+
+Cada volta do LIDAR, tomada em uma pose conhecida, atualiza a grade global:
+as células atravessadas pelos feixes recebem a evidência de livre e as células
+dos retornos a evidência de ocupado (modelo inverso do sensor). Em log-odds a
+atualização é uma soma, feita de uma vez para todas as células da volta; cada
+célula é atualizada no máximo uma vez por volta, mesmo que vários feixes passem
+por ela. Os valores são limitados para que o mapa continue se adaptando.
+
+A grade usa as mesmas dimensões e resolução do PathFinder, e o resultado é
+exportado como a camada estática consumida pelo planejador.
+"""
+
+import time
+import zlib
+from typing import Optional, Tuple
+import numpy as np
+
+from .geometry import beam_free_samples
+from .obstacle_extractor import ObstacleExtractor
+from .config import (MAP_WIDTH, MAP_HEIGHT, MAP_GRID_SIZE, OCCUPANCY_LOG_ODDS_HIT, OCCUPANCY_LOG_ODDS_MISS,
+                     OCCUPANCY_LOG_ODDS_MIN, OCCUPANCY_LOG_ODDS_MAX, OCCUPANCY_OCCUPIED_PROBABILITY,
+                     OCCUPANCY_FREE_PROBABILITY)
+
+
+class OccupancyMapper:
+    """Grade de ocupação global em log-odds, atualizada por voltas do LIDAR."""
+
+    def __init__(self, width: int = int(MAP_WIDTH / MAP_GRID_SIZE), height: int = int(MAP_HEIGHT / MAP_GRID_SIZE),
+                 resolution: float = MAP_GRID_SIZE, hit_log_odds: float = OCCUPANCY_LOG_ODDS_HIT,
+                 miss_log_odds: float = OCCUPANCY_LOG_ODDS_MISS, min_log_odds: float = OCCUPANCY_LOG_ODDS_MIN,
+                 max_log_odds: float = OCCUPANCY_LOG_ODDS_MAX,
+                 extractor: Optional[ObstacleExtractor] = None):
+        """
+        Args:
+            width: Largura da grade em células
+            height: Altura da grade em células
+            resolution: Lado da célula (m)
+            hit_log_odds: Evidência somada às células de retorno
+            miss_log_odds: Evidência somada às células atravessadas (negativa)
+            min_log_odds: Limite inferior da grade
+            max_log_odds: Limite superior da grade
+            extractor: Conversor de scans para o mundo (montagem do LIDAR e faixa válida)
+        """
+        self.width = width
+        self.height = height
+        self.resolution = resolution
+        self.hit_log_odds = np.float32(hit_log_odds)
+        self.miss_log_odds = np.float32(miss_log_odds)
+        self.min_log_odds = min_log_odds
+        self.max_log_odds = max_log_odds
+        self.extractor = extractor if extractor is not None else ObstacleExtractor()
+
+        self.log_odds = np.zeros((height, width), dtype=np.float32)  # [y, x]; 0 = desconhecido
+        self.scans_integrated = 0
+        self.last_update_duration = 0.0
+
+    def reset(self):
+        """Descarta todo o mapeamento."""
+        self.log_odds.fill(0.0)
+        self.scans_integrated = 0
+
+    def load(self, log_odds: np.ndarray):
+        """Substitui a grade (ex.: carregada do banco de dados)."""
+        log_odds = np.asarray(log_odds, dtype=np.float32)
+        if log_odds.shape != self.log_odds.shape:
+            raise ValueError(f"grade {log_odds.shape} incompatível com {self.log_odds.shape}")
+        self.log_odds = log_odds.copy()
+
+    # ------------------------------------------------------------------
+    # Integração
+    # ------------------------------------------------------------------
+
+    def integrate_scan(self, scan: np.ndarray, pose: Tuple[float, float, float]):
+        """
+        Integra uma volta do LIDAR.
+
+        Args:
+            scan: Array estruturado com 'angle' (rad), 'range' (m) e 'quality'
+            pose: Pose do robô (x, y, ângulo em graus) no instante da volta
+        """
+        self.integrate_points(pose[:2], self.extractor.scan_to_world(scan, pose))
+
+    def integrate_points(self, sensor_position: Tuple[float, float], hit_points: np.ndarray):
+        """
+        Integra retornos já convertidos para o mundo.
+
+        Args:
+            sensor_position: Posição (x, y) do sensor
+            hit_points: Array (N, 2) dos retornos válidos
+        """
+        started = time.perf_counter()
+        hit_points = np.asarray(hit_points, dtype=float).reshape(-1, 2)
+        if len(hit_points):
+            free_samples = beam_free_samples(sensor_position, hit_points, self.resolution * 0.5)
+            free = np.zeros(self.log_odds.size, dtype=bool)
+            free[self._flat_indices(free_samples)] = True
+            hit = np.zeros(self.log_odds.size, dtype=bool)
+            hit[self._flat_indices(hit_points)] = True
+            free &= ~hit
+
+            flat = self.log_odds.reshape(-1)
+            flat[free] += self.miss_log_odds
+            flat[hit] += self.hit_log_odds
+            np.clip(self.log_odds, self.min_log_odds, self.max_log_odds, out=self.log_odds)
+        self.scans_integrated += 1
+        self.last_update_duration = time.perf_counter() - started
+
+    def _flat_indices(self, points: np.ndarray) -> np.ndarray:
+        """Índices planos das células que contêm os pontos; pontos fora da grade são ignorados."""
+        cells_x = np.floor(points[:, 0] / self.resolution).astype(np.int64)
+        cells_y = np.floor(points[:, 1] / self.resolution).astype(np.int64)
+        inside = (cells_x >= 0) & (cells_x < self.width) & (cells_y >= 0) & (cells_y < self.height)
+        return cells_y[inside] * self.width + cells_x[inside]
+
+    # ------------------------------------------------------------------
+    # Exportação
+    # ------------------------------------------------------------------
+
+    def probabilities(self) -> np.ndarray:
+        """Probabilidade de ocupação de cada célula (0.5 = desconhecida)."""
+        return 1.0 / (1.0 + np.exp(-self.log_odds))
+
+    def occupied_mask(self, probability: float = OCCUPANCY_OCCUPIED_PROBABILITY) -> np.ndarray:
+        """Máscara [y, x] das células ocupadas - a camada estática do PathFinder."""
+        return self.log_odds > np.float32(np.log(probability / (1.0 - probability)))
+
+    def free_mask(self, probability: float = OCCUPANCY_FREE_PROBABILITY) -> np.ndarray:
+        """Máscara [y, x] das células observadas como livres."""
+        return self.log_odds < np.float32(np.log(probability / (1.0 - probability)))
+
+    def to_blob(self) -> bytes:
+        """Serializa a grade (float32 compactado) para armazenamento."""
+        return self.grid_to_blob(self.log_odds)
+
+    @staticmethod
+    def grid_to_blob(grid: np.ndarray) -> bytes:
+        """Serializa uma grade em log-odds no formato de to_blob."""
+        return zlib.compress(np.ascontiguousarray(grid, dtype=np.float32).tobytes())
+
+    @staticmethod
+    def grid_from_blob(blob: bytes, width: int, height: int) -> np.ndarray:
+        """Reconstrói a grade serializada por to_blob."""
+        try:
+            raw = zlib.decompress(blob)
+        except zlib.error as e:
+            raise ValueError(f"grade de ocupação corrompida: {e}")
+        return np.frombuffer(raw, dtype=np.float32).reshape(height, width).copy()
@@ -0,0 +1,388 @@
+"""
+Localização de Monte Carlo (estilo AMCL) sobre o mapa de ocupação.
+
+As partículas ficam em arrays NumPy (poses (N, 3) e pesos (N,)) e todas as etapas
+são vetorizadas:
+- movimento: modelo de odometria (rotação, translação, rotação) com ruído
+  proporcional ao deslocamento, amostrado para todas as partículas de uma vez;
+- sensor: modelo de campo de verossimilhança avaliado em partículas × feixes; o
+  produto das verossimilhanças dos feixes é atenuado por um expoente, pois os
+  feixes não são independentes e os pesos colapsariam em uma única hipótese;
+- reamostragem de baixa variância (sistemática), apenas quando o número efetivo
+  de partículas cai;
+- número de partículas adaptativo (KLD): após a reamostragem mantém apenas as
+  partículas necessárias para o número de células de histograma ocupadas, o que
+  reduz o custo quando a localização converge;
+- recuperação (MCL aumentado): médias lenta e rápida da verossimilhança; quando
+  a rápida cai abaixo da lenta (robô sequestrado, ex.: movido pelo joystick),
+  partículas aleatórias são injetadas no espaço livre.
+"""
+
+import math
+import time
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from .obstacle_extractor import ObstacleExtractor
+from .scan_matcher import build_likelihood_field
+from .config import (MAP_GRID_SIZE, PF_MIN_PARTICLES, PF_MAX_PARTICLES, PF_KLD_EPSILON, PF_KLD_Z,
+                     PF_KLD_BIN_SIZE, PF_KLD_BIN_ANGLE, PF_ODOMETRY_ALPHAS, PF_SENSOR_SIGMA, PF_Z_HIT,
+                     PF_Z_RAND, PF_MAX_BEAMS, PF_LIKELIHOOD_SCALE, PF_RECOVERY_ALPHA_SLOW, PF_RECOVERY_ALPHA_FAST,
+                     PF_UPDATE_MIN_DISTANCE, PF_UPDATE_MIN_ANGLE, PF_RESAMPLE_THRESHOLD, PF_CONVERGED_LINEAR_STD,
+                     PF_CONVERGED_ANGULAR_STD)
+
+
+class ParticleFilter:
+    """Filtro de partículas com modelo de odometria, campo de verossimilhança e KLD."""
+
+    def __init__(self, min_particles: int = PF_MIN_PARTICLES, max_particles: int = PF_MAX_PARTICLES,
+                 kld_epsilon: float = PF_KLD_EPSILON, kld_z: float = PF_KLD_Z,
+                 bin_size: float = PF_KLD_BIN_SIZE, bin_angle: float = PF_KLD_BIN_ANGLE,
+                 odometry_alphas: Tuple[float, float, float, float] = PF_ODOMETRY_ALPHAS,
+                 sigma: float = PF_SENSOR_SIGMA, z_hit: float = PF_Z_HIT, z_rand: float = PF_Z_RAND,
+                 max_beams: int = PF_MAX_BEAMS, likelihood_scale: float = PF_LIKELIHOOD_SCALE,
+                 alpha_slow: float = PF_RECOVERY_ALPHA_SLOW,
+                 alpha_fast: float = PF_RECOVERY_ALPHA_FAST,
+                 update_min_distance: float = PF_UPDATE_MIN_DISTANCE,
+                 update_min_angle: float = PF_UPDATE_MIN_ANGLE,
+                 resample_threshold: float = PF_RESAMPLE_THRESHOLD,
+                 extractor: Optional[ObstacleExtractor] = None, seed: Optional[int] = None):
+        """
+        Args:
+            min_particles: Limite inferior do número de partículas
+            max_particles: Limite superior (e número usado na inicialização global)
+            kld_epsilon: Erro máximo (KL) entre a distribuição amostrada e a verdadeira
+            kld_z: Quantil normal superior para 1 - δ
+            bin_size: Lado (m) das células do histograma do KLD
+            bin_angle: Largura (graus) das células angulares do histograma do KLD
+            odometry_alphas: Ruído do modelo de odometria (rot/rot, rot/trans, trans/trans, trans/rot)
+            sigma: Desvio (m) do campo de verossimilhança
+            z_hit: Peso do termo de acerto do modelo de sensor
+            z_rand: Peso do termo de leitura aleatória
+            max_beams: Feixes usados por volta
+            likelihood_scale: Expoente aplicado ao produto das verossimilhanças dos feixes
+            alpha_slow: Taxa da média lenta da verossimilhança (recuperação)
+            alpha_fast: Taxa da média rápida da verossimilhança (recuperação)
+            update_min_distance: Deslocamento (m) mínimo entre atualizações do sensor
+            update_min_angle: Rotação (graus) mínima entre atualizações do sensor
+            resample_threshold: Fração do número de partículas abaixo da qual o número efetivo dispara a reamostragem
+            extractor: Conversor polar -> robô (montagem do LIDAR e faixa válida)
+            seed: Semente do gerador aleatório (reprodutibilidade)
+        """
+        self.min_particles = min_particles
+        self.max_particles = max_particles
+        self.kld_epsilon = kld_epsilon
+        self.kld_z = kld_z
+        self.bin_size = bin_size
+        self.bin_angle = math.radians(bin_angle)
+        self.odometry_alphas = odometry_alphas
+        self.sigma = sigma
+        self.z_hit = z_hit
+        self.z_rand = z_rand
+        self.max_beams = max_beams
+        self.alpha_slow = alpha_slow
+        self.alpha_fast = alpha_fast
+        self.update_min_distance = update_min_distance
+        self.update_min_angle = math.radians(update_min_angle)
+        self.resample_threshold = resample_threshold
+        self.likelihood_scale = likelihood_scale
+        self.extractor = extractor if extractor is not None else ObstacleExtractor()
+        self.rng = np.random.default_rng(seed)
+
+        # Mapa
+        self.resolution = MAP_GRID_SIZE
+        self._padded_field: Optional[np.ndarray] = None
+        self._free_cells: Optional[np.ndarray] = None  # (F, 2) índices (x, y) das células livres
+
+        # Partículas: x, y (m), θ (rad)
+        self.poses = np.zeros((0, 3))
+        self.weights = np.zeros(0)
+
+        # Movimento acumulado desde a última atualização do sensor
+        self._pending_distance = 0.0
+        self._pending_rotation = 0.0
+        self._force_update = True
+
+        self.w_slow = 0.0
+        self.w_fast = 0.0
+        self.updates = 0
+        self.injected_particles = 0
+        self.last_update_duration = 0.0
+
+    # ------------------------------------------------------------------
+    # Mapa e inicialização
+    # ------------------------------------------------------------------
+
+    @property
+    def has_map(self) -> bool:
+        """Indica se há um mapa para avaliar as partículas."""
+        return self._padded_field is not None
+
+    @property
+    def particle_count(self) -> int:
+        return len(self.poses)
+
+    def set_map(self, occupied: Optional[np.ndarray], free: Optional[np.ndarray] = None,
+                resolution: float = MAP_GRID_SIZE):
+        """
+        Define o mapa usado pelo modelo de sensor e pela inicialização global.
+
+        Args:
+            occupied: Máscara booleana [y, x] das células ocupadas, ou None para desativar
+            free: Máscara [y, x] das células livres onde partículas podem nascer (padrão: não ocupadas)
+            resolution: Lado da célula (m)
+        """
+        if occupied is None or not np.any(occupied):
+            self._padded_field = None
+            self._free_cells = None
+            return
+        occupied = np.asarray(occupied, dtype=bool)
+        self.resolution = resolution
+        self._padded_field = np.pad(build_likelihood_field(occupied, resolution, self.sigma), 1)
+        free = ~occupied if free is None else np.asarray(free, dtype=bool) & ~occupied
+        cells_y, cells_x = np.nonzero(free)
+        self._free_cells = np.stack([cells_x, cells_y], axis=1)
+
+    def initialize_pose(self, pose: Tuple[float, float, float], linear_std: float = 0.2,
+                        angular_std: float = 10.0, count: Optional[int] = None):
+        """Distribui as partículas em torno de uma pose conhecida (x, y, graus)."""
+        count = count or self.max_particles
+        self.poses = np.empty((count, 3))
+        self.poses[:, 0] = self.rng.normal(pose[0], linear_std, count)
+        self.poses[:, 1] = self.rng.normal(pose[1], linear_std, count)
+        self.poses[:, 2] = self.rng.normal(math.radians(pose[2]), math.radians(angular_std), count)
+        self._reset_weights()
+
+    def initialize_global(self, count: Optional[int] = None):
+        """Localização global: partículas uniformes no espaço livre, com orientação aleatória."""
+        if self._free_cells is None or not len(self._free_cells):
+            print("AVISO: Localização global requer um mapa")
+            return
+        self.poses = self._random_free_poses(count or self.max_particles)
+        self._reset_weights()
+        print(f"DEBUG: Localização global iniciada com {len(self.poses)} partículas")
+
+    def _random_free_poses(self, count: int) -> np.ndarray:
+        cells = self._free_cells[self.rng.integers(0, len(self._free_cells), count)]
+        poses = np.empty((count, 3))
+        poses[:, :2] = (cells + self.rng.random((count, 2))) * self.resolution
+        poses[:, 2] = self.rng.uniform(-math.pi, math.pi, count)
+        return poses
+
+    def _reset_weights(self):
+        self.weights = np.full(len(self.poses), 1.0 / max(1, len(self.poses)))
+        self.w_slow = 0.0
+        self.w_fast = 0.0
+        self._pending_distance = 0.0
+        self._pending_rotation = 0.0
+        self._force_update = True
+
+    # ------------------------------------------------------------------
+    # Movimento
+    # ------------------------------------------------------------------
+
+    def predict(self, previous_odometry: Tuple[float, float, float], current_odometry: Tuple[float, float, float]):
+        """
+        Propaga as partículas pelo deslocamento de odometria (modelo rotação-translação-rotação).
+
+        Args:
+            previous_odometry: Pose de odometria (x, y, graus) na atualização anterior
+            current_odometry: Pose de odometria (x, y, graus) atual
+        """
+        if not len(self.poses):
+            return
+        dx = current_odometry[0] - previous_odometry[0]
+        dy = current_odometry[1] - previous_odometry[1]
+        previous_heading = math.radians(previous_odometry[2])
+        delta_heading = _wrap(math.radians(current_odometry[2]) - previous_heading)
+        translation = math.hypot(dx, dy)
+        if translation < 1e-4 and abs(delta_heading) < 1e-5:
+            return
+        # Em rotações puras a primeira rotação é indefinida; toda a rotação vai para rot1
+        rot1 = _wrap(math.atan2(dy, dx) - previous_heading) if translation >= 1e-4 else 0.0
+        # Movimento para trás: o ruído de rotação é calculado sobre o menor ângulo
+        rot1_noise_base = min(abs(rot1), abs(_wrap(rot1 - math.pi)))
+        rot2 = _wrap(delta_heading - rot1)
+        rot2_noise_base = min(abs(rot2), abs(_wrap(rot2 - math.pi)))
+
+        a1, a2, a3, a4 = self.odometry_alphas
+        count = len(self.poses)
+        noisy_rot1 = rot1 - self.rng.normal(0.0, math.sqrt(a1 * rot1_noise_base ** 2 + a2 * translation ** 2), count)
+        noisy_trans = translation - self.rng.normal(
+            0.0, math.sqrt(a3 * translation ** 2 + a4 * (rot1_noise_base ** 2 + rot2_noise_base ** 2)), count)
+        noisy_rot2 = rot2 - self.rng.normal(0.0, math.sqrt(a1 * rot2_noise_base ** 2 + a2 * translation ** 2), count)
+
+        heading = self.poses[:, 2] + noisy_rot1
+        self.poses[:, 0] += noisy_trans * np.cos(heading)
+        self.poses[:, 1] += noisy_trans * np.sin(heading)
+        self.poses[:, 2] = _wrap(heading + noisy_rot2)
+
+        self._pending_distance += translation
+        self._pending_rotation += abs(delta_heading)
+
+    # ------------------------------------------------------------------
+    # Sensor e reamostragem
+    # ------------------------------------------------------------------
+
+    def update(self, scan: np.ndarray, force: bool = False) -> bool:
+        """
+        Pondera as partículas pela volta do LIDAR e reamostra.
+
+        A atualização só ocorre após um deslocamento mínimo desde a anterior (ou se forçada),
+        para não colapsar a distribuição com o robô parado.
+
+        Returns:
+            True se a atualização foi feita
+        """
+        if not self.has_map or not len(self.poses):
+            return False
+        if not (force or self._force_update or self._pending_distance >= self.update_min_distance or
+                self._pending_rotation >= self.update_min_angle):
+            return False
+        started = time.perf_counter()
+
+        beams = self._beam_points(scan)
+        if not len(beams):
+            return False
+
+        # (N, B): extremidades dos feixes no mundo para cada partícula
+        cos_h = np.cos(self.poses[:, 2])[:, None]
+        sin_h = np.sin(self.poses[:, 2])[:, None]
+        world_x = self.poses[:, 0:1] + beams[None, :, 0] * cos_h - beams[None, :, 1] * sin_h
+        world_y = self.poses[:, 1:2] + beams[None, :, 0] * sin_h + beams[None, :, 1] * cos_h
+        padded_height, padded_width = self._padded_field.shape
+        columns = np.clip(np.floor(world_x / self.resolution).astype(np.int64) + 1, 0, padded_width - 1)
+        rows = np.clip(np.floor(world_y / self.resolution).astype(np.int64) + 1, 0, padded_height - 1)
+        log_probabilities = np.log(self.z_hit * self._padded_field[rows, columns] + self.z_rand)
+        # Feixes não são independentes: a soma dos logs é atenuada para não colapsar a distribuição
+        log_likelihood = self.likelihood_scale * np.sum(log_probabilities, axis=1)
+        # Verossimilhança média por feixe (média geométrica), comparável entre voltas
+        average = float(np.sum(self.weights * np.exp(np.mean(log_probabilities, axis=1))))
+        self.weights = self.weights * np.exp(log_likelihood - log_likelihood.max())
+        self.weights /= self.weights.sum()
+        self.w_slow = average if self.w_slow == 0.0 else self.w_slow + self.alpha_slow * (average - self.w_slow)
+        self.w_fast = average if self.w_fast == 0.0 else self.w_fast + self.alpha_fast * (average - self.w_fast)
+
+        # Reamostragem seletiva: só quando o número efetivo de partículas cai (preservando
+        # hipóteses concorrentes por mais atualizações) ou quando há partículas a injetar
+        effective = 1.0 / float(np.sum(self.weights * self.weights))
+        if effective < self.resample_threshold * len(self.weights) or self._injection_probability() > 0.0:
+            self._resample()
+        self._pending_distance = 0.0
+        self._pending_rotation = 0.0
+        self._force_update = False
+        self.updates += 1
+        self.last_update_duration = time.perf_counter() - started
+        return True
+
+    def _beam_points(self, scan: np.ndarray) -> np.ndarray:
+        """Feixes válidos no referencial do robô, subamostrados para max_beams."""
+        ranges = np.asarray(scan['range'], dtype=np.float64)
+        valid = ((ranges >= self.extractor.min_range) & (ranges <= self.extractor.max_range) &
+                 (np.asarray(scan['quality']) > 0))
+        points = self.extractor.polar_to_robot(scan['angle'][valid], ranges[valid])
+        if len(points) > self.max_beams:
+            points = points[np.linspace(0, len(points) - 1, self.max_beams).astype(int)]
+        return points
+
+    def _resample(self):
+        """Reamostragem de baixa variância com número de partículas adaptativo (KLD)."""
+        count = len(self.poses)
+        # Candidatas: max_particles sorteadas sistematicamente (uma única semente aleatória)
+        positions = (self.rng.random() + np.arange(self.max_particles)) / self.max_particles
+        cumulative = np.cumsum(self.weights)
+        cumulative[-1] = 1.0
+        parents = np.searchsorted(cumulative, positions)
+        # A ordem sistemática segue os pais; embaralha para o KLD contar células de forma não enviesada
+        self.rng.shuffle(parents)
+        candidates = self.poses[parents]
+        # Recuperação (MCL aumentado): parte das candidatas é sorteada no espaço livre quando a
+        # verossimilhança recente caiu; elas entram no histograma e aumentam o número mantido
+        injection = self._injection_probability()
+        if injection > 0.0:
+            random_mask = self.rng.random(len(candidates)) < injection
+            candidates[random_mask] = self._random_free_poses(int(random_mask.sum()))
+        else:
+            random_mask = np.zeros(len(candidates), dtype=bool)
+
+        # KLD: k(i) = células distintas entre as i primeiras candidatas; para no primeiro
+        # i >= max(n(k(i)), min_particles)
+        bins = np.stack([np.floor(candidates[:, 0] / self.bin_size),
+                         np.floor(candidates[:, 1] / self.bin_size),
+                         np.floor(candidates[:, 2] / self.bin_angle)], axis=1).astype(np.int64)
+        _, first_seen = np.unique(bins, axis=0, return_index=True)
+        new_bin = np.zeros(len(candidates), dtype=np.int64)
+        new_bin[first_seen] = 1
+        occupied_bins = np.cumsum(new_bin)
+        required = np.maximum(self._kld_required(occupied_bins), self.min_particles)
+        enough = np.flatnonzero(np.arange(1, len(candidates) + 1) >= required)
+        keep = int(enough[0]) + 1 if len(enough) else len(candidates)
+        keep = int(np.clip(keep, self.min_particles, self.max_particles))
+        self.poses = candidates[:keep].copy()
+        self.injected_particles += int(random_mask[:keep].sum())
+        self.weights = np.full(keep, 1.0 / keep)
+        if keep != count:
+            print(f"DEBUG: Partículas ajustadas (KLD): {count} -> {keep}")
+
+    def _injection_probability(self) -> float:
+        """Probabilidade de sortear partículas aleatórias: max(0, 1 - w_fast / w_slow)."""
+        if self.w_slow <= 0.0 or self._free_cells is None:
+            return 0.0
+        return max(0.0, 1.0 - self.w_fast / self.w_slow)
+
+    def _kld_required(self, occupied_bins: np.ndarray) -> np.ndarray:
+        """Número de partículas exigido pelo KLD para k células ocupadas (vetorizado)."""
+        k = np.maximum(occupied_bins - 1, 1).astype(np.float64)
+        a = 2.0 / (9.0 * k)
+        required = k / (2.0 * self.kld_epsilon) * (1.0 - a + np.sqrt(a) * self.kld_z) ** 3
+        return np.where(occupied_bins > 1, np.ceil(required), 1.0)
+
+    # ------------------------------------------------------------------
+    # Estimativa
+    # ------------------------------------------------------------------
+
+    def estimate(self) -> Tuple[Tuple[float, float, float], Tuple[float, float]]:
+        """
+        Pose média ponderada das partículas.
+
+        Returns:
+            Tupla ((x, y, graus), (desvio linear em m, desvio angular em graus))
+        """
+        if not len(self.poses):
+            return (0.0, 0.0, 0.0), (math.inf, math.inf)
+        weights = self.weights
+        x = float(np.dot(weights, self.poses[:, 0]))
+        y = float(np.dot(weights, self.poses[:, 1]))
+        sin_mean = float(np.dot(weights, np.sin(self.poses[:, 2])))
+        cos_mean = float(np.dot(weights, np.cos(self.poses[:, 2])))
+        heading = math.atan2(sin_mean, cos_mean)
+        linear_std = math.sqrt(float(np.dot(weights, (self.poses[:, 0] - x) ** 2 + (self.poses[:, 1] - y) ** 2)))
+        # Desvio circular: sqrt(-2 ln R)
+        resultant = min(1.0, math.hypot(sin_mean, cos_mean))
+        angular_std = math.degrees(math.sqrt(-2.0 * math.log(resultant))) if resultant > 0 else 180.0
+        return (x, y, math.degrees(heading) % 360.0), (linear_std, angular_std)
+
+    @property
+    def converged(self) -> bool:
+        """Indica se as partículas se concentraram em uma única pose."""
+        _, (linear_std, angular_std) = self.estimate()
+        return linear_std < PF_CONVERGED_LINEAR_STD and angular_std < PF_CONVERGED_ANGULAR_STD
+
+    def stats(self) -> Dict:
+        """Estatísticas do filtro (tempo da última atualização em milissegundos)."""
+        pose, (linear_std, angular_std) = self.estimate()
+        return {
+            'particles': len(self.poses),
+            'updates': self.updates,
+            'converged': linear_std < PF_CONVERGED_LINEAR_STD and angular_std < PF_CONVERGED_ANGULAR_STD,
+            'pose': pose,
+            'linear_std': linear_std,
+            'angular_std': angular_std,
+            'injected_particles': self.injected_particles,
+            'last_update_ms': self.last_update_duration * 1000.0,
+        }
+
+
+def _wrap(angle):
+    """Normaliza ângulo(s) em radianos para [-π, π)."""
+    return (angle + np.pi) % (2.0 * np.pi) - np.pi
@@ -2,6 +2,8 @@ from typing import List, Tuple, Dict, Set, Optional
 import math
 import heapq
 from collections import deque
+import numpy as np
+from scipy import ndimage
 from .config import FORBIDDEN_AREA_INFLATION_RADIUS, ROBOT_WIDTH
 from shapely.geometry import Polygon, Point
 
@@ -20,36 +22,62 @@ class PathFinder:
         self.grid_size = grid_size
         self.forbidden_areas = []
         self.obstacle_grid = set()  # Cache para células com obstáculos
+        self.occupancy_grid = np.zeros((height, width), dtype=bool)  # Mesmo cache em NumPy, indexado [y, x]
+        # Camadas dinâmicas (ex.: LocalCostmap) consultadas junto com a grade estática, sem cópia
+        self.dynamic_layers = []
+        # Obstáculos mapeados pelo LIDAR (máscara [y, x]), somados às áreas proibidas
+        self.static_map: Optional[np.ndarray] = None
+        # Áreas proibidas infladas rasterizadas (máscara [y, x]); só muda com as áreas
+        self.area_mask = np.zeros((height, width), dtype=bool)
+        # Áreas proibidas sem inflação (máscara [y, x]), base de structure_grid
+        self.raw_area_mask = np.zeros((height, width), dtype=bool)
+        # Estrutura conhecida sem inflação: áreas, obstáculos mapeados e borda externa, com
+        # tolerância de uma célula (máscara [y, x]); separa retornos do LIDAR em estruturas
+        # já conhecidas dos obstáculos novos
+        self.structure_grid = np.zeros((height, width), dtype=bool)
         print(f"DEBUG: PathFinder inicializado - Dimensões: {width}x{height}, Grid: {grid_size}m")
         
-    def set_forbidden_areas(self, areas: List[List[Tuple[float, float]]]):
-        """Define as áreas proibidas e atualiza o cache de obstáculos"""
+    def set_forbidden_areas(self, areas: List[List[Tuple[float, float]]],
+                            area_mask: Optional[np.ndarray] = None):
+        """
+        Define as áreas proibidas e atualiza o cache de obstáculos.
+
+        Args:
+            areas: Polígonos das áreas proibidas
+            area_mask: Rasterização já calculada das áreas infladas (ex.: de um pacote de mapa);
+                       se None ou de outras dimensões, é calculada aqui
+        """
         self.forbidden_areas = areas
+        if area_mask is not None and area_mask.shape == (self.height, self.width):
+            self.area_mask = np.asarray(area_mask, dtype=bool)
+        else:
+            self.area_mask = self.inflated_areas_mask(areas)
+        self.raw_area_mask = self.areas_to_mask(areas)
         self._update_obstacle_grid()
         print(f"DEBUG: Áreas proibidas definidas: {len(areas)} áreas")
+
+    def set_static_map(self, occupied: Optional[np.ndarray]):
+        """
+        Define a camada estática de obstáculos mapeados (ex.: OccupancyMapper.occupied_mask()).
+
+        Args:
+            occupied: Máscara booleana [y, x] com as dimensões da grade, ou None para remover
+        """
+        if occupied is not None:
+            occupied = np.asarray(occupied, dtype=bool)
+            if occupied.shape != (self.height, self.width):
+                raise ValueError(f"mapa {occupied.shape} incompatível com a grade {(self.height, self.width)}")
+        self.static_map = occupied
+        self._update_obstacle_grid()
+        print(f"DEBUG: Mapa estático definido: {0 if occupied is None else int(occupied.sum())} células ocupadas")
         
     def _update_obstacle_grid(self):
         """Atualiza o cache de células com obstáculos usando inflação geométrica e adicionando as bordas do mapa."""
         self.obstacle_grid.clear()
         
-        # 1. Adicionar as áreas proibidas infladas
-        for area in self.forbidden_areas:
-            if len(area) < 3:
-                continue # Um polígono precisa de pelo menos 3 pontos
-
-            # Cria um polígono Shapely a partir da área
-            original_polygon = Polygon(area)
-            
-            # Infla o polígono usando um buffer. Isso cria a margem de segurança
-            inflated_polygon = original_polygon.buffer(FORBIDDEN_AREA_INFLATION_RADIUS)
-
-            # Simplificação: assume que o resultado é um único polígono
-            # Esta parte pode precisar de revisão se as áreas proibidas forem complexas
-            if inflated_polygon.geom_type in ['Polygon', 'MultiPolygon']:
-                # Extrai as coordenadas exteriores
-                inflated_area_coords = list(inflated_polygon.exterior.coords)
-                area_cells = self._area_to_grid_cells(inflated_area_coords)
-                self.obstacle_grid.update(area_cells)
+        # 1. Adicionar as áreas proibidas infladas (rasterizadas em set_forbidden_areas)
+        cells_y, cells_x = np.nonzero(self.area_mask)
+        self.obstacle_grid.update(zip(cells_x.tolist(), cells_y.tolist()))
 
         # 2. Adicionar as bordas do mapa como obstáculos
         robot_radius_cells = math.ceil((ROBOT_WIDTH / 2) / self.grid_size)
@@ -66,8 +94,142 @@ class PathFinder:
                 self.obstacle_grid.add((x, i)) # Borda inferior
                 self.obstacle_grid.add((x, self.height - 1 - i)) # Borda superior
 
+        # Espelha o cache em uma matriz para consultas vetorizadas
+        self.occupancy_grid = np.zeros((self.height, self.width), dtype=bool)
+        if self.obstacle_grid:
+            cells = np.array(list(self.obstacle_grid), dtype=int)
+            self.occupancy_grid[cells[:, 1], cells[:, 0]] = True
+
+        # 3. Adicionar os obstáculos mapeados, inflados pelo raio do robô
+        if self.static_map is not None and self.static_map.any():
+            yy, xx = np.mgrid[-robot_radius_cells:robot_radius_cells + 1, -robot_radius_cells:robot_radius_cells + 1]
+            kernel = (xx * xx + yy * yy) <= robot_radius_cells * robot_radius_cells
+            mapped = ndimage.binary_dilation(self.static_map, structure=kernel) & ~self.occupancy_grid
+            self.occupancy_grid |= mapped
+            cells_y, cells_x = np.nonzero(mapped)
+            self.obstacle_grid.update(zip(cells_x.tolist(), cells_y.tolist()))
+
+        # 4. Estrutura conhecida: as células das áreas e dos obstáculos mapeados, sem inflação.
+        #    A dilatação de uma célula cobre o ruído do LIDAR e as células de borda cujo centro
+        #    fica fora do polígono; as paredes do ambiente caem na borda externa da grade
+        structure = self.raw_area_mask.copy()
+        if self.static_map is not None:
+            structure |= self.static_map
+        structure = ndimage.binary_dilation(structure, structure=np.ones((3, 3), dtype=bool))
+        structure[0, :] = structure[-1, :] = structure[:, 0] = structure[:, -1] = True
+        self.structure_grid = structure
+
         print(f"DEBUG: Cache de obstáculos atualizado: {len(self.obstacle_grid)} células (incluindo áreas e bordas)")
-        
+
+    def add_dynamic_layer(self, layer):
+        """
+        Registra uma camada dinâmica consultada pelo A* e pelas verificações de colisão.
+
+        A camada deve oferecer `active`, `is_cell_blocked(x, y)` e `cells_blocked(xs, ys)`.
+        """
+        if layer not in self.dynamic_layers:
+            self.dynamic_layers.append(layer)
+
+    def remove_dynamic_layer(self, layer):
+        """Remove uma camada dinâmica."""
+        if layer in self.dynamic_layers:
+            self.dynamic_layers.remove(layer)
+
+    def is_cell_blocked(self, x: int, y: int) -> bool:
+        """Verifica uma célula contra a grade estática e as camadas dinâmicas."""
+        if (x, y) in self.obstacle_grid:
+            return True
+        for layer in self.dynamic_layers:
+            if layer.active and layer.is_cell_blocked(x, y):
+                return True
+        return False
+
+    @staticmethod
+    def _blocked_by_layers(layers, current: Tuple[int, int], dx: int, dy: int) -> bool:
+        """
+        Verifica o movimento de `current` para o vizinho (dx, dy) contra as camadas dinâmicas.
+        Diagonais não podem cortar o canto de uma célula bloqueada.
+        """
+        x, y = current[0] + dx, current[1] + dy
+        for layer in layers:
+            if layer.is_cell_blocked(x, y):
+                return True
+            if dx != 0 and dy != 0 and (layer.is_cell_blocked(x, current[1]) or
+                                        layer.is_cell_blocked(current[0], y)):
+                return True
+        return False
+
+    def world_to_cells(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Converte um array (N, 2) de pontos do mundo para índices de célula (x, y)."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        cells_x = np.floor(points[:, 0] / self.grid_size).astype(int)
+        cells_y = np.floor(points[:, 1] / self.grid_size).astype(int)
+        return cells_x, cells_y
+
+    def points_blocked(self, points: np.ndarray) -> np.ndarray:
+        """
+        Verifica de forma vetorizada se pontos do mundo caem em células bloqueadas.
+
+        Args:
+            points: Array (N, 2) de coordenadas (x, y) em metros
+
+        Returns:
+            Array booleano (N,) - True para pontos bloqueados ou fora do mapa
+        """
+        cells_x, cells_y = self.world_to_cells(points)
+        inside = (cells_x >= 0) & (cells_x < self.width) & (cells_y >= 0) & (cells_y < self.height)
+        blocked = np.ones(len(cells_x), dtype=bool)
+        blocked[inside] = self.occupancy_grid[cells_y[inside], cells_x[inside]]
+        for layer in self.dynamic_layers:
+            if layer.active:
+                blocked |= layer.cells_blocked(cells_x, cells_y)
+        return blocked
+
+    def structure_points(self, points: np.ndarray) -> np.ndarray:
+        """
+        Verifica de forma vetorizada se pontos do mundo caem sobre a estrutura conhecida
+        (áreas proibidas e obstáculos mapeados sem inflação, e as paredes do ambiente).
+
+        Returns:
+            Array booleano (N,) - True para pontos na estrutura conhecida ou fora do mapa
+        """
+        cells_x, cells_y = self.world_to_cells(points)
+        inside = (cells_x >= 0) & (cells_x < self.width) & (cells_y >= 0) & (cells_y < self.height)
+        known = np.ones(len(cells_x), dtype=bool)
+        known[inside] = self.structure_grid[cells_y[inside], cells_x[inside]]
+        return known
+        
+    def inflated_areas_mask(self, areas: List[List[Tuple[float, float]]]) -> np.ndarray:
+        """Rasteriza as áreas infladas pela margem de segurança em uma máscara booleana [y, x]."""
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        for area in areas:
+            if len(area) < 3:
+                continue # Um polígono precisa de pelo menos 3 pontos
+
+            # Infla o polígono usando um buffer. Isso cria a margem de segurança
+            inflated_polygon = Polygon(area).buffer(FORBIDDEN_AREA_INFLATION_RADIUS)
+
+            # Simplificação: assume que o resultado é um único polígono
+            # Esta parte pode precisar de revisão se as áreas proibidas forem complexas
+            if inflated_polygon.geom_type in ['Polygon', 'MultiPolygon']:
+                cells = self._area_to_grid_cells(list(inflated_polygon.exterior.coords))
+                if cells:
+                    cells = np.array(list(cells), dtype=int)
+                    mask[cells[:, 1], cells[:, 0]] = True
+        return mask
+
+    def areas_to_mask(self, areas: List[List[Tuple[float, float]]]) -> np.ndarray:
+        """Rasteriza áreas poligonais (sem inflação) em uma máscara booleana [y, x] da grade."""
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        for area in areas:
+            if len(area) < 3:
+                continue
+            cells = self._area_to_grid_cells(area)
+            if cells:
+                cells = np.array(list(cells), dtype=int)
+                mask[cells[:, 1], cells[:, 0]] = True
+        return mask
+
     def _area_to_grid_cells(self, area: List[Tuple[float, ...]]) -> Set[Tuple[int, int]]:
         """Converte uma área poligonal em um conjunto de células da grade."""
         cells = set()
@@ -212,6 +374,9 @@ class PathFinder:
             (0, 1), (1, 0), (0, -1), (-1, 0),  # Cardinal
             (1, 1), (-1, 1), (1, -1), (-1, -1)  # Diagonal
         ]
+
+        # Camadas dinâmicas com obstáculos (consultadas sem copiar a grade estática)
+        active_layers = [layer for layer in self.dynamic_layers if layer.active]
         
         while open_set:
             # Remove o nó com menor f_score
@@ -236,6 +401,8 @@ class PathFinder:
                 # Verifica se está em área proibida (usando cache)
                 if neighbor in self.obstacle_grid:
                     continue
+                if active_layers and self._blocked_by_layers(active_layers, current, dx, dy):
+                    continue
                     
                 # Verifica se já foi visitado
                 if neighbor in closed_set:
@@ -335,7 +502,7 @@ class PathFinder:
         points = self._bresenham_line(start_grid, end_grid)
         
         for point in points:
-            if point in self.obstacle_grid:
+            if self.is_cell_blocked(point[0], point[1]):
                 return True
                 
         return False
@@ -0,0 +1,188 @@
+"""
+Seguidor de caminho contínuo (regulated pure pursuit) para o Robô Garçom.
+
+Em vez de girar no lugar e avançar waypoint a waypoint, o seguidor mira um
+ponto de antecipação (lookahead) sobre o caminho e calcula a curvatura
+necessária para alcançá-lo, limitando a velocidade linear nas curvas.
+"""
+
+import math
+from typing import List, Tuple, Optional
+import numpy as np
+
+from .config import (PURE_PURSUIT_LOOKAHEAD_TIME, PURE_PURSUIT_MIN_LOOKAHEAD,
+                     PURE_PURSUIT_MAX_LOOKAHEAD, PURE_PURSUIT_MIN_TURN_RADIUS,
+                     PURE_PURSUIT_ROTATE_IN_PLACE_ANGLE, PURE_PURSUIT_APPROACH_DISTANCE,
+                     PURE_PURSUIT_MIN_APPROACH_RATIO, PURE_PURSUIT_SEARCH_WINDOW)
+
+
+class PurePursuitFollower:
+    """
+    Segue um caminho poligonal de forma contínua usando pure pursuit regulado.
+
+    Trabalha em unidades físicas: posições em metros, velocidade linear em m/s
+    e velocidade angular em rad/s. A conversão para os comandos dos motores
+    fica a cargo do RobotNavigator.
+    """
+
+    def __init__(self,
+                 lookahead_time: float = PURE_PURSUIT_LOOKAHEAD_TIME,
+                 min_lookahead: float = PURE_PURSUIT_MIN_LOOKAHEAD,
+                 max_lookahead: float = PURE_PURSUIT_MAX_LOOKAHEAD,
+                 min_turn_radius: float = PURE_PURSUIT_MIN_TURN_RADIUS,
+                 rotate_in_place_angle: float = PURE_PURSUIT_ROTATE_IN_PLACE_ANGLE,
+                 approach_distance: float = PURE_PURSUIT_APPROACH_DISTANCE,
+                 min_approach_ratio: float = PURE_PURSUIT_MIN_APPROACH_RATIO,
+                 search_window: int = PURE_PURSUIT_SEARCH_WINDOW):
+        """
+        Inicializa o seguidor.
+
+        Args:
+            lookahead_time: Tempo (s) multiplicado pela velocidade para obter a distância de antecipação
+            min_lookahead: Distância mínima de antecipação (m)
+            max_lookahead: Distância máxima de antecipação (m)
+            min_turn_radius: Raio (m) abaixo do qual a velocidade linear é reduzida
+            rotate_in_place_angle: Erro angular (graus) acima do qual o robô gira no lugar
+            approach_distance: Distância (m) do fim do caminho a partir da qual o robô desacelera
+            min_approach_ratio: Fração mínima da velocidade mantida durante a desaceleração final
+            search_window: Quantidade de segmentos à frente considerados ao projetar a posição
+        """
+        self.lookahead_time = lookahead_time
+        self.min_lookahead = min_lookahead
+        self.max_lookahead = max_lookahead
+        self.min_turn_radius = min_turn_radius
+        self.rotate_in_place_angle = rotate_in_place_angle
+        self.approach_distance = approach_distance
+        self.min_approach_ratio = min_approach_ratio
+        self.search_window = search_window
+
+        self._points = np.zeros((0, 2))
+        self._cumulative = np.zeros(0)
+        self._segment_index = 0
+        self.progress = 0.0  # Distância percorrida ao longo do caminho (m)
+        self.last_lookahead_point: Optional[Tuple[float, float]] = None
+        self._last_speed = 0.0
+
+    def set_path(self, path: List[Tuple[float, float]]):
+        """Define o caminho a ser seguido e reinicia o progresso."""
+        self._points = np.asarray(path, dtype=float).reshape(-1, 2)
+        if len(self._points) > 1:
+            segment_lengths = np.hypot(*np.diff(self._points, axis=0).T)
+            self._cumulative = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+        else:
+            self._cumulative = np.zeros(len(self._points))
+        self._segment_index = 0
+        self.progress = 0.0
+        self.last_lookahead_point = None
+        self._last_speed = 0.0
+        print(f"DEBUG: PurePursuit - caminho com {len(self._points)} pontos, {self.path_length:.2f}m")
+
+    @property
+    def path_length(self) -> float:
+        """Comprimento total do caminho (m)."""
+        return float(self._cumulative[-1]) if len(self._cumulative) else 0.0
+
+    @property
+    def nearest_index(self) -> int:
+        """Índice do ponto do caminho no início do segmento atual."""
+        return self._segment_index
+
+    def remaining_distance(self) -> float:
+        """Distância restante (m) ao longo do caminho a partir do progresso atual."""
+        return max(0.0, self.path_length - self.progress)
+
+    def _update_progress(self, position: Tuple[float, float]):
+        """Projeta a posição sobre os próximos segmentos e avança o progresso (nunca retrocede)."""
+        segment_count = len(self._points) - 1
+        if segment_count < 1:
+            return
+
+        start = self._segment_index
+        end = min(start + self.search_window, segment_count)
+        a = self._points[start:end]
+        ab = self._points[start + 1:end + 1] - a
+        ap = np.asarray(position, dtype=float) - a
+
+        len_sq = np.einsum('ij,ij->i', ab, ab)
+        t = np.einsum('ij,ij->i', ap, ab) / np.where(len_sq > 0, len_sq, 1.0)
+        t = np.clip(t, 0.0, 1.0)
+        distances = np.hypot(*(ap - t[:, None] * ab).T)
+
+        k = int(np.argmin(distances))
+        progress = self._cumulative[start + k] + t[k] * math.sqrt(len_sq[k])
+        if progress >= self.progress:
+            self._segment_index = start + k
+            self.progress = float(progress)
+
+    def _point_at(self, s: float) -> Tuple[float, float]:
+        """Interpola o ponto do caminho na distância s (m) a partir do início."""
+        s = min(max(s, 0.0), self.path_length)
+        i = int(np.searchsorted(self._cumulative, s, side='right')) - 1
+        i = min(max(i, 0), len(self._points) - 2)
+        segment_length = self._cumulative[i + 1] - self._cumulative[i]
+        if segment_length <= 0:
+            return float(self._points[i + 1][0]), float(self._points[i + 1][1])
+        t = (s - self._cumulative[i]) / segment_length
+        point = self._points[i] + t * (self._points[i + 1] - self._points[i])
+        return float(point[0]), float(point[1])
+
+    def compute_velocity(self, position: Tuple[float, float], heading_deg: float,
+                         max_linear: float, max_angular: float) -> Tuple[float, float]:
+        """
+        Calcula a velocidade para seguir o caminho a partir da pose atual.
+
+        Args:
+            position: Posição (x, y) do robô em metros
+            heading_deg: Orientação do robô em graus (mesma convenção do navegador)
+            max_linear: Velocidade linear máxima permitida (m/s)
+            max_angular: Velocidade angular máxima permitida (rad/s)
+
+        Returns:
+            Tupla (velocidade linear m/s, velocidade angular rad/s)
+        """
+        if len(self._points) < 2:
+            return 0.0, 0.0
+
+        self._update_progress(position)
+
+        # Distância de antecipação proporcional à velocidade
+        lookahead = self.lookahead_time * self._last_speed
+        lookahead = min(self.max_lookahead, max(self.min_lookahead, lookahead))
+        target = self._point_at(self.progress + lookahead)
+        self.last_lookahead_point = target
+
+        dx = target[0] - position[0]
+        dy = target[1] - position[1]
+        target_distance = math.hypot(dx, dy)
+        if target_distance < 1e-6:
+            self._last_speed = 0.0
+            return 0.0, 0.0
+
+        alpha = math.atan2(dy, dx) - math.radians(heading_deg)
+        alpha = (alpha + math.pi) % (2 * math.pi) - math.pi
+
+        # Erro angular muito grande: gira no lugar até o alvo ficar à frente
+        if abs(math.degrees(alpha)) > self.rotate_in_place_angle:
+            self._last_speed = 0.0
+            return 0.0, math.copysign(max_angular, alpha)
+
+        curvature = 2.0 * math.sin(alpha) / target_distance
+        linear = max_linear
+
+        # Regulação por curvatura: reduz a velocidade em curvas fechadas
+        if abs(curvature) > 1.0 / self.min_turn_radius:
+            linear *= (1.0 / abs(curvature)) / self.min_turn_radius
+
+        # Regulação por aproximação: desacelera perto do fim do caminho
+        remaining = self.remaining_distance()
+        if remaining < self.approach_distance:
+            linear *= max(remaining / self.approach_distance, self.min_approach_ratio)
+
+        # Respeita o limite de velocidade angular mantendo a curvatura
+        angular = curvature * linear
+        if abs(angular) > max_angular:
+            linear = max_angular / abs(curvature)
+            angular = math.copysign(max_angular, curvature)
+
+        self._last_speed = linear
+        return linear, angular
@@ -0,0 +1,180 @@
+"""
+Suavização de caminhos com B-spline cúbica e validação contra a grade de obstáculos.
+
+O caminho em "escada" do A* é primeiro encurtado por linha de visada, depois
+ajustado por uma B-spline cúbica fixada nas extremidades. Cada trecho da curva
+é amostrado e validado de forma vetorizada contra o PathFinder; trechos que
+colidem voltam para o polígono de controle (já validado).
+"""
+
+import math
+from typing import List, Tuple
+import numpy as np
+
+from .config import (PATH_SMOOTHING_SAMPLE_SPACING, PATH_SMOOTHING_CONTROL_SPACING,
+                     PATH_SMOOTHING_WAYPOINT_SPACING)
+
+# Matriz de base da B-spline cúbica uniforme
+_BSPLINE_BASIS = np.array([
+    [-1.0, 3.0, -3.0, 1.0],
+    [3.0, -6.0, 3.0, 0.0],
+    [-3.0, 0.0, 3.0, 0.0],
+    [1.0, 4.0, 1.0, 0.0],
+]) / 6.0
+
+
+class PathSmoother:
+    """Suaviza caminhos do PathFinder sem atravessar células bloqueadas."""
+
+    def __init__(self, path_finder,
+                 sample_spacing: float = PATH_SMOOTHING_SAMPLE_SPACING,
+                 control_spacing: float = PATH_SMOOTHING_CONTROL_SPACING,
+                 waypoint_spacing: float = PATH_SMOOTHING_WAYPOINT_SPACING):
+        """
+        Args:
+            path_finder: PathFinder cuja grade de ocupação valida o caminho
+            sample_spacing: Espaçamento (m) das amostras usadas na validação
+            control_spacing: Espaçamento máximo (m) entre pontos de controle da spline
+            waypoint_spacing: Espaçamento (m) aproximado dos waypoints do caminho final
+        """
+        self.path_finder = path_finder
+        self.sample_spacing = sample_spacing
+        self.control_spacing = control_spacing
+        self.waypoint_spacing = waypoint_spacing
+        self._allowed = None
+
+    def smooth(self, path: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """
+        Retorna uma versão suavizada e validada do caminho.
+
+        Os pontos inicial e final são preservados. Se a validação final falhar,
+        o caminho original é retornado.
+        """
+        if len(path) < 3:
+            return path
+
+        original = np.asarray(path, dtype=float)
+        # Células atravessadas pelo próprio caminho original são aceitas (ex.: a base
+        # pode estar dentro da margem das bordas do mapa)
+        self._allowed = self._cells_of(self._sample_polyline(original))
+
+        control = self._shortcut(original)
+        control = self._densify(control)
+        dense = self._fit_bspline(control)
+        waypoints = self._resample(dense)
+
+        if self._polyline_collides(waypoints):
+            print("DEBUG: Suavização rejeitada na validação final - mantendo caminho original")
+            self._allowed = None
+            return path
+
+        self._allowed = None
+        print(f"DEBUG: Caminho suavizado: {len(path)} -> {len(waypoints)} pontos")
+        return [(float(x), float(y)) for x, y in waypoints]
+
+    def _cells_of(self, points: np.ndarray) -> set:
+        """Conjunto de células (x, y) ocupadas por um conjunto de pontos."""
+        cells_x, cells_y = self.path_finder.world_to_cells(points)
+        return set(zip(cells_x.tolist(), cells_y.tolist()))
+
+    def _blocked(self, points: np.ndarray) -> np.ndarray:
+        """Máscara de pontos bloqueados, ignorando células do caminho original."""
+        points = points.reshape(-1, 2)
+        blocked = self.path_finder.points_blocked(points)
+        if self._allowed and blocked.any():
+            cells_x, cells_y = self.path_finder.world_to_cells(points[blocked])
+            in_allowed = np.fromiter(((cx, cy) in self._allowed for cx, cy in zip(cells_x.tolist(), cells_y.tolist())),
+                                     dtype=bool, count=len(cells_x))
+            blocked[np.flatnonzero(blocked)[in_allowed]] = False
+        return blocked
+
+    def _sample_polyline(self, points: np.ndarray) -> np.ndarray:
+        """Amostra densamente todos os segmentos de uma polilinha."""
+        segments = []
+        for a, b in zip(points[:-1], points[1:]):
+            count = max(2, int(math.ceil(np.hypot(*(b - a)) / self.sample_spacing)) + 1)
+            t = np.linspace(0.0, 1.0, count)[:, None]
+            segments.append(a + t * (b - a))
+        return np.concatenate(segments) if segments else points
+
+    def _polyline_collides(self, points: np.ndarray) -> bool:
+        """Verifica se algum segmento da polilinha atravessa célula bloqueada."""
+        return bool(self._blocked(self._sample_polyline(points)).any())
+
+    def _shortcut(self, points: np.ndarray) -> np.ndarray:
+        """Remove pontos da escada do A* usando linha de visada (avaliada em lote por âncora)."""
+        result = [points[0]]
+        anchor = 0
+        last = len(points) - 1
+        while anchor < last:
+            candidates = points[anchor + 1:]
+            longest = np.hypot(*(candidates - points[anchor]).T).max()
+            count = max(2, int(math.ceil(longest / self.sample_spacing)) + 1)
+            t = np.linspace(0.0, 1.0, count)
+            # Amostras de todos os segmentos âncora -> candidato: (candidatos, amostras, 2)
+            samples = points[anchor] + t[None, :, None] * (candidates - points[anchor])[:, None, :]
+            visible = ~self._blocked(samples).reshape(len(candidates), count).any(axis=1)
+            blocked_indices = np.flatnonzero(~visible)
+            reach = len(candidates) if not len(blocked_indices) else blocked_indices[0]
+            anchor += max(1, int(reach))
+            result.append(points[anchor])
+        return np.array(result)
+
+    def _densify(self, points: np.ndarray) -> np.ndarray:
+        """Insere pontos de controle nos segmentos longos para a spline acompanhar as retas."""
+        result = [points[0]]
+        for a, b in zip(points[:-1], points[1:]):
+            count = max(1, int(math.ceil(np.hypot(*(b - a)) / self.control_spacing)))
+            t = np.linspace(0.0, 1.0, count + 1)[1:, None]
+            result.extend(a + t * (b - a))
+        return np.array(result)
+
+    def _fit_bspline(self, control: np.ndarray) -> np.ndarray:
+        """
+        Avalia a B-spline cúbica fixada (extremidades triplicadas) e valida cada trecho.
+
+        Trechos que colidem são substituídos pelos pontos de controle correspondentes.
+        """
+        padded = np.concatenate([control[:1], control[:1], control, control[-1:], control[-1:]])
+        segment_count = len(padded) - 3
+        windows = np.stack([padded[k:k + segment_count] for k in range(4)], axis=1)  # (segmentos, 4, 2)
+
+        samples_per_segment = max(2, int(math.ceil(self.control_spacing / self.sample_spacing)))
+        t = np.linspace(0.0, 1.0, samples_per_segment, endpoint=False)
+        weights = np.stack([t ** 3, t ** 2, t, np.ones_like(t)], axis=1) @ _BSPLINE_BASIS
+        curve = np.einsum('sj,kjd->ksd', weights, windows)  # (segmentos, amostras, 2)
+
+        colliding = self._blocked(curve).reshape(segment_count, samples_per_segment).any(axis=1)
+
+        pieces = []
+        for k in range(segment_count):
+            if colliding[k]:
+                # Volta ao polígono de controle neste trecho
+                pieces.append(windows[k, 1:3])
+            else:
+                pieces.append(curve[k])
+        pieces.append(control[-1:])
+        dense = np.concatenate(pieces)
+
+        # Remove pontos repetidos consecutivos
+        keep = np.ones(len(dense), dtype=bool)
+        keep[1:] = np.hypot(*np.diff(dense, axis=0).T) > 1e-9
+        if colliding.any():
+            print(f"DEBUG: Suavização - {int(colliding.sum())}/{segment_count} trechos da spline revertidos por colisão")
+        return dense[keep]
+
+    def _resample(self, dense: np.ndarray) -> np.ndarray:
+        """Reduz a curva densa a waypoints espaçados, mantendo curvas que colidiriam como cordas."""
+        if len(dense) < 3:
+            return dense
+        lengths = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(dense, axis=0).T))))
+        marks = np.arange(0.0, lengths[-1], self.waypoint_spacing)
+        indices = np.unique(np.concatenate((np.searchsorted(lengths, marks), [len(dense) - 1])))
+
+        # Cordas que atravessam obstáculos recebem todas as amostras intermediárias
+        selected = [indices[0]]
+        for start, end in zip(indices[:-1], indices[1:]):
+            if end - start > 1 and self._polyline_collides(dense[[start, end]]):
+                selected.extend(range(start + 1, end))
+            selected.append(end)
+        return dense[selected]
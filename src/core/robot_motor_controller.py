@@ -26,6 +26,7 @@ class RobotMotorController:
         self.left_speed_percent = 0
         self.right_speed_percent = 0
         self.is_moving = False
+        self.recorder = None  # ScanLogWriter que recebe cada comando (opcional)
         
         if GPIO_AVAILABLE and GPIO:
             print("Inicializando controlador de motores em MODO REAL (Raspberry Pi).")
@@ -65,6 +66,8 @@ class RobotMotorController:
         """
         self.left_speed_percent = max(-100, min(100, left_speed))
         self.right_speed_percent = max(-100, min(100, right_speed))
+        if self.recorder is not None:
+            self.recorder.write_motor(self.left_speed_percent, self.right_speed_percent)
         
         if GPIO_AVAILABLE and GPIO:
             self._set_motor_speed_real("left", self.left_speed_percent)
@@ -6,12 +6,28 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 import time
 import math
+import numpy as np
 from typing import List, Tuple, Optional
 from .slamtec_manager import SlamtecManager
 from .robot_motor_controller import RobotMotorController
 from .config import *
 from src.core.environment import GPIO_AVAILABLE, is_raspberry_pi
 from .path_finder import PathFinder
+from .path_follower import PurePursuitFollower
+from .velocity_profile import VelocityProfile
+from .path_smoother import PathSmoother
+from .spatial_index import ForbiddenAreaIndex
+from .geometry import points_to_segments_distance
+from .obstacle_extractor import OBSTACLE_DTYPE
+from .local_costmap import LocalCostmap
+from .occupancy_mapper import OccupancyMapper
+from .scan_matcher import ScanMatcher
+from .particle_filter import ParticleFilter
+from .scan_simulator import ScanSimulator
+from .scan_log import ScanLogWriter, ScanLogReader, ScanLogReplay
+from .map_bundle import DerivedGrids, derived_grids_key, GRID_INFLATED, GRID_AREAS, GRID_CLEARANCE
+from .telemetry import (TelemetryStore, Delivery, DELIVERY_COMPLETED, DELIVERY_ABORTED, DELIVERY_CANCELLED,
+                        DELIVERY_PLAN_FAILED)
 
 class RobotNavigator:
     def __init__(self):
@@ -30,6 +46,9 @@ class RobotNavigator:
         self.is_returning_to_base = False
         self.base_position = ROBOT_INITIAL_POSITION
         self.is_adjusting_final_angle = False
+        # Telemetria (poses, transições de estado e métricas da entrega em andamento)
+        self.telemetry: Optional[TelemetryStore] = None
+        self.delivery: Optional[Delivery] = None
         self.navigation_state = "IDLE"  # IDLE, NAVIGATING, RETURNING, COMPLETED
         self.speed_multiplier = 1.0  # Fator de velocidade inicial (100%)
         
@@ -39,8 +58,12 @@ class RobotNavigator:
             height=int(MAP_HEIGHT / MAP_GRID_SIZE),
             grid_size=MAP_GRID_SIZE
         )
+        self.path_smoother = PathSmoother(self.path_finder)
         
         self.forbidden_areas = []
+        self.forbidden_index = ForbiddenAreaIndex([])  # Índice espacial para consultas de proximidade
+        # Grades calculadas das áreas atuais; reaproveitadas enquanto as áreas não mudam
+        self.derived_grids: Optional[DerivedGrids] = None
         self.is_autonomous = False
         self.current_path = []
         self.current_path_index = 0
@@ -63,7 +86,54 @@ class RobotNavigator:
         # Sistema de timeout para evitar travamento na aproximação final
         self.final_approach_start_time = None
         self.final_approach_timeout = 15.0  # Aumentado para 15s para dar mais margem
-        
+
+        # Seguidor de caminho (WAYPOINT ou PURE_PURSUIT) e medição do tempo de viagem
+        self.follower_mode = NAVIGATION_FOLLOWER_MODE
+        self.path_follower = PurePursuitFollower()
+        self.follower_path_offset = 0  # Índice em self.path do primeiro ponto do trecho seguido
+        self.start_time = None
+        self.last_trip_time = None
+        self.last_trip_mode = None
+
+        # Obstáculos extraídos da última volta do LIDAR (apenas com scans do ambiente)
+        self.detected_obstacles = np.zeros(0, dtype=OBSTACLE_DTYPE)
+        self.detected_obstacle_points = np.zeros((0, 2))  # Pontos dos obstáculos (referencial do robô)
+        self.last_obstacle_scan = 0
+
+        # Camada dinâmica de custo local, consultada pelo A* junto com as áreas proibidas
+        self.local_costmap = LocalCostmap()
+        self.path_finder.add_dynamic_layer(self.local_costmap)
+        self.path_blocked = False
+        self.last_replan_time = 0.0
+
+        # Modo de mapeamento: integra as voltas do LIDAR na grade de ocupação global
+        self.occupancy_mapper = OccupancyMapper(self.path_finder.width, self.path_finder.height,
+                                                self.path_finder.grid_size)
+        self.mapping_active = False
+        self.last_mapping_scan = 0
+
+        # Localização: cada volta do LIDAR é casada com o mapa para corrigir a odometria
+        self.scan_matcher = ScanMatcher()
+        self.localization_enabled = SCAN_MATCH_ENABLED
+        # Filtro de partículas: localização global e recuperação de sequestro (ex.: robô movido à mão)
+        self.localization_mode = LOCALIZATION_MODE
+        self.particle_filter = ParticleFilter()
+        self.particle_filter_odometry = None  # Pose na última etapa do filtro
+
+        # LIDAR simulado: sem sensor, as voltas são geradas da grade do ambiente na pose do robô
+        self.scan_simulator: Optional[ScanSimulator] = None
+        if LIDAR_SIMULATION_ENABLED and not self.slamtec.provides_environment_scans():
+            self.enable_simulated_lidar()
+
+        # Gravação (voltas, obstáculos, comandos e poses) e reprodução de logs binários
+        self.recorder: Optional[ScanLogWriter] = None
+        self.replay: Optional[ScanLogReplay] = None
+        self.replayed_motor_command = (0.0, 0.0)  # Último comando gravado (não vai aos motores)
+
+        # Perfil de velocidade calculado uma vez por planejamento
+        self.velocity_profile_enabled = TRAJECTORY_PROFILE_ENABLED
+        self.velocity_profile = None
+
         print(f"DEBUG: Posição inicial definida: {self.current_position}")
         print(f"DEBUG: Ângulo inicial definido: {self.current_angle}°")
         print(f"DEBUG: Base position definida: {self.base_position}")
@@ -72,6 +142,18 @@ class RobotNavigator:
         
         print(f"DEBUG: Área proibida configurada no navegador")
         
+    @property
+    def navigation_state(self) -> str:
+        return self._navigation_state
+
+    @navigation_state.setter
+    def navigation_state(self, state: str):
+        """Muda o estado da navegação, registrando a transição na telemetria."""
+        previous = getattr(self, '_navigation_state', None)
+        self._navigation_state = state
+        if state != previous and self.telemetry is not None:
+            self.telemetry.record_transition(previous, state, self.delivery.id if self.delivery is not None else None)
+
     def reset_to_initial_state(self):
         """Reseta o robô para o estado inicial"""
         print("🔄 ===== RESETANDO ROBÔ PARA ESTADO INICIAL =====")
@@ -79,6 +161,9 @@ class RobotNavigator:
         print(f"🔄 Estado anterior - navigation_active: {self.navigation_active}")
         print(f"🔄 Estado anterior - is_returning_to_base: {self.is_returning_to_base}")
         print(f"🔄 Estado anterior - navigation_state: {self.navigation_state}")
+
+        # Uma entrega em andamento é interrompida pelo reset
+        self._finish_delivery(DELIVERY_CANCELLED)
         
         # Preserva as áreas proibidas durante o reset
         preserved_forbidden_areas = self.forbidden_areas.copy()
@@ -92,6 +177,7 @@ class RobotNavigator:
         self.current_target = None
         self.path = []
         self.path_index = 0
+        self.velocity_profile = None
         self.is_adjusting_final_angle = False
         self.is_returning_to_base = False  # RESETA ESTE VALOR
         self.navigation_state = "IDLE"
@@ -99,6 +185,8 @@ class RobotNavigator:
         self.start_time = None
         self.estimated_time_remaining = 0.0
         self.is_paused_at_destination = False
+        self.path_blocked = False
+        self.local_costmap.reset()
         
         # Reset de variáveis específicas
         if hasattr(self, 'original_destination'):
@@ -107,7 +195,7 @@ class RobotNavigator:
         
         # Restaura as áreas proibidas
         self.forbidden_areas = preserved_forbidden_areas
-        self.path_finder.set_forbidden_areas(preserved_forbidden_areas)
+        self.path_finder.set_forbidden_areas(preserved_forbidden_areas, self.path_finder.area_mask)
         
         # Para os motores
         self.motors.stop()
@@ -133,6 +221,26 @@ class RobotNavigator:
         else:
             print(f"AVISO: Tentativa de definir multiplicador de velocidade inválido: {multiplier}. Deve ser entre 1.0 e 2.0.")
 
+    def set_follower_mode(self, mode: str) -> bool:
+        """
+        Define o modo de seguimento do caminho.
+
+        Args:
+            mode: "WAYPOINT" (gira e avança ponto a ponto) ou "PURE_PURSUIT" (seguimento contínuo)
+
+        Returns:
+            bool: True se o modo foi aplicado, False caso contrário
+        """
+        if mode not in NAVIGATION_FOLLOWER_MODES:
+            print(f"AVISO: Modo de seguimento inválido: {mode}. Use um de {NAVIGATION_FOLLOWER_MODES}.")
+            return False
+        if self.navigation_active:
+            print("AVISO: O modo de seguimento só pode ser alterado com o robô parado.")
+            return False
+        self.follower_mode = mode
+        print(f"Modo de seguimento do caminho: {self.follower_mode}")
+        return True
+
     def set_path(self, path: List[Tuple[float, float]]):
         """
         Define um novo caminho para o robô seguir.
@@ -145,31 +253,51 @@ class RobotNavigator:
         print(f"DEBUG: Caminho definido com {len(self.current_path)} pontos")
         
     def _smooth_path(self, path: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
-        """Suaviza o caminho para movimentos mais naturais"""
+        """Suaviza o caminho com B-spline validada contra a grade de obstáculos do PathFinder"""
         if len(path) < 3:
             return path
-            
-        smoothed_path = [path[0]]  # Mantém o ponto inicial
-        
-        for i in range(1, len(path) - 1):
-            prev_point = path[i - 1]
-            current_point = path[i]
-            next_point = path[i + 1]
-            
-            # Calcula o ponto médio ponderado
-            smoothed_x = (prev_point[0] + 2 * current_point[0] + next_point[0]) / 4
-            smoothed_y = (prev_point[1] + 2 * current_point[1] + next_point[1]) / 4
-            
-            smoothed_path.append((smoothed_x, smoothed_y))
-            
-        smoothed_path.append(path[-1])  # Mantém o ponto final
-        return smoothed_path
+        return self.path_smoother.smooth(path)
         
     def update(self):
         """Atualiza o estado do robô usando uma máquina de estados clara."""
         if not self.navigation_active:
             return
 
+        if self.mapping_active:
+            self.update_mapping()
+
+        if self.recorder is not None:
+            self.recorder.write_pose((self.current_position[0], self.current_position[1], self.current_angle))
+        if self.telemetry is not None:
+            self.telemetry.record_pose((self.current_position[0], self.current_position[1], self.current_angle),
+                                       self.delivery.id if self.delivery is not None else None)
+
+        # Obstáculos do LIDAR: não avança enquanto houver algo perto demais à frente
+        new_scan = self._process_lidar_scan()
+        if self.navigation_state in ("NAVIGATING_TO_DESTINATION", "FINAL_APPROACH", "RETURNING_TO_BASE"):
+            if self._check_obstacles(self.detected_obstacles, self.detected_obstacle_points):
+                if not self.emergency_stop_active:
+                    print("DEBUG: Obstáculo próximo detectado pelo LIDAR - robô parado")
+                self.emergency_stop_active = True
+            elif self.emergency_stop_active:
+                print("DEBUG: Caminho livre - retomando navegação")
+                self.emergency_stop_active = False
+
+        # Caminho bloqueado por obstáculo dinâmico: replaneja ou aguarda (também com o robô
+        # segurado acima, para que ele contorne o obstáculo em vez de esperar indefinidamente)
+        if self.navigation_state in ("NAVIGATING_TO_DESTINATION", "RETURNING_TO_BASE"):
+            if (new_scan or self.path_blocked) and self._path_ahead_blocked():
+                if not self._replan_current_leg():
+                    self._drive(0.0, 0.0)
+                    return
+            elif self.path_blocked:
+                print("DEBUG: Caminho desobstruído - retomando navegação")
+                self.path_blocked = False
+        if self.emergency_stop_active and self.navigation_state == "FINAL_APPROACH":
+            # A aproximação final comanda os motores diretamente: segura o robô parado
+            self._drive(0.0, 0.0)
+            return
+
         # --- Máquina de Estados de Navegação ---
         
         if self.navigation_state == "IDLE":
@@ -184,6 +312,18 @@ class RobotNavigator:
                 self._finalize_navigation()
                 return
 
+            if self.follower_mode == "PURE_PURSUIT":
+                distance_to_destination = self._calculate_distance(self.current_position, self.original_destination)
+                if (self.path_follower.remaining_distance() < NAVIGATION_FINE_APPROACH_DISTANCE or
+                        distance_to_destination < NAVIGATION_FINE_APPROACH_DISTANCE):
+                    print("🔄 MUDANÇA DE FASE: NAVIGATING_TO_DESTINATION → FINAL_APPROACH (pure pursuit)")
+                    self.navigation_state = "FINAL_APPROACH"
+                    self.path_index = self.destination_index
+                    self.current_target = self.original_destination
+                    return
+                self._follow_path_pure_pursuit()
+                return
+
             # Verifica se está no ponto anterior ao destino final
             is_near_final_destination_waypoint = (self.path_index == self.destination_index - 1)
             
@@ -219,6 +359,9 @@ class RobotNavigator:
                 # Chegou ao destino com sucesso
                 print("🔄 MUDANÇA DE FASE: FINAL_APPROACH → PAUSED_AT_DESTINATION")
                 self.motors.stop()
+                if self.delivery is not None:
+                    self.delivery.mark_arrival(self._calculate_distance(self.current_position,
+                                                                        self.original_destination))
                 self.navigation_state = "PAUSED_AT_DESTINATION"
                 self.arrival_time = time.time()
                 self.is_paused_at_destination = True
@@ -234,6 +377,10 @@ class RobotNavigator:
                     print("🔄 MUDANÇA DE FASE: PAUSED_AT_DESTINATION → RETURNING_TO_BASE")
                     self.navigation_state = "RETURNING_TO_BASE"
                     self.is_returning_to_base = True
+                    if self.follower_mode == "PURE_PURSUIT":
+                        # O trecho de volta começa na posição atual (destino alcançado)
+                        self.follower_path_offset = self.destination_index
+                        self.path_follower.set_path([self.current_position] + self.path[self.destination_index + 1:])
                 else:
                     # Caso estranho: não há caminho de volta, então finaliza.
                     print("DEBUG: Não há caminho de volta, ajustando ângulo final.")
@@ -246,8 +393,17 @@ class RobotNavigator:
                 self._finalize_navigation()
                 return
 
+            if self.follower_mode == "PURE_PURSUIT":
+                if self.path_follower.remaining_distance() < NAVIGATION_GOAL_TOLERANCE:
+                    print("🏁 FINALIZOU FASE: RETURNING_TO_BASE (pure pursuit)")
+                    self.path_index = len(self.path) - 1
+                    self._start_final_angle_adjustment()
+                    return
+                self._follow_path_pure_pursuit()
+                return
+
             distance_to_target = self._calculate_distance(self.current_position, self.current_target)
-            
+
             if distance_to_target < NAVIGATION_GOAL_TOLERANCE: # 15cm
                 self.path_index += 1
                 if self.path_index >= len(self.path):
@@ -275,9 +431,16 @@ class RobotNavigator:
         """Finaliza completamente a navegação"""
         print("DEBUG: === FINALIZANDO NAVEGAÇÃO ===")
         self.motors.stop()
+        if self.start_time is not None:
+            self.last_trip_time = time.time() - self.start_time
+            self.last_trip_mode = self.follower_mode
+            print(f"⏱️ Tempo total da viagem ({self.last_trip_mode}): {self.last_trip_time:.1f}s")
+            self.start_time = None
         self.navigation_active = False
         self.is_adjusting_final_angle = False
         self.navigation_state = "COMPLETED"
+        self._finish_delivery(DELIVERY_COMPLETED if self.delivery is not None and self.delivery.arrived
+                              else DELIVERY_ABORTED)
         self.current_target = None
         self.path = []
         self.path_index = 0
@@ -306,61 +469,48 @@ class RobotNavigator:
         
         # Simula detecção de obstáculos a cada 0.5 segundos
         if current_time - self.last_position_update > 0.5:
-            # Verifica se há áreas proibidas muito próximas
-            for area in self.forbidden_areas:
-                if self._is_near_forbidden_area(area):
-                    print("DEBUG: Área proibida detectada próxima - parada de emergência")
-                    return True
+            # Verifica se há áreas proibidas muito próximas (consulta O(1) no índice espacial)
+            if self._is_near_forbidden_area():
+                print("DEBUG: Área proibida detectada próxima - parada de emergência")
+                return True
                     
             self.last_position_update = current_time
             
         return False
         
-    def _is_near_forbidden_area(self, area: List[Tuple[float, float]]) -> bool:
-        """Verifica se o robô está muito próximo de uma área proibida"""
-        # Calcula a distância mínima até a área proibida
-        min_distance = float('inf')
-        
-        for i in range(len(area)):
-            point1 = area[i]
-            point2 = area[(i + 1) % len(area)]
-            
-            # Calcula a distância até o segmento de linha
-            distance = self._distance_to_line_segment(point1, point2, self.current_position)
-            min_distance = min(min_distance, distance)
-            
-        return min_distance < EMERGENCY_STOP_DISTANCE
+    def _is_near_forbidden_area(self, position: Optional[Tuple[float, float]] = None) -> bool:
+        """Verifica se o robô (ou a posição informada) está muito próximo de alguma área proibida"""
+        if position is None:
+            position = self.current_position
+        return self.forbidden_index.is_within(position, EMERGENCY_STOP_DISTANCE)
         
     def _distance_to_line_segment(self, p1: Tuple[float, float], p2: Tuple[float, float], 
                                  point: Tuple[float, float]) -> float:
         """Calcula a distância de um ponto até um segmento de linha"""
-        x, y = point
-        x1, y1 = p1
-        x2, y2 = p2
-        
-        # Calcula a distância até a linha infinita
-        A = x - x1
-        B = y - y1
-        C = x2 - x1
-        D = y2 - y1
-        
-        dot = A * C + B * D
-        len_sq = C * C + D * D
-        
-        if len_sq == 0:
-            return math.sqrt((x - x1) ** 2 + (y - y1) ** 2)
-            
-        param = dot / len_sq
-        
-        if param < 0:
-            xx, yy = x1, y1
-        elif param > 1:
-            xx, yy = x2, y2
-        else:
-            xx = x1 + param * C
-            yy = y1 + param * D
-            
-        return math.sqrt((x - xx) ** 2 + (y - yy) ** 2)
+        distances, _ = points_to_segments_distance(np.asarray(point, dtype=float), np.array([[p1, p2]], dtype=float))
+        return float(distances[0])
+
+    def _path_clearance(self, path: List[Tuple[float, float]], spacing: float = 0.05) -> Tuple[float, Optional[Tuple[float, float]]]:
+        """
+        Calcula a menor distância entre o caminho (amostrado) e as bordas das áreas proibidas.
+
+        Todas as amostras são avaliadas em uma única chamada vetorizada.
+
+        Returns:
+            Tupla (folga mínima em metros, ponto do caminho onde ela ocorre)
+        """
+        if len(path) < 1 or not len(self.forbidden_index):
+            return float('inf'), None
+        points = np.asarray(path, dtype=float).reshape(-1, 2)
+        samples = [points[:1]]
+        for a, b in zip(points[:-1], points[1:]):
+            count = max(1, int(math.ceil(math.hypot(*(b - a)) / spacing)))
+            t = np.linspace(0.0, 1.0, count + 1)[1:, None]
+            samples.append(a + t * (b - a))
+        samples = np.concatenate(samples)
+        distances, _ = self.forbidden_index.distances(samples)
+        k = int(np.argmin(distances))
+        return float(distances[k]), (float(samples[k, 0]), float(samples[k, 1]))
         
     def _emergency_stop(self):
         """Executa parada de emergência"""
@@ -421,24 +571,490 @@ class RobotNavigator:
             
         return forward_value, turn_value
         
-    def _check_obstacles(self, obstacles: dict) -> bool:
-        """Verifica se há obstáculos perigosos próximos."""
-        if not obstacles or 'obstacles' not in obstacles:
+    def _process_lidar_scan(self) -> bool:
+        """
+        Processa a volta mais recente do LIDAR, uma vez por volta: corrige a pose pelo
+        casamento com o mapa, extrai os obstáculos e atualiza o mapa de custo local.
+
+        Returns:
+            True se uma volta nova foi processada
+        """
+        if not self.slamtec.provides_environment_scans():
             return False
-            
-        for obstacle in obstacles['obstacles']:
-            x, y, _ = obstacle
-            
-            # Converte coordenadas do obstáculo para o referencial do robô
-            # (apenas para verificação de proximidade, não para navegação)
-            dx_world = x - self.current_position[0]
-            dy_world = y - self.current_position[1]
-            distance = math.sqrt(dx_world*dx_world + dy_world*dy_world)
-            
-            if distance < EMERGENCY_STOP_DISTANCE:
-                print(f"Obstáculo detectado! Distância: {distance:.2f}m")
-                return True
+        sequence, scan = self.slamtec.get_latest_scan()
+        if scan is None or sequence == self.last_obstacle_scan:
+            return False
+        self.last_obstacle_scan = sequence
+        self._localize(scan)
+        if not self.obstacle_avoidance_enabled:
+            return False
+        pose = (self.current_position[0], self.current_position[1], self.current_angle)
+        extractor = self.slamtec.obstacle_extractor
+        self.detected_obstacles = extractor.extract(scan, pose)
+        self.detected_obstacle_points = extractor.last_obstacle_points
+        if self.recorder is not None:
+            self.recorder.write_obstacles(self.detected_obstacles)
+        hits = extractor.scan_to_world(scan, pose)
+        # Retornos sobre as áreas proibidas, os obstáculos mapeados ou as paredes já são evitados
+        # pelo planejador: só obstáculos novos entram na camada dinâmica, inclusive os que
+        # estão logo ao lado dessas estruturas (pessoa ou cadeira junto a uma mesa). A exceção
+        # é a estrutura dentro do corredor de parada (ex.: o canto de uma mesa rente ao trecho):
+        # ela segura o robô, então entra na camada para o replanejamento contorná-la
+        known = self.path_finder.structure_points(hits)
+        if known.any():
+            known &= ~self._in_stop_corridor(hits)
+        self.local_costmap.update(self.current_position, hits, self.slamtec.scan_buffer.latest_time(),
+                                  known=known)
+        return True
+
+    def _localize(self, scan: np.ndarray) -> bool:
+        """
+        Corrige a pose de odometria casando a volta com o mapa de ocupação.
+
+        Returns:
+            True se a pose foi corrigida
+        """
+        if not self.localization_enabled or self.mapping_active:
+            return False
+        if self.localization_mode == "PARTICLE_FILTER":
+            return self._localize_particles(scan)
+        if not self.scan_matcher.has_map:
+            return False
+        result = self.scan_matcher.match(scan, (self.current_position[0], self.current_position[1],
+                                                self.current_angle))
+        stats = self.scan_matcher.stats()
+        if result is None:
+            print(f"DEBUG: Casamento de scan rejeitado (pontuação {stats['last_score']:.2f}, "
+                  f"{stats['last_match_ms']:.1f}ms)")
+            return False
+        (x, y, angle), score = result
+        dx, dy, dangle = self.scan_matcher.last_correction
+        print(f"DEBUG: Pose corrigida pelo LIDAR: Δ=({dx:+.3f}, {dy:+.3f})m {dangle:+.2f}° "
+              f"(pontuação {score:.2f}, {stats['last_match_ms']:.1f}ms)")
+        self.current_position = (x, y)
+        self.current_angle = angle
+        return True
+
+    def _localize_particles(self, scan: np.ndarray) -> bool:
+        """
+        Propaga o filtro de partículas pelo deslocamento de odometria desde a etapa anterior,
+        pondera pela volta do LIDAR e, se as partículas convergiram, adota a pose estimada.
+
+        Returns:
+            True se a pose foi corrigida
+        """
+        if not self.particle_filter.has_map or not self.particle_filter.particle_count:
+            return False
+        pose = (self.current_position[0], self.current_position[1], self.current_angle)
+        if self.particle_filter_odometry is not None:
+            self.particle_filter.predict(self.particle_filter_odometry, pose)
+        self.particle_filter_odometry = pose
+        if not self.particle_filter.update(scan):
+            return False
+        stats = self.particle_filter.stats()
+        if not stats['converged']:
+            print(f"DEBUG: Filtro de partículas não convergiu ({stats['particles']} partículas, "
+                  f"σ={stats['linear_std']:.2f}m/{stats['angular_std']:.1f}°, {stats['last_update_ms']:.1f}ms)")
+            return False
+        x, y, angle = stats['pose']
+        print(f"DEBUG: Pose estimada pelo filtro de partículas: ({x:.3f}, {y:.3f}) {angle:.1f}° "
+              f"({stats['particles']} partículas, {stats['last_update_ms']:.1f}ms)")
+        self.current_position = (x, y)
+        self.current_angle = angle
+        self.particle_filter_odometry = (x, y, angle)
+        return True
+
+    def relocalize_global(self) -> bool:
+        """
+        Descarta a estimativa atual e reinicia a localização global pelo filtro de partículas.
+
+        Returns:
+            True se há mapa para a localização global
+        """
+        if not self.particle_filter.has_map:
+            print("AVISO: Localização global requer um mapa de ocupação")
+            return False
+        self.localization_mode = "PARTICLE_FILTER"
+        self.particle_filter.initialize_global()
+        self.particle_filter_odometry = None
+        return True
+
+    def get_localization_stats(self) -> dict:
+        """Estatísticas da localização (casamento de scans ou filtro de partículas, com tempos)."""
+        if self.localization_mode == "PARTICLE_FILTER":
+            stats = self.particle_filter.stats()
+            stats['enabled'] = self.localization_enabled and self.particle_filter.has_map
+        else:
+            stats = self.scan_matcher.stats()
+            stats['enabled'] = self.localization_enabled and self.scan_matcher.has_map
+        stats['mode'] = self.localization_mode
+        return stats
+
+    def start_mapping(self, reset: bool = True) -> bool:
+        """
+        Inicia o modo de mapeamento: cada volta nova do LIDAR é integrada na grade
+        de ocupação na pose atual do robô.
+
+        Args:
+            reset: Se True, começa uma grade vazia; se False, continua a grade atual
+
+        Returns:
+            True se o mapeamento foi iniciado (requer scans do ambiente)
+        """
+        if not self.slamtec.provides_environment_scans():
+            print("AVISO: Mapeamento requer um LIDAR observando o ambiente")
+            return False
+        if reset:
+            self.occupancy_mapper.reset()
+        self.last_mapping_scan = self.slamtec.get_latest_scan()[0]
+        self.mapping_active = True
+        print("DEBUG: Mapeamento iniciado")
+        return True
+
+    def stop_mapping(self) -> OccupancyMapper:
+        """
+        Encerra o mapeamento e aplica o resultado como camada estática do planejador.
+
+        Returns:
+            O mapeador com a grade resultante (para ser salva pelo MapManager)
+        """
+        self.mapping_active = False
+        self.apply_occupancy_map()
+        print(f"DEBUG: Mapeamento encerrado ({self.occupancy_mapper.scans_integrated} voltas integradas)")
+        return self.occupancy_mapper
+
+    def update_mapping(self) -> bool:
+        """
+        Integra a volta mais recente do LIDAR, se houver uma nova.
+
+        Returns:
+            True se uma volta foi integrada
+        """
+        if not self.mapping_active:
+            return False
+        sequence, scan = self.slamtec.get_latest_scan()
+        if scan is None or sequence == self.last_mapping_scan:
+            return False
+        self.last_mapping_scan = sequence
+        self.occupancy_mapper.integrate_scan(scan, (self.current_position[0], self.current_position[1],
+                                                    self.current_angle))
+        return True
+
+    def load_occupancy_map(self, log_odds: Optional[np.ndarray]):
+        """Carrega uma grade salva (ou descarta a atual, com None) e a aplica ao planejador."""
+        if log_odds is None:
+            self.occupancy_mapper.reset()
+            self.path_finder.set_static_map(None)
+            self.scan_matcher.set_map(None)
+            self.particle_filter.set_map(None)
+            self._update_simulated_environment()
+            return
+        self.occupancy_mapper.load(log_odds)
+        self.apply_occupancy_map()
+
+    def apply_occupancy_map(self):
+        """Exporta as células ocupadas da grade como camada estática do PathFinder."""
+        occupied = self.occupancy_mapper.occupied_mask()
+        self.path_finder.set_static_map(occupied if occupied.any() else None)
+        self.scan_matcher.set_map(occupied, self.occupancy_mapper.resolution)
+        self.particle_filter.set_map(occupied, self.occupancy_mapper.free_mask(), self.occupancy_mapper.resolution)
+        self._update_simulated_environment()
+        if self.particle_filter.has_map:
+            # Parte da pose atual; relocalize_global() reinicia sem conhecimento prévio
+            self.particle_filter.initialize_pose((self.current_position[0], self.current_position[1],
+                                                  self.current_angle))
+            self.particle_filter_odometry = None
+
+    def enable_simulated_lidar(self, pose_source=None, simulator: Optional[ScanSimulator] = None):
+        """
+        Passa a gerar voltas do LIDAR pelo simulador de scans (áreas proibidas e mapa
+        de ocupação carregado), em vez do scan fixo de demonstração.
+
+        Args:
+            pose_source: Função que retorna a pose real (x, y, graus); padrão: a pose do navegador.
+                         Testes de localização podem fornecer uma pose real distinta da odometria
+            simulator: Simulador a usar (padrão: um novo ScanSimulator)
+        """
+        self.scan_simulator = simulator if simulator is not None else ScanSimulator()
+        if pose_source is None:
+            pose_source = lambda: (self.current_position[0], self.current_position[1], self.current_angle)
+        self.slamtec.attach_scan_simulator(self.scan_simulator, pose_source)
+        self._update_simulated_environment()
+        print("DEBUG: LIDAR simulado ativado")
+
+    def disable_simulated_lidar(self):
+        """Volta ao scan fixo de demonstração."""
+        self.slamtec.detach_scan_simulator()
+        self.scan_simulator = None
+
+    def _update_simulated_environment(self):
+        """
+        Reconstrói a grade do ambiente simulado: áreas proibidas (sem inflação) e obstáculos do
+        mapa de ocupação. As bordas do mapa não viram paredes - a base pode ficar mais perto
+        delas que a distância de parada de emergência.
+        """
+        if self.scan_simulator is None:
+            return
+        areas_mask = self.derived_grids.get(GRID_AREAS) if self.derived_grids is not None else None
+        if areas_mask is None or areas_mask.shape != (self.path_finder.height, self.path_finder.width):
+            areas_mask = self.path_finder.areas_to_mask(self.forbidden_areas)
+            if self.derived_grids is not None:
+                self.derived_grids.grids[GRID_AREAS] = areas_mask
+        world = areas_mask.copy()
+        if self.path_finder.static_map is not None:
+            world |= self.path_finder.static_map
+        self.scan_simulator.set_map(world, self.path_finder.grid_size)
+
+    def start_recording(self, path: Optional[str] = None) -> str:
+        """
+        Passa a gravar as voltas do LIDAR, os obstáculos extraídos, os comandos dos motores
+        e a pose do robô a cada ciclo.
+
+        Args:
+            path: Arquivo do log (padrão: SCAN_LOG_DIRECTORY/scan_<data>_<hora>.rgsl)
+
+        Returns:
+            Caminho do log
+        """
+        self.stop_recording()
+        if path is None:
+            path = os.path.join(SCAN_LOG_DIRECTORY, time.strftime("scan_%Y%m%d_%H%M%S.rgsl"))
+        self.recorder = ScanLogWriter(path)
+        self.slamtec.scan_buffer.recorder = self.recorder
+        self.motors.recorder = self.recorder
+        print(f"DEBUG: Gravação iniciada em {path}")
+        return path
+
+    def stop_recording(self) -> Optional[str]:
+        """
+        Encerra a gravação, escrevendo os registros pendentes.
+
+        Returns:
+            Caminho do log gravado, ou None se não havia gravação
+        """
+        if self.recorder is None:
+            return None
+        recorder = self.recorder
+        self.slamtec.scan_buffer.recorder = None
+        self.motors.recorder = None
+        self.recorder = None
+        recorder.close()
+        print(f"DEBUG: Gravação encerrada ({recorder.records_written} registros em {recorder.path})")
+        return recorder.path
+
+    def start_telemetry(self, store: Optional[TelemetryStore] = None) -> TelemetryStore:
+        """
+        Passa a registrar poses, transições de estado e entregas.
+
+        Args:
+            store: Armazenamento da telemetria (padrão: TelemetryStore em TELEMETRY_DATABASE_PATH)
+
+        Returns:
+            Armazenamento em uso
+        """
+        self.stop_telemetry()
+        self.telemetry = store if store is not None else TelemetryStore()
+        self.telemetry.start()
+        print(f"DEBUG: Telemetria registrada em {self.telemetry.db_path}")
+        return self.telemetry
+
+    def stop_telemetry(self):
+        """Encerra a telemetria, gravando as linhas pendentes (a entrega em andamento fica como cancelada)."""
+        if self.telemetry is None:
+            return
+        self._finish_delivery(DELIVERY_CANCELLED)
+        telemetry = self.telemetry
+        self.telemetry = None
+        telemetry.close()
+        print(f"DEBUG: Telemetria encerrada ({telemetry.rows_written} linhas gravadas)")
+
+    def _finish_delivery(self, result: str):
+        """Fecha a entrega em andamento (se houver) com o resultado."""
+        if self.delivery is None:
+            return
+        delivery = self.delivery
+        self.delivery = None
+        if self.telemetry is not None:
+            self.telemetry.finish_delivery(delivery, result)
+
+    def start_replay(self, path: str, speed: float = 1.0, apply_poses: bool = True,
+                     threaded: bool = True) -> ScanLogReplay:
+        """
+        Reproduz um log gravado: as voltas chegam ao navegador como se viessem do sensor
+        e, com apply_poses, a pose gravada substitui a odometria. Os comandos gravados dos
+        motores ficam em replayed_motor_command, sem acionar os motores.
+
+        Args:
+            path: Arquivo do log
+            speed: Fator de velocidade em relação ao tempo gravado (<= 0: sem espera)
+            apply_poses: Se True, aplica as poses gravadas ao navegador
+            threaded: Se True, reproduz em segundo plano; caso contrário, o chamador avança
+                      com replay.step() / replay.step_until_scan()
+
+        Returns:
+            A reprodução criada
+        """
+        self.stop_replay()
+        on_pose = self._apply_replayed_pose if apply_poses else None
+        self.replay = ScanLogReplay(ScanLogReader(path), self.slamtec.scan_buffer, speed,
+                                    on_pose=on_pose, on_motor=self._store_replayed_motor_command)
+        self.slamtec.attach_replay(self.replay)
+        if threaded:
+            self.replay.start()
+        return self.replay
+
+    def stop_replay(self):
+        """Encerra a reprodução e fecha o log."""
+        if self.replay is None:
+            return
+        replay = self.replay
+        self.slamtec.detach_replay()
+        self.replay = None
+        replay.reader.close()
+
+    def _apply_replayed_pose(self, pose: Tuple[float, float, float], timestamp: float):
+        """Aplica ao navegador uma pose reproduzida do log."""
+        self.current_position = (pose[0], pose[1])
+        self.current_angle = pose[2]
+
+    def _store_replayed_motor_command(self, left_speed: float, right_speed: float, timestamp: float):
+        """Guarda o comando reproduzido dos motores (não vai aos motores)."""
+        self.replayed_motor_command = (left_speed, right_speed)
+
+    def _current_leg_end(self) -> int:
+        """Índice em self.path do último ponto do trecho atual (ida ou volta)."""
+        if self.navigation_state == "NAVIGATING_TO_DESTINATION":
+            return self.destination_index
+        return len(self.path) - 1
+
+    def _path_ahead_blocked(self) -> bool:
+        """Verifica se o trecho à frente do robô atravessa obstáculos da camada dinâmica."""
+        if not self.local_costmap.active or not self.path:
+            return False
+        leg_end = self._current_leg_end()
+        ahead = [self.current_position] + self.path[min(self.path_index + 1, leg_end):leg_end + 1]
+        return self._leg_blocked(ahead, LOCAL_COSTMAP_LOOKAHEAD)
+
+    def _leg_blocked(self, leg: List[Tuple[float, float]], max_length: float = math.inf) -> bool:
+        """
+        Amostra os segmentos do trecho a cada meia célula (até max_length metros)
+        e verifica as amostras contra a camada dinâmica.
+        """
+        points = np.asarray(leg, dtype=float)
+        samples = [points[:1]]
+        travelled = 0.0
+        for a, b in zip(points[:-1], points[1:]):
+            length = math.hypot(*(b - a))
+            count = max(1, int(math.ceil(length / (MAP_GRID_SIZE * 0.5))))
+            samples.append(a + np.linspace(0.0, 1.0, count + 1)[1:, None] * (b - a))
+            travelled += length
+            if travelled >= max_length:
+                break
+        return bool(self.local_costmap.points_blocked(np.concatenate(samples)).any())
+
+    def _replan_current_leg(self) -> bool:
+        """
+        Replaneja o trecho atual considerando o mapa de custo local.
+
+        Returns:
+            True se um novo caminho livre foi adotado; False se o robô deve aguardar
+        """
+        now = time.time()
+        if now - self.last_replan_time < LOCAL_COSTMAP_REPLAN_INTERVAL:
+            # Ainda não é hora de replanejar e o trecho continua bloqueado: o robô aguarda
+            if not self.path_blocked:
+                print("DEBUG: Caminho bloqueado por obstáculo - aguardando o próximo replanejamento")
+            self.path_blocked = True
+            return False
+        self.last_replan_time = now
+
+        outbound = self.navigation_state == "NAVIGATING_TO_DESTINATION"
+        goal = self.original_destination if outbound else ROBOT_INITIAL_POSITION
+        new_leg = self.path_finder.find_path(self.current_position, goal)
+        if len(new_leg) < 2 or self._leg_blocked(new_leg):
+            if not self.path_blocked:
+                print("DEBUG: Caminho bloqueado por obstáculo e sem alternativa - aguardando")
+            self.path_blocked = True
+            return False
+        if self.path_smoothing_enabled:
+            smoothed = self._smooth_path(new_leg)
+            # A suavização pode cortar cantos para dentro da inflação; nesse caso mantém o trecho do A*
+            if not self._leg_blocked(smoothed):
+                new_leg = smoothed
+
+        leg_end = self._current_leg_end()
+        remaining = self.path[leg_end + 1:]
+        self.path = self.path[:self.path_index] + new_leg + remaining
+        if outbound:
+            self.destination_index = self.path_index + len(new_leg) - 1
+        self.current_target = self.path[self.path_index]
+        if self.velocity_profile_enabled:
+            self._build_velocity_profile()
+        if self.follower_mode == "PURE_PURSUIT":
+            self.follower_path_offset = self.path_index
+            self.path_follower.set_path([self.current_position] + new_leg[1:])
+        self.path_blocked = False
+        if self.delivery is not None:
+            self.delivery.replans += 1
+        print(f"DEBUG: Trecho replanejado por obstáculo dinâmico ({len(new_leg)} pontos)")
+        return True
+
+    def _check_obstacles(self, obstacles, points: Optional[np.ndarray] = None) -> bool:
+        """
+        Verifica se há obstáculos perigosos à frente.
+
+        Com o array estruturado do extrator, só contam os obstáculos no corredor à frente
+        do robô (largura do robô, até EMERGENCY_STOP_DISTANCE além da frente dele, e na
+        aproximação final não além do destino): paredes e mesas ao lado ou atrás, inclusive
+        a mesa da entrega, não seguram o robô. Com os pontos dos agrupamentos (referencial
+        do robô), o teste é feito ponto a ponto; sem eles, vale o centróide de cada obstáculo.
+        Aceita também o dicionário legado de detect_obstacles.
+        """
+        if isinstance(obstacles, np.ndarray):
+            if not len(obstacles):
+                return False
+            length, half_width = self._stop_corridor()
+            if points is not None and len(points):
+                ahead = points[(points[:, 0] > 0.0) & (points[:, 0] < length) & (np.abs(points[:, 1]) < half_width)]
+                if not len(ahead):
+                    return False
+                distance = float(ahead[:, 0].min()) - half_width
+            else:
+                ahead = ((obstacles['robot_x'] > 0.0) & (obstacles['robot_x'] < length) &
+                         (np.abs(obstacles['robot_y']) < half_width))
+                if not ahead.any():
+                    return False
+                distance = float(obstacles['robot_x'][ahead].min()) - half_width
+            print(f"Obstáculo detectado à frente! Distância: {max(distance, 0.0):.2f}m")
+            return True
+
+        if not obstacles or not obstacles.get('obstacles'):
+            return False
+        positions = np.asarray([obstacle[:2] for obstacle in obstacles['obstacles']], dtype=float)
+        distances = np.hypot(positions[:, 0] - self.current_position[0], positions[:, 1] - self.current_position[1])
+        if distances.min() < EMERGENCY_STOP_DISTANCE:
+            print(f"Obstáculo detectado! Distância: {float(distances.min()):.2f}m")
+            return True
         return False
+
+    def _stop_corridor(self) -> Tuple[float, float]:
+        """Comprimento e meia largura (m) do corredor à frente do robô que o segura parado."""
+        half_width = ROBOT_WIDTH / 2.0
+        length = half_width + EMERGENCY_STOP_DISTANCE
+        if self.navigation_state == "FINAL_APPROACH" and getattr(self, 'original_destination', None) is not None:
+            length = min(length, self._calculate_distance(self.current_position, self.original_destination)
+                         + half_width)
+        return length, half_width
+
+    def _in_stop_corridor(self, world_points: np.ndarray) -> np.ndarray:
+        """Máscara (N,) dos pontos do mundo dentro do corredor de parada (ver _check_obstacles)."""
+        length, half_width = self._stop_corridor()
+        heading = math.radians(self.current_angle)
+        dx = world_points[:, 0] - self.current_position[0]
+        dy = world_points[:, 1] - self.current_position[1]
+        forward = dx * math.cos(heading) + dy * math.sin(heading)
+        lateral = -dx * math.sin(heading) + dy * math.cos(heading)
+        return (forward > 0.0) & (forward < length) & (np.abs(lateral) < half_width)
         
     def _update_position(self, forward_value: float, turn_value: float):
         """Atualiza a posição e orientação do robô baseado nos comandos com precisão extrema"""
@@ -503,7 +1119,11 @@ class RobotNavigator:
             
     def cleanup(self):
         """Limpa recursos."""
+        self.stop_recording()
+        self.stop_telemetry()
+        self.stop_replay()
         self.motors.cleanup()
+        self.slamtec.cleanup()
 
     def set_autonomous_mode(self, autonomous):
         """Alterna entre modo autônomo e manual"""
@@ -530,14 +1150,44 @@ class RobotNavigator:
         # TODO: Implementar navegação autônoma
         pass 
 
-    def set_forbidden_areas(self, areas: List[List[Tuple[float, float]]]):
-        """Define as áreas proibidas para o navegador"""
+    def set_forbidden_areas(self, areas: List[List[Tuple[float, float]]], derived: Optional[DerivedGrids] = None):
+        """
+        Define as áreas proibidas para o navegador.
+
+        Args:
+            areas: Polígonos das áreas proibidas
+            derived: Grades já calculadas (ex.: de um pacote de mapa), usadas só se valem para
+                     estas áreas; sem elas, as grades atuais são reaproveitadas se as áreas não mudaram
+        """
+        start = time.time()
+        key = derived_grids_key(areas)
+        grids = {}
+        for candidate in (derived, self.derived_grids):
+            if candidate is not None and candidate.key == key:
+                grids = candidate.grids
+                break
         self.forbidden_areas = areas
-        self.path_finder.set_forbidden_areas(areas)
+        self.path_finder.set_forbidden_areas(areas, grids.get(GRID_INFLATED))
+        self.forbidden_index = ForbiddenAreaIndex(areas, clearance=grids.get(GRID_CLEARANCE))
+        self.derived_grids = DerivedGrids(key, {GRID_INFLATED: self.path_finder.area_mask,
+                                                GRID_CLEARANCE: self.forbidden_index.clearance})
+        if grids.get(GRID_AREAS) is not None:
+            self.derived_grids.grids[GRID_AREAS] = grids[GRID_AREAS]
+        print(f"DEBUG: Grades das áreas {'reaproveitadas' if grids else 'calculadas'} em "
+              f"{(time.time() - start) * 1000:.1f}ms ({len(self.forbidden_index)} arestas)")
         print(f"DEBUG: {len(areas)} áreas proibidas configuradas no navegador")
+        self._update_simulated_environment()
         
-    def navigate_to_and_return(self, destination: Tuple[float, float], base_position: Tuple[float, float]) -> None:
-        """Navega até o destino e retorna à base com planejamento otimizado"""
+    def navigate_to_and_return(self, destination: Tuple[float, float], base_position: Tuple[float, float],
+                               destination_name: Optional[str] = None) -> None:
+        """
+        Navega até o destino e retorna à base com planejamento otimizado
+
+        Args:
+            destination: Ponto de destino (x, y) em metros
+            base_position: Ignorado - a base é sempre ROBOT_INITIAL_POSITION
+            destination_name: Nome do destino (ex.: mesa), usado no histórico das entregas
+        """
         # SEMPRE usa a posição inicial definida em config.py como base
         actual_base_position = ROBOT_INITIAL_POSITION
         print(f"DEBUG: ===== INICIANDO NAVEGAÇÃO =====")
@@ -554,6 +1204,9 @@ class RobotNavigator:
         
         # Reset completo para nova navegação (MANTÉM as áreas proibidas)
         self.reset_to_initial_state()
+
+        if self.telemetry is not None:
+            self.delivery = self.telemetry.begin_delivery(destination, destination_name, self.follower_mode)
         
         # Configura a navegação
         self.navigation_active = True
@@ -578,10 +1231,12 @@ class RobotNavigator:
         print(f"DEBUG: Calculando caminho completo: base -> destino -> base")
         
         # Caminho da base até o destino
+        plan_start = time.time()
         path_to_destination = self.path_finder.find_path(self.current_position, destination)
         if not path_to_destination:
             print("DEBUG: ERRO - Não foi possível encontrar caminho para o destino")
             self.navigation_active = False
+            self._finish_delivery(DELIVERY_PLAN_FAILED)
             return
             
         # Caminho do destino até a base
@@ -589,10 +1244,27 @@ class RobotNavigator:
         if not path_to_base:
             print("DEBUG: ERRO - Não foi possível encontrar caminho de retorno à base")
             self.navigation_active = False
+            self._finish_delivery(DELIVERY_PLAN_FAILED)
             return
+
+        if self.path_smoothing_enabled:
+            path_to_destination = self._smooth_path(path_to_destination)
+            path_to_base = self._smooth_path(path_to_base)
             
         # Combina os caminhos: base -> destino -> base
         self.path = path_to_destination + path_to_base[1:]  # Remove duplicação do destino
+        if self.delivery is not None:
+            self.delivery.plan_time = time.time() - plan_start
+            steps = np.diff(np.asarray(self.path, dtype=float).reshape(-1, 2), axis=0)
+            self.delivery.planned_distance = float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+
+        # Verificação de segurança do caminho completo (consulta em lote)
+        clearance, closest_point = self._path_clearance(self.path)
+        if clearance < EMERGENCY_STOP_DISTANCE:
+            print(f"DEBUG: AVISO - caminho passa a {clearance:.3f}m de uma área proibida em {closest_point} "
+                  f"(limite de parada: {EMERGENCY_STOP_DISTANCE}m)")
+        elif math.isfinite(clearance):
+            print(f"DEBUG: Folga mínima do caminho até áreas proibidas: {clearance:.3f}m")
         self.path_index = 0
         
         # **CORREÇÃO CRÍTICA: SEMPRE USA O DESTINO EXATO SOLICITADO**
@@ -623,7 +1295,15 @@ class RobotNavigator:
             print("DEBUG: ERRO - Caminho vazio")
             self.navigation_active = False
             return
-        
+
+        if self.velocity_profile_enabled:
+            self._build_velocity_profile()
+
+        if self.follower_mode == "PURE_PURSUIT":
+            # O trecho de ida começa na posição atual do robô
+            self.follower_path_offset = 0
+            self.path_follower.set_path([self.current_position] + self.path[1:self.destination_index + 1])
+
         print(f"DEBUG: Caminho completo calculado com {len(self.path)} pontos")
         for i, point in enumerate(self.path):
             print(f"DEBUG:   Ponto {i}: {point}")
@@ -640,7 +1320,9 @@ class RobotNavigator:
                 "estimated_time_remaining": 0.0,
                 "current_target": None,
                 "position": self.current_position,
-                "angle": self.current_angle
+                "angle": self.current_angle,
+                "follower_mode": self.follower_mode,
+                "last_trip_time": self.last_trip_time
             }
             
         # Calcula o progresso
@@ -669,7 +1351,10 @@ class RobotNavigator:
             "position": self.current_position,
             "angle": self.current_angle,
             "is_returning_to_base": self.is_returning_to_base,
-            "is_paused_at_destination": self.is_paused_at_destination
+            "is_paused_at_destination": self.is_paused_at_destination,
+            "follower_mode": self.follower_mode,
+            "elapsed_time": time.time() - self.start_time if self.start_time is not None else 0.0,
+            "last_trip_time": self.last_trip_time
         }
 
     def _calculate_distance(self, p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
@@ -704,7 +1389,12 @@ class RobotNavigator:
                 # Movimento para frente com ajuste de rotação
                 # Aplica o multiplicador de velocidade
                 base_speed = ROBOT_SPEED * self.speed_multiplier
-                forward_value = min(base_speed, distance / 1.5)
+                if self.velocity_profile is not None:
+                    # Perfil pré-calculado: só desacelera em curvas e paradas reais
+                    arc_length = self.velocity_profile.arc_length_at_index(self.path_index) - distance
+                    forward_value = min(base_speed, self.velocity_profile.speed_at(arc_length) / ROBOT_SPEED)
+                else:
+                    forward_value = min(base_speed, distance / 1.5)
 
                 if abs(angle_diff) > 1.5:  # Pequeno ajuste de curva
                     turn_value = min(0.1, abs(angle_diff) / 40.0)
@@ -721,7 +1411,13 @@ class RobotNavigator:
                 # Na aproximação final, não usamos o multiplicador para segurança
                 forward_value = min(0.1, distance)
 
-        # Aplica os comandos de movimento
+        self._drive(forward_value, turn_value)
+
+    def _drive(self, forward_value: float, turn_value: float):
+        """Aplica os comandos de avanço e giro aos motores e atualiza a posição simulada."""
+        if self.emergency_stop_active:
+            # Obstáculo à frente: o robô (circular) só gira no lugar, ex.: para o trecho replanejado
+            forward_value = 0.0
         if forward_value > 0 or abs(turn_value) > 0:
             left_speed = (forward_value - turn_value) * 100 
             right_speed = (forward_value + turn_value) * 100
@@ -739,6 +1435,43 @@ class RobotNavigator:
         # Atualiza a posição (simulado)
         self._update_position(forward_value, turn_value)
 
+    def _build_velocity_profile(self):
+        """Calcula o perfil de velocidade do caminho completo (ida e volta) uma única vez por plano."""
+        # O perfil usa a velocidade máxima possível (multiplicador 2.0); o limite do
+        # multiplicador atual é aplicado na consulta, permitindo ajustá-lo durante a viagem.
+        max_speed = ROBOT_SPEED * 2.0 * ROBOT_SPEED
+        start = time.time()
+        self.velocity_profile = VelocityProfile(
+            self.path, max_speed,
+            stop_indices=[self.destination_index, len(self.path) - 1]
+        )
+        print(f"DEBUG: Perfil de velocidade calculado em {(time.time() - start) * 1000:.1f}ms "
+              f"({self.velocity_profile.length:.2f}m)")
+
+    def _follow_path_pure_pursuit(self):
+        """Segue o trecho atual do caminho de forma contínua com o pure pursuit regulado."""
+        # Converte os limites de comando usados pela máquina de estados para unidades físicas
+        # (ver modelo cinemático em config.py)
+        max_forward_value = ROBOT_SPEED * self.speed_multiplier
+        max_linear = max_forward_value * ROBOT_SPEED
+        max_angular = math.radians(NAVIGATION_MAX_TURN_VALUE * ROBOT_TURN_SPEED)
+        if self.velocity_profile is not None:
+            arc_length = (self.velocity_profile.arc_length_at_index(self.follower_path_offset) +
+                          self.path_follower.progress)
+            max_linear = min(max_linear, self.velocity_profile.speed_at(arc_length))
+
+        linear, angular = self.path_follower.compute_velocity(
+            self.current_position, self.current_angle, max_linear, max_angular)
+
+        forward_value = linear / ROBOT_SPEED
+        turn_value = math.degrees(angular) / ROBOT_TURN_SPEED
+
+        self.path_index = self.follower_path_offset + self.path_follower.nearest_index
+        if self.path_follower.last_lookahead_point is not None:
+            self.current_target = self.path_follower.last_lookahead_point
+
+        self._drive(forward_value, turn_value)
+
     def _stable_final_approach(self):
         """
         Executa uma aproximação final estável e precisa, parando ao chegar.
@@ -757,6 +1490,8 @@ class RobotNavigator:
             print(f"DEBUG: ⚠️ TIMEOUT DA APROXIMAÇÃO FINAL ({self.final_approach_timeout}s)")
             print("DEBUG: Considerando destino alcançado por timeout")
             self.motors.stop()
+            if self.delivery is not None:
+                self.delivery.timeouts += 1
             self.final_approach_start_time = None
             return True # Considera como sucesso para não travar
         
@@ -0,0 +1,226 @@
+"""
+Driver do RPLIDAR pela porta serial, com aquisição em thread dedicada.
+
+A thread lê a porta em blocos (read() em lote), decodifica os pacotes com o
+decodificador vetorizado de rplidar_protocol (SCAN padrão ou cápsulas
+EXPRESS/DENSE, conforme o descritor da resposta) e publica cada volta completa
+no ScanRingBuffer. O laço de controle nunca toca a porta serial: apenas lê o anel.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+import numpy as np
+
+from .config import (RPLIDAR_PORT, RPLIDAR_BAUDRATE, RPLIDAR_TIMEOUT, RPLIDAR_MAX_READ,
+                     RPLIDAR_SCAN_RATE_SMOOTHING, RPLIDAR_SCAN_MODE, LIDAR_MAX_POINTS_PER_SCAN)
+from .lidar_buffer import ScanRingBuffer
+from .rplidar_protocol import (SYNC_BYTE, SYNC_BYTE2, CMD_STOP, CMD_SCAN, DESCRIPTOR_SIZE,
+                               express_scan_command, decoder_for_response)
+
+try:
+    import serial
+    SERIAL_AVAILABLE = True
+except ImportError:
+    serial = None
+    SERIAL_AVAILABLE = False
+
+
+class RPLidarDriver:
+    """Aquisição contínua do RPLIDAR em segundo plano."""
+
+    def __init__(self, port: str = RPLIDAR_PORT, baudrate: int = RPLIDAR_BAUDRATE,
+                 timeout: float = RPLIDAR_TIMEOUT, buffer: Optional[ScanRingBuffer] = None,
+                 scan_mode: str = RPLIDAR_SCAN_MODE):
+        """
+        Args:
+            port: Porta serial do sensor
+            baudrate: Taxa de comunicação
+            timeout: Timeout (s) de leitura da porta
+            buffer: Anel onde as voltas são publicadas (criado se não informado)
+            scan_mode: "STANDARD" (nós de 5 bytes) ou "EXPRESS" (cápsulas; DENSE no C1/S2)
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.buffer = buffer if buffer is not None else ScanRingBuffer()
+        self.scan_mode = scan_mode
+        self.decoder = None
+        self.response_type: Optional[int] = None
+
+        self._serial = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._pending = bytearray()
+
+        # Volta em montagem (arrays pré-alocados)
+        self._revolution_angles = np.zeros(LIDAR_MAX_POINTS_PER_SCAN, dtype=np.float32)
+        self._revolution_ranges = np.zeros(LIDAR_MAX_POINTS_PER_SCAN, dtype=np.float32)
+        self._revolution_qualities = np.zeros(LIDAR_MAX_POINTS_PER_SCAN, dtype=np.uint8)
+        self._revolution_count = 0
+        self._revolution_started = False
+
+        # Estatísticas
+        self.bytes_read = 0
+        self.nodes_received = 0
+        self.dropped_packets = 0
+        self.revolutions = 0
+        self.scan_rate = 0.0
+        self.last_error: Optional[str] = None
+        self._last_revolution_time: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        """Indica se a thread de aquisição está ativa."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Abre a porta, inicia o modo SCAN e a thread de aquisição.
+
+        Returns:
+            True se a aquisição foi iniciada
+        """
+        if not SERIAL_AVAILABLE:
+            print("AVISO: pyserial não disponível - driver do RPLIDAR desativado")
+            return False
+        if self.is_running:
+            return True
+        try:
+            self._serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+            # Nos adaptadores USB dos modelos A1/A2, DTR baixo liga o motor
+            try:
+                self._serial.dtr = False
+            except (OSError, serial.SerialException):
+                pass  # Porta sem linhas de modem (ex.: pty do dispositivo falso)
+            self._send_command(CMD_STOP)
+            time.sleep(0.01)
+            self._serial.reset_input_buffer()
+            if self.scan_mode == "EXPRESS":
+                self._serial.write(express_scan_command())
+                self._serial.flush()
+            else:
+                self._send_command(CMD_SCAN)
+            descriptor = self._serial.read(DESCRIPTOR_SIZE)
+            if len(descriptor) != DESCRIPTOR_SIZE or descriptor[0] != SYNC_BYTE or descriptor[1] != SYNC_BYTE2:
+                raise IOError(f"descritor de resposta inválido: {descriptor.hex()}")
+            self.response_type = descriptor[6]
+            self.decoder = decoder_for_response(self.response_type)
+            if self.decoder is None:
+                raise IOError(f"tipo de resposta não suportado: 0x{self.response_type:02x}")
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Erro ao iniciar RPLIDAR em {self.port}: {e}")
+            self._close_serial()
+            return False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="rplidar-acquisition", daemon=True)
+        self._thread.start()
+        print(f"DEBUG: Aquisição do RPLIDAR iniciada em {self.port} ({self.baudrate} baud)")
+        return True
+
+    def stop(self):
+        """Para a aquisição, o modo SCAN e fecha a porta."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._serial is not None:
+            try:
+                self._send_command(CMD_STOP)
+            except Exception as e:
+                print(f"Erro ao parar RPLIDAR: {e}")
+        self._close_serial()
+
+    def stats(self) -> Dict:
+        """Estatísticas da aquisição."""
+        return {
+            'running': self.is_running,
+            'bytes_read': self.bytes_read,
+            'nodes_received': self.nodes_received,
+            'dropped_packets': self.dropped_packets,
+            'revolutions': self.revolutions,
+            'scan_rate': self.scan_rate,
+            'truncated_scans': self.buffer.truncated_scans,
+            'response_type': self.response_type,
+            'last_error': self.last_error,
+        }
+
+    def _send_command(self, command: int):
+        """Envia um comando sem payload."""
+        self._serial.write(bytes((SYNC_BYTE, command)))
+        self._serial.flush()
+
+    def _close_serial(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+            self._serial = None
+
+    def _run(self):
+        """Laço da thread: leitura em lote, decodificação e publicação das voltas."""
+        while not self._stop_event.is_set():
+            try:
+                # Lê de uma vez tudo o que já chegou; sem dados, espera o primeiro byte (até o timeout)
+                data = self._serial.read(min(self._serial.in_waiting, RPLIDAR_MAX_READ) or 1)
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    self.last_error = str(e)
+                    print(f"Erro de leitura do RPLIDAR: {e}")
+                break
+            if not data:
+                continue
+            self.bytes_read += len(data)
+            self.feed(data)
+
+    def feed(self, data: bytes):
+        """Decodifica bytes recebidos e publica as voltas completas."""
+        self._pending += data
+        starts, qualities, angles, ranges, consumed, dropped = self.decoder(bytes(self._pending))
+        del self._pending[:consumed]
+        self.dropped_packets += dropped
+        self.nodes_received += len(starts)
+        if not len(starts):
+            return
+
+        # Divide os nós nos inícios de volta; o nó com S=1 abre a volta seguinte
+        cursor = 0
+        for boundary in np.flatnonzero(starts).tolist():
+            if boundary > cursor and self._revolution_started:
+                self._append(angles[cursor:boundary], ranges[cursor:boundary], qualities[cursor:boundary])
+            self._finish_revolution()
+            self._revolution_started = True
+            cursor = boundary
+        if self._revolution_started and cursor < len(starts):
+            self._append(angles[cursor:], ranges[cursor:], qualities[cursor:])
+
+    def _append(self, angles: np.ndarray, ranges: np.ndarray, qualities: np.ndarray):
+        """Acrescenta nós à volta em montagem (excesso é descartado)."""
+        start = self._revolution_count
+        count = min(len(angles), len(self._revolution_angles) - start)
+        self._revolution_angles[start:start + count] = angles[:count]
+        self._revolution_ranges[start:start + count] = ranges[:count]
+        self._revolution_qualities[start:start + count] = qualities[:count]
+        self._revolution_count += count
+
+    def _finish_revolution(self):
+        """Publica a volta em montagem no anel e atualiza a taxa de varredura."""
+        if not self._revolution_started or self._revolution_count == 0:
+            self._revolution_count = 0
+            return
+        now = time.time()
+        count = self._revolution_count
+        self.buffer.publish(self._revolution_angles[:count], self._revolution_ranges[:count],
+                            self._revolution_qualities[:count], now)
+        self.revolutions += 1
+        if self._last_revolution_time is not None:
+            period = now - self._last_revolution_time
+            if period > 0:
+                rate = 1.0 / period
+                self.scan_rate = rate if self.scan_rate == 0.0 else (
+                    RPLIDAR_SCAN_RATE_SMOOTHING * rate + (1.0 - RPLIDAR_SCAN_RATE_SMOOTHING) * self.scan_rate)
+        self._last_revolution_time = now
+        self._revolution_count = 0
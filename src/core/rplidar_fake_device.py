@@ -0,0 +1,156 @@
+"""
+Dispositivo RPLIDAR falso sobre um pseudo-terminal (pty).
+
+Permite testar localmente todo o caminho serial -> driver -> anel de scans sem o
+sensor: o driver abre `device.port` como se fosse a porta do RPLIDAR. O dispositivo
+responde aos comandos STOP, RESET, GET_HEALTH, SCAN e EXPRESS_SCAN e transmite
+nós de medição na taxa de varredura configurada. EXPRESS_SCAN é respondido com
+cápsulas DENSE, como no C1.
+
+Uso:
+    device = FakeRPLidarDevice()
+    device.start()
+    driver = RPLidarDriver(port=device.port)
+    driver.start()
+"""
+
+import os
+import pty
+import select
+import threading
+import time
+import tty
+from typing import Callable, Optional
+import numpy as np
+
+from .rplidar_protocol import (SYNC_BYTE, SYNC_BYTE2, CMD_STOP, CMD_RESET, CMD_SCAN, CMD_EXPRESS_SCAN,
+                               CMD_GET_HEALTH, SCAN_RESPONSE_TYPE, DENSE_RESPONSE_TYPE, NODE_SIZE,
+                               CAPSULE_SIZE, DENSE_SAMPLES, encode_standard_nodes, encode_capsules)
+
+SCAN_DESCRIPTOR = bytes((SYNC_BYTE, SYNC_BYTE2, 0x05, 0x00, 0x00, 0x40, SCAN_RESPONSE_TYPE))
+DENSE_DESCRIPTOR = bytes((SYNC_BYTE, SYNC_BYTE2, CAPSULE_SIZE, 0x00, 0x00, 0x40, DENSE_RESPONSE_TYPE))
+HEALTH_RESPONSE = bytes((SYNC_BYTE, SYNC_BYTE2, 0x03, 0x00, 0x00, 0x00, 0x06, 0x00, 0x00, 0x00))
+
+
+class FakeRPLidarDevice:
+    """Simula o RPLIDAR do lado "dispositivo" de um pseudo-terminal."""
+
+    def __init__(self, points_per_scan: int = 360, scan_rate: float = 10.0,
+                 range_function: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 corrupt_every: int = 0):
+        """
+        Args:
+            points_per_scan: Nós transmitidos por volta
+            scan_rate: Voltas por segundo
+            range_function: Recebe os ângulos (graus) e retorna as distâncias (mm);
+                            padrão: sala circular de 3 m
+            corrupt_every: Se > 0, corrompe um nó a cada N voltas (teste de ressincronização)
+        """
+        self.points_per_scan = points_per_scan
+        self.scan_rate = scan_rate
+        self.range_function = range_function or (lambda angles: np.full(len(angles), 3000.0))
+        self.corrupt_every = corrupt_every
+
+        self._master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+
+        self._scanning = threading.Event()
+        self._dense = False
+        self._stop_event = threading.Event()
+        self._threads = []
+        self.revolutions_sent = 0
+        self.corrupted_nodes = 0
+
+    def start(self):
+        """Inicia as threads de comando e de transmissão."""
+        self._stop_event.clear()
+        for target in (self._command_loop, self._stream_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """Para o dispositivo e fecha o pseudo-terminal."""
+        self._stop_event.set()
+        self._scanning.clear()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        for fd in (self._master_fd, self._slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _write(self, data: bytes):
+        try:
+            os.write(self._master_fd, data)
+        except OSError:
+            self._stop_event.set()
+
+    def _command_loop(self):
+        """Lê as requisições do driver e responde."""
+        pending = bytearray()
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self._master_fd], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                pending += os.read(self._master_fd, 64)
+            except OSError:
+                return
+            while len(pending) >= 2:
+                if pending[0] != SYNC_BYTE:
+                    del pending[0]
+                    continue
+                command = pending[1]
+                if command & 0x80:
+                    # Comando com payload: tamanho, payload e checksum
+                    if len(pending) < 3 or len(pending) < 4 + pending[2]:
+                        break
+                    del pending[:4 + pending[2]]
+                else:
+                    del pending[:2]
+                if command in (CMD_STOP, CMD_RESET):
+                    self._scanning.clear()
+                elif command == CMD_GET_HEALTH:
+                    self._write(HEALTH_RESPONSE)
+                elif command == CMD_SCAN:
+                    self._dense = False
+                    self._write(SCAN_DESCRIPTOR)
+                    self._scanning.set()
+                elif command == CMD_EXPRESS_SCAN:
+                    self._dense = True
+                    self._write(DENSE_DESCRIPTOR)
+                    self._scanning.set()
+
+    def _stream_loop(self):
+        """Transmite as voltas enquanto a varredura estiver ativa."""
+        angles = np.linspace(0.0, 360.0, self.points_per_scan, endpoint=False)
+        qualities = np.full(self.points_per_scan, 47, dtype=np.uint8)
+        capsules = max(1, self.points_per_scan // DENSE_SAMPLES)
+        capsule_starts = np.arange(capsules) * 360.0 / capsules
+        capsule_angles = capsule_starts[:, None] + np.arange(DENSE_SAMPLES)[None, :] * (360.0 / capsules) / DENSE_SAMPLES
+        period = 1.0 / self.scan_rate
+        while not self._stop_event.is_set():
+            if not self._scanning.wait(timeout=0.05):
+                continue
+            started = time.time()
+            if self._dense:
+                distances = self.range_function(capsule_angles.ravel()).reshape(capsules, DENSE_SAMPLES)
+                payload = bytearray(encode_capsules(capsule_starts, distances, dense=True,
+                                                    first_is_start=self.revolutions_sent == 0))
+                corrupt_position = (capsules // 2) * CAPSULE_SIZE + 10
+            else:
+                payload = bytearray(encode_standard_nodes(angles, self.range_function(angles), qualities))
+                corrupt_position = (self.points_per_scan // 2) * NODE_SIZE + 1
+            if self.corrupt_every and (self.revolutions_sent + 1) % self.corrupt_every == 0:
+                # Quebra o bit de verificação (nó) ou o checksum (cápsula) no meio da volta
+                payload[corrupt_position] ^= 0x01
+                self.corrupted_nodes += 1
+            self._write(bytes(payload))
+            self.revolutions_sent += 1
+            remaining = period - (time.time() - started)
+            if remaining > 0:
+                time.sleep(remaining)
@@ -0,0 +1,412 @@
+"""
+Protocolo binário do RPLIDAR: decodificação vetorizada dos modos de varredura.
+
+Os blocos lidos da porta serial são interpretados diretamente com np.frombuffer
+sobre dtypes estruturados; a validação dos bits de sincronismo e dos checksums
+é feita em lote. A ressincronização (busca byte a byte) só acontece quando um
+pacote inválido é encontrado.
+
+Formatos suportados:
+- SCAN padrão (tipo 0x81): nós de 5 bytes
+    byte 0: qualidade (6 bits) | !S | S   (S = início de volta)
+    byte 1: ângulo_q6[6:0] | C            (C = bit de verificação, sempre 1)
+    byte 2: ângulo_q6[14:7]
+    bytes 3-4: distância_q2 (little-endian, mm * 4)
+- EXPRESS legado (tipo 0x82): cápsulas de 84 bytes com 16 cabines de 2 amostras
+- DENSE (tipo 0x85, ex.: C1/S2): cápsulas de 84 bytes com 40 distâncias (mm)
+
+Cabeçalho das cápsulas: sync1 (0xA) | checksum[3:0], sync2 (0x5) | checksum[7:4],
+ângulo inicial q6 (15 bits) | S. O checksum é o XOR dos bytes 2..83.
+
+Executar este módulo roda um benchmark dos decodificadores:
+    python -m src.core.rplidar_protocol [fluxo_gravado.bin]
+"""
+
+import sys
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+
+# Comandos e respostas
+SYNC_BYTE = 0xA5
+SYNC_BYTE2 = 0x5A
+CMD_STOP = 0x25
+CMD_RESET = 0x40
+CMD_SCAN = 0x20
+CMD_EXPRESS_SCAN = 0x82
+CMD_GET_HEALTH = 0x52
+DESCRIPTOR_SIZE = 7
+SCAN_RESPONSE_TYPE = 0x81
+EXPRESS_RESPONSE_TYPE = 0x82
+DENSE_RESPONSE_TYPE = 0x85
+
+NODE_SIZE = 5
+CAPSULE_SIZE = 84
+EXPRESS_SAMPLES = 32
+DENSE_SAMPLES = 40
+CAPSULE_SYNC1 = 0xA
+CAPSULE_SYNC2 = 0x5
+EXPRESS_QUALITY = 47  # Cápsulas não trazem qualidade; o SDK usa 0x2F para amostras válidas
+
+STANDARD_NODE_DTYPE = np.dtype([
+    ('sync_quality', np.uint8),
+    ('angle_q6_check', '<u2'),
+    ('distance_q2', '<u2'),
+])
+
+_CAPSULE_HEADER = [
+    ('sync1', np.uint8),
+    ('sync2', np.uint8),
+    ('start_angle_q6', '<u2'),
+]
+
+EXPRESS_CABIN_DTYPE = np.dtype([
+    ('distance_angle_1', '<u2'),
+    ('distance_angle_2', '<u2'),
+    ('offset_angles_q3', np.uint8),
+])
+
+EXPRESS_CAPSULE_DTYPE = np.dtype(_CAPSULE_HEADER + [('cabins', EXPRESS_CABIN_DTYPE, (16,))])
+DENSE_CAPSULE_DTYPE = np.dtype(_CAPSULE_HEADER + [('distances', '<u2', (DENSE_SAMPLES,))])
+
+# Resultado de uma decodificação: (início_de_volta, qualidade, ângulo (rad), distância (m),
+# bytes consumidos, pacotes descartados)
+DecodeResult = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, int, int]
+
+
+def _empty_result(consumed: int = 0, dropped: int = 0) -> DecodeResult:
+    return (np.zeros(0, dtype=bool), np.zeros(0, dtype=np.uint8), np.zeros(0),
+            np.zeros(0), consumed, dropped)
+
+
+def express_scan_command(working_mode: int = 0) -> bytes:
+    """Monta a requisição EXPRESS_SCAN (modo de trabalho + 4 bytes reservados e checksum)."""
+    request = bytes((SYNC_BYTE, CMD_EXPRESS_SCAN, 5, working_mode, 0, 0, 0, 0))
+    checksum = 0
+    for byte in request:
+        checksum ^= byte
+    return request + bytes((checksum,))
+
+
+# ---------------------------------------------------------------------------
+# SCAN padrão
+# ---------------------------------------------------------------------------
+
+def decode_standard_nodes(data: bytes) -> DecodeResult:
+    """
+    Decodifica nós do modo SCAN padrão de forma vetorizada.
+
+    Os trechos alinhados são lidos com np.frombuffer (sem cópia). Ao encontrar um
+    nó inválido, procura o próximo deslocamento em que dois nós seguidos são
+    válidos; cada trecho descartado conta como um pacote perdido.
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    limit = len(raw) - NODE_SIZE + 1  # deslocamentos com um nó completo
+    if limit <= 0:
+        return _empty_result()
+
+    b0 = raw[:limit]
+    valid = ((b0 ^ (b0 >> 1)) & 1).astype(bool) & (raw[1:limit + 1] & 1).astype(bool)
+    # Candidato de ressincronização: nó válido seguido de outro nó válido
+    confirmed = valid.copy()
+    confirmed[:-NODE_SIZE] &= valid[NODE_SIZE:]
+
+    pieces: List[np.ndarray] = []
+    dropped = 0
+    offset = 0
+    while offset < limit:
+        lane = valid[offset::NODE_SIZE]
+        bad = np.flatnonzero(~lane)
+        good = len(lane) if not len(bad) else int(bad[0])
+        if good:
+            pieces.append(np.frombuffer(data, dtype=STANDARD_NODE_DTYPE, count=good, offset=offset))
+            offset += good * NODE_SIZE
+        if offset >= limit:
+            break
+        dropped += 1
+        candidates = np.flatnonzero(confirmed[offset + 1:])
+        if not len(candidates):
+            offset = limit
+            break
+        offset += 1 + int(candidates[0])
+
+    if not pieces:
+        return _empty_result(offset, dropped)
+    nodes = pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+    sync_quality = nodes['sync_quality']
+    return ((sync_quality & 1).astype(bool),
+            sync_quality >> 2,
+            np.radians((nodes['angle_q6_check'] >> 1) / 64.0),
+            nodes['distance_q2'] / 4000.0,
+            offset, dropped)
+
+
+def decode_standard_nodes_python(data: bytes) -> DecodeResult:
+    """Versão de referência em Python puro (um nó por iteração), usada no benchmark."""
+    def is_valid(position: int) -> bool:
+        b0 = data[position]
+        return ((b0 ^ (b0 >> 1)) & 1) == 1 and (data[position + 1] & 1) == 1
+
+    starts, qualities, angles, ranges = [], [], [], []
+    dropped = 0
+    resyncing = False
+    offset = 0
+    end = len(data) - NODE_SIZE
+    while offset <= end:
+        # Na ressincronização exige dois nós válidos seguidos
+        if not is_valid(offset) or (resyncing and offset + NODE_SIZE <= end and not is_valid(offset + NODE_SIZE)):
+            if not resyncing:
+                dropped += 1
+                resyncing = True
+            offset += 1
+            continue
+        resyncing = False
+        b0 = data[offset]
+        angle_q6 = (data[offset + 1] >> 1) | (data[offset + 2] << 7)
+        distance_q2 = data[offset + 3] | (data[offset + 4] << 8)
+        starts.append(b0 & 0x1)
+        qualities.append(b0 >> 2)
+        angles.append(angle_q6 / 64.0)
+        ranges.append(distance_q2 / 4.0)
+        offset += NODE_SIZE
+    return (np.array(starts, dtype=bool), np.array(qualities, dtype=np.uint8),
+            np.radians(np.array(angles, dtype=np.float64)),
+            np.array(ranges, dtype=np.float64) / 1000.0, offset, dropped)
+
+
+def encode_standard_nodes(angles_deg: np.ndarray, ranges_mm: np.ndarray, qualities: np.ndarray,
+                          first_is_start: bool = True) -> bytes:
+    """Codifica amostras como nós do modo SCAN padrão (5 bytes por nó)."""
+    count = len(angles_deg)
+    nodes = np.zeros(count, dtype=STANDARD_NODE_DTYPE)
+    starts = np.zeros(count, dtype=np.uint8)
+    if first_is_start and count:
+        starts[0] = 1
+    angle_q6 = (np.asarray(angles_deg) * 64.0).astype(np.uint16) & 0x7FFF
+    nodes['sync_quality'] = (np.asarray(qualities, dtype=np.uint8) << 2) | ((1 - starts) << 1) | starts
+    nodes['angle_q6_check'] = (angle_q6 << 1) | 0x1
+    nodes['distance_q2'] = np.clip(np.asarray(ranges_mm) * 4.0, 0, 0xFFFF).astype(np.uint16)
+    return nodes.tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Cápsulas EXPRESS / DENSE
+# ---------------------------------------------------------------------------
+
+def _valid_capsules(raw: np.ndarray) -> np.ndarray:
+    """Valida em lote sincronismo e checksum de cápsulas alinhadas (K, 84)."""
+    checksum = (raw[:, 0] & 0xF) | ((raw[:, 1] & 0xF) << 4)
+    return (((raw[:, 0] >> 4) == CAPSULE_SYNC1) & ((raw[:, 1] >> 4) == CAPSULE_SYNC2)
+            & (np.bitwise_xor.reduce(raw[:, 2:], axis=1) == checksum))
+
+
+class CapsuleDecoder:
+    """
+    Decodificador com estado das cápsulas EXPRESS (0x82) e DENSE (0x85).
+
+    O ângulo de cada amostra depende do ângulo inicial da cápsula seguinte, por isso
+    a última cápsula recebida fica pendente até a próxima chegar.
+    """
+
+    def __init__(self, dense: bool = True):
+        self.dense = dense
+        self.dtype = DENSE_CAPSULE_DTYPE if dense else EXPRESS_CAPSULE_DTYPE
+        self.samples = DENSE_SAMPLES if dense else EXPRESS_SAMPLES
+        self._previous: Optional[np.ndarray] = None
+        self._last_angle: Optional[float] = None
+        self._resyncing = False  # Ressincronização que chegou ao fim dos dados sem achar cápsula válida
+
+    def reset(self):
+        """Descarta o estado (ex.: após reiniciar a varredura)."""
+        self._previous = None
+        self._last_angle = None
+        self._resyncing = False
+
+    def feed(self, data: bytes) -> DecodeResult:
+        """Decodifica as cápsulas completas contidas em `data`."""
+        raw = np.frombuffer(data, dtype=np.uint8)
+        pieces: List[np.ndarray] = []
+        dropped = 0
+        offset = 0
+        while len(raw) - offset >= CAPSULE_SIZE:
+            count = (len(raw) - offset) // CAPSULE_SIZE
+            block = raw[offset:offset + count * CAPSULE_SIZE].reshape(count, CAPSULE_SIZE)
+            bad = np.flatnonzero(~_valid_capsules(block))
+            good = count if not len(bad) else int(bad[0])
+            if good:
+                pieces.append(np.frombuffer(data, dtype=self.dtype, count=good, offset=offset))
+                offset += good * CAPSULE_SIZE
+                self._resyncing = False
+            if good == count:
+                break
+            # Ressincronização: próximo par de bytes de sincronismo com checksum válido. Se a
+            # anterior continua neste bloco, o trecho inválido é o mesmo pacote perdido.
+            if not self._resyncing:
+                dropped += 1
+                pieces.append(None)  # Marca a lacuna: a cápsula anterior não tem sucessora conhecida
+                self._resyncing = True
+            offset = self._resync(raw, offset + 1)
+
+        results = [self._decode_run(piece) for piece in pieces]
+        results = [result for result in results if result is not None]
+        if not results:
+            return _empty_result(offset, dropped)
+        angles = np.concatenate([r[0] for r in results])
+        distances = np.concatenate([r[1] for r in results])
+
+        # Início de volta: o ângulo volta a diminuir
+        previous = np.empty_like(angles)
+        previous[0] = self._last_angle if self._last_angle is not None else angles[0]
+        previous[1:] = angles[:-1]
+        starts = angles < previous
+        self._last_angle = float(angles[-1])
+
+        qualities = np.where(distances > 0, EXPRESS_QUALITY, 0).astype(np.uint8)
+        return starts, qualities, np.radians(angles), distances / 1000.0, offset, dropped
+
+    def _resync(self, raw: np.ndarray, start: int) -> int:
+        """Procura o próximo deslocamento com uma cápsula válida (ou o fim dos dados completos)."""
+        last = len(raw) - CAPSULE_SIZE
+        if start > last:
+            return start
+        window = raw[start:last + 2]
+        candidates = np.flatnonzero(((window[:-1] >> 4) == CAPSULE_SYNC1) & ((window[1:] >> 4) == CAPSULE_SYNC2))
+        for candidate in candidates.tolist():
+            position = start + candidate
+            if _valid_capsules(raw[position:position + CAPSULE_SIZE].reshape(1, CAPSULE_SIZE))[0]:
+                return position
+        return last + 1
+
+    def _decode_run(self, capsules: Optional[np.ndarray]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Decodifica um trecho contíguo de cápsulas (None marca uma lacuna)."""
+        if capsules is None:
+            self._previous = None
+            return None
+        if self._previous is not None:
+            capsules = np.concatenate([self._previous, capsules])
+        self._previous = capsules[-1:].copy()
+        if len(capsules) < 2:
+            return None
+
+        start_angles = (capsules['start_angle_q6'] & 0x7FFF) / 64.0
+        current = start_angles[:-1]
+        span = (start_angles[1:] - current) % 360.0
+        steps = np.arange(self.samples) / self.samples
+        angles = current[:, None] + span[:, None] * steps[None, :]
+
+        body = capsules[:-1]
+        if self.dense:
+            distances = body['distances'].astype(np.float64)
+        else:
+            cabins = body['cabins']
+            first = cabins['distance_angle_1']
+            second = cabins['distance_angle_2']
+            offsets = cabins['offset_angles_q3']
+            distances = np.stack([first >> 2, second >> 2], axis=-1).reshape(len(body), -1).astype(np.float64)
+            magnitude_1 = (offsets & 0xF) | ((first & 0x1) << 4)
+            magnitude_2 = (offsets >> 4) | ((second & 0x1) << 4)
+            sign_1 = np.where(first & 0x2, -1.0, 1.0)
+            sign_2 = np.where(second & 0x2, -1.0, 1.0)
+            compensation = np.stack([magnitude_1 * sign_1, magnitude_2 * sign_2], axis=-1).reshape(len(body), -1) / 8.0
+            angles = angles - compensation
+        return (angles.ravel() % 360.0), distances.ravel()
+
+
+def encode_capsules(start_angles_deg: np.ndarray, distances_mm: np.ndarray, dense: bool = True,
+                    first_is_start: bool = True) -> bytes:
+    """
+    Codifica cápsulas DENSE (40 distâncias) ou EXPRESS (32 distâncias, sem compensação angular).
+
+    Args:
+        start_angles_deg: Ângulo inicial de cada cápsula
+        distances_mm: Distâncias (K, amostras por cápsula)
+    """
+    count = len(start_angles_deg)
+    capsules = np.zeros(count, dtype=DENSE_CAPSULE_DTYPE if dense else EXPRESS_CAPSULE_DTYPE)
+    start_q6 = (np.asarray(start_angles_deg) * 64.0).astype(np.uint16) & 0x7FFF
+    if first_is_start and count:
+        start_q6[0] |= 0x8000
+    capsules['start_angle_q6'] = start_q6
+    distances = np.clip(np.asarray(distances_mm), 0, 0xFFFF if dense else 0x3FFF).astype(np.uint16)
+    if dense:
+        capsules['distances'] = distances
+    else:
+        capsules['cabins']['distance_angle_1'] = distances[:, 0::2] << 2
+        capsules['cabins']['distance_angle_2'] = distances[:, 1::2] << 2
+
+    raw = capsules.view(np.uint8).reshape(count, CAPSULE_SIZE)
+    checksum = np.bitwise_xor.reduce(raw[:, 2:], axis=1)
+    raw[:, 0] = (CAPSULE_SYNC1 << 4) | (checksum & 0xF)
+    raw[:, 1] = (CAPSULE_SYNC2 << 4) | (checksum >> 4)
+    return raw.tobytes()
+
+
+def decoder_for_response(response_type: int):
+    """Retorna a função de decodificação adequada ao tipo de resposta do descritor."""
+    if response_type == SCAN_RESPONSE_TYPE:
+        return decode_standard_nodes
+    if response_type == EXPRESS_RESPONSE_TYPE:
+        return CapsuleDecoder(dense=False).feed
+    if response_type == DENSE_RESPONSE_TYPE:
+        return CapsuleDecoder(dense=True).feed
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _synthetic_standard_stream(nodes: int, points_per_scan: int = 720, corrupt_every: int = 1000) -> bytes:
+    """Gera um fluxo SCAN padrão com alguns nós corrompidos."""
+    angles = (np.arange(nodes) % points_per_scan) * 360.0 / points_per_scan
+    ranges = 1000.0 + 500.0 * np.sin(np.radians(angles) * 3)
+    data = np.frombuffer(encode_standard_nodes(angles, ranges, np.full(nodes, 47)), dtype=np.uint8).copy()
+    starts = (np.arange(nodes) % points_per_scan) == 0
+    data.reshape(nodes, NODE_SIZE)[:, 0] = (47 << 2) | ((~starts).astype(np.uint8) << 1) | starts
+    if corrupt_every:
+        data.reshape(nodes, NODE_SIZE)[corrupt_every // 2::corrupt_every, 1] &= 0xFE
+    return data.tobytes()
+
+
+def _synthetic_dense_stream(capsules: int, samples_per_scan: int = 3200) -> bytes:
+    """Gera um fluxo de cápsulas DENSE contínuo."""
+    step = 360.0 * DENSE_SAMPLES / samples_per_scan
+    starts = (np.arange(capsules) * step) % 360.0
+    distances = np.tile(np.linspace(500, 4000, DENSE_SAMPLES), (capsules, 1))
+    return encode_capsules(starts, distances, dense=True)
+
+
+def _time_decoder(decoder, data: bytes, chunk: int) -> Tuple[float, int]:
+    started = time.perf_counter()
+    pending = b""
+    samples = 0
+    for position in range(0, len(data), chunk):
+        pending += data[position:position + chunk]
+        result = decoder(pending)
+        samples += len(result[0])
+        pending = pending[result[4]:]
+    return time.perf_counter() - started, samples
+
+
+def run_benchmark(recorded: Optional[bytes] = None, chunk: int = 4096):
+    """Compara os decodificadores sobre um fluxo gravado ou sintético."""
+    print(f"Benchmark do decodificador RPLIDAR (blocos de {chunk} bytes)")
+    standard = recorded if recorded is not None else _synthetic_standard_stream(200000)
+    for name, decoder in (("python", decode_standard_nodes_python), ("numpy", decode_standard_nodes)):
+        elapsed, samples = _time_decoder(decoder, standard, chunk)
+        print(f"  SCAN padrão [{name:6s}]: {samples} nós em {elapsed:.3f}s -> {samples / elapsed:,.0f} nós/s")
+
+    if recorded is None:
+        dense = _synthetic_dense_stream(20000)
+        decoder = CapsuleDecoder(dense=True)
+        elapsed, samples = _time_decoder(decoder.feed, dense, chunk)
+        print(f"  DENSE      [numpy ]: {samples} amostras em {elapsed:.3f}s -> {samples / elapsed:,.0f} amostras/s")
+    print("  Referência: C1 ~5.000 amostras/s, S2 ~32.000 amostras/s")
+
+
+if __name__ == '__main__':
+    recorded_stream = None
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            recorded_stream = f.read()
+    run_benchmark(recorded_stream)
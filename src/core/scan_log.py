@@ -0,0 +1,456 @@
+"""
+Gravação e reprodução em formato binário do que o robô viu durante a operação.
+
+O log é um arquivo somente de acréscimo com registros de tamanho variável:
+
+    cabeçalho do arquivo (16 bytes): 'RGSL', versão, instante de criação
+    registro: cabeçalho (tipo, quantidade, instante) + payload (array estruturado)
+
+Os payloads são os próprios arrays NumPy (SCAN_DTYPE, OBSTACLE_DTYPE, comandos dos
+motores e poses), alinhados a 8 bytes, e podem ser lidos sem cópia a partir do
+arquivo mapeado em memória. Os registros são acumulados em blocos e cada bloco é
+escrito com uma única chamada; junto ao arquivo fica um índice (<log>.idx) com o
+instante, o deslocamento, o tipo e a quantidade de cada registro. Se o processo
+for interrompido entre o bloco e o índice, o leitor reconstrói as entradas que
+faltam percorrendo os cabeçalhos.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import numpy as np
+
+from .lidar_buffer import SCAN_DTYPE, ScanRingBuffer
+from .obstacle_extractor import OBSTACLE_DTYPE
+from .config import SCAN_LOG_CHUNK_SIZE, SCAN_LOG_FLUSH_INTERVAL
+
+LOG_MAGIC = b'RGSL'
+LOG_VERSION = 1
+
+# Tipos de registro
+RECORD_SCAN = 1
+RECORD_OBSTACLES = 2
+RECORD_MOTOR = 3
+RECORD_POSE = 4
+
+FILE_HEADER_DTYPE = np.dtype([('magic', 'S4'), ('version', '<u2'), ('reserved', '<u2'), ('created', '<f8')])
+RECORD_HEADER_DTYPE = np.dtype([('type', '<u4'), ('count', '<u4'), ('timestamp', '<f8')])
+INDEX_DTYPE = np.dtype([('timestamp', '<f8'), ('offset', '<u8'), ('type', '<u4'), ('count', '<u4')])
+
+# Comando dos motores (-100 a 100) e pose do robô (x, y em m; ângulo em graus)
+MOTOR_DTYPE = np.dtype([('left', '<f4'), ('right', '<f4')])
+POSE_DTYPE = np.dtype([('x', '<f8'), ('y', '<f8'), ('angle', '<f8')])
+
+RECORD_DTYPES = {
+    RECORD_SCAN: SCAN_DTYPE,
+    RECORD_OBSTACLES: OBSTACLE_DTYPE,
+    RECORD_MOTOR: MOTOR_DTYPE,
+    RECORD_POSE: POSE_DTYPE,
+}
+
+
+def _padded(size: int) -> int:
+    """Tamanho arredondado para múltiplo de 8 bytes."""
+    return (size + 7) & ~7
+
+
+def index_path(path: str) -> str:
+    """Caminho do índice de um log."""
+    return path + '.idx'
+
+
+def repair_log(path: str) -> int:
+    """
+    Prepara um log existente para ser continuado: descarta o registro incompleto do fim
+    (processo interrompido no meio de um bloco) e reescreve o índice só com entradas
+    inteiras de registros completos, incluindo as que faltavam.
+
+    Raises:
+        ValueError: Se o arquivo não é um log válido (não é continuado)
+
+    Returns:
+        Bytes descartados do fim do log
+    """
+    reader = ScanLogReader(path)
+    index = reader.index.copy()
+    reader.close()
+    del reader  # Libera o mapeamento antes de truncar o arquivo
+    ends = index['offset'] + RECORD_HEADER_DTYPE.itemsize + ScanLogReader._payload_sizes(index)
+    data_end = int(ends.max()) if len(index) else FILE_HEADER_DTYPE.itemsize
+    size = os.path.getsize(path)
+    idx_path = index_path(path)
+    idx_size = os.path.getsize(idx_path) if os.path.exists(idx_path) else 0
+    if size > data_end:
+        print(f"DEBUG: Log {path} interrompido: {size - data_end} bytes de registro incompleto descartados")
+        os.truncate(path, data_end)
+    if idx_size != index.nbytes:
+        with open(idx_path, 'wb') as f:
+            f.write(index.tobytes())
+    return size - data_end
+
+
+class ScanLogWriter:
+    """Grava registros em blocos no log e no índice (seguro para várias threads)."""
+
+    def __init__(self, path: str, chunk_size: int = SCAN_LOG_CHUNK_SIZE,
+                 flush_interval: float = SCAN_LOG_FLUSH_INTERVAL):
+        """
+        Args:
+            path: Arquivo do log (criado ou continuado; o índice fica em <path>.idx)
+            chunk_size: Bytes acumulados em memória antes de escrever um bloco
+            flush_interval: Tempo máximo (s) que um registro espera em memória
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) < FILE_HEADER_DTYPE.itemsize
+        if new_file and os.path.exists(path):
+            # Cabeçalho incompleto (interrompido na criação): o log recomeça
+            os.truncate(path, 0)
+        elif not new_file:
+            repair_log(path)
+        self._data = open(path, 'ab')
+        # Log novo: um índice que sobrou de um log anterior não vale para ele
+        self._index = open(index_path(path), 'wb' if new_file else 'ab')
+        if new_file:
+            header = np.zeros(1, dtype=FILE_HEADER_DTYPE)
+            header['magic'] = LOG_MAGIC
+            header['version'] = LOG_VERSION
+            header['created'] = time.time()
+            self._data.write(header.tobytes())
+            self._data.flush()
+        self._offset = self._data.tell()
+
+        self._lock = threading.Lock()
+        self._chunk = bytearray()
+        self._chunk_index = []
+        self._last_flush = time.time()
+        self.records_written = 0
+        self.bytes_written = self._offset
+
+    @property
+    def closed(self) -> bool:
+        return self._data.closed
+
+    def write(self, record_type: int, payload: np.ndarray, timestamp: Optional[float] = None):
+        """
+        Acrescenta um registro.
+
+        Args:
+            record_type: RECORD_SCAN, RECORD_OBSTACLES, RECORD_MOTOR ou RECORD_POSE
+            payload: Array com o dtype do tipo de registro
+            timestamp: Instante do registro (padrão: agora)
+        """
+        dtype = RECORD_DTYPES[record_type]
+        payload = np.ascontiguousarray(payload, dtype=dtype)
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        header = np.zeros(1, dtype=RECORD_HEADER_DTYPE)
+        header['type'] = record_type
+        header['count'] = len(payload)
+        header['timestamp'] = timestamp
+        body = payload.tobytes()
+        with self._lock:
+            if self._data.closed:
+                return
+            offset = self._offset + len(self._chunk)
+            self._chunk += header.tobytes()
+            self._chunk += body
+            self._chunk += bytes(_padded(len(body)) - len(body))
+            self._chunk_index.append((timestamp, offset, record_type, len(payload)))
+            self.records_written += 1
+            if len(self._chunk) >= self.chunk_size or time.time() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def write_scan(self, scan: np.ndarray, timestamp: Optional[float] = None):
+        """Grava uma volta do LIDAR (SCAN_DTYPE)."""
+        self.write(RECORD_SCAN, scan, timestamp)
+
+    def write_obstacles(self, obstacles: np.ndarray, timestamp: Optional[float] = None):
+        """Grava os obstáculos extraídos de uma volta (OBSTACLE_DTYPE)."""
+        self.write(RECORD_OBSTACLES, obstacles, timestamp)
+
+    def write_motor(self, left_speed: float, right_speed: float, timestamp: Optional[float] = None):
+        """Grava um comando dos motores."""
+        self.write(RECORD_MOTOR, np.array([(left_speed, right_speed)], dtype=MOTOR_DTYPE), timestamp)
+
+    def write_pose(self, pose: Tuple[float, float, float], timestamp: Optional[float] = None):
+        """Grava uma pose do robô (x, y, ângulo em graus)."""
+        self.write(RECORD_POSE, np.array([tuple(pose)], dtype=POSE_DTYPE), timestamp)
+
+    def flush(self):
+        """Escreve o bloco pendente no log e no índice."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.time()
+        if not self._chunk or self._data.closed:
+            return
+        # O bloco vai primeiro para o log; o índice só aponta para dados já escritos
+        self._data.write(self._chunk)
+        self._data.flush()
+        self._index.write(np.array(self._chunk_index, dtype=INDEX_DTYPE).tobytes())
+        self._index.flush()
+        self._offset += len(self._chunk)
+        self.bytes_written = self._offset
+        self._chunk = bytearray()
+        self._chunk_index = []
+
+    def close(self):
+        """Escreve o bloco pendente e fecha os arquivos."""
+        with self._lock:
+            if self._data.closed:
+                return
+            self._flush_locked()
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+class ScanLogReader:
+    """Leitura do log mapeado em memória, com acesso pelo índice de instantes."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Arquivo do log
+
+        Raises:
+            ValueError: Se o arquivo não é um log válido
+        """
+        self.path = path
+        size = os.path.getsize(path)
+        if size < FILE_HEADER_DTYPE.itemsize:
+            raise ValueError(f"log vazio ou truncado: {path}")
+        self._data = np.memmap(path, dtype=np.uint8, mode='r')
+        header = np.frombuffer(self._data, dtype=FILE_HEADER_DTYPE, count=1)[0]
+        if header['magic'] != LOG_MAGIC:
+            raise ValueError(f"arquivo não é um log de scans: {path}")
+        if header['version'] > LOG_VERSION:
+            raise ValueError(f"versão do log não suportada: {header['version']}")
+        self.created = float(header['created'])
+        self.index = self._load_index()
+        # Ordem de reprodução: por instante, estável em relação à ordem de gravação
+        self.order = np.argsort(self.index['timestamp'], kind='stable')
+
+    def _load_index(self) -> np.ndarray:
+        """Carrega o índice, descarta entradas além do fim do log e reconstrói as que faltam."""
+        path = index_path(self.path)
+        index = np.zeros(0, dtype=INDEX_DTYPE)
+        if os.path.exists(path):
+            raw = np.fromfile(path, dtype=np.uint8)
+            index = raw[:len(raw) - len(raw) % INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+        ends = index['offset'] + RECORD_HEADER_DTYPE.itemsize + self._payload_sizes(index)
+        index = index[ends <= len(self._data)]
+        start = int(ends[len(index) - 1]) if len(index) else FILE_HEADER_DTYPE.itemsize
+        missing = self._scan_records(start)
+        if len(missing):
+            print(f"DEBUG: Índice do log reconstruído: {len(missing)} registros recuperados")
+            index = np.concatenate([index, missing])
+        return index
+
+    @staticmethod
+    def _payload_sizes(index: np.ndarray) -> np.ndarray:
+        """Tamanho (com alinhamento) do payload de cada entrada do índice."""
+        itemsizes = np.zeros(len(index), dtype=np.uint64)
+        for record_type, dtype in RECORD_DTYPES.items():
+            itemsizes[index['type'] == record_type] = dtype.itemsize
+        return (index['count'].astype(np.uint64) * itemsizes + 7) & ~np.uint64(7)
+
+    def _scan_records(self, offset: int) -> np.ndarray:
+        """Percorre os cabeçalhos a partir de `offset` (recuperação do índice)."""
+        entries = []
+        header_size = RECORD_HEADER_DTYPE.itemsize
+        while offset + header_size <= len(self._data):
+            header = np.frombuffer(self._data, dtype=RECORD_HEADER_DTYPE, count=1, offset=offset)[0]
+            dtype = RECORD_DTYPES.get(int(header['type']))
+            if dtype is None:
+                break
+            end = offset + header_size + _padded(int(header['count']) * dtype.itemsize)
+            if end > len(self._data):
+                break
+            entries.append((header['timestamp'], offset, header['type'], header['count']))
+            offset = end
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def time_range(self) -> Tuple[float, float]:
+        """Primeiro e último instante gravados."""
+        if not len(self.index):
+            return (0.0, 0.0)
+        timestamps = self.index['timestamp']
+        return float(timestamps.min()), float(timestamps.max())
+
+    def counts(self) -> Dict[int, int]:
+        """Número de registros por tipo."""
+        types, counts = np.unique(self.index['type'], return_counts=True)
+        return dict(zip(types.tolist(), counts.tolist()))
+
+    def payload(self, position: int) -> np.ndarray:
+        """Payload (view sem cópia do arquivo mapeado) da entrada `position` do índice."""
+        entry = self.index[position]
+        dtype = RECORD_DTYPES[int(entry['type'])]
+        return np.frombuffer(self._data, dtype=dtype, count=int(entry['count']),
+                             offset=int(entry['offset']) + RECORD_HEADER_DTYPE.itemsize)
+
+    def find(self, timestamp: float) -> int:
+        """Posição, na ordem de reprodução, do primeiro registro em ou após `timestamp`."""
+        return int(np.searchsorted(self.index['timestamp'][self.order], timestamp, side='left'))
+
+    def records(self, types: Optional[Tuple[int, ...]] = None, start: Optional[float] = None,
+                end: Optional[float] = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """
+        Registros em ordem de instante.
+
+        Args:
+            types: Tipos desejados (padrão: todos)
+            start: Instante inicial (padrão: início do log)
+            end: Instante final, inclusivo (padrão: fim do log)
+
+        Yields:
+            Tuplas (tipo, instante, payload)
+        """
+        order = self.order[self.find(start):] if start is not None else self.order
+        if types is not None:
+            order = order[np.isin(self.index['type'][order], types)]
+        for position in order:
+            timestamp = float(self.index['timestamp'][position])
+            if end is not None and timestamp > end:
+                return
+            yield int(self.index['type'][position]), timestamp, self.payload(position)
+
+    def close(self):
+        """Libera o mapeamento do arquivo (payloads já obtidos continuam válidos até serem descartados)."""
+        self._data = np.zeros(0, dtype=np.uint8)
+        self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self.order = np.zeros(0, dtype=np.int64)
+
+
+class ScanLogReplay:
+    """
+    Reproduz um log pelas mesmas interfaces da operação: as voltas são publicadas no
+    ScanRingBuffer (como faz o driver) e os demais registros vão para callbacks.
+
+    A reprodução pode ser síncrona (step) ou em thread (start), em qualquer velocidade;
+    speed <= 0 reproduz o mais rápido possível.
+    """
+
+    def __init__(self, reader: ScanLogReader, buffer: ScanRingBuffer, speed: float = 1.0,
+                 on_pose: Optional[Callable[[Tuple[float, float, float], float], None]] = None,
+                 on_motor: Optional[Callable[[float, float, float], None]] = None,
+                 on_obstacles: Optional[Callable[[np.ndarray, float], None]] = None):
+        """
+        Args:
+            reader: Log aberto
+            buffer: Anel onde as voltas são publicadas
+            speed: Fator de velocidade em relação ao tempo gravado (<= 0: sem espera)
+            on_pose: Recebe (pose, instante) de cada pose gravada
+            on_motor: Recebe (esquerda, direita, instante) de cada comando dos motores
+            on_obstacles: Recebe (obstáculos, instante) de cada extração gravada
+        """
+        self.reader = reader
+        self.buffer = buffer
+        self.speed = speed
+        self.on_pose = on_pose
+        self.on_motor = on_motor
+        self.on_obstacles = on_obstacles
+        self.position = 0  # Próximo registro, na ordem de reprodução
+        self.records_replayed = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        """Indica se todos os registros já foram entregues."""
+        return self.position >= len(self.reader)
+
+    @property
+    def is_running(self) -> bool:
+        """Indica se a thread de reprodução está ativa."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def seek(self, timestamp: float):
+        """Posiciona a reprodução no primeiro registro em ou após `timestamp`."""
+        self.position = self.reader.find(timestamp)
+
+    def step(self) -> Optional[Tuple[int, float]]:
+        """
+        Entrega o próximo registro, sem espera.
+
+        Returns:
+            Tupla (tipo, instante) do registro entregue, ou None no fim do log
+        """
+        if self.finished:
+            return None
+        entry_position = int(self.reader.order[self.position])
+        self.position += 1
+        record_type = int(self.reader.index['type'][entry_position])
+        timestamp = float(self.reader.index['timestamp'][entry_position])
+        payload = self.reader.payload(entry_position)
+        if record_type == RECORD_SCAN and len(payload):
+            self.buffer.publish_structured(payload)
+        elif record_type == RECORD_POSE and self.on_pose is not None and len(payload):
+            self.on_pose((float(payload['x'][0]), float(payload['y'][0]), float(payload['angle'][0])), timestamp)
+        elif record_type == RECORD_MOTOR and self.on_motor is not None and len(payload):
+            self.on_motor(float(payload['left'][0]), float(payload['right'][0]), timestamp)
+        elif record_type == RECORD_OBSTACLES and self.on_obstacles is not None:
+            self.on_obstacles(payload, timestamp)
+        self.records_replayed += 1
+        return record_type, timestamp
+
+    def step_until_scan(self) -> Optional[float]:
+        """
+        Entrega registros até a próxima volta do LIDAR (inclusive).
+
+        Returns:
+            Instante da volta publicada, ou None no fim do log
+        """
+        while True:
+            result = self.step()
+            if result is None:
+                return None
+            if result[0] == RECORD_SCAN:
+                return result[1]
+
+    def run(self):
+        """Reproduz até o fim (ou até stop), respeitando a velocidade."""
+        wall_start = time.time()
+        log_start: Optional[float] = None
+        while not self.finished and not self._stop_event.is_set():
+            entry_position = int(self.reader.order[self.position])
+            timestamp = float(self.reader.index['timestamp'][entry_position])
+            if log_start is None:
+                log_start = timestamp
+            if self.speed > 0:
+                wait = wall_start + (timestamp - log_start) / self.speed - time.time()
+                if wait > 0 and self._stop_event.wait(wait):
+                    break
+            self.step()
+
+    def start(self):
+        """Inicia a reprodução em segundo plano."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="scan-log-replay", daemon=True)
+        self._thread.start()
+        print(f"DEBUG: Reprodução do log {self.reader.path} iniciada (velocidade {self.speed}x)")
+
+    def stop(self):
+        """Interrompe a reprodução em segundo plano."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
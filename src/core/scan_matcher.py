@@ -0,0 +1,235 @@
+"""
+Localização por casamento de scans (correlative scan matching) contra o mapa de ocupação.
+
+O mapa é convertido uma vez em um campo de verossimilhança: para cada célula,
+exp(-d² / 2σ²), em que d é a distância (transformada de distância) até a célula
+ocupada mais próxima. O casamento de uma volta procura a pose que maximiza a
+média do campo sobre os pontos do scan:
+
+1. busca exaustiva vetorizada em uma janela de translações e rotações em torno
+   da pose de odometria, com consulta direta às células do campo;
+2. refinamento local (subida de encosta com passos decrescentes) com
+   interpolação bilinear do campo, para precisão abaixo do tamanho da célula.
+
+O custo é limitado pela subamostragem dos pontos do scan (max_points).
+"""
+
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+import numpy as np
+from scipy import ndimage
+
+from .obstacle_extractor import ObstacleExtractor
+from .config import (MAP_GRID_SIZE, SCAN_MATCH_SIGMA, SCAN_MATCH_LINEAR_WINDOW, SCAN_MATCH_LINEAR_STEP,
+                     SCAN_MATCH_ANGULAR_WINDOW, SCAN_MATCH_ANGULAR_STEP, SCAN_MATCH_MIN_SCORE,
+                     SCAN_MATCH_MAX_POINTS, SCAN_MATCH_MIN_POINTS)
+
+
+def build_likelihood_field(occupied: np.ndarray, resolution: float, sigma: float) -> np.ndarray:
+    """
+    Campo de verossimilhança de um mapa de ocupação.
+
+    Args:
+        occupied: Máscara booleana [y, x] das células ocupadas
+        resolution: Lado da célula (m)
+        sigma: Desvio (m) do ruído de medição
+
+    Returns:
+        Array float32 [y, x] com exp(-d² / 2σ²), d a distância à célula ocupada mais próxima
+    """
+    distances = ndimage.distance_transform_edt(~np.asarray(occupied, dtype=bool)) * resolution
+    return np.exp(-(distances * distances) / (2.0 * sigma * sigma)).astype(np.float32)
+
+
+class ScanMatcher:
+    """Corrige a pose de odometria casando cada volta do LIDAR com o mapa."""
+
+    def __init__(self, sigma: float = SCAN_MATCH_SIGMA, linear_window: float = SCAN_MATCH_LINEAR_WINDOW,
+                 linear_step: float = SCAN_MATCH_LINEAR_STEP, angular_window: float = SCAN_MATCH_ANGULAR_WINDOW,
+                 angular_step: float = SCAN_MATCH_ANGULAR_STEP, min_score: float = SCAN_MATCH_MIN_SCORE,
+                 max_points: int = SCAN_MATCH_MAX_POINTS, min_points: int = SCAN_MATCH_MIN_POINTS,
+                 extractor: Optional[ObstacleExtractor] = None, timing_window: int = 100):
+        """
+        Args:
+            sigma: Desvio (m) do campo de verossimilhança
+            linear_window: Meia largura (m) da janela de busca em x e y
+            linear_step: Passo (m) da busca exaustiva em translação
+            angular_window: Meia largura (graus) da janela de busca em rotação
+            angular_step: Passo (graus) da busca exaustiva em rotação
+            min_score: Pontuação média mínima (0 a 1) para aceitar o casamento
+            max_points: Pontos do scan usados no casamento (subamostragem uniforme)
+            min_points: Pontos válidos mínimos para tentar o casamento
+            extractor: Conversor polar -> robô (montagem do LIDAR e faixa válida)
+            timing_window: Casamentos considerados nas estatísticas de tempo
+        """
+        self.sigma = sigma
+        self.linear_window = linear_window
+        self.linear_step = linear_step
+        self.angular_window = angular_window
+        self.angular_step = angular_step
+        self.min_score = min_score
+        self.max_points = max_points
+        self.min_points = min_points
+        self.extractor = extractor if extractor is not None else ObstacleExtractor()
+
+        self.field: Optional[np.ndarray] = None  # [y, x], verossimilhança em [0, 1]
+        self._padded_field: Optional[np.ndarray] = None
+        self.resolution = MAP_GRID_SIZE
+
+        self.match_times = deque(maxlen=timing_window)
+        self.matches = 0
+        self.rejected = 0
+        self.last_score = 0.0
+        self.last_correction = (0.0, 0.0, 0.0)
+
+    @property
+    def has_map(self) -> bool:
+        """Indica se há um mapa para casar os scans."""
+        return self.field is not None
+
+    def set_map(self, occupied: Optional[np.ndarray], resolution: float = MAP_GRID_SIZE):
+        """
+        Pré-calcula o campo de verossimilhança do mapa.
+
+        Args:
+            occupied: Máscara booleana [y, x] das células ocupadas, ou None para desativar
+            resolution: Lado da célula (m)
+        """
+        if occupied is None or not np.any(occupied):
+            self.field = None
+            self._padded_field = None
+            return
+        started = time.perf_counter()
+        self.field = build_likelihood_field(occupied, resolution, self.sigma)
+        self._padded_field = np.pad(self.field, 1)  # borda de zeros para a busca exaustiva
+        self.resolution = resolution
+        print(f"DEBUG: Campo de verossimilhança calculado em {(time.perf_counter() - started) * 1000:.1f}ms "
+              f"({occupied.shape[1]}x{occupied.shape[0]} células)")
+
+    # ------------------------------------------------------------------
+    # Casamento
+    # ------------------------------------------------------------------
+
+    def scan_points(self, scan: np.ndarray) -> np.ndarray:
+        """Pontos válidos da volta no referencial do robô, subamostrados para max_points."""
+        ranges = np.asarray(scan['range'], dtype=np.float64)
+        valid = ((ranges >= self.extractor.min_range) & (ranges <= self.extractor.max_range) &
+                 (np.asarray(scan['quality']) > 0))
+        points = self.extractor.polar_to_robot(scan['angle'][valid], ranges[valid])
+        if len(points) > self.max_points:
+            points = points[np.linspace(0, len(points) - 1, self.max_points).astype(int)]
+        return points
+
+    def match(self, scan: np.ndarray, pose: Tuple[float, float, float]) -> Optional[Tuple[Tuple[float, float, float], float]]:
+        """
+        Casa uma volta com o mapa a partir da pose de odometria.
+
+        Args:
+            scan: Array estruturado com 'angle' (rad), 'range' (m) e 'quality'
+            pose: Pose estimada (x, y, ângulo em graus) no instante da volta
+
+        Returns:
+            Tupla ((x, y, ângulo em graus), pontuação) se o casamento foi aceito, None caso contrário
+        """
+        if self.field is None:
+            return None
+        started = time.perf_counter()
+        result = None
+        points = self.scan_points(scan)
+        if len(points) >= self.min_points:
+            coarse, _ = self._coarse_search(points, pose)
+            refined, score = self._refine(points, coarse)
+            self.last_score = score
+            if score >= self.min_score:
+                result = (refined, score)
+        elapsed = time.perf_counter() - started
+        self.match_times.append(elapsed)
+        if result is None:
+            self.rejected += 1
+        else:
+            self.matches += 1
+            self.last_correction = (result[0][0] - pose[0], result[0][1] - pose[1],
+                                    (result[0][2] - pose[2] + 180.0) % 360.0 - 180.0)
+        return result
+
+    def _coarse_search(self, points: np.ndarray, pose: Tuple[float, float, float]) -> Tuple[Tuple[float, float, float], float]:
+        """Busca exaustiva na janela, com consulta à célula mais próxima do campo."""
+        linear = np.arange(-self.linear_window, self.linear_window + 1e-9, self.linear_step)
+        angular = np.arange(-self.angular_window, self.angular_window + 1e-9, self.angular_step)
+        headings = np.radians(pose[2] + angular)
+        cos_h, sin_h = np.cos(headings), np.sin(headings)
+        # (K, N): pontos girados para cada ângulo candidato
+        rotated_x = points[None, :, 0] * cos_h[:, None] - points[None, :, 1] * sin_h[:, None]
+        rotated_y = points[None, :, 0] * sin_h[:, None] + points[None, :, 1] * cos_h[:, None]
+        # Colunas e linhas (K, L, N) calculadas separadamente para cada deslocamento em x e em y;
+        # a borda de zeros do campo estendido absorve os pontos fora do mapa
+        padded_height, padded_width = self._padded_field.shape
+        columns = np.clip(np.floor((rotated_x[:, None, :] + (pose[0] + linear)[None, :, None]) / self.resolution)
+                          .astype(np.int64) + 1, 0, padded_width - 1)
+        rows = np.clip(np.floor((rotated_y[:, None, :] + (pose[1] + linear)[None, :, None]) / self.resolution)
+                       .astype(np.int64) + 1, 0, padded_height - 1)
+        # (K, Ly, Lx, N): todas as translações de todos os ângulos de uma vez
+        flat = rows[:, :, None, :] * padded_width + columns[:, None, :, :]
+        scores = self._padded_field.ravel()[flat].mean(axis=3)
+        k, j, i = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        return (pose[0] + linear[i], pose[1] + linear[j], pose[2] + angular[k]), float(scores[k, j, i])
+
+    def _refine(self, points: np.ndarray, pose: Tuple[float, float, float]) -> Tuple[Tuple[float, float, float], float]:
+        """Subida de encosta com interpolação bilinear e passos decrescentes."""
+        x, y, heading = pose
+        linear_step = self.linear_step * 0.5
+        angular_step = self.angular_step * 0.5
+        moves = np.array([[0, 0, 0], [1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1]], dtype=float)
+        best_score = 0.0
+        for _ in range(30):
+            candidates = np.array([x, y, heading]) + moves * (linear_step, linear_step, angular_step)
+            scores = self._score_poses(points, candidates)
+            best = int(np.argmax(scores))
+            best_score = float(scores[best])
+            if best == 0:
+                linear_step *= 0.5
+                angular_step *= 0.5
+                if linear_step < 0.002:
+                    break
+            else:
+                x, y, heading = candidates[best]
+        return (float(x), float(y), float(heading) % 360.0), best_score
+
+    def _score_poses(self, points: np.ndarray, poses: np.ndarray) -> np.ndarray:
+        """Pontuação média (bilinear) de cada pose (P, 3)."""
+        headings = np.radians(poses[:, 2])
+        cos_h, sin_h = np.cos(headings)[:, None], np.sin(headings)[:, None]
+        world_x = points[None, :, 0] * cos_h - points[None, :, 1] * sin_h + poses[:, 0:1]
+        world_y = points[None, :, 0] * sin_h + points[None, :, 1] * cos_h + poses[:, 1:2]
+        return self._bilinear(world_x, world_y).mean(axis=1)
+
+    def _bilinear(self, world_x: np.ndarray, world_y: np.ndarray) -> np.ndarray:
+        """Campo interpolado entre os centros das células (0 fora do mapa)."""
+        height, width = self.field.shape
+        u = world_x / self.resolution - 0.5
+        v = world_y / self.resolution - 0.5
+        x0 = np.floor(u).astype(np.int64)
+        y0 = np.floor(v).astype(np.int64)
+        fx = u - x0
+        fy = v - y0
+        inside = (x0 >= 0) & (x0 < width - 1) & (y0 >= 0) & (y0 < height - 1)
+        values = np.zeros(world_x.shape, dtype=np.float64)
+        x0, y0, fx, fy = x0[inside], y0[inside], fx[inside], fy[inside]
+        field = self.field
+        values[inside] = ((field[y0, x0] * (1 - fx) + field[y0, x0 + 1] * fx) * (1 - fy) +
+                          (field[y0 + 1, x0] * (1 - fx) + field[y0 + 1, x0 + 1] * fx) * fy)
+        return values
+
+    def stats(self) -> Dict:
+        """Estatísticas dos casamentos (tempos em milissegundos)."""
+        times = np.asarray(self.match_times, dtype=float) * 1000.0
+        return {
+            'matches': self.matches,
+            'rejected': self.rejected,
+            'last_score': self.last_score,
+            'last_correction': self.last_correction,
+            'last_match_ms': float(times[-1]) if len(times) else 0.0,
+            'mean_match_ms': float(times.mean()) if len(times) else 0.0,
+            'max_match_ms': float(times.max()) if len(times) else 0.0,
+        }
@@ -0,0 +1,194 @@
+"""
+Simulação de voltas do LIDAR a partir da grade de ocupação.
+
+Cada feixe é marchado sobre a grade com passos dados pela transformada de
+distância do espaço livre (sphere tracing): em cada ponto o feixe pode avançar,
+sem atravessar nenhuma célula ocupada, a distância até o obstáculo mais próximo
+menos meia diagonal de célula. Longe das paredes os passos são grandes, de modo
+que poucas iterações vetorizadas resolvem a maioria dos feixes; os feixes rasantes
+a paredes (passos curtos) que restam após um número fixo de iterações são
+amostrados em um único lote. O retorno é refinado por bisseção entre o último
+ponto livre e o primeiro ocupado.
+
+As direções dos feixes no referencial do robô formam uma tabela pré-calculada;
+para cada pose basta girá-la pelo ângulo do robô.
+"""
+
+import math
+import time
+from typing import Optional, Tuple
+import numpy as np
+from scipy import ndimage
+
+from .config import (MAP_GRID_SIZE, LIDAR_MOUNT_ANGLE_OFFSET, LIDAR_ANGLE_DIRECTION, LIDAR_SIM_BEAMS,
+                     LIDAR_SIM_MAX_RANGE, LIDAR_SIM_MIN_RANGE, LIDAR_SIM_RANGE_NOISE, LIDAR_SIM_QUALITY)
+
+
+class ScanSimulator:
+    """Gera voltas sintéticas do LIDAR por marcha acelerada pela transformada de distância."""
+
+    def __init__(self, beams: int = LIDAR_SIM_BEAMS, max_range: float = LIDAR_SIM_MAX_RANGE,
+                 min_range: float = LIDAR_SIM_MIN_RANGE, range_noise: float = LIDAR_SIM_RANGE_NOISE,
+                 quality: int = LIDAR_SIM_QUALITY, mount_angle_offset: float = LIDAR_MOUNT_ANGLE_OFFSET,
+                 angle_direction: int = LIDAR_ANGLE_DIRECTION, max_march_iterations: int = 12,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            beams: Feixes por volta, igualmente espaçados
+            max_range: Alcance (m); feixes sem retorno até ele são inválidos (distância 0)
+            min_range: Distância mínima (m) medida pelo sensor
+            range_noise: Desvio (m) do ruído gaussiano das distâncias
+            quality: Qualidade atribuída aos retornos válidos
+            mount_angle_offset: Ângulo (graus) do zero do LIDAR em relação à frente do robô
+            angle_direction: 1 se o ângulo do LIDAR cresce no mesmo sentido do ângulo do robô, -1 caso contrário
+            max_march_iterations: Iterações da marcha; os feixes restantes são amostrados de uma vez
+            seed: Semente do gerador de ruído (reprodutibilidade)
+        """
+        self.max_range = max_range
+        self.min_range = min_range
+        self.range_noise = range_noise
+        self.quality = quality
+        self.rng = np.random.default_rng(seed)
+
+        # Tabela de direções: ângulos do LIDAR e seus vetores unitários no referencial do robô
+        self.angles = np.linspace(0.0, 2.0 * np.pi, beams, endpoint=False).astype(np.float32)
+        robot_angles = angle_direction * self.angles.astype(np.float64) + math.radians(mount_angle_offset)
+        self._directions = np.stack([np.cos(robot_angles), np.sin(robot_angles)], axis=1)
+
+        self.resolution = MAP_GRID_SIZE
+        # [y, x] com uma célula de borda: distância (m) ao obstáculo mais próximo, 0 nas células
+        # ocupadas e -1 fora da grade - uma única consulta responde as três perguntas da marcha
+        self._clearance: Optional[np.ndarray] = None
+        self.max_march_iterations = max_march_iterations
+        self.last_simulation_duration = 0.0
+        self.last_iterations = 0
+
+    @property
+    def has_map(self) -> bool:
+        """Indica se há uma grade para simular os scans."""
+        return self._clearance is not None
+
+    def set_map(self, occupied: Optional[np.ndarray], resolution: float = MAP_GRID_SIZE):
+        """
+        Define o ambiente simulado e pré-calcula a transformada de distância.
+
+        Args:
+            occupied: Máscara booleana [y, x] das células ocupadas, ou None para desativar
+            resolution: Lado da célula (m)
+        """
+        if occupied is None or not np.any(occupied):
+            self._clearance = None
+            return
+        occupied = np.asarray(occupied, dtype=bool)
+        self.resolution = resolution
+        clearance = (ndimage.distance_transform_edt(~occupied) * resolution).astype(np.float32)
+        self._clearance = np.pad(clearance, 1, constant_values=-1.0)
+
+    def simulate(self, pose: Tuple[float, float, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Simula uma volta na pose dada.
+
+        Args:
+            pose: Pose do robô (x, y, ângulo em graus)
+
+        Returns:
+            Tupla (ângulos em rad, distâncias em m, qualidades) no formato do ScanRingBuffer;
+            feixes sem retorno têm distância e qualidade 0
+        """
+        started = time.perf_counter()
+        ranges = self.cast(pose)
+        hit = ranges > 0.0
+        if self.range_noise > 0.0:
+            ranges[hit] += self.rng.normal(0.0, self.range_noise, int(hit.sum()))
+        hit &= ranges >= self.min_range
+        ranges[~hit] = 0.0
+        qualities = np.where(hit, self.quality, 0).astype(np.uint8)
+        self.last_simulation_duration = time.perf_counter() - started
+        return self.angles, ranges.astype(np.float32), qualities
+
+    def cast(self, pose: Tuple[float, float, float]) -> np.ndarray:
+        """
+        Distâncias exatas (sem ruído) de todos os feixes na pose dada.
+
+        Returns:
+            Array (beams,) em metros; 0 para feixes sem retorno até max_range
+        """
+        beams = len(self._directions)
+        ranges = np.zeros(beams)
+        if self._clearance is None:
+            return ranges
+        heading = math.radians(pose[2])
+        cos_h, sin_h = math.cos(heading), math.sin(heading)
+        directions = np.stack([self._directions[:, 0] * cos_h - self._directions[:, 1] * sin_h,
+                               self._directions[:, 0] * sin_h + self._directions[:, 1] * cos_h], axis=1)
+        origin = np.array([pose[0], pose[1]], dtype=np.float64)
+
+        # Avanço seguro: a distância ao obstáculo mais próximo menos meia diagonal de célula
+        # garante que nenhuma célula ocupada é atravessada; o passo mínimo é meia célula
+        margin = self.resolution * math.sqrt(2.0) / 2.0
+        min_step = self.resolution * 0.5
+        active = np.arange(beams)
+        distance = np.zeros(beams)
+        previous = np.zeros(beams)
+        iterations = 0
+        while len(active) and iterations < self.max_march_iterations:
+            iterations += 1
+            clearance = self._lookup(origin + directions[active] * distance[active, None])
+            # Retorno: guarda o intervalo [último livre, primeiro ocupado] para a bisseção
+            hit = clearance == 0.0
+            ranges[active[hit]] = distance[active[hit]]
+            moving = ~hit & (distance[active] <= self.max_range) & (clearance > 0.0)
+            active = active[moving]
+            previous[active] = distance[active]
+            distance[active] += np.maximum(clearance[moving] - margin, min_step)
+        self.last_iterations = iterations
+        if len(active):
+            self._sample_remaining(origin, directions, active, distance, previous, ranges, min_step)
+
+        hits = np.flatnonzero(ranges > 0.0)
+        if len(hits):
+            # A bisseção encontra a borda da célula ocupada; o obstáculo da grade fica, em média,
+            # meia célula adiante (coerente com o campo de verossimilhança, medido aos centros)
+            ranges[hits] = self._bisect(origin, directions[hits], previous[hits], ranges[hits]) + self.resolution * 0.5
+        ranges[ranges > self.max_range] = 0.0
+        return ranges
+
+    def _sample_remaining(self, origin: np.ndarray, directions: np.ndarray, active: np.ndarray,
+                          distance: np.ndarray, previous: np.ndarray, ranges: np.ndarray, step: float):
+        """
+        Resolve de uma vez os feixes que esgotaram as iterações da marcha (rasantes a paredes,
+        onde os passos seguros são curtos): amostra todo o alcance restante a cada meio passo.
+        """
+        samples = max(1, int(math.ceil((self.max_range - float(distance[active].min())) / step)) + 1)
+        # (A, S): distâncias das amostras de cada feixe restante
+        offsets = distance[active, None] + np.arange(samples) * step
+        points = origin + directions[active, None, :] * offsets[:, :, None]
+        clearance = self._lookup(points)
+        stop = (clearance <= 0.0) | (offsets > self.max_range)
+        first = np.argmax(stop, axis=1)
+        rows = np.arange(len(active))
+        hit = stop[rows, first] & (clearance[rows, first] == 0.0)
+        beams = active[hit]
+        ranges[beams] = offsets[rows[hit], first[hit]]
+        previous[beams] = np.where(first[hit] > 0, offsets[rows[hit], np.maximum(first[hit] - 1, 0)],
+                                   previous[beams])
+
+    def _bisect(self, origin: np.ndarray, directions: np.ndarray, free: np.ndarray, occupied: np.ndarray,
+                iterations: int = 4) -> np.ndarray:
+        """Refina o retorno entre o último ponto livre e o primeiro ocupado de cada feixe."""
+        for _ in range(iterations):
+            middle = (free + occupied) * 0.5
+            inside = self._lookup(origin + directions * middle[:, None]) == 0.0
+            occupied = np.where(inside, middle, occupied)
+            free = np.where(inside, free, middle)
+        return occupied
+
+    def _lookup(self, points: np.ndarray) -> np.ndarray:
+        """Distância livre (m) nas células dos pontos (..., 2): 0 se ocupada, -1 fora da grade."""
+        padded_height, padded_width = self._clearance.shape
+        columns = np.floor(points[..., 0] / self.resolution).astype(np.int64) + 1
+        rows = np.floor(points[..., 1] / self.resolution).astype(np.int64) + 1
+        # Pontos fora da grade caem na borda (-1)
+        columns = np.minimum(np.maximum(columns, 0), padded_width - 1)
+        rows = np.minimum(np.maximum(rows, 0), padded_height - 1)
+        return self._clearance[rows, columns]
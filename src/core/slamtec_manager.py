@@ -1,15 +1,44 @@
 import os
 import time
 import ctypes
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional, Iterator
 import numpy as np
 
+from .config import SIMULATION_FREQUENCY, RPLIDAR_PORT, RPLIDAR_BAUDRATE
+from .environment import LIDAR_AVAILABLE
+from .lidar_buffer import ScanRingBuffer
+from .rplidar_driver import RPLidarDriver, SERIAL_AVAILABLE
+from .obstacle_extractor import ObstacleExtractor, OBSTACLE_DTYPE
+from .scan_simulator import ScanSimulator
+from .scan_log import ScanLogReplay
+
 class SlamtecManager:
-    def __init__(self):
-        """Inicializa o gerenciador do RPLIDAR."""
+    def __init__(self, port: Optional[str] = None, baudrate: int = RPLIDAR_BAUDRATE):
+        """
+        Inicializa o gerenciador do RPLIDAR.
+
+        Args:
+            port: Porta serial do sensor. Se informada, o driver é usado mesmo fora
+                  da Raspberry Pi (ex.: dispositivo falso em um pty)
+            baudrate: Taxa de comunicação da porta serial
+        """
+        self.port = port or RPLIDAR_PORT
+        self.baudrate = baudrate
+        self._explicit_port = port is not None
         self.sdk_available = self._detect_slamtec_sdk()
         self.hardware_connected = self._detect_hardware()
+        # Voltas do sensor (reais ou simuladas) ficam em um anel pré-alocado
+        self.scan_buffer = ScanRingBuffer()
+        self._mock_angles, self._mock_ranges, self._mock_qualities = self._build_mock_scan()
+        self.lidar_driver: Optional[RPLidarDriver] = None
+        self.obstacle_extractor = ObstacleExtractor()
+        # Sem sensor, as voltas podem ser simuladas a partir da grade de ocupação na pose do robô
+        self.scan_simulator: Optional[ScanSimulator] = None
+        self._simulated_pose: Optional[Callable[[], Tuple[float, float, float]]] = None
+        # Reprodução de um log gravado: as voltas chegam ao anel como se viessem do sensor
+        self.replay: Optional[ScanLogReplay] = None
         self._initialize_sdk()
+        self._start_driver()
         
     def _detect_slamtec_sdk(self) -> bool:
         """Verifica se o SDK do RPLIDAR está disponível."""
@@ -23,8 +52,11 @@ class SlamtecManager:
     def _detect_hardware(self) -> bool:
         """Verifica se o hardware do RPLIDAR está conectado."""
         try:
-            # TODO: Implementar verificação real do hardware
-            return False  # Por enquanto, retorna False para usar modo simulado
+            if not SERIAL_AVAILABLE:
+                return False
+            if not (LIDAR_AVAILABLE or self._explicit_port):
+                return False
+            return os.path.exists(self.port)
         except Exception as e:
             print(f"Erro ao detectar hardware: {e}")
             return False
@@ -38,58 +70,185 @@ class SlamtecManager:
             except Exception as e:
                 print(f"Erro ao inicializar SDK: {e}")
                 self.sdk_available = False
+
+    def _start_driver(self):
+        """Inicia a aquisição em segundo plano pela porta serial, se o sensor estiver conectado."""
+        if not self.hardware_connected:
+            return
+        driver = RPLidarDriver(port=self.port, baudrate=self.baudrate, buffer=self.scan_buffer)
+        if driver.start():
+            self.lidar_driver = driver
+        else:
+            print("AVISO: RPLIDAR não respondeu - usando scans simulados")
+            self.hardware_connected = False
+
+    def _using_driver(self) -> bool:
+        """Indica se os scans vêm do sensor real (thread de aquisição ativa)."""
+        return self.lidar_driver is not None and self.lidar_driver.is_running
+
+    def _receiving_scans(self) -> bool:
+        """Indica se as voltas chegam ao anel de fora (sensor real ou reprodução de log)."""
+        return self._using_driver() or self.replay is not None
+
+    def _simulating_environment(self) -> bool:
+        """Indica se as voltas simuladas vêm do simulador de scans (e não do scan fixo)."""
+        return (not self._receiving_scans() and self.scan_simulator is not None and
+                self.scan_simulator.has_map and self._simulated_pose is not None)
+
+    def provides_environment_scans(self) -> bool:
+        """Indica se os scans refletem o ambiente (sensor real ou simulador), e não o scan fixo de demonstração."""
+        return self._receiving_scans() or self._simulating_environment()
+
+    def attach_scan_simulator(self, simulator: ScanSimulator, pose_source: Callable[[], Tuple[float, float, float]]):
+        """
+        Gera as voltas simuladas pelo simulador de scans em vez do scan fixo.
+
+        Args:
+            simulator: Simulador com a grade do ambiente
+            pose_source: Função que retorna a pose real do robô (x, y, ângulo em graus)
+        """
+        self.scan_simulator = simulator
+        self._simulated_pose = pose_source
+
+    def detach_scan_simulator(self):
+        """Volta a publicar o scan fixo de demonstração."""
+        self.scan_simulator = None
+        self._simulated_pose = None
+
+    def attach_replay(self, replay: ScanLogReplay):
+        """
+        Passa a receber as voltas de um log gravado, publicadas no anel pela reprodução
+        (em thread, com replay.start(), ou passo a passo, com replay.step()).
+        """
+        self.detach_replay()
+        self.replay = replay
+
+    def detach_replay(self):
+        """Encerra a reprodução do log."""
+        if self.replay is not None:
+            self.replay.stop()
+            self.replay = None
+
+    def get_acquisition_stats(self) -> Dict:
+        """Estatísticas da aquisição (pacotes descartados, taxa de varredura, etc.)."""
+        if self.lidar_driver is None:
+            return {'running': False, 'revolutions': self.scan_buffer.sequence, 'scan_rate': SIMULATION_FREQUENCY}
+        return self.lidar_driver.stats()
                 
+    def get_latest_scan(self) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Obtém a última volta do LIDAR sem cópia.
+
+        Returns:
+            Tupla (número de sequência, view estruturada com os campos
+            'angle' (rad), 'range' (m), 'quality' e 'timestamp')
+        """
+        if not self._receiving_scans():
+            self._publish_mock_scan_if_due()
+        return self.scan_buffer.latest()
+
+    def iter_scans(self, timeout: Optional[float] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Gerador das voltas do LIDAR, na taxa do sensor.
+
+        Cada item é (número de sequência, view estruturada do scan). As views são
+        reutilizadas pelo anel; copie o scan se precisar guardá-lo.
+        """
+        if self._receiving_scans():
+            yield from self.scan_buffer.scans(timeout=timeout)
+            return
+        # Modo simulado: publica as voltas na frequência de simulação
+        period = 1.0 / SIMULATION_FREQUENCY
+        while True:
+            wait = self.scan_buffer.latest_time() + period - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            sequence = self._publish_mock_scan()
+            yield sequence, self.scan_buffer.latest()[1]
+
     def get_lidar_scan(self) -> Dict:
         """
         Obtém dados do scan do LIDAR.
         Retorna um dicionário com os dados do scan.
+
+        Formato legado (distâncias em mm); novos consumidores devem usar
+        get_latest_scan ou iter_scans, que não alocam listas por volta.
         """
-        if self.sdk_available and self.hardware_connected:
-            return self._real_lidar_scan()
-        else:
-            return self._mock_lidar_scan()
-            
-    def _real_lidar_scan(self) -> Dict:
-        """Implementação real do scan do LIDAR."""
-        # TODO: Implementar integração real com o SDK
-        return self._mock_lidar_scan()  # Fallback para simulação
-        
-    def _mock_lidar_scan(self) -> Dict:
-        """Simula dados do scan do LIDAR."""
+        sequence, scan = self.get_latest_scan()
+        if scan is None:
+            return {'timestamp': time.time(), 'points': [], 'quality': [], 'scan_frequency': 0.0}
+        return {
+            'timestamp': self.scan_buffer.latest_time(),
+            'points': list(zip((scan['range'] * 1000.0).tolist(), scan['angle'].tolist())),
+            'quality': scan['quality'].tolist(),
+            'scan_frequency': self.lidar_driver.scan_rate if self._using_driver() else SIMULATION_FREQUENCY
+        }
+
+    def _build_mock_scan(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pré-calcula os arrays do scan simulado."""
         # Gera pontos em um círculo com alguns obstáculos simulados
         num_points = 360
-        angles = np.linspace(0, 2*np.pi, num_points)
+        angles = np.linspace(0, 2*np.pi, num_points).astype(np.float32)
         
         # Simula alguns obstáculos
-        distances = np.ones(num_points) * 5000  # 5 metros por padrão
+        ranges = np.full(num_points, 5.0, dtype=np.float32)  # 5 metros por padrão
         
         # Adiciona alguns obstáculos simulados
         obstacle_angles = [np.pi/4, np.pi/2, 3*np.pi/4]
         for angle in obstacle_angles:
             idx = int(angle * num_points / (2*np.pi))
-            distances[idx] = 2000  # 2 metros
-            
-        return {
-            'timestamp': time.time(),
-            'points': list(zip(distances, angles)),
-            'quality': [255] * num_points,  # Qualidade máxima para simulação
-            'scan_frequency': 10.0
-        }
+            ranges[idx] = 2.0  # 2 metros
+
+        qualities = np.full(num_points, 255, dtype=np.uint8)  # Qualidade máxima para simulação
+        return angles, ranges, qualities
+
+    def _publish_mock_scan(self) -> int:
+        """Publica uma volta simulada no anel de scans."""
+        if self._simulating_environment():
+            return self.scan_buffer.publish(*self.scan_simulator.simulate(self._simulated_pose()))
+        return self.scan_buffer.publish(self._mock_angles, self._mock_ranges, self._mock_qualities)
+
+    def _publish_mock_scan_if_due(self):
+        """Publica uma nova volta simulada se a anterior já tem mais de um período."""
+        if time.time() - self.scan_buffer.latest_time() >= 1.0 / SIMULATION_FREQUENCY:
+            self._publish_mock_scan()
         
-    def detect_obstacles(self) -> Dict:
+    def extract_obstacles(self, pose: Optional[Tuple[float, float, float]] = None) -> Tuple[int, np.ndarray]:
+        """
+        Extrai os obstáculos da última volta do LIDAR.
+
+        Args:
+            pose: Pose do robô (x, y, ângulo em graus) para obter os obstáculos no mundo
+
+        Returns:
+            Tupla (número de sequência da volta, array estruturado OBSTACLE_DTYPE)
+        """
+        sequence, scan = self.get_latest_scan()
+        if scan is None:
+            return 0, np.zeros(0, dtype=OBSTACLE_DTYPE)
+        return sequence, self.obstacle_extractor.extract(scan, pose)
+
+    def detect_obstacles(self, pose: Optional[Tuple[float, float, float]] = None) -> Dict:
         """
         Detecta obstáculos usando o sensor C1.
         Retorna um dicionário com os dados dos obstáculos.
         """
-        if self.sdk_available and self.hardware_connected:
-            return self._real_obstacle_detection()
+        if self.provides_environment_scans():
+            return self._real_obstacle_detection(pose)
         else:
             return self._mock_obstacles()
             
-    def _real_obstacle_detection(self) -> Dict:
-        """Implementação real da detecção de obstáculos."""
-        # TODO: Implementar integração real com o SDK
-        return self._mock_obstacles()  # Fallback para simulação
+    def _real_obstacle_detection(self, pose: Optional[Tuple[float, float, float]] = None) -> Dict:
+        """Implementação real da detecção de obstáculos (agrupamento dos pontos do scan)."""
+        _, obstacles = self.extract_obstacles(pose)
+        return {
+            'timestamp': self.scan_buffer.latest_time(),
+            'obstacles': list(zip(obstacles['x'].tolist(), obstacles['y'].tolist(),
+                                  obstacles['confidence'].tolist())),
+            'clusters': obstacles,
+            'detection_range': self.obstacle_extractor.max_range,
+            'update_frequency': self.lidar_driver.scan_rate if self.lidar_driver else SIMULATION_FREQUENCY
+        }
         
     def _mock_obstacles(self) -> Dict:
         """Simula dados de detecção de obstáculos."""
@@ -109,6 +268,10 @@ class SlamtecManager:
         
     def cleanup(self):
         """Limpa recursos do SDK."""
+        self.detach_replay()
+        if self.lidar_driver is not None:
+            self.lidar_driver.stop()
+            self.lidar_driver = None
         if self.sdk_available:
             try:
                 # TODO: Implementar limpeza real do SDK
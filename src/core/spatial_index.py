@@ -0,0 +1,177 @@
+"""
+Índice espacial das bordas das áreas proibidas.
+
+Combina dois mecanismos para consultas de proximidade em tempo constante:
+- um campo de distância (clearance) pré-calculado sobre uma grade fina, lido em O(1);
+- uma grade uniforme de buckets com as arestas, usada para refinar o resultado
+  exato apenas quando o valor do campo está perto do limiar consultado.
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from .config import (MAP_WIDTH, MAP_HEIGHT, SPATIAL_INDEX_BUCKET_SIZE, CLEARANCE_FIELD_RESOLUTION,
+                     CLEARANCE_FIELD_MAX_DISTANCE)
+from .geometry import polygons_to_segments, points_to_segments_distance
+
+
+class ForbiddenAreaIndex:
+    """Índice de arestas das áreas proibidas com campo de distância pré-calculado."""
+
+    def __init__(self, areas: List[List[Tuple[float, float]]],
+                 width: float = MAP_WIDTH, height: float = MAP_HEIGHT,
+                 bucket_size: float = SPATIAL_INDEX_BUCKET_SIZE,
+                 field_resolution: float = CLEARANCE_FIELD_RESOLUTION,
+                 max_distance: float = CLEARANCE_FIELD_MAX_DISTANCE,
+                 clearance: Optional[np.ndarray] = None):
+        """
+        Constrói o índice.
+
+        Args:
+            areas: Lista de polígonos, cada um uma lista de pontos (x, y) em metros
+            width: Largura do mapa (m)
+            height: Altura do mapa (m)
+            bucket_size: Lado (m) de cada bucket da grade de arestas
+            field_resolution: Lado (m) de cada célula do campo de distância
+            max_distance: Distância (m) a partir da qual o campo é saturado
+            clearance: Campo de distância já calculado para estas áreas e parâmetros (ex.: de um
+                       pacote de mapa); se None ou de outras dimensões, é calculado aqui
+        """
+        self.width = width
+        self.height = height
+        self.bucket_size = bucket_size
+        self.field_resolution = field_resolution
+        self.max_distance = max_distance
+
+        self.segments, self.owners = polygons_to_segments(areas)
+
+        self._buckets: Dict[Tuple[int, int], np.ndarray] = {}
+        self._build_buckets()
+
+        # Erro máximo da leitura do campo pela célula mais próxima (meia diagonal)
+        self.field_error = field_resolution * math.sqrt(2) / 2
+        if clearance is not None and clearance.shape == self.field_shape:
+            self.clearance = clearance
+        else:
+            self.clearance = self._build_clearance_field()
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    @property
+    def field_shape(self) -> Tuple[int, int]:
+        """Dimensões (linhas, colunas) do campo de distância."""
+        return (int(math.ceil(self.height / self.field_resolution)),
+                int(math.ceil(self.width / self.field_resolution)))
+
+    def _build_buckets(self):
+        """Insere cada aresta em todos os buckets cobertos pela sua caixa delimitadora."""
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        if len(self.segments):
+            low = np.floor(self.segments.min(axis=1) / self.bucket_size).astype(int)
+            high = np.floor(self.segments.max(axis=1) / self.bucket_size).astype(int)
+            for segment_id, ((x0, y0), (x1, y1)) in enumerate(zip(low.tolist(), high.tolist())):
+                for bx in range(x0, x1 + 1):
+                    for by in range(y0, y1 + 1):
+                        buckets.setdefault((bx, by), []).append(segment_id)
+        self._buckets = {key: np.array(ids, dtype=int) for key, ids in buckets.items()}
+
+    def _build_clearance_field(self) -> np.ndarray:
+        """
+        Calcula a distância exata de cada centro de célula até a aresta mais próxima.
+
+        Distâncias acima de `max_distance` são saturadas, o que permite calcular cada
+        bloco de células apenas contra as arestas dos buckets vizinhos.
+        """
+        rows, columns = self.field_shape
+        field = np.full((rows, columns), self.max_distance, dtype=np.float32)
+        if not len(self.segments):
+            return field
+
+        cells_per_bucket = max(1, int(round(self.bucket_size / self.field_resolution)))
+        reach = int(math.ceil(self.max_distance / self.bucket_size))
+        for row0 in range(0, rows, cells_per_bucket):
+            for column0 in range(0, columns, cells_per_bucket):
+                bx = int((column0 + 0.5) * self.field_resolution / self.bucket_size)
+                by = int((row0 + 0.5) * self.field_resolution / self.bucket_size)
+                candidates = [self._buckets[key] for key in
+                              ((x, y) for x in range(bx - reach, bx + reach + 1)
+                               for y in range(by - reach, by + reach + 1))
+                              if key in self._buckets]
+                if not candidates:
+                    continue
+                ids = np.unique(np.concatenate(candidates))
+
+                block_rows = np.arange(row0, min(row0 + cells_per_bucket, rows))
+                block_columns = np.arange(column0, min(column0 + cells_per_bucket, columns))
+                grid_x, grid_y = np.meshgrid((block_columns + 0.5) * self.field_resolution,
+                                             (block_rows + 0.5) * self.field_resolution)
+                centers = np.stack([grid_x.ravel(), grid_y.ravel()], axis=1)
+
+                distances, _ = points_to_segments_distance(centers, self.segments[ids])
+                field[block_rows[0]:block_rows[-1] + 1, block_columns[0]:block_columns[-1] + 1] = \
+                    np.minimum(distances, self.max_distance).reshape(len(block_rows), len(block_columns))
+        return field
+
+    def clearance_at(self, point: Tuple[float, float]) -> float:
+        """
+        Distância aproximada (m) do ponto até a aresta mais próxima, em O(1).
+
+        O erro máximo é `field_error`; valores acima de `max_distance` são saturados.
+        Pontos fora do mapa retornam infinito.
+        """
+        column = int(point[0] / self.field_resolution)
+        row = int(point[1] / self.field_resolution)
+        if point[0] < 0 or point[1] < 0 or row >= self.clearance.shape[0] or column >= self.clearance.shape[1]:
+            return float('inf')
+        return float(self.clearance[row, column])
+
+    def nearest_edge(self, point: Tuple[float, float], max_distance: float) -> Tuple[float, Optional[int]]:
+        """
+        Distância exata até a aresta mais próxima dentro de um raio, usando os buckets.
+
+        Returns:
+            Tupla (distância, índice da área) - (inf, None) se não houver aresta no raio
+        """
+        x0 = int(math.floor((point[0] - max_distance) / self.bucket_size))
+        x1 = int(math.floor((point[0] + max_distance) / self.bucket_size))
+        y0 = int(math.floor((point[1] - max_distance) / self.bucket_size))
+        y1 = int(math.floor((point[1] + max_distance) / self.bucket_size))
+        candidates = [self._buckets[key] for key in
+                      ((bx, by) for bx in range(x0, x1 + 1) for by in range(y0, y1 + 1))
+                      if key in self._buckets]
+        if not candidates:
+            return float('inf'), None
+        ids = np.unique(np.concatenate(candidates))
+
+        distances, nearest = points_to_segments_distance(np.asarray(point, dtype=float), self.segments[ids])
+        if distances[0] > max_distance:
+            return float('inf'), None
+        return float(distances[0]), int(self.owners[ids[nearest[0]]])
+
+    def is_within(self, point: Tuple[float, float], distance: float) -> bool:
+        """Verifica se alguma aresta está a menos de `distance` do ponto."""
+        if not len(self.segments):
+            return False
+        approximate = self.clearance_at(point)
+        if math.isfinite(approximate):
+            if approximate - self.field_error >= distance:
+                return False
+            if approximate < self.max_distance and approximate + self.field_error < distance:
+                return True
+        # Perto do limiar (ou fora do mapa): refina com a distância exata
+        exact, _ = self.nearest_edge(point, distance)
+        return exact < distance
+
+    def distances(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distância exata de vários pontos até as arestas, em lote.
+
+        Returns:
+            Tupla (distâncias (N,), índice da área mais próxima (N,), -1 sem arestas)
+        """
+        distances, nearest = points_to_segments_distance(points, self.segments)
+        if not len(self.segments):
+            return distances, nearest
+        return distances, np.where(nearest >= 0, self.owners[nearest], -1)
@@ -0,0 +1,386 @@
+"""
+Histórico das entregas e telemetria da navegação.
+
+Três tabelas somente de acréscimo, em um banco SQLite próprio (WAL), separado do
+banco dos mapas para que as gravações contínuas não disputem o bloqueio de escrita
+com a interface:
+
+- amostras_pose: pose do robô durante a navegação (no máximo uma a cada
+  TELEMETRY_POSE_INTERVAL);
+- transicoes_estado: cada mudança de navigation_state;
+- entregas: uma linha por entrega, com os tempos de planejamento, de ida e total,
+  o erro final de posição, os timeouts e o resultado.
+
+Quem navega apenas acumula as linhas em memória; uma thread dedicada grava os
+lotes com executemany em uma única transação, quando um lote enche
+(TELEMETRY_BATCH_SIZE) ou a cada TELEMETRY_FLUSH_INTERVAL. As consultas de
+relatório (por mesa e por hora) usam os índices pelo instante de início.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .database import ConnectionPool, connect
+from .config import (TELEMETRY_DATABASE_PATH, TELEMETRY_FLUSH_INTERVAL, TELEMETRY_BATCH_SIZE,
+                     TELEMETRY_POSE_INTERVAL)
+
+# Resultados de uma entrega
+DELIVERY_COMPLETED = "CONCLUIDA"
+DELIVERY_ABORTED = "INTERROMPIDA"  # Navegação finalizada antes de chegar ao destino
+DELIVERY_CANCELLED = "CANCELADA"  # Nova navegação ou reset com a entrega em andamento
+DELIVERY_PLAN_FAILED = "SEM_CAMINHO"
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entregas (
+        id INTEGER PRIMARY KEY,
+        inicio REAL NOT NULL,
+        fim REAL NOT NULL,
+        destino TEXT,
+        destino_x REAL,
+        destino_y REAL,
+        modo TEXT,
+        resultado TEXT NOT NULL,
+        tempo_planejamento REAL,
+        tempo_ida REAL,
+        tempo_total REAL,
+        distancia_planejada REAL,
+        erro_final REAL,
+        timeouts INTEGER NOT NULL DEFAULT 0,
+        replanejamentos INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_entregas_inicio ON entregas (inicio);
+    CREATE INDEX IF NOT EXISTS idx_entregas_destino ON entregas (destino, inicio);
+
+    CREATE TABLE IF NOT EXISTS amostras_pose (
+        instante REAL NOT NULL,
+        entrega_id INTEGER,
+        x REAL NOT NULL,
+        y REAL NOT NULL,
+        angulo REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_amostras_pose_entrega ON amostras_pose (entrega_id, instante);
+    CREATE INDEX IF NOT EXISTS idx_amostras_pose_instante ON amostras_pose (instante);
+
+    CREATE TABLE IF NOT EXISTS transicoes_estado (
+        instante REAL NOT NULL,
+        entrega_id INTEGER,
+        estado_anterior TEXT,
+        estado TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_transicoes_entrega ON transicoes_estado (entrega_id, instante);
+    CREATE INDEX IF NOT EXISTS idx_transicoes_instante ON transicoes_estado (instante);
+"""
+
+_INSERT_DELIVERY = """
+    INSERT OR REPLACE INTO entregas (id, inicio, fim, destino, destino_x, destino_y, modo, resultado,
+                                     tempo_planejamento, tempo_ida, tempo_total, distancia_planejada,
+                                     erro_final, timeouts, replanejamentos)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_POSE = "INSERT INTO amostras_pose (instante, entrega_id, x, y, angulo) VALUES (?, ?, ?, ?, ?)"
+_INSERT_TRANSITION = ("INSERT INTO transicoes_estado (instante, entrega_id, estado_anterior, estado) "
+                      "VALUES (?, ?, ?, ?)")
+
+# Colunas agregadas dos relatórios (por mesa e por hora)
+_REPORT_COLUMNS = """
+    COUNT(*) AS entregas,
+    SUM(resultado = 'CONCLUIDA') AS concluidas,
+    AVG(tempo_planejamento) AS tempo_planejamento_medio,
+    AVG(CASE WHEN resultado = 'CONCLUIDA' THEN tempo_ida END) AS tempo_ida_medio,
+    MAX(CASE WHEN resultado = 'CONCLUIDA' THEN tempo_ida END) AS tempo_ida_maximo,
+    AVG(CASE WHEN resultado = 'CONCLUIDA' THEN tempo_total END) AS tempo_total_medio,
+    AVG(erro_final) AS erro_final_medio,
+    MAX(erro_final) AS erro_final_maximo,
+    SUM(timeouts) AS timeouts,
+    SUM(replanejamentos) AS replanejamentos
+"""
+
+
+class Delivery:
+    """Métricas de uma entrega em andamento (preenchidas pelo navegador)."""
+
+    def __init__(self, delivery_id: int, destination: Tuple[float, float], name: Optional[str] = None,
+                 mode: Optional[str] = None, started: Optional[float] = None):
+        self.id = delivery_id
+        self.destination = destination
+        self.name = name
+        self.mode = mode
+        self.started = time.time() if started is None else started
+        self.plan_time: Optional[float] = None  # s - planejamento inicial (ida e volta)
+        self.planned_distance: Optional[float] = None  # m - comprimento do caminho planejado
+        self.arrived: Optional[float] = None  # Instante de chegada ao destino
+        self.final_error: Optional[float] = None  # m - distância ao destino na chegada
+        self.timeouts = 0
+        self.replans = 0
+
+    @property
+    def travel_time(self) -> Optional[float]:
+        """Tempo de ida (s), do início até a chegada ao destino."""
+        return None if self.arrived is None else self.arrived - self.started
+
+    def mark_arrival(self, error: float, timestamp: Optional[float] = None):
+        """Registra a chegada ao destino com o erro de posição final."""
+        self.arrived = time.time() if timestamp is None else timestamp
+        self.final_error = error
+
+    def __repr__(self) -> str:
+        return f"Delivery(id={self.id}, destino={self.name or self.destination}, ida={self.travel_time})"
+
+
+class TelemetryStore:
+    """Acumula a telemetria da navegação e a grava em lotes em uma thread própria."""
+
+    def __init__(self, db_path: str = TELEMETRY_DATABASE_PATH, flush_interval: float = TELEMETRY_FLUSH_INTERVAL,
+                 batch_size: int = TELEMETRY_BATCH_SIZE, pose_interval: float = TELEMETRY_POSE_INTERVAL):
+        """
+        Args:
+            db_path: Arquivo do banco de telemetria (criado se não existir)
+            flush_interval: Espera máxima (s) de uma linha em memória antes de ser gravada
+            batch_size: Linhas acumuladas que disparam a gravação antes do intervalo
+            pose_interval: Intervalo mínimo (s) entre amostras de pose
+        """
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pose_interval = pose_interval
+        self.rows_written = 0
+        self.failures = 0
+
+        data_dir = os.path.dirname(db_path)
+        if data_dir and not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+        conn = connect(db_path)
+        try:
+            conn.executescript(_SCHEMA)
+            # IDs das entregas são atribuídos aqui, para que poses e transições já os referenciem
+            self._last_delivery_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM entregas").fetchone()[0]
+        finally:
+            conn.close()
+        self.pool = ConnectionPool(db_path, size=2)
+
+        self._poses: List[tuple] = []
+        self._transitions: List[tuple] = []
+        self._deliveries: List[tuple] = []
+        self._last_pose_time = float('-inf')
+        self._first_pending = 0.0  # Instante (monotonic) em que a primeira linha pendente chegou
+        self._writing = False
+        self._stopping = False
+        self._flushing = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ escrita
+
+    @property
+    def is_running(self) -> bool:
+        """Indica se a thread de gravação está ativa."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self) -> int:
+        """Linhas ainda em memória."""
+        with self._condition:
+            return len(self._poses) + len(self._transitions) + len(self._deliveries)
+
+    def start(self):
+        """Inicia a thread de gravação."""
+        if self.is_running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+
+    def _append(self, rows: List[tuple], row: tuple):
+        with self._condition:
+            count = len(self._poses) + len(self._transitions) + len(self._deliveries)
+            rows.append(row)
+            if not count:
+                # Primeira linha pendente: a thread passa a contar flush_interval a partir dela
+                self._first_pending = time.monotonic()
+                self._condition.notify_all()
+            elif count + 1 >= self.batch_size:
+                self._condition.notify_all()
+
+    def record_pose(self, pose: Tuple[float, float, float], delivery_id: Optional[int] = None,
+                    timestamp: Optional[float] = None) -> bool:
+        """
+        Acumula uma amostra de pose (x, y em m; ângulo em graus), descartando as que chegam
+        antes de pose_interval desde a anterior.
+
+        Returns:
+            True se a amostra foi guardada
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if timestamp - self._last_pose_time < self.pose_interval:
+            return False
+        self._last_pose_time = timestamp
+        self._append(self._poses, (timestamp, delivery_id, float(pose[0]), float(pose[1]), float(pose[2])))
+        return True
+
+    def record_transition(self, previous: Optional[str], state: str, delivery_id: Optional[int] = None,
+                          timestamp: Optional[float] = None):
+        """Acumula uma mudança de estado da navegação."""
+        timestamp = time.time() if timestamp is None else timestamp
+        self._append(self._transitions, (timestamp, delivery_id, previous, state))
+
+    def begin_delivery(self, destination: Tuple[float, float], name: Optional[str] = None,
+                       mode: Optional[str] = None) -> Delivery:
+        """Abre uma entrega com um novo ID (a linha só é gravada em finish_delivery)."""
+        with self._condition:
+            self._last_delivery_id += 1
+            delivery_id = self._last_delivery_id
+        # A primeira pose da entrega é sempre amostrada
+        self._last_pose_time = float('-inf')
+        return Delivery(delivery_id, destination, name, mode)
+
+    def finish_delivery(self, delivery: Delivery, result: str, timestamp: Optional[float] = None):
+        """Fecha a entrega com o resultado e acumula a linha com as suas métricas."""
+        finished = time.time() if timestamp is None else timestamp
+        x, y = (float(delivery.destination[0]), float(delivery.destination[1])) if delivery.destination else (None, None)
+        self._append(self._deliveries, (
+            delivery.id, delivery.started, finished, delivery.name, x, y, delivery.mode, result,
+            delivery.plan_time, delivery.travel_time, finished - delivery.started, delivery.planned_distance,
+            delivery.final_error, delivery.timeouts, delivery.replans))
+        print(f"DEBUG: Entrega {delivery.id} ({delivery.name or delivery.destination}) registrada: {result}")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Grava já as linhas em memória e espera a gravação terminar.
+
+        Returns:
+            True se não restam linhas pendentes
+        """
+        with self._condition:
+            if not self.is_running:
+                return not (self._poses or self._transitions or self._deliveries)
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(
+                    lambda: not (self._poses or self._transitions or self._deliveries or self._writing), timeout)
+            finally:
+                self._flushing -= 1
+
+    def stop(self, flush: bool = True, timeout: float = 5.0):
+        """Encerra a thread, gravando antes as linhas pendentes (se flush)."""
+        if flush and self.is_running:
+            self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def close(self):
+        """Para a gravação (gravando o que falta) e fecha as conexões de consulta."""
+        self.stop(flush=True)
+        self.pool.close()
+
+    def _run(self):
+        """Laço da thread: espera um lote encher (ou o intervalo vencer) e o grava."""
+        conn = connect(self.db_path)
+        try:
+            while True:
+                with self._condition:
+                    while True:
+                        count = len(self._poses) + len(self._transitions) + len(self._deliveries)
+                        deadline = self._first_pending + self.flush_interval
+                        if count and (count >= self.batch_size or self._flushing or self._stopping
+                                      or time.monotonic() >= deadline):
+                            break
+                        if not count and self._stopping:
+                            return
+                        # Sem linhas, espera a primeira (_append notifica); com linhas, até o prazo do lote
+                        self._condition.wait(max(0.0, deadline - time.monotonic()) if count else None)
+                    poses, self._poses = self._poses, []
+                    transitions, self._transitions = self._transitions, []
+                    deliveries, self._deliveries = self._deliveries, []
+                    self._writing = True
+                try:
+                    self._write(conn, poses, transitions, deliveries)
+                finally:
+                    with self._condition:
+                        self._writing = False
+                        self._condition.notify_all()
+        finally:
+            conn.close()
+
+    def _write(self, conn, poses: List[tuple], transitions: List[tuple], deliveries: List[tuple]):
+        """Grava um lote em uma transação; em caso de erro o lote é descartado (telemetria não bloqueia o robô)."""
+        try:
+            with conn:
+                if poses:
+                    conn.executemany(_INSERT_POSE, poses)
+                if transitions:
+                    conn.executemany(_INSERT_TRANSITION, transitions)
+                if deliveries:
+                    conn.executemany(_INSERT_DELIVERY, deliveries)
+            self.rows_written += len(poses) + len(transitions) + len(deliveries)
+        except Exception as e:
+            self.failures += 1
+            print(f"DEBUG: Erro ao gravar telemetria ({len(poses) + len(transitions) + len(deliveries)} linhas "
+                  f"descartadas): {e}")
+
+    # ---------------------------------------------------------------- consultas
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        with self.pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _period(since: Optional[float], until: Optional[float]) -> tuple:
+        return (float('-inf') if since is None else since, float('inf') if until is None else until)
+
+    def deliveries(self, since: Optional[float] = None, until: Optional[float] = None,
+                   destination: Optional[str] = None) -> List[Dict]:
+        """Entregas iniciadas no período (instantes Unix), opcionalmente de um destino."""
+        if destination is None:
+            return self._query("SELECT * FROM entregas WHERE inicio BETWEEN ? AND ? ORDER BY inicio",
+                               self._period(since, until))
+        return self._query("SELECT * FROM entregas WHERE destino = ? AND inicio BETWEEN ? AND ? ORDER BY inicio",
+                           (destination,) + self._period(since, until))
+
+    def report_by_table(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """Desempenho por destino (mesa) das entregas iniciadas no período."""
+        return self._query(f"""
+            SELECT destino, {_REPORT_COLUMNS}
+            FROM entregas
+            WHERE inicio BETWEEN ? AND ?
+            GROUP BY destino
+            ORDER BY destino
+        """, self._period(since, until))
+
+    def report_by_hour(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """Desempenho por hora do dia (horário local, 0-23) das entregas iniciadas no período."""
+        return self._query(f"""
+            SELECT CAST(strftime('%H', inicio, 'unixepoch', 'localtime') AS INTEGER) AS hora, {_REPORT_COLUMNS}
+            FROM entregas
+            WHERE inicio BETWEEN ? AND ?
+            GROUP BY hora
+            ORDER BY hora
+        """, self._period(since, until))
+
+    def pose_track(self, delivery_id: int) -> List[Tuple[float, float, float, float]]:
+        """Poses (instante, x, y, ângulo) amostradas durante uma entrega."""
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT instante, x, y, angulo FROM amostras_pose WHERE entrega_id = ? "
+                                "ORDER BY instante", (delivery_id,)).fetchall()
+
+    def state_transitions(self, delivery_id: Optional[int] = None, since: Optional[float] = None,
+                          until: Optional[float] = None) -> List[Tuple[float, Optional[str], str]]:
+        """Mudanças de estado (instante, estado anterior, estado) de uma entrega ou do período."""
+        with self.pool.connection() as conn:
+            if delivery_id is not None:
+                return conn.execute("SELECT instante, estado_anterior, estado FROM transicoes_estado "
+                                    "WHERE entrega_id = ? ORDER BY instante", (delivery_id,)).fetchall()
+            return conn.execute("SELECT instante, estado_anterior, estado FROM transicoes_estado "
+                                "WHERE instante BETWEEN ? AND ? ORDER BY instante",
+                                self._period(since, until)).fetchall()
+
+    def __repr__(self) -> str:
+        return f"TelemetryStore({self.db_path}, {self.rows_written} linhas gravadas, {self.pending} pendentes)"
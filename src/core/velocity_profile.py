@@ -0,0 +1,119 @@
+"""
+Geração de perfil de velocidade ao longo de um caminho planejado.
+
+O perfil é calculado uma única vez por planejamento: limites por curvatura
+(aceleração lateral), passagem para frente (aceleração) e passagem para trás
+(desaceleração até as paradas). Depois é reamostrado em uma tabela uniforme
+por comprimento de arco, interpolada linearmente em O(1) a cada ciclo de controle.
+"""
+
+from typing import List, Tuple, Optional, Iterable
+import numpy as np
+
+from .config import (TRAJECTORY_MAX_ACCELERATION, TRAJECTORY_MAX_LATERAL_ACCELERATION,
+                     TRAJECTORY_RESOLUTION, TRAJECTORY_MIN_SPEED)
+
+
+class VelocityProfile:
+    """
+    Perfil de velocidade limitado por curvatura e aceleração ao longo de um caminho.
+
+    Velocidades em m/s e distâncias em metros (comprimento de arco a partir do
+    primeiro ponto do caminho).
+    """
+
+    def __init__(self, path: List[Tuple[float, float]], max_speed: float,
+                 max_acceleration: float = TRAJECTORY_MAX_ACCELERATION,
+                 max_lateral_acceleration: float = TRAJECTORY_MAX_LATERAL_ACCELERATION,
+                 stop_indices: Optional[Iterable[int]] = None,
+                 resolution: float = TRAJECTORY_RESOLUTION,
+                 min_speed: float = TRAJECTORY_MIN_SPEED):
+        """
+        Calcula o perfil de velocidade.
+
+        Args:
+            path: Lista de pontos (x, y) do caminho
+            max_speed: Velocidade máxima de cruzeiro (m/s)
+            max_acceleration: Aceleração/desaceleração longitudinal máxima (m/s²)
+            max_lateral_acceleration: Aceleração lateral máxima nas curvas (m/s²)
+            stop_indices: Índices dos pontos onde o robô deve parar (o último ponto sempre é parada)
+            resolution: Espaçamento (m) da tabela de consulta
+            min_speed: Velocidade mínima retornada pela consulta, para o robô não travar em paradas
+        """
+        self.max_speed = max_speed
+        self.resolution = resolution
+        self.min_speed = min_speed
+
+        points = np.asarray(path, dtype=float).reshape(-1, 2)
+        count = len(points)
+        if count < 2:
+            self.cumulative = np.zeros(count)
+            self.vertex_speeds = np.zeros(count)
+            self._table = np.zeros(1)
+            return
+
+        segment_lengths = np.hypot(*np.diff(points, axis=0).T)
+        self.cumulative = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+
+        # 1. Limite por curvatura nos vértices (curvatura de Menger: 4·área / (a·b·c))
+        limits = np.full(count, max_speed)
+        a = segment_lengths[:-1]
+        b = segment_lengths[1:]
+        c = np.hypot(*(points[2:] - points[:-2]).T)
+        v1 = points[1:-1] - points[:-2]
+        v2 = points[2:] - points[1:-1]
+        double_area = np.abs(v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0])
+        denominator = a * b * c
+        curvature = np.where(denominator > 1e-12, 2.0 * double_area / np.where(denominator > 1e-12, denominator, 1.0), 0.0)
+        with np.errstate(divide='ignore'):
+            limits[1:-1] = np.minimum(max_speed, np.sqrt(max_lateral_acceleration / curvature))
+
+        # Paradas: início (robô parado), pontos solicitados e fim do caminho
+        limits[0] = 0.0
+        limits[-1] = 0.0
+        for index in stop_indices or []:
+            if 0 <= index < count:
+                limits[index] = 0.0
+
+        # 2. Passagem para frente (aceleração) e 3. para trás (desaceleração)
+        speeds = limits.copy()
+        two_a_ds = 2.0 * max_acceleration * segment_lengths
+        for i in range(count - 1):
+            speeds[i + 1] = min(speeds[i + 1], np.sqrt(speeds[i] ** 2 + two_a_ds[i]))
+        for i in range(count - 2, -1, -1):
+            speeds[i] = min(speeds[i], np.sqrt(speeds[i + 1] ** 2 + two_a_ds[i]))
+        self.vertex_speeds = speeds
+
+        # 4. Tabela uniforme por comprimento de arco (entre vértices a velocidade
+        #    segue as parábolas de aceleração a partir de cada extremidade)
+        samples = np.arange(0.0, self.cumulative[-1] + resolution, resolution)
+        segment = np.clip(np.searchsorted(self.cumulative, samples, side='right') - 1, 0, count - 2)
+        from_start = samples - self.cumulative[segment]
+        to_end = np.maximum(self.cumulative[segment + 1] - samples, 0.0)
+        accelerating = np.sqrt(speeds[segment] ** 2 + 2.0 * max_acceleration * np.maximum(from_start, 0.0))
+        braking = np.sqrt(speeds[segment + 1] ** 2 + 2.0 * max_acceleration * to_end)
+        self._table = np.minimum(np.minimum(accelerating, braking), max_speed)
+
+    @property
+    def length(self) -> float:
+        """Comprimento total do caminho (m)."""
+        return float(self.cumulative[-1]) if len(self.cumulative) else 0.0
+
+    def arc_length_at_index(self, index: int) -> float:
+        """Comprimento de arco (m) até o ponto de índice informado."""
+        if not len(self.cumulative):
+            return 0.0
+        return float(self.cumulative[min(max(index, 0), len(self.cumulative) - 1)])
+
+    def speed_at(self, s: float) -> float:
+        """Velocidade do perfil (m/s) no comprimento de arco s, em O(1)."""
+        table = self._table
+        if len(table) < 2:
+            return max(float(table[0]), self.min_speed)
+        # A tabela é uniforme: o índice sai direto de s, e a velocidade é interpolada entre as
+        # amostras vizinhas (arredondar para a de baixo deixaria o robô em min_speed por toda a
+        # primeira amostra após cada partida)
+        position = min(max(s, 0.0), self.length) / self.resolution
+        i = min(int(position), len(table) - 2)
+        t = position - i
+        return max(float(table[i] + t * (table[i + 1] - table[i])), self.min_speed)
@@ -1,11 +1,12 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QLabel, QComboBox, QMessageBox,
-                             QGroupBox, QGridLayout, QInputDialog, QProgressBar, QSlider)
-from PyQt5.QtCore import Qt, QTimer
+                             QGroupBox, QGridLayout, QInputDialog, QProgressBar, QSlider, QFileDialog)
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
 from PyQt5.QtGui import QPainter, QColor, QPen, QBrush, QCursor
 import sys
 import os
 import time
+from typing import Optional
 
 # Adiciona o diretório raiz ao PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -15,9 +16,33 @@ from src.core.config import *
 from src.interfaces.add_point_dialog import AddPointDialog
 from src.interfaces.map_widget import MapWidget
 from src.core.map_manager import MapManager
+from src.core.map_model import MapModel
+from src.core.map_writer import MapWriteBehind
+from src.core.map_cache import PreparedMap
 import math
 from src.interfaces.edit_point_dialog import EditPointDialog
 
+
+class MapSaveNotifier(QObject):
+    """
+    Leva à thread da interface o resultado das gravações feitas em segundo plano:
+    o sinal emitido na thread de gravação é entregue na fila de eventos do Qt.
+    """
+    saved = pyqtSignal(object, int, bool, str)  # (modelo, último pedido atendido, sucesso, erro)
+
+
+class MapModelNotifier(QObject):
+    """
+    Ouvinte do MapModel que leva as alterações à thread da interface: o modelo notifica
+    na thread que o alterou (a de gravação, ao confirmar um salvamento) e com seu bloqueio
+    adquirido, então a entrega é sempre pela fila de eventos do Qt.
+    """
+    changed = pyqtSignal(object)  # modelo alterado
+
+    def notify(self, model):
+        """Callback registrado com MapModel.subscribe()."""
+        self.changed.emit(model)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -31,9 +56,18 @@ class MainWindow(QMainWindow):
         self.has_unsaved_changes = False
         self.autosave_enabled = True
         self.last_autosave_time = None
+        self._save_message = None  # (título, número do pedido): mensagem a mostrar quando o pedido for gravado
         
-        # Inicializa o MapManager
+        # Inicializa o MapManager; as edições do mapa são gravadas em segundo plano e o
+        # resultado volta pelo sinal do map_save_notifier
         self.map_manager = MapManager()
+        self.map_save_notifier = MapSaveNotifier()
+        self.map_save_notifier.saved.connect(self._on_map_saved)
+        self.map_writer = MapWriteBehind(self.map_manager, on_saved=self.map_save_notifier.saved.emit)
+        self.map_writer.start()
+        self._displayed_map_version = -1
+        self.map_model_notifier = MapModelNotifier()
+        self.map_model_notifier.changed.connect(self._sync_map_view, Qt.QueuedConnection)
 
         # Configuração da janela
         self.setWindowTitle("Robô Garçom Autônomo")
@@ -45,6 +79,9 @@ class MainWindow(QMainWindow):
         # Área do mapa (lado esquerdo)
         map_layout = QVBoxLayout()
         self.map_widget = MapWidget()
+        self.map_model = MapModel()  # Mapa em edição; o autosave grava só as alterações dele
+        self.map_model.subscribe(self.map_model_notifier.notify)
+        self.map_widget.set_map_model(self.map_model)
         map_layout.addWidget(self.map_widget)
         
         # Barra de status do mapa
@@ -116,6 +153,16 @@ class MainWindow(QMainWindow):
         map_management_layout.addWidget(save_map_btn, 0, 0)
         map_management_layout.addWidget(load_map_btn, 0, 1)
         map_management_layout.addWidget(autosave_btn, 1, 0, 1, 2)  # Ocupa duas colunas
+        self.mapping_button = QPushButton("Mapear Ambiente (LIDAR)")
+        self.mapping_button.clicked.connect(self._toggle_mapping)
+        map_management_layout.addWidget(self.mapping_button, 2, 0, 1, 2)
+        export_map_btn = QPushButton("Exportar Mapa")
+        export_map_btn.clicked.connect(self._export_map)
+        import_maps_btn = QPushButton("Importar Mapas")
+        import_maps_btn.clicked.connect(self._import_maps)
+        map_management_layout.addWidget(export_map_btn, 3, 0)
+        map_management_layout.addWidget(import_maps_btn, 3, 1)
+        self.last_mapping_display = 0.0
         map_management_group.setLayout(map_management_layout)
         
         # Grupo de Navegação Melhorado
@@ -156,6 +203,17 @@ class MainWindow(QMainWindow):
         speed_control_layout.addWidget(self.speed_slider)
         nav_layout.addLayout(speed_control_layout)
 
+        # Modo de seguimento do caminho (para comparar tempos de viagem)
+        follower_layout = QHBoxLayout()
+        follower_layout.addWidget(QLabel("Seguidor:"))
+        self.follower_combo = QComboBox()
+        self.follower_combo.addItem("Waypoints (gira e avança)", "WAYPOINT")
+        self.follower_combo.addItem("Pure Pursuit (contínuo)", "PURE_PURSUIT")
+        self.follower_combo.setCurrentIndex(max(0, self.follower_combo.findData(NAVIGATION_FOLLOWER_MODE)))
+        self.follower_combo.currentIndexChanged.connect(self._on_follower_mode_changed)
+        follower_layout.addWidget(self.follower_combo)
+        nav_layout.addLayout(follower_layout)
+
         nav_buttons = QGridLayout()
         start_nav_btn = QPushButton("Iniciar Navegação")
         start_nav_btn.clicked.connect(self._start_navigation)
@@ -187,6 +245,9 @@ class MainWindow(QMainWindow):
         # Inicializa o navegador
         self.navigator = RobotNavigator()
         print(f"DEBUG: Navegador inicializado - Posição: {self.navigator.current_position}, Ângulo: {self.navigator.current_angle}°")
+        if TELEMETRY_ENABLED:
+            # Histórico das entregas; a gravação em lote roda em segundo plano
+            self.navigator.start_telemetry()
         
         # Configura callbacks do mapa
         self.map_widget.area_clicked_callback = self._on_area_clicked
@@ -199,7 +260,10 @@ class MainWindow(QMainWindow):
         # Tenta carregar o último mapa ativo ao iniciar
         self._load_active_map()
         
-        # Inicia o timer de atualização
+        # Ciclo de atualização (navegação e mapeamento): um único timer, ativo enquanto
+        # houver navegação ou mapeamento em andamento
+        self.update_timer = QTimer()
+        self.update_timer.timeout.connect(self._update)
         self._update()
 
     def _load_active_map(self):
@@ -211,56 +275,53 @@ class MainWindow(QMainWindow):
             map_name, ok = QInputDialog.getItem(
                 self, "Carregar Mapa", "Selecione um mapa para carregar:", map_names, 0, False
             )
+            # Gravações pendentes entram no banco antes que um mapa seja lido dele
+            if self.map_writer.busy:
+                self.map_writer.flush(DATABASE_BUSY_TIMEOUT)
             if ok and map_name:
-                # Carrega o mapa selecionado
-                self.map_manager.load_map_by_name(map_name)
-                active_map = self.map_manager.get_active_map()
-                if active_map:
-                    self.current_map = active_map
-                    # Carrega os pontos de interesse e áreas proibidas
-                    points_of_interest, forbidden_areas, _ = self.map_manager.load_active_map()
-                    map_data = {
-                        'points_of_interest': points_of_interest,
-                        'forbidden_areas': forbidden_areas
-                    }
-                    print(f"DEBUG: Carregando dados do mapa: {map_data}")
-                    print(f"DEBUG: Pontos de interesse carregados: {len(points_of_interest)}")
-                    print(f"DEBUG: Chaves dos pontos: {list(points_of_interest.keys())}")
-                    self.map_widget.load_map(map_data)
-                    self._update_points_list()
-                    self._update_destination_combo()
-                    self._reload_forbidden_areas()  # Recarrega áreas proibidas com IDs
-                    self.status_label.setText(f"Mapa carregado: {active_map['nome']}")
-                    
-                    # Reseta o robô para a posição base
-                    self._reset_robot_to_base()
-                else:
-                    self.status_label.setText("Nenhum mapa ativo encontrado")
+                # Ativa o mapa selecionado (preparado no cache, se usado recentemente)
+                prepared = self.map_manager.switch_map(map_name)
             else:
                 # Se o usuário cancelar, carrega o mapa ativo
-                active_map = self.map_manager.get_active_map()
-                if active_map:
-                    self.current_map = active_map
-                    # Carrega os pontos de interesse e áreas proibidas
-                    points_of_interest, forbidden_areas, _ = self.map_manager.load_active_map()
-                    map_data = {
-                        'points_of_interest': points_of_interest,
-                        'forbidden_areas': forbidden_areas
-                    }
-                    print(f"DEBUG: Carregando dados do mapa: {map_data}")
-                    self.map_widget.load_map(map_data)
-                    self._update_points_list()
-                    self._update_destination_combo()
-                    self._reload_forbidden_areas()  # Recarrega áreas proibidas com IDs
-                    self.status_label.setText(f"Mapa carregado: {active_map['nome']}")
-                    
-                    # Reseta o robô para a posição base
-                    self._reset_robot_to_base()
-                else:
-                    self.status_label.setText("Nenhum mapa ativo encontrado")
+                prepared = self.map_manager.load_prepared_map()
+            if prepared is not None:
+                self._show_prepared_map(prepared)
+                print(f"DEBUG: Chaves dos pontos: {list(self.map_model.points_of_interest.keys())}")
+                self.status_label.setText(f"Mapa carregado: {prepared.name}")
+
+                # Reseta o robô para a posição base
+                self._reset_robot_to_base()
+            else:
+                self.status_label.setText("Nenhum mapa ativo encontrado")
         else:
             self.status_label.setText("Nenhum mapa encontrado. Crie um novo mapa.")
             
+    def _show_prepared_map(self, prepared: PreparedMap):
+        """Exibe um mapa preparado e o passa ao navegador, com as grades e a grade de ocupação."""
+        self.current_map = {'id': prepared.map_id, 'nome': prepared.name,
+                            'largura': MAP_WIDTH, 'comprimento': MAP_HEIGHT}
+        self._set_map_model(prepared.model)
+        self._update_points_list()
+        self._update_destination_combo()
+        self._reload_forbidden_areas()  # Recarrega áreas proibidas com IDs
+        self.navigator.set_forbidden_areas(self.map_model.area_coordinates(), prepared.derived)
+        # As grades (re)calculadas ficam com o mapa para a próxima troca
+        prepared.derived = self.navigator.derived_grids
+        self.map_manager.map_cache.put(prepared)
+        self._apply_occupancy_grid(prepared.occupancy)
+
+    def _set_map_model(self, model: Optional[MapModel]):
+        """Passa a editar e exibir o modelo dado (um mapa vazio se None)."""
+        if self.map_model.has_changes and self.map_model.map_id is not None:
+            # O mapa anterior ainda é gravado em segundo plano
+            self.map_writer.request_save(self.map_model)
+        self.map_model.unsubscribe(self.map_model_notifier.notify)
+        self.map_model = model if model is not None else MapModel()
+        self.map_model.subscribe(self.map_model_notifier.notify)
+        self._displayed_map_version = self.map_model.version
+        self.map_widget.set_map_model(self.map_model)
+        print(f"DEBUG: Modelo do mapa carregado: {self.map_model}")
+
     def _reset_robot_to_base(self):
         """Reseta o robô para a posição base (5.7, 11.5) com ângulo 270°"""
         print("DEBUG: Resetando robô para posição base após carregamento do mapa")
@@ -288,6 +349,16 @@ class MainWindow(QMainWindow):
             
     def _update(self):
         """Atualiza o estado da interface e do robô"""
+        # Durante o mapeamento sem navegação, integra as voltas do LIDAR aqui
+        # (com navegação ativa, navigator.update() já faz isso)
+        if self.navigator.mapping_active:
+            if not self.navigation_active:
+                self.navigator.update_mapping()
+            if time.time() - self.last_mapping_display > OCCUPANCY_DISPLAY_INTERVAL:
+                self.last_mapping_display = time.time()
+                mapper = self.navigator.occupancy_mapper
+                self.map_widget.set_occupancy_grid(mapper.probabilities(), mapper.resolution)
+
         # Atualiza o navegador se a navegação estiver ativa
         if self.navigation_active:
             print(f"DEBUG: update() - Navegação ativa, chamando navigator.update()")
@@ -319,13 +390,20 @@ class MainWindow(QMainWindow):
                 print("DEBUG: ===== NAVEGAÇÃO CONCLUÍDA =====")
                 print("DEBUG: update() - Definindo navigation_active = False")
                 self.navigation_active = False
-                self.nav_status_label.setText("Status: Concluído")
+                # Para o ciclo antes da mensagem modal (exceto durante o mapeamento)
+                if not self.navigator.mapping_active:
+                    self.update_timer.stop()
+                self.map_widget.set_path([])
+                trip_time = nav_status.get("last_trip_time")
+                if trip_time is not None:
+                    self.nav_status_label.setText(f"Status: Concluído em {trip_time:.1f}s ({nav_status.get('follower_mode')})")
+                else:
+                    self.nav_status_label.setText("Status: Concluído")
                 self.nav_progress_bar.setVisible(False)
                 self.nav_info_label.setVisible(False)
                 self.status_label.setText("Modo: Manual")
                 QMessageBox.information(self, "Navegação", "Navegação concluída com sucesso!")
                 print("DEBUG: ===== FIM DA NAVEGAÇÃO =====")
-                # PARA COMPLETAMENTE A ATUALIZAÇÃO - NÃO AGENDA PRÓXIMA
                 return
                 
         # Atualiza a posição do robô no mapa
@@ -333,12 +411,19 @@ class MainWindow(QMainWindow):
         robot_angle = self.navigator.current_angle
         print(f"DEBUG: Atualizando posição do robô - Posição: {robot_position}, Ângulo: {robot_angle}°")
         self.map_widget.update_robot_position(robot_position[0], robot_position[1], robot_angle)
+        self.map_widget.set_path(self.navigator.path if self.navigation_active else [])
         
-        # Agenda a próxima atualização APENAS se a navegação não foi concluída
-        if self.navigation_active:
-            QTimer.singleShot(100, self._update)  # Atualiza a cada 100ms
-        else:
+        # O ciclo só continua enquanto houver navegação (ou mapeamento) em andamento
+        if not (self.navigation_active or self.navigator.mapping_active) and self.update_timer.isActive():
             print("DEBUG: Navegação concluída - parando atualizações automáticas")
+            self.update_timer.stop()
+
+    def _start_update_loop(self):
+        """Inicia o ciclo de atualização (a cada 100ms), se ainda não estiver rodando."""
+        if self.update_timer.isActive():
+            return
+        self.update_timer.start(100)
+        self._update()
         
     def _toggle_mode(self):
         """Alterna entre modo manual e autônomo."""
@@ -370,7 +455,7 @@ class MainWindow(QMainWindow):
             name, position, point_type = dialog.get_point_data()
             if name:  # Verifica se o nome não está vazio
                 print(f"DEBUG: Adicionando ponto {name} em ({x}, {y}) do tipo {point_type}")
-                self.map_widget.points_of_interest[name] = (x, y, point_type)
+                self.map_model.set_point(name, x, y, point_type)
                 self.map_widget.update()  # Força a atualização do mapa
                 self._update_points_list()
                 self._update_destination_combo()
@@ -393,14 +478,13 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            try:
-                del self.map_widget.points_of_interest[point_name]
+            if self.map_model.remove_point(point_name):
                 self.map_widget.update()  # Força a atualização imediata do mapa
                 self._update_points_list()
                 self._update_destination_combo()
                 self._mark_unsaved_changes()  # Marca alterações não salvas
                 QMessageBox.information(self, "Sucesso", f"Ponto '{point_name}' excluído com sucesso!")
-            except KeyError:
+            else:
                 QMessageBox.warning(self, "Erro", f"Erro ao excluir o ponto '{point_name}'!")
             
     def _add_forbidden_area(self):
@@ -416,7 +500,7 @@ class MainWindow(QMainWindow):
         self.status_label.setText("Modo: Manual" if not self.navigator.is_autonomous else "Modo: Autônomo")
         self.map_widget.area_finished_callback = None
         
-        # Salva a área proibida automaticamente no banco de dados
+        # Acrescenta a área proibida ao mapa em edição (gravada em segundo plano)
         if len(self.map_widget.current_forbidden_area) >= 3:
             # Gera um nome para a área
             area_count = len(self.map_widget.forbidden_areas) + 1
@@ -424,54 +508,71 @@ class MainWindow(QMainWindow):
             
             print(f"DEBUG: Salvando área proibida com {len(self.map_widget.current_forbidden_area)} pontos")
             
-            # Salva no banco de dados
-            success = self.map_manager.save_forbidden_area(
-                self.map_widget.current_forbidden_area, 
-                area_name
-            )
-            
-            if success:
-                # Limpa a área temporária
-                self.map_widget.current_forbidden_area = []
-                # Recarrega as áreas proibidas do banco para obter o ID
-                self._reload_forbidden_areas()
-                self._mark_unsaved_changes()  # Marca alterações não salvas
-                QMessageBox.information(self, "Sucesso", f"Área proibida '{area_name}' salva automaticamente!")
-            else:
-                QMessageBox.warning(self, "Erro", "Erro ao salvar área proibida no banco de dados!")
+            # Acrescenta ao modelo e grava o delta (a área recebe seu ID do banco)
+            self.map_model.add_area(self.map_widget.current_forbidden_area, area_name)
+            save_requested = self._save_model_changes()
+
+            # Limpa a área temporária
+            self.map_widget.current_forbidden_area = []
+            self._reload_forbidden_areas()
+            self._mark_unsaved_changes()  # Marca alterações não salvas
+            QMessageBox.information(self, "Sucesso", f"Área proibida '{area_name}' criada. "
+                                    f"{self._model_save_note(save_requested)}")
         else:
             QMessageBox.warning(self, "Aviso", "Área proibida deve ter pelo menos 3 pontos!")
 
     def _reload_forbidden_areas(self):
-        """Recarrega as áreas proibidas do banco de dados."""
-        print("DEBUG: Iniciando recarregamento de áreas proibidas")
-        
-        # Obtém o mapa ativo do banco se não tiver um carregado
-        if not self.current_map:
-            print("DEBUG: Nenhum mapa atual, obtendo mapa ativo do banco")
-            self.current_map = self.map_manager.get_active_map()
-            if not self.current_map:
-                print("DEBUG: Nenhum mapa ativo encontrado para recarregar áreas proibidas")
-                return
-            else:
-                print(f"DEBUG: Mapa ativo obtido: {self.current_map}")
-            
-        print(f"DEBUG: Usando mapa ID: {self.current_map['id']}")
-        
-        # Obtém as áreas proibidas com IDs do banco
-        areas_with_ids = self.map_manager.get_forbidden_areas_with_ids(self.current_map['id'])
-        print(f"DEBUG: Recarregando {len(areas_with_ids)} áreas proibidas do banco")
-        
-        # Atualiza o MapWidget
-        print(f"DEBUG: Atualizando MapWidget com {len(areas_with_ids)} áreas")
-        self.map_widget.forbidden_areas = areas_with_ids
+        """Atualiza a exibição das áreas proibidas a partir do modelo do mapa."""
+        print(f"DEBUG: Exibindo {len(self.map_model.forbidden_areas)} áreas proibidas do mapa")
+        self.map_widget.forbidden_areas = self.map_model.forbidden_areas
         self.map_widget.update()
-        
-        # Atualiza a lista de áreas proibidas
-        print("DEBUG: Atualizando lista de áreas proibidas")
         self._update_forbidden_areas_list()
-        
-        print("DEBUG: Recarregamento de áreas proibidas concluído")
+
+    def _save_model_changes(self) -> bool:
+        """
+        Pede a gravação em segundo plano das alterações do mapa em edição. Um mapa
+        ainda não gravado fica só em memória (o autosave o cria).
+
+        Returns:
+            True se a gravação foi pedida; o resultado chega por _on_map_saved
+        """
+        if self.map_model.map_id is None:
+            return False
+        self.map_writer.request_save(self.map_model)
+        return True
+
+    def _model_save_note(self, save_requested: bool) -> str:
+        """Complemento das mensagens de edição: onde a alteração fica até ser gravada."""
+        if save_requested:
+            return "A gravação no banco de dados é feita em segundo plano."
+        return "Ela fica em memória até o mapa ser salvo."
+
+    def _sync_map_view(self, model: MapModel):
+        """
+        Atualiza a exibição quando o modelo do mapa mudou fora da interface - a gravação
+        em segundo plano troca os IDs temporários das áreas e cria mapas novos.
+        Notificações enfileiradas de um modelo já substituído e as que chegam depois
+        da exibição refletir a versão atual são ignoradas.
+        """
+        if model is not self.map_model or model.version == self._displayed_map_version:
+            return
+        self._displayed_map_version = self.map_model.version
+        if self.map_model.map_id is not None and (not self.current_map or
+                                                   self.current_map.get('id') != self.map_model.map_id):
+            self.current_map = {'id': self.map_model.map_id, 'nome': self.map_model.name,
+                                'largura': MAP_WIDTH, 'comprimento': MAP_HEIGHT}
+        self._update_forbidden_areas_list()
+        self.map_widget.update()
+
+    def _save_map_as(self, map_name: str) -> bool:
+        """Grava o mapa em edição com outro nome e passa a editar o mapa gravado."""
+        if not self.map_manager.save_map(map_name, self.map_model.points_of_interest,
+                                         self.map_model.forbidden_areas):
+            return False
+        self._set_map_model(self.map_manager.load_map_model(map_name))
+        self.current_map = self.map_manager.get_active_map()
+        self._reload_forbidden_areas()
+        return True
         
     def _update_forbidden_areas_list(self):
         """Atualiza a lista de áreas proibidas no combo box."""
@@ -531,16 +632,18 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.Yes:
             print(f"DEBUG: Confirmada exclusão da área {area_id}")
-            # Remove do banco de dados
-            success = self.map_manager.delete_forbidden_area(area_id)
-            print(f"DEBUG: Resultado da exclusão no banco: {success}")
+            # Remove do modelo e pede a gravação do delta
+            success = self.map_model.remove_area(area_id)
+            print(f"DEBUG: Resultado da exclusão no modelo: {success}")
             
             if success:
+                save_requested = self._save_model_changes()
                 # Recarrega as áreas proibidas
                 print("DEBUG: Recarregando áreas proibidas...")
                 self._reload_forbidden_areas()
                 self._mark_unsaved_changes()  # Marca alterações não salvas
-                QMessageBox.information(self, "Sucesso", f"Área '{area_name}' excluída com sucesso!")
+                QMessageBox.information(self, "Sucesso", f"Área '{area_name}' excluída. "
+                                        f"{self._model_save_note(save_requested)}")
             else:
                 QMessageBox.warning(self, "Erro", f"Erro ao excluir a área '{area_name}'!")
         else:
@@ -550,16 +653,103 @@ class MainWindow(QMainWindow):
         """Salva o mapa atual no banco de dados."""
         map_name, ok = QInputDialog.getText(self, "Salvar Mapa", "Nome do Mapa:")
         if ok and map_name:
-            self.map_manager.save_map(
-                map_name,
-                self.map_widget.points_of_interest,
-                self.map_widget.forbidden_areas
-            )
+            if map_name == self.map_model.name and self.map_model.map_id is not None:
+                # Gravado em segundo plano; _on_map_saved avisa o resultado
+                ticket = self.map_writer.request_save(self.map_model, activate=True)
+                self._save_message = ("Salvar Mapa", ticket)
+                return
+            if not self._save_map_as(map_name):
+                QMessageBox.warning(self, "Erro", f"Erro ao salvar o mapa '{map_name}'!")
+                return
             self.has_unsaved_changes = False  # Limpa alterações não salvas
             QMessageBox.information(self, "Salvar Mapa", f"Mapa '{map_name}' salvo com sucesso!")
         elif not map_name and ok:
             QMessageBox.warning(self, "Aviso", "O nome do mapa não pode ser vazio!")
 
+    def _toggle_mapping(self):
+        """Inicia ou encerra o mapeamento do ambiente pelo LIDAR."""
+        if self.navigator.mapping_active:
+            self._finish_mapping()
+            return
+
+        if not self.current_map:
+            QMessageBox.warning(self, "Mapeamento", "Salve ou carregue um mapa antes de mapear o ambiente.")
+            return
+        if not self.navigator.start_mapping():
+            QMessageBox.warning(self, "Mapeamento", "LIDAR não disponível: o mapeamento requer scans do ambiente.")
+            return
+        self.mapping_button.setText("Encerrar Mapeamento")
+        self.status_label.setText("Mapeando: conduza o robô pelo ambiente")
+        self.last_mapping_display = 0.0
+        # Sem navegação, o ciclo de atualização está parado: reinicia-o
+        self._start_update_loop()
+
+    def _finish_mapping(self):
+        """Encerra o mapeamento, aplica o resultado ao planejador e o salva junto ao mapa."""
+        mapper = self.navigator.stop_mapping()
+        self.mapping_button.setText("Mapear Ambiente (LIDAR)")
+        self.map_widget.set_occupancy_grid(mapper.probabilities(), mapper.resolution)
+        if self.current_map and self.map_manager.save_occupancy_grid(mapper, self.current_map['id']):
+            self.status_label.setText(f"Mapeamento salvo: {mapper.scans_integrated} voltas integradas")
+        else:
+            self.status_label.setText("Erro ao salvar o mapeamento")
+
+    def _export_map(self):
+        """Exporta o mapa em edição para um pacote (.rgmb), para instalá-lo em outros robôs."""
+        if self.map_model.map_id is None:
+            QMessageBox.warning(self, "Exportar Mapa", "Salve o mapa antes de exportá-lo!")
+            return
+        default_path = os.path.join(MAP_BUNDLE_DIRECTORY, f"{self.map_model.name}{MAP_BUNDLE_EXTENSION}")
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar Mapa", default_path,
+                                              f"Pacotes de mapa (*{MAP_BUNDLE_EXTENSION})")
+        if not path:
+            return
+        if not path.endswith(MAP_BUNDLE_EXTENSION):
+            path += MAP_BUNDLE_EXTENSION
+        # O pacote é lido do banco: as alterações pendentes são gravadas antes
+        self.map_writer.request_save(self.map_model)
+        self.map_writer.flush(DATABASE_BUSY_TIMEOUT)
+        if self.map_manager.export_map_bundle(path, self.map_model.name, derived=self.navigator.derived_grids):
+            QMessageBox.information(self, "Exportar Mapa", f"Mapa '{self.map_model.name}' exportado para {path}")
+        else:
+            QMessageBox.warning(self, "Erro", f"Erro ao exportar o mapa '{self.map_model.name}'!")
+
+    def _import_maps(self):
+        """Importa um ou mais pacotes de mapa (.rgmb); mapas com o mesmo nome são substituídos."""
+        paths, _ = QFileDialog.getOpenFileNames(self, "Importar Mapas", MAP_BUNDLE_DIRECTORY,
+                                                f"Pacotes de mapa (*{MAP_BUNDLE_EXTENSION})")
+        if not paths:
+            return
+        # Grava as alterações pendentes antes que a importação substitua o mapa em edição
+        self.map_writer.flush(DATABASE_BUSY_TIMEOUT)
+        imported = self.map_manager.import_map_bundles(paths)
+        if not imported:
+            QMessageBox.warning(self, "Importar Mapas", "Nenhum mapa foi importado!")
+            return
+        if self.current_map and self.map_model.name in imported:
+            # O mapa em edição foi substituído: exibe o conteúdo importado
+            prepared = self.map_manager.load_prepared_map(self.map_model.name)
+            if prepared is not None:
+                self._show_prepared_map(prepared)
+        skipped = len(paths) - len(imported)
+        QMessageBox.information(self, "Importar Mapas",
+                                f"{len(imported)} mapa(s) importado(s): {', '.join(imported)}"
+                                + (f"\n{skipped} pacote(s) ignorado(s)" if skipped else ""))
+
+    def _apply_occupancy_grid(self, stored: Optional[tuple]):
+        """Aplica a grade de ocupação (log-odds, resolução) de um mapa - ou nenhuma - ao navegador e ao mapa."""
+        if stored is None:
+            self.navigator.load_occupancy_map(None)
+            self.map_widget.set_occupancy_grid(None)
+            return
+        log_odds, resolution = stored
+        try:
+            self.navigator.load_occupancy_map(log_odds)
+        except ValueError as e:
+            print(f"Erro ao aplicar grade de ocupação: {e}")
+            return
+        self.map_widget.set_occupancy_grid(self.navigator.occupancy_mapper.probabilities(), resolution)
+
     def _start_navigation(self):
         """Inicia a navegação autônoma com feedback melhorado"""
         print("🚀 ===== INICIANDO NOVA NAVEGAÇÃO =====")
@@ -638,8 +828,8 @@ class MainWindow(QMainWindow):
             
         print(f"DEBUG: Destino selecionado: {destination_name} em {destination}")
         
-        # Obtém as áreas proibidas do mapa atual
-        forbidden_areas = self.map_manager.get_forbidden_areas(self.current_map['id'])
+        # Obtém as áreas proibidas do mapa atual (do modelo em memória, sem consultar o banco)
+        forbidden_areas = self.map_model.area_coordinates()
         print(f"DEBUG: Áreas proibidas carregadas: {len(forbidden_areas)}")
         
         # Configura as áreas proibidas no navegador
@@ -655,7 +845,7 @@ class MainWindow(QMainWindow):
         # VERIFICA SE A FUNÇÃO VAI SER EXECUTADA
         try:
             print("⚡ EXECUTANDO navigate_to_and_return...")
-            self.navigator.navigate_to_and_return(destination, ROBOT_INITIAL_POSITION)
+            self.navigator.navigate_to_and_return(destination, ROBOT_INITIAL_POSITION, destination_name)
             print("✅ navigate_to_and_return EXECUTOU SEM ERRO")
         except Exception as e:
             print(f"❌ ERRO na execução de navigate_to_and_return: {e}")
@@ -680,8 +870,8 @@ class MainWindow(QMainWindow):
         self.nav_info_label.setVisible(True)
         self.status_label.setText("Navegando...")
         
-        # Reinicia o loop de atualização
-        self._update()
+        # Reinicia o loop de atualização (se o mapeamento já o mantém ativo, nada muda)
+        self._start_update_loop()
         
         print("DEBUG: Navegação iniciada com sucesso")
         print("DEBUG: ===== FIM DA INICIALIZAÇÃO =====")
@@ -709,41 +899,53 @@ class MainWindow(QMainWindow):
         print("DEBUG: Alterações não salvas detectadas")
         
     def _perform_autosave(self, show_message=False):
-        """Executa o autosave automático."""
+        """
+        Pede o autosave à thread de gravação (retorna sem esperar o banco). As alterações
+        só deixam de ser pendentes quando _on_map_saved recebe a confirmação.
+        """
         if not self.autosave_enabled or not self.has_unsaved_changes:
             return
             
-        try:
-            # Obtém o nome do mapa atual ou cria um nome padrão
-            if self.current_map:
-                map_name = self.current_map['nome']
-            else:
-                map_name = f"Mapa_Auto_{int(time.time())}"
-                
-            # Salva o mapa
-            self.map_manager.save_map(
-                map_name,
-                self.map_widget.points_of_interest,
-                self.map_widget.forbidden_areas
-            )
-            
+        # Grava só as alterações do mapa em edição; sem mapa gravado, a gravação cria
+        # um com nome padrão
+        if self.map_model.map_id is None and not self.map_model.name:
+            self.map_model.name = f"Mapa_Auto_{int(time.time())}"
+        ticket = self.map_writer.request_save(self.map_model, activate=self.map_model.map_id is None)
+        if show_message:
+            self._save_message = ("Autosave", ticket)
+        self.last_autosave_time = time.time()
+        print(f"DEBUG: Autosave pedido - Mapa '{self.map_model.name}'")
+
+    def _on_map_saved(self, model: MapModel, ticket: int, success: bool, error: str):
+        """Recebe (na thread da interface) o resultado de uma gravação em segundo plano."""
+        if model is not self.map_model:
+            # Mapa anterior, gravado depois de trocado
+            print(f"DEBUG: Mapa '{model.name}' gravado em segundo plano: {success}")
+            return
+        title = None
+        if self._save_message is not None and ticket >= self._save_message[1]:
+            # Esta gravação atendeu o pedido que espera mensagem
+            title, self._save_message = self._save_message[0], None
+        current_status = self.status_label.text()
+        if not success:
+            print(f"DEBUG: Erro no autosave: {error}")
+            self.status_label.setText(f"Erro ao salvar o mapa '{model.name}' (*)")
+            if title:
+                QMessageBox.warning(self, f"Erro - {title}", f"Erro ao salvar: {error}")
+            return
+
+        if not model.has_changes:
+            # Nada foi editado depois do instantâneo gravado
             self.has_unsaved_changes = False
             self.last_autosave_time = time.time()
-            
-            # Remove o indicador de alterações não salvas do status
-            current_status = self.status_label.text()
-            if "(*)" in current_status:
+            if current_status.startswith("Erro ao salvar"):
+                self.status_label.setText(f"Mapa salvo: {model.name}")
+            elif "(*)" in current_status:
                 self.status_label.setText(current_status.replace(" (*)", ""))
-            
-            if show_message:
-                QMessageBox.information(self, "Autosave", f"Mapa '{map_name}' salvo automaticamente!")
-            else:
-                print(f"DEBUG: Autosave executado - Mapa '{map_name}'")
-                
-        except Exception as e:
-            print(f"DEBUG: Erro no autosave: {e}")
-            if show_message:
-                QMessageBox.warning(self, "Erro no Autosave", f"Erro ao salvar automaticamente: {str(e)}")
+        if title:
+            QMessageBox.information(self, title, f"Mapa '{model.name}' salvo com sucesso!")
+        else:
+            print(f"DEBUG: Autosave concluído - Mapa '{model.name}'")
                 
     def _check_unsaved_changes(self) -> bool:
         """Verifica se há alterações não salvas e pergunta ao usuário."""
@@ -791,7 +993,15 @@ class MainWindow(QMainWindow):
         if self.autosave_enabled and self.has_unsaved_changes:
             self._perform_autosave(show_message=False)
             
-        self.navigator.motors.cleanup()
+        if self.navigator.mapping_active:
+            self._finish_mapping()
+
+        self.navigator.cleanup()
+        # A janela está fechando: o resultado da última gravação não gera mais mensagens
+        self._save_message = None
+        self.map_writer.stop(flush=True)
+        if self.map_model.has_changes:
+            print("DEBUG: Alterações do mapa não puderam ser gravadas antes de fechar")
         self.map_manager.close()
         event.accept()
 
@@ -818,3 +1028,13 @@ class MainWindow(QMainWindow):
         # Converte o valor do slider (100-200) para um multiplicador (1.0-2.0)
         multiplier = speed_percentage / 100.0
         self.navigator.set_speed_multiplier(multiplier)
+
+    def _on_follower_mode_changed(self, index):
+        """Altera o modo de seguimento do caminho do navegador."""
+        mode = self.follower_combo.itemData(index)
+        if not self.navigator.set_follower_mode(mode):
+            # Restaura a seleção anterior se o navegador recusou a troca
+            self.follower_combo.blockSignals(True)
+            self.follower_combo.setCurrentIndex(self.follower_combo.findData(self.navigator.follower_mode))
+            self.follower_combo.blockSignals(False)
+            QMessageBox.information(self, "Navegação", "Aguarde o término da navegação para trocar o seguidor.")
@@ -1,11 +1,13 @@
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import Qt, QPointF, QPoint
-from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QFont, QCursor, QPolygon
-from src.core.config import MAP_WIDTH, MAP_HEIGHT, MAP_SCALE, ROBOT_INITIAL_POSITION, ROBOT_INITIAL_ANGLE, DATABASE_PATH, INTERFACE_ROBOT_SIZE, INTERFACE_DIRECTION_LENGTH
+from PyQt5.QtCore import Qt, QPointF, QPoint, QRect, QRectF, QTimer
+from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QFont, QCursor, QPolygon, QImage, QPixmap
+from src.core.config import MAP_WIDTH, MAP_HEIGHT, MAP_SCALE, ROBOT_INITIAL_POSITION, ROBOT_INITIAL_ANGLE, DATABASE_PATH, INTERFACE_ROBOT_SIZE, INTERFACE_DIRECTION_LENGTH, INTERFACE_MAX_FPS
 import math
+import time
 import sys
 import os
 import sqlite3
+import numpy as np
 from typing import Dict, List, Tuple, Callable, Optional
 
 # Adiciona o diretório raiz ao PYTHONPATH
@@ -33,34 +35,158 @@ class MapWidget(QWidget):
         self.area_finished_callback: Optional[Callable[[], None]] = None
         self.selected_area_id = None  # ID da área selecionada
         self.area_clicked_callback: Optional[Callable[[int], None]] = None  # Callback para clique em área
+        self.occupancy_image: Optional[QImage] = None  # Grade de ocupação mapeada pelo LIDAR
+        self.occupancy_resolution = 0.1
+        self.map_model = None  # Modelo exibido (set_map_model); sua versão invalida a camada estática
+        # Camada estática (ocupação, grade, áreas e pontos) desenhada uma vez e copiada a cada
+        # redesenho; refeita só quando muda algo do que ela mostra (ver _static_layer_key)
+        self._static_layer: Optional[QPixmap] = None
+        self._static_layer_key = None
+        self.static_layer_renders = 0
+        # O widget inteiro é coberto pela camada estática: o Qt não precisa apagar o fundo antes
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+        # Caminho planejado, desenhado sobre a camada estática
+        self.path_overlay: List[Tuple[float, float]] = []
+        self._path_rect = QRect()
+
+        # Redesenho do robô limitado a max_fps, independente da taxa de controle: poses que chegam
+        # antes do próximo quadro só atualizam a pose, e o quadro desenha a mais recente
+        self.max_fps = INTERFACE_MAX_FPS
+        self._last_robot_frame = float('-inf')
+        self._robot_frame_timer = QTimer(self)
+        self._robot_frame_timer.setSingleShot(True)
+        self._robot_frame_timer.timeout.connect(self._request_robot_frame)
+        self._requested_robot_pixels = None  # Centro e ponta da seta (pixels) do último quadro pedido
+        self._robot_region = QRect()  # Região onde o robô pode estar desenhado na tela
+        self.robot_frames_skipped = 0
         
     def update_robot_position(self, x: float, y: float, angle: float):
-        """Atualiza a posição do robô no mapa."""
+        """
+        Atualiza a posição do robô no mapa. O redesenho cobre só a região que o robô ocupava
+        e a que ocupa, respeita o limite de quadros e é omitido se o robô não mudou de pixel.
+        """
         self.robot_position = (x, y)
         self.robot_angle = angle
-        self.update()
+        if self._robot_frame_timer.isActive():
+            return
+        wait = self._last_robot_frame + 1.0 / self.max_fps - time.monotonic() if self.max_fps > 0 else 0.0
+        if wait > 0:
+            self._robot_frame_timer.start(int(math.ceil(wait * 1000)))
+        else:
+            self._request_robot_frame()
+
+    def _robot_pixels(self) -> Tuple[int, int, int, int]:
+        """Centro do robô e ponta da seta de direção, em pixels."""
+        x, y = self.robot_position
+        angle_rad = math.radians(self.robot_angle)
+        screen_x, screen_y = x * self.scale, y * self.scale
+        return (int(screen_x), int(screen_y),
+                int(screen_x + INTERFACE_DIRECTION_LENGTH * math.cos(angle_rad)),
+                int(screen_y + INTERFACE_DIRECTION_LENGTH * math.sin(angle_rad)))
+
+    def _request_robot_frame(self):
+        """Pede o redesenho da região do robô, se ele mudou de pixel desde o último quadro."""
+        pixels = self._robot_pixels()
+        rect = self._robot_rect()
+        if pixels == self._requested_robot_pixels and self._robot_region == rect:
+            self.robot_frames_skipped += 1
+            return
+        self.update(self._robot_region.united(rect))
+        self._requested_robot_pixels = pixels
+        self._robot_region = rect
+        self._last_robot_frame = time.monotonic()
+
+    def set_path(self, path: List[Tuple[float, float]]):
+        """Exibe o caminho planejado (lista vazia para ocultar), redesenhando só a região dele."""
+        if path is self.path_overlay or (not path and not self.path_overlay):
+            return
+        previous = self._path_rect
+        self.path_overlay = path
+        self._path_rect = QRect()
+        if len(path) >= 2:
+            xs = [int(float(x) * self.scale) for x, _ in path]
+            ys = [int(float(y) * self.scale) for _, y in path]
+            self._path_rect = QRect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1).adjusted(-3, -3, 3, 3)
+        self.update(previous.united(self._path_rect))
         
     def add_point_of_interest(self, name, position):
         """Adiciona um ponto de interesse ao mapa"""
         self.points_of_interest[name] = position
+        self.invalidate_static_layer()
+
+    def invalidate_static_layer(self):
+        """Descarta a camada estática (a ser chamado quando pontos ou áreas mudam fora do modelo)."""
+        self._static_layer = None
         self.update()
-        
-    def paintEvent(self, event):
-        """Desenha o mapa, pontos de interesse e áreas proibidas"""
-        super().paintEvent(event)
-        painter = QPainter(self)
+
+    def _current_static_layer_key(self) -> tuple:
+        """Estado exibido pela camada estática; se mudar, a camada é refeita."""
+        return (self.width(), self.height(), self.devicePixelRatioF(), self.scale, self.selected_area_id,
+                id(self.points_of_interest), id(self.forbidden_areas),
+                self.map_model.version if self.map_model is not None else None)
+
+    def _render_static_layer(self) -> QPixmap:
+        """Desenha a ocupação, a grade, as áreas proibidas e os pontos de interesse em um QPixmap."""
+        ratio = self.devicePixelRatioF()
+        layer = QPixmap(int(math.ceil(self.width() * ratio)), int(math.ceil(self.height() * ratio)))
+        layer.setDevicePixelRatio(ratio)
+        layer.fill(self.palette().color(self.backgroundRole()))
+        painter = QPainter(layer)
         painter.setRenderHint(QPainter.Antialiasing)
         
+        # Desenha a grade de ocupação mapeada (por baixo de todo o resto)
+        self._draw_occupancy_grid(painter)
+
         # Desenha o grid
         self._draw_grid(painter)
         
         # Desenha as áreas proibidas
         self._draw_forbidden_areas(painter)
         
+        # Desenha os pontos de interesse
+        self._draw_points_of_interest(painter)
+        painter.end()
+        self.static_layer_renders += 1
+        return layer
+
+    def paintEvent(self, event):
+        """Desenha o mapa, pontos de interesse e áreas proibidas"""
+        key = self._current_static_layer_key()
+        if self._static_layer is None or key != self._static_layer_key:
+            self._static_layer = self._render_static_layer()
+            self._static_layer_key = key
+
+        painter = QPainter(self)
+        # Copia da camada estática apenas a região a redesenhar
+        rect = event.rect()
+        ratio = self._static_layer.devicePixelRatio()
+        painter.drawPixmap(QRectF(rect), self._static_layer,
+                           QRectF(rect.x() * ratio, rect.y() * ratio, rect.width() * ratio, rect.height() * ratio))
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Desenha o caminho planejado
+        if rect.intersects(self._path_rect):
+            self._draw_path(painter)
+
         # Desenha a área proibida que está sendo criada
         self._draw_current_forbidden_area(painter)
         
-        # Desenha os pontos de interesse
+        # Desenha o robô (a pose pode ter mudado desde o pedido do quadro: a região passa a incluí-la)
+        robot_rect = self._robot_rect()
+        if rect.intersects(robot_rect):
+            self._draw_robot(painter)
+            self._robot_region = self._robot_region.united(robot_rect)
+
+    def _draw_path(self, painter: QPainter):
+        """Desenha o caminho planejado como uma linha tracejada."""
+        painter.setPen(QPen(QColor(0, 150, 0, 160), 2, Qt.PenStyle.DashLine))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawPolyline(QPolygon([QPoint(int(float(x) * self.scale), int(float(y) * self.scale))
+                                       for x, y in self.path_overlay]))
+
+    def _draw_points_of_interest(self, painter: QPainter):
+        """Desenha os pontos de interesse com nome e tipo."""
         for name, point_data in self.points_of_interest.items():
             x, y, point_type = point_data
             screen_x = int(x * self.scale)
@@ -77,10 +203,38 @@ class MapWidget(QWidget):
             painter.setPen(QPen(QColor(0, 0, 0)))
             painter.setFont(QFont('Arial', 8))
             painter.drawText(screen_x + 10, screen_y + 5, f"{name} ({point_type})")
-            
-        # Desenha o robô
-        self._draw_robot(painter)
         
+    def set_occupancy_grid(self, probabilities: Optional[np.ndarray], resolution: float = 0.1):
+        """
+        Define a grade de ocupação exibida sob o mapa.
+
+        Args:
+            probabilities: Probabilidade de ocupação [y, x] (0.5 = desconhecida) ou None para ocultar
+            resolution: Lado da célula em metros
+        """
+        if probabilities is None:
+            self.occupancy_image = None
+            self.invalidate_static_layer()
+            return
+        # Desconhecido fica transparente; livre claro e ocupado escuro, com opacidade pela certeza
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        gray = ((1.0 - probabilities) * 255).astype(np.uint32)
+        alpha = np.clip(np.abs(probabilities - 0.5) * 2 * 255, 0, 255).astype(np.uint32)
+        argb = np.ascontiguousarray((alpha << 24) | (gray << 16) | (gray << 8) | gray)
+        height, width = argb.shape
+        # copy(): a QImage passa a ter o próprio buffer, independente do array
+        self.occupancy_image = QImage(argb.data, width, height, width * 4, QImage.Format_ARGB32).copy()
+        self.occupancy_resolution = resolution
+        self.invalidate_static_layer()
+
+    def _draw_occupancy_grid(self, painter: QPainter):
+        """Desenha a grade de ocupação, escalada para o mapa."""
+        if self.occupancy_image is None:
+            return
+        target = QRectF(0, 0, self.occupancy_image.width() * self.occupancy_resolution * self.scale,
+                        self.occupancy_image.height() * self.occupancy_resolution * self.scale)
+        painter.drawImage(target, self.occupancy_image)
+
     def _draw_grid(self, painter: QPainter):
         """Desenha a grade do mapa."""
         painter.setPen(QPen(QColor(128, 128, 128), 1, Qt.PenStyle.DotLine))
@@ -223,6 +377,18 @@ class MapWidget(QWidget):
                 # Dispara o processo de finalização com duplo clique.
                 self.finish_forbidden_area()
 
+    def set_map_model(self, model):
+        """
+        Exibe o modelo do mapa: os pontos e as áreas passam a ser os do modelo
+        (mesmos objetos), de modo que as edições feitas nele aparecem no próximo redesenho.
+        """
+        self.map_model = model
+        self.points_of_interest = model.points_of_interest
+        self.forbidden_areas = model.forbidden_areas
+        self.map_name = model.name
+        self.selected_area_id = None
+        self.invalidate_static_layer()
+
     def load_map(self, map_data: Dict):
         """Carrega os dados do mapa."""
         print(f"DEBUG: Carregando mapa: {map_data}")
@@ -256,7 +422,7 @@ class MapWidget(QWidget):
                 }
                 self.forbidden_areas.append(area_dict)
         
-        self.update()
+        self.invalidate_static_layer()
 
     def save_map(self) -> Dict:
         """Salva os dados do mapa."""
@@ -275,6 +441,12 @@ class MapWidget(QWidget):
             'forbidden_areas': forbidden_areas_compat
         }
 
+    def _robot_rect(self) -> QRect:
+        """Região da tela ocupada pelo robô e pela seta de direção, com margem para o traço."""
+        x, y = self.robot_position
+        radius = max(INTERFACE_ROBOT_SIZE // 2, INTERFACE_DIRECTION_LENGTH) + 4
+        return QRect(int(x * self.scale) - radius, int(y * self.scale) - radius, 2 * radius + 1, 2 * radius + 1)
+
     def _draw_robot(self, painter: QPainter):
         """Desenha o robô no mapa."""
         x, y = self.robot_position
@@ -377,7 +549,7 @@ class MapWidget(QWidget):
     def add_forbidden_area(self, area_data: Dict):
         """Adiciona uma área proibida com dados completos."""
         self.forbidden_areas.append(area_data)
-        self.update()
+        self.invalidate_static_layer()
         
     def remove_forbidden_area(self, area_id: int) -> bool:
         """Remove uma área proibida pelo ID."""
@@ -386,7 +558,7 @@ class MapWidget(QWidget):
                 del self.forbidden_areas[i]
                 if self.selected_area_id == area_id:
                     self.selected_area_id = None
-                self.update()
+                self.invalidate_static_layer()
                 return True
         return False
         